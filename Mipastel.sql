@@ -16,6 +16,7 @@ CREATE TABLE PastelesNormales (
                                   fecha_entrega DATETIME2 NULL,
                                   detalles NVARCHAR(MAX) NULL,
                                   sabor_personalizado NVARCHAR(100) NULL,
+                                  version_fila ROWVERSION,
 
                                   fecha_formateada AS FORMAT(fecha, 'dd-MM-yyyy'),
                                   fecha_hora_formateada AS FORMAT(fecha, 'dd-MM-yyyy HH:mm'),
@@ -24,7 +25,13 @@ CREATE TABLE PastelesNormales (
 );
 GO
 
-CREATE INDEX idx_fecha_sucursal ON PastelesNormales(fecha, sucursal);
+CREATE INDEX idx_normales_sucursal_fecha ON PastelesNormales(sucursal, fecha)
+    INCLUDE (sabor, tamano, cantidad, precio, total, fecha_entrega, sabor_personalizado, detalles, version_fila);
+GO
+
+CREATE INDEX idx_normales_fecha ON PastelesNormales(fecha)
+    INCLUDE (sucursal, sabor, tamano, cantidad, precio, total, fecha_entrega, sabor_personalizado, detalles,
+             version_fila);
 GO
 
 CREATE TRIGGER TR_CalcularTotalNormal
@@ -129,6 +136,7 @@ CREATE TABLE PastelesClientes (
                                   sabor_personalizado NVARCHAR(100) NULL,
                                   foto_path NVARCHAR(500) NULL,
                                   fecha_entrega DATETIME2 NULL,
+                                  version_fila ROWVERSION,
 
                                   fecha_formateada AS FORMAT(fecha, 'dd-MM-yyyy'),
                                   fecha_hora_formateada AS FORMAT(fecha, 'dd-MM-yyyy HH:mm'),
@@ -137,7 +145,14 @@ CREATE TABLE PastelesClientes (
 );
 GO
 
-CREATE INDEX idx_fecha_sucursal_clientes ON PastelesClientes(fecha, sucursal);
+CREATE INDEX idx_clientes_sucursal_fecha ON PastelesClientes(sucursal, fecha)
+    INCLUDE (color, sabor, tamano, cantidad, precio, total, fecha_entrega, sabor_personalizado,
+             foto_path, dedicatoria, detalles, version_fila);
+GO
+
+CREATE INDEX idx_clientes_fecha ON PastelesClientes(fecha)
+    INCLUDE (sucursal, color, sabor, tamano, cantidad, precio, total, fecha_entrega, sabor_personalizado,
+             foto_path, dedicatoria, detalles, version_fila);
 GO
 
 CREATE TRIGGER TR_CalcularTotalCliente
@@ -9,12 +9,12 @@ logger = logging.getLogger(__name__)
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from PySide6.QtWidgets import (
-    QMainWindow, QWidget, QTabWidget, QVBoxLayout, QTableWidget,
-    QTableWidgetItem, QPushButton, QLabel, QHBoxLayout, QComboBox, QDateEdit,
+    QMainWindow, QWidget, QTabWidget, QVBoxLayout, QTableView,
+    QPushButton, QLabel, QHBoxLayout, QComboBox, QDateEdit, QLineEdit,
     QFileDialog, QAbstractItemView, QHeaderView, QGridLayout, QMenu,
-    QApplication, QDialog, QDialogButtonBox, QRadioButton
+    QApplication, QDialog, QDialogButtonBox, QRadioButton, QCheckBox, QProgressDialog
 )
-from PySide6.QtCore import QDate, Qt, Slot
+from PySide6.QtCore import QDate, QSize, Qt, Slot
 from PySide6.QtGui import QFont, QKeyEvent, QPixmap
 
 try:
@@ -26,8 +26,19 @@ try:
         obtener_cliente_por_id_db,
         obtener_normal_por_id_db
     )
-    import pdf_reportes
-    from config import SUCURSALES_FILTRO
+    from config import SUCURSALES, SUCURSALES_FILTRO
+    from utils.fechas import rango_dias
+    from admin.modelos import (
+        COLUMNAS_CLIENTES,
+        COLUMNAS_NORMALES,
+        ROL_VALOR,
+        ConsultaPedidos,
+        FiltroPedidos,
+        ModeloPedidos
+    )
+    from admin.reportes_proceso import TareaReporte, nombre_reporte
+    from admin.reportes_worker import LoteReportes
+    from admin.catalogo import obtener_catalogo
     from admin.dialogos import (
         DialogoNuevoNormal,
         DialogoNuevoCliente,
@@ -40,6 +51,14 @@ except ImportError as e:
     logger.error(f"Error fatal en imports de admin_app: {e}", exc_info=True)
     sys.exit(f"Error fatal en imports: {e}")
 
+CAMPOS_CLIENTES = (
+    "id", "cantidad", "tamano", "sabor", "sucursal", "fecha", "fecha_entrega",
+    "detalles", "dedicatoria", "color", "precio", "total", "foto_path"
+)
+CAMPOS_NORMALES = (
+    "id", "cantidad", "tamano", "sabor", "sucursal", "fecha", "fecha_entrega", "precio", "total"
+)
+
 DARK_STYLE = """
 QMainWindow {
     background-color: #ffffff; 
@@ -82,7 +101,7 @@ QTabBar::tab:hover {
     color: #ffffff;
 }
 
-QTableWidget {
+QTableView {
     background-color: #ffffff;
     color: #2b1b3a;
     gridline-color: #f0d6ec;
@@ -100,12 +119,12 @@ QHeaderView::section {
     font-size: 10pt;
 }
 
-QTableWidget::item {
+QTableView::item {
     padding: 8px;
     border-bottom: 1px solid #fff0f6;
 }
 
-QTableWidget::item:selected {
+QTableView::item:selected {
     background-color: #b65fae;
     color: #ffffff;
 }
@@ -370,6 +389,12 @@ class AdminApp(QMainWindow):
 
         self.setFont(QFont("Segoe UI", 12))
 
+        # Lotes de reportes PDF generándose en procesos aparte
+        self._lotes_reporte = []
+
+        # Los precios de la sesión se cargan en segundo plano desde ya
+        obtener_catalogo()
+
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
 
@@ -447,18 +472,25 @@ class AdminApp(QMainWindow):
         self.btn_reporte_clientes.setProperty("cssClass", "btnAzul")
         filtros_layout_clientes.addWidget(self.btn_reporte_clientes, 0, 5)
 
+        filtros_layout_clientes.addWidget(QLabel("Buscar:"), 0, 6)
+        self.txt_buscar_clientes = QLineEdit()
+        self.txt_buscar_clientes.setPlaceholderText("Sabor, color, dedicatoria...")
+        self.txt_buscar_clientes.setClearButtonEnabled(True)
+        filtros_layout_clientes.addWidget(self.txt_buscar_clientes, 0, 7)
+
         self.layout_clientes.addLayout(filtros_layout_clientes)
 
-        self.table_clientes = QTableWidget()
-        self.table_clientes.setColumnCount(13)
-        self.table_clientes.setHorizontalHeaderLabels([
-            "ID", "Cant.", "Tamaño", "Sabor", "Sucursal", "Fecha",
-            "Fecha Entrega", "Detalles", "Dedicatoria", "Color", "Precio U.", "Total", "Foto"
-        ])
+        self.modelo_clientes = ModeloPedidos(COLUMNAS_CLIENTES, self)
+        self.filtro_clientes = FiltroPedidos(self.modelo_clientes, self)
+        self.table_clientes = QTableView()
+        self.table_clientes.setModel(self.filtro_clientes)
+        self.table_clientes.setSortingEnabled(True)
+        self.table_clientes.sortByColumn(0, Qt.DescendingOrder)
         self.table_clientes.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.table_clientes.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.table_clientes.setSelectionMode(QAbstractItemView.SingleSelection)
         self.table_clientes.setAlternatingRowColors(True)
+        self.table_clientes.setIconSize(QSize(40, 40))
 
         header_clientes = self.table_clientes.horizontalHeader()
         header_clientes.setSectionResizeMode(QHeaderView.ResizeToContents)
@@ -519,13 +551,20 @@ class AdminApp(QMainWindow):
         self.btn_reporte_normales.setProperty("cssClass", "btnAzul")
         filtros_layout_normales.addWidget(self.btn_reporte_normales, 0, 5)
 
+        filtros_layout_normales.addWidget(QLabel("Buscar:"), 0, 6)
+        self.txt_buscar_normales = QLineEdit()
+        self.txt_buscar_normales.setPlaceholderText("Sabor, tamaño, sucursal...")
+        self.txt_buscar_normales.setClearButtonEnabled(True)
+        filtros_layout_normales.addWidget(self.txt_buscar_normales, 0, 7)
+
         self.layout_normales.addLayout(filtros_layout_normales)
 
-        self.table_normales = QTableWidget()
-        self.table_normales.setColumnCount(9)
-        self.table_normales.setHorizontalHeaderLabels([
-            "ID", "Cant.", "Tamaño", "Sabor", "Sucursal", "Fecha", "Fecha Entrega", "Precio U.", "Total"
-        ])
+        self.modelo_normales = ModeloPedidos(COLUMNAS_NORMALES, self)
+        self.filtro_normales = FiltroPedidos(self.modelo_normales, self)
+        self.table_normales = QTableView()
+        self.table_normales.setModel(self.filtro_normales)
+        self.table_normales.setSortingEnabled(True)
+        self.table_normales.sortByColumn(0, Qt.DescendingOrder)
         self.table_normales.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.table_normales.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.table_normales.setSelectionMode(QAbstractItemView.SingleSelection)
@@ -577,13 +616,19 @@ class AdminApp(QMainWindow):
         self.btn_nuevo_cliente.clicked.connect(self.abrir_dialogo_cliente_nuevo)
         self.btn_editar_cliente.clicked.connect(self.abrir_dialogo_cliente_editar)
         self.btn_eliminar_cliente.clicked.connect(self.eliminar_cliente)
-        self.table_clientes.itemSelectionChanged.connect(self.actualizar_botones_crud_clientes)
+        self.table_clientes.selectionModel().selectionChanged.connect(self.actualizar_botones_crud_clientes)
+        self.txt_buscar_clientes.textChanged.connect(self.filtro_clientes.establecer_busqueda)
+        self.modelo_clientes.cargaTerminada.connect(self._clientes_cargados)
+        self.modelo_clientes.cargaFallida.connect(self._error_cargar_clientes)
         self.btn_filtrar_normales.clicked.connect(self.cargar_normales)
         self.btn_reporte_normales.clicked.connect(self.generar_reporte_listas)
         self.btn_nuevo_normal.clicked.connect(self.abrir_dialogo_normal_nuevo)
         self.btn_editar_normal.clicked.connect(self.abrir_dialogo_normal_editar)
         self.btn_eliminar_normal.clicked.connect(self.eliminar_normal)
-        self.table_normales.itemSelectionChanged.connect(self.actualizar_botones_crud_normales)
+        self.table_normales.selectionModel().selectionChanged.connect(self.actualizar_botones_crud_normales)
+        self.txt_buscar_normales.textChanged.connect(self.filtro_normales.establecer_busqueda)
+        self.modelo_normales.cargaTerminada.connect(self._normales_cargados)
+        self.modelo_normales.cargaFallida.connect(self._error_cargar_normales)
 
     def configurar_tablas_copia(self):
         self.table_clientes.setSelectionBehavior(QAbstractItemView.SelectItems)
@@ -604,35 +649,30 @@ class AdminApp(QMainWindow):
         if event.key() == Qt.Key_C and (event.modifiers() & Qt.ControlModifier):
             self._copiar_seleccion(self.table_clientes)
         else:
-            QTableWidget.keyPressEvent(self.table_clientes, event)
+            QTableView.keyPressEvent(self.table_clientes, event)
 
     def _key_press_event_normales(self, event: QKeyEvent):
         if event.key() == Qt.Key_C and (event.modifiers() & Qt.ControlModifier):
             self._copiar_seleccion(self.table_normales)
         else:
-            QTableWidget.keyPressEvent(self.table_normales, event)
+            QTableView.keyPressEvent(self.table_normales, event)
 
-    def _copiar_seleccion(self, table: QTableWidget):
-        selected_items = table.selectedItems()
+    def _copiar_seleccion(self, table: QTableView):
+        indices = table.selectionModel().selectedIndexes()
 
-        if not selected_items:
+        if not indices:
             return
 
-        min_row = min(item.row() for item in selected_items)
-        max_row = max(item.row() for item in selected_items)
-        min_col = min(item.column() for item in selected_items)
-        max_col = max(item.column() for item in selected_items)
+        celdas = {(index.row(), index.column()): index.data() or "" for index in indices}
+        min_row = min(fila for fila, _ in celdas)
+        max_row = max(fila for fila, _ in celdas)
+        min_col = min(col for _, col in celdas)
+        max_col = max(col for _, col in celdas)
 
         copied_text = ""
 
         for row in range(min_row, max_row + 1):
-            row_data = []
-            for col in range(min_col, max_col + 1):
-                item = table.item(row, col)
-                if item and item.text():
-                    row_data.append(item.text())
-                else:
-                    row_data.append("")
+            row_data = [celdas.get((row, col), "") for col in range(min_col, max_col + 1)]
             copied_text += "\t".join(row_data) + "\n"
 
         QApplication.clipboard().setText(copied_text.strip())
@@ -645,7 +685,7 @@ class AdminApp(QMainWindow):
     def _mostrar_menu_contextual_normales(self, pos):
         self._mostrar_menu_contextual(self.table_normales, pos)
 
-    def _mostrar_menu_contextual(self, table: QTableWidget, pos):
+    def _mostrar_menu_contextual(self, table: QTableView, pos):
         menu = QMenu(self)
 
         copiar_action = menu.addAction("Copiar selección")
@@ -658,28 +698,23 @@ class AdminApp(QMainWindow):
         elif action == copiar_todo_action:
             self._copiar_toda_tabla(table)
 
-    def _copiar_toda_tabla(self, table: QTableWidget):
-        if table.rowCount() == 0:
+    def _copiar_toda_tabla(self, table: QTableView):
+        modelo = table.model()
+        if modelo.rowCount() == 0:
             return
 
         headers = []
-        for col in range(table.columnCount()):
-            header = table.horizontalHeaderItem(col)
+        for col in range(modelo.columnCount()):
+            header = modelo.headerData(col, Qt.Horizontal)
             if header:
-                headers.append(header.text())
+                headers.append(header)
             else:
                 headers.append(f"Columna {col+1}")
 
         copied_text = "\t".join(headers) + "\n"
 
-        for row in range(table.rowCount()):
-            row_data = []
-            for col in range(table.columnCount()):
-                item = table.item(row, col)
-                if item and item.text():
-                    row_data.append(item.text())
-                else:
-                    row_data.append("")
+        for row in range(modelo.rowCount()):
+            row_data = [modelo.index(row, col).data() or "" for col in range(modelo.columnCount())]
             copied_text += "\t".join(row_data) + "\n"
 
         QApplication.clipboard().setText(copied_text.strip())
@@ -690,196 +725,85 @@ class AdminApp(QMainWindow):
         self.cargar_clientes()
         self.cargar_normales()
 
-    def _crear_item_centrado(self, texto: str) -> QTableWidgetItem:
-        item = QTableWidgetItem(texto)
-        item.setTextAlignment(Qt.AlignCenter)
-        item.setFlags(item.flags() & ~Qt.ItemIsEditable)
-        return item
-
-    def _crear_item_moneda(self, valor: float) -> QTableWidgetItem:
-        item = QTableWidgetItem(f"Q{valor:,.2f}")
-        item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-        item.setFlags(item.flags() & ~Qt.ItemIsEditable)
-        return item
-
-    def _get_selected_id(self, table: QTableWidget) -> Optional[int]:
-        selected_items = table.selectedItems()
-        if not selected_items:
+    def _get_selected_id(self, table: QTableView) -> Optional[int]:
+        indices = table.selectionModel().selectedIndexes()
+        if not indices:
             return None
 
         try:
-            id_item = table.item(selected_items[0].row(), 0)
-            return int(id_item.text())
+            return int(table.model().index(indices[0].row(), 0).data(ROL_VALOR))
         except Exception as e:
             logger.error(f"Error al obtener ID de fila: {e}")
             return None
 
+    def _consulta(self, tabla: str, campos: tuple, fecha: str, sucursal: str) -> ConsultaPedidos:
+        filtro = "fecha >= ? AND fecha < ?"
+        params = list(rango_dias(fecha))
+        if sucursal != "Todas":
+            filtro += " AND sucursal = ?"
+            params.append(sucursal)
+        return ConsultaPedidos(tabla, campos, filtro, params)
+
     def cargar_clientes(self):
-        try:
-            fecha = self.date_clientes.date().toString("yyyy-MM-dd")
-            sucursal = self.cmb_sucursal_clientes.currentText()
-            conn = get_conn_clientes()
-            cursor = conn.cursor()
-
-            query = """
-                SELECT id, cantidad, tamano, sabor, sucursal, fecha, fecha_entrega, 
-                       detalles, dedicatoria, color, precio, total, foto_path
-                FROM PastelesClientes 
-                WHERE CAST(fecha AS DATE) = ?
-            """
-            params = [fecha]
-            if sucursal != "Todas":
-                query += " AND sucursal = ?"
-                params.append(sucursal)
-            query += " ORDER BY id DESC"
-
-            cursor.execute(query, params)
-            resultados = cursor.fetchall()
-            conn.close()
-
-            self.table_clientes.setRowCount(0)
-            self.table_clientes.setRowCount(len(resultados))
-
-            for fila, datos in enumerate(resultados):
-
-                for col in range(13):
-                    valor = datos[col]
-                    valor_str = ""
-
-                    if col == 5:
-                        if valor:
-                            valor_str = valor.strftime('%Y-%m-%d %H:%M')
-                        else:
-                            valor_str = ''
-                        item = self._crear_item_centrado(valor_str)
-                        self.table_clientes.setItem(fila, col, item)
-
-                    elif col == 6:
-                        if valor:
-                            valor_str = valor.strftime('%Y-%m-%d')
-                        else:
-                            valor_str = 'Sin especificar'
-                        item = self._crear_item_centrado(valor_str)
-                        self.table_clientes.setItem(fila, col, item)
-
-                    elif col in (10, 11):
-                        if valor is not None:
-                            try:
-                                valor_float = float(valor)
-                                item = self._crear_item_moneda(valor_float)
-                                self.table_clientes.setItem(fila, col, item)
-                            except (ValueError, TypeError):
-                                valor_str = str(valor)
-                                item = self._crear_item_centrado(valor_str)
-                                self.table_clientes.setItem(fila, col, item)
-                        else:
-                            item = self._crear_item_centrado('')
-                            self.table_clientes.setItem(fila, col, item)
-
-                    elif col == 12:
-                        if valor:
-                            nombre_foto = os.path.basename(valor) if valor else ""
-                            item = self._crear_item_centrado(f"{nombre_foto}")
-                        else:
-                            item = self._crear_item_centrado("Sin foto")
-                        self.table_clientes.setItem(fila, col, item)
-
-                    else:
-                        valor_str = str(valor if valor is not None else '')
-                        item = self._crear_item_centrado(valor_str)
-                        self.table_clientes.setItem(fila, col, item)
-
-            self.statusBar().showMessage(f"Clientes: {len(resultados)} pedidos cargados para {fecha}")
-        except Exception as e:
-            logger.error(f"ERROR DETALLADO (cargar_clientes): {e}", exc_info=True)
-            dialogo = DialogoConfirmacionMejorado(
-                self,
-                "Error al Cargar",
-                f"No se pudieron cargar los pedidos de clientes:\n\n{str(e)}",
-                "error"
-            )
-            dialogo.exec()
-        finally:
-            self.actualizar_botones_crud_clientes()
+        self.actualizar_clientes()
+
+    def actualizar_clientes(self, editados=()):
+        fecha = self.date_clientes.date().toString("yyyy-MM-dd")
+        sucursal = self.cmb_sucursal_clientes.currentText()
+        consulta = self._consulta("PastelesClientes", CAMPOS_CLIENTES, fecha, sucursal)
+
+        # Mismo filtro: solo se traen los cambios. La consulta corre en el pool de hilos
+        if self.modelo_clientes.mostrar(get_conn_clientes, consulta, editados):
+            self._fecha_clientes = fecha
+            self.statusBar().showMessage(f"Cargando pedidos de clientes para {fecha}...")
+        self.actualizar_botones_crud_clientes()
+
+    @Slot(int)
+    def _clientes_cargados(self, total: int):
+        self.statusBar().showMessage(f"Clientes: {total} pedidos cargados para {self._fecha_clientes}")
+        self.actualizar_botones_crud_clientes()
+
+    @Slot(str)
+    def _error_cargar_clientes(self, mensaje: str):
+        self.statusBar().clearMessage()
+        dialogo = DialogoConfirmacionMejorado(
+            self,
+            "Error al Cargar",
+            f"No se pudieron cargar los pedidos de clientes:\n\n{mensaje}",
+            "error"
+        )
+        dialogo.exec()
+        self.actualizar_botones_crud_clientes()
 
     def cargar_normales(self):
-        try:
-            fecha = self.date_normales.date().toString("yyyy-MM-dd")
-            sucursal = self.cmb_sucursal_normales.currentText()
-            conn = get_conn_normales()
-            cursor = conn.cursor()
-
-            query = """
-                SELECT id, cantidad, tamano, sabor, sucursal, fecha, fecha_entrega, precio, total
-                FROM PastelesNormales 
-                WHERE CAST(fecha AS DATE) = ?
-            """
-            params = [fecha]
-            if sucursal != "Todas":
-                query += " AND sucursal = ?"
-                params.append(sucursal)
-            query += " ORDER BY id DESC"
-
-            cursor.execute(query, params)
-            resultados = cursor.fetchall()
-            conn.close()
-
-            self.table_normales.setRowCount(0)
-            self.table_normales.setRowCount(len(resultados))
-
-            for fila, datos in enumerate(resultados):
-
-                for col in range(9):
-                    valor = datos[col]
-                    valor_str = ""
-
-                    if col == 5:
-                        if valor:
-                            valor_str = valor.strftime('%Y-%m-%d %H:%M')
-                        else:
-                            valor_str = ''
-                        item = self._crear_item_centrado(valor_str)
-                        self.table_normales.setItem(fila, col, item)
-
-                    elif col == 6:
-                        if valor:
-                            valor_str = valor.strftime('%Y-%m-%d')
-                        else:
-                            valor_str = 'Sin especificar'
-                        item = self._crear_item_centrado(valor_str)
-                        self.table_normales.setItem(fila, col, item)
-
-                    elif col in (7, 8):
-                        if valor is not None:
-                            try:
-                                valor_float = float(valor)
-                                item = self._crear_item_moneda(valor_float)
-                                self.table_normales.setItem(fila, col, item)
-                            except (ValueError, TypeError):
-                                valor_str = str(valor)
-                                item = self._crear_item_centrado(valor_str)
-                                self.table_normales.setItem(fila, col, item)
-                        else:
-                            item = self._crear_item_centrado('')
-                            self.table_normales.setItem(fila, col, item)
-
-                    else:
-                        valor_str = str(valor if valor is not None else '')
-                        item = self._crear_item_centrado(valor_str)
-                        self.table_normales.setItem(fila, col, item)
-
-            self.statusBar().showMessage(f"Tiendas: {len(resultados)} pedidos cargados para {fecha}")
-        except Exception as e:
-            logger.error(f"ERROR DETALLADO (cargar_normales): {e}", exc_info=True)
-            dialogo = DialogoConfirmacionMejorado(
-                self,
-                "Error al Cargar",
-                f"No se pudieron cargar los pedidos de tienda:\n\n{str(e)}",
-                "error"
-            )
-            dialogo.exec()
-        finally:
-            self.actualizar_botones_crud_normales()
+        self.actualizar_normales()
+
+    def actualizar_normales(self, editados=()):
+        fecha = self.date_normales.date().toString("yyyy-MM-dd")
+        sucursal = self.cmb_sucursal_normales.currentText()
+        consulta = self._consulta("PastelesNormales", CAMPOS_NORMALES, fecha, sucursal)
+
+        if self.modelo_normales.mostrar(get_conn_normales, consulta, editados):
+            self._fecha_normales = fecha
+            self.statusBar().showMessage(f"Cargando pedidos de tienda para {fecha}...")
+        self.actualizar_botones_crud_normales()
+
+    @Slot(int)
+    def _normales_cargados(self, total: int):
+        self.statusBar().showMessage(f"Tiendas: {total} pedidos cargados para {self._fecha_normales}")
+        self.actualizar_botones_crud_normales()
+
+    @Slot(str)
+    def _error_cargar_normales(self, mensaje: str):
+        self.statusBar().clearMessage()
+        dialogo = DialogoConfirmacionMejorado(
+            self,
+            "Error al Cargar",
+            f"No se pudieron cargar los pedidos de tienda:\n\n{mensaje}",
+            "error"
+        )
+        dialogo.exec()
+        self.actualizar_botones_crud_normales()
 
     @Slot()
     def abrir_dialogo_precios(self):
@@ -888,7 +812,7 @@ class AdminApp(QMainWindow):
 
     @Slot()
     def actualizar_botones_crud_clientes(self):
-        hay_seleccion = bool(self.table_clientes.selectedItems())
+        hay_seleccion = self.table_clientes.selectionModel().hasSelection()
         self.btn_editar_cliente.setEnabled(hay_seleccion)
         self.btn_eliminar_cliente.setEnabled(hay_seleccion)
 
@@ -896,7 +820,7 @@ class AdminApp(QMainWindow):
     def abrir_dialogo_cliente_nuevo(self):
         dialog = DialogoNuevoCliente(self)
         if dialog.exec():
-            self.cargar_clientes()
+            self.actualizar_clientes()
             self.statusBar().showMessage("Nuevo pedido de cliente agregado exitosamente", 5000)
 
     @Slot()
@@ -926,7 +850,7 @@ class AdminApp(QMainWindow):
 
             dialog = DialogoNuevoCliente(self, data_dict=data, pedido_id=pedido_id)
             if dialog.exec():
-                self.cargar_clientes()
+                self.actualizar_clientes(editados=(pedido_id,))
                 self.statusBar().showMessage(f"Pedido #{pedido_id} actualizado exitosamente", 5000)
         except Exception as e:
             logger.error(f"Error al abrir diálogo editar cliente: {e}", exc_info=True)
@@ -962,7 +886,7 @@ class AdminApp(QMainWindow):
         if dialogo.exec():
             try:
                 eliminar_cliente_db(pedido_id)
-                self.cargar_clientes()
+                self.actualizar_clientes()
                 self.statusBar().showMessage(f"Pedido #{pedido_id} eliminado exitosamente", 5000)
             except Exception as e:
                 logger.error(f"Error al eliminar cliente: {e}", exc_info=True)
@@ -976,7 +900,7 @@ class AdminApp(QMainWindow):
 
     @Slot()
     def actualizar_botones_crud_normales(self):
-        hay_seleccion = bool(self.table_normales.selectedItems())
+        hay_seleccion = self.table_normales.selectionModel().hasSelection()
         self.btn_editar_normal.setEnabled(hay_seleccion)
         self.btn_eliminar_normal.setEnabled(hay_seleccion)
 
@@ -984,7 +908,7 @@ class AdminApp(QMainWindow):
     def abrir_dialogo_normal_nuevo(self):
         dialog = DialogoNuevoNormal(self)
         if dialog.exec():
-            self.cargar_normales()
+            self.actualizar_normales()
             self.statusBar().showMessage("Nuevo pedido agregado exitosamente", 5000)
 
     @Slot()
@@ -1014,7 +938,7 @@ class AdminApp(QMainWindow):
 
             dialog = DialogoNuevoNormal(self, data_dict=data, pedido_id=pedido_id)
             if dialog.exec():
-                self.cargar_normales()
+                self.actualizar_normales(editados=(pedido_id,))
                 self.statusBar().showMessage(f"Pedido #{pedido_id} actualizado exitosamente", 5000)
         except Exception as e:
             logger.error(f"Error al abrir diálogo editar normal: {e}", exc_info=True)
@@ -1050,7 +974,7 @@ class AdminApp(QMainWindow):
         if dialogo.exec():
             try:
                 eliminar_normal_db(pedido_id)
-                self.cargar_normales()
+                self.actualizar_normales()
                 self.statusBar().showMessage(f"Pedido #{pedido_id} eliminado exitosamente", 5000)
             except Exception as e:
                 logger.error(f"Error al eliminar normal: {e}", exc_info=True)
@@ -1064,6 +988,21 @@ class AdminApp(QMainWindow):
 
     def generar_reporte_ventas(self):
         """Genera el reporte de ventas"""
+        self._generar_reportes(
+            "ventas", "Ventas", "Generar Reporte de Ventas", "Seleccione el tipo de reporte:",
+            "Reporte de una fecha específica", "Reporte por rango de fechas"
+        )
+
+    def generar_reporte_listas(self):
+        """Genera el reporte de listas de producción y pedidos"""
+        self._generar_reportes(
+            "listas", "Listas", "Generar Reporte de Lista", "Seleccione el tipo de lista:",
+            "Lista de fecha específica", "Lista por rango de fechas"
+        )
+
+    def _generar_reportes(self, tipo: str, prefijo: str, titulo_ventana: str, titulo: str,
+                          texto_fecha: str, texto_rango: str):
+        """Pide fechas y destino y genera los PDFs en procesos aparte"""
         tab_actual = self.tabs.currentIndex()
 
         if tab_actual == 0:
@@ -1075,24 +1014,27 @@ class AdminApp(QMainWindow):
         else:
             return
 
+        if sucursal == "Todas":
+            sucursal = None
+
         # Diálogo para seleccionar tipo de reporte
         dialog = QDialog(self)
-        dialog.setWindowTitle("Generar Reporte de Ventas")
-        dialog.resize(450, 250)
+        dialog.setWindowTitle(titulo_ventana)
+        dialog.resize(450, 280)
         dialog.setStyleSheet(DARK_STYLE)
 
         layout = QVBoxLayout(dialog)
         layout.setSpacing(15)
         layout.setContentsMargins(20, 20, 20, 20)
 
-        titulo = QLabel("Seleccione el tipo de reporte:")
-        titulo.setStyleSheet("font-size: 15pt; margin-bottom: 10px;")
-        layout.addWidget(titulo)
+        lbl_titulo = QLabel(titulo)
+        lbl_titulo.setStyleSheet("font-size: 15pt; margin-bottom: 10px;")
+        layout.addWidget(lbl_titulo)
 
         # Radio buttons
         radio_layout = QVBoxLayout()
-        radio_fecha = QRadioButton("Reporte de una fecha específica")
-        radio_rango = QRadioButton("Reporte por rango de fechas")
+        radio_fecha = QRadioButton(texto_fecha)
+        radio_rango = QRadioButton(texto_rango)
         radio_fecha.setChecked(True)
         radio_layout.addWidget(radio_fecha)
         radio_layout.addWidget(radio_rango)
@@ -1126,6 +1068,10 @@ class AdminApp(QMainWindow):
         # Mostrar/ocultar rango
         radio_fecha.toggled.connect(lambda checked: rango_widget.setVisible(not checked))
 
+        # Un PDF por sucursal, todos en la misma carpeta
+        check_sucursales = QCheckBox("Un PDF por cada sucursal (en una carpeta)")
+        layout.addWidget(check_sucursales)
+
         layout.addStretch()
 
         buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
@@ -1139,281 +1085,133 @@ class AdminApp(QMainWindow):
         if dialog.exec() != QDialog.Accepted:
             return
 
-        from pdf_reportes import generar_pdf_ventas, generar_pdf_ventas_rango
-
-        if sucursal == "Todas":
-            sucursal = None
-
-        try:
-            # Reporte fecha única
-            if radio_fecha.isChecked():
-                ruta = "reportes"
-                os.makedirs(ruta, exist_ok=True)
-                default_name = f"{ruta}/Ventas_{fecha.strftime('%Y-%m-%d')}_{sucursal or 'TODAS'}.pdf"
-
-                nombre_pdf, _ = QFileDialog.getSaveFileName(
-                    self, "Guardar Reporte de Ventas", default_name, "PDF Files (*.pdf)"
-                )
-
-                if not nombre_pdf:
-                    self.statusBar().showMessage("Generación de reporte cancelada")
-                    return
-
-                self.statusBar().showMessage("Generando reporte de ventas...")
-
-                generar_pdf_ventas(
-                    target_date=fecha,
-                    sucursal=sucursal,
-                    output_path=nombre_pdf
-                )
-
-            # Reporte por rango
-            else:
-                fecha_inicio = date_inicio.date().toPython()
-                fecha_fin = date_fin.date().toPython()
-
-                if fecha_fin < fecha_inicio:
-                    dialogo_error = DialogoConfirmacionMejorado(
-                        self,
-                        "Error de Fechas",
-                        "La fecha fin debe ser posterior a la fecha inicio",
-                        "error"
-                    )
-                    dialogo_error.exec()
-                    return
-
-                ruta = "reportes"
-                os.makedirs(ruta, exist_ok=True)
-                default_name = (
-                    f"{ruta}/Ventas_{fecha_inicio.strftime('%Y-%m-%d')}"
-                    f"_a_{fecha_fin.strftime('%Y-%m-%d')}_{sucursal or 'TODAS'}.pdf"
-                )
+        if radio_fecha.isChecked():
+            fecha_inicio, fecha_fin = fecha, None
+        else:
+            fecha_inicio = date_inicio.date().toPython()
+            fecha_fin = date_fin.date().toPython()
 
-                nombre_pdf, _ = QFileDialog.getSaveFileName(
-                    self, "Guardar Reporte de Ventas", default_name, "PDF Files (*.pdf)"
+            if fecha_fin < fecha_inicio:
+                dialogo_error = DialogoConfirmacionMejorado(
+                    self,
+                    "Error de Fechas",
+                    "La fecha fin debe ser posterior a la fecha inicio",
+                    "error"
                 )
+                dialogo_error.exec()
+                return
 
-                if not nombre_pdf:
-                    self.statusBar().showMessage("Generación de reporte cancelada")
-                    return
-
-                self.statusBar().showMessage("Generando reporte de rango...")
-
-                generar_pdf_ventas_rango(
-                    fecha_inicio=fecha_inicio,
-                    fecha_fin=fecha_fin,
-                    sucursal=sucursal,
-                    output_path=nombre_pdf
-                )
+        ruta = "reportes"
+        os.makedirs(ruta, exist_ok=True)
 
-            # Confirmación
-            dialogo = DialogoConfirmacionMejorado(
-                self,
-                "Reporte Generado",
-                f"El reporte de ventas se ha generado exitosamente:\n\n{nombre_pdf}",
-                "success"
+        if check_sucursales.isChecked():
+            carpeta = QFileDialog.getExistingDirectory(self, f"Carpeta para los reportes de {prefijo}", ruta)
+            if not carpeta:
+                self.statusBar().showMessage("Generación de reporte cancelada")
+                return
+            tareas = [
+                TareaReporte(tipo, fecha_inicio, fecha_fin, nombre,
+                             os.path.join(carpeta, nombre_reporte(prefijo, fecha_inicio, fecha_fin, nombre)))
+                for nombre in SUCURSALES
+            ]
+        else:
+            default_name = f"{ruta}/{nombre_reporte(prefijo, fecha_inicio, fecha_fin, sucursal)}"
+            nombre_pdf, _ = QFileDialog.getSaveFileName(
+                self, f"Guardar Reporte de {prefijo}", default_name, "PDF Files (*.pdf)"
             )
-            dialogo.exec()
-
-            self.statusBar().showMessage("Reporte de ventas generado exitosamente", 5000)
+            if not nombre_pdf:
+                self.statusBar().showMessage("Generación de reporte cancelada")
+                return
+            tareas = [TareaReporte(tipo, fecha_inicio, fecha_fin, sucursal, nombre_pdf)]
 
-            # Abrir PDF automáticamente
-            try:
-                if os.name == 'nt':
-                    os.startfile(os.path.realpath(nombre_pdf))
-                elif os.name == 'posix':
-                    import subprocess
-                    if os.uname().sysname == 'Darwin':
-                        subprocess.call(['open', nombre_pdf])
-                    else:
-                        subprocess.call(['xdg-open', nombre_pdf])
-            except Exception as e:
-                logger.warning(f"No se pudo abrir el PDF automáticamente: {e}")
+        self._ejecutar_reportes(tareas, prefijo)
 
+    def _ejecutar_reportes(self, tareas, prefijo: str):
+        """Lanza el lote de reportes con un diálogo de progreso que permite cancelar"""
+        try:
+            lote = LoteReportes(tareas, parent=self)
         except Exception as e:
-            logger.error(f"ERROR DETALLADO (generar_reporte_ventas): {e}", exc_info=True)
+            logger.error(f"ERROR DETALLADO (reportes {prefijo}): {e}", exc_info=True)
+            return
+
+        progreso = QProgressDialog(f"Generando reportes de {prefijo.lower()}...", "Cancelar", 0, lote.total_pasos, self)
+        progreso.setWindowTitle("Generando Reportes")
+        progreso.setWindowModality(Qt.NonModal)
+        progreso.setMinimumDuration(0)
+        progreso.setAutoClose(False)
+        progreso.setAutoReset(False)
+        progreso.setStyleSheet(DARK_STYLE)
+
+        def al_avanzar(hechos: int, total: int, mensaje: str):
+            progreso.setValue(hechos)
+            if mensaje:
+                progreso.setLabelText(mensaje)
+                self.statusBar().showMessage(mensaje)
+
+        def al_terminar(rutas: list, errores: list):
+            progreso.close()
+            self._lotes_reporte.remove(lote)
+            lote.deleteLater()
+            self._reportes_terminados(rutas, errores, prefijo)
+
+        def al_cancelar():
+            progreso.close()
+            self._lotes_reporte.remove(lote)
+            lote.deleteLater()
+            self.statusBar().showMessage("Generación de reportes cancelada", 5000)
+
+        lote.progreso.connect(al_avanzar)
+        lote.terminado.connect(al_terminar)
+        lote.cancelado.connect(al_cancelar)
+        progreso.canceled.connect(lote.cancelar)
+
+        self._lotes_reporte.append(lote)
+        self.statusBar().showMessage(f"Generando {len(tareas)} reporte(s) de {prefijo.lower()}...")
+        lote.iniciar()
+        progreso.show()
+
+    def _reportes_terminados(self, rutas: list, errores: list, prefijo: str):
+        """Confirma el resultado del lote y abre el PDF o la carpeta"""
+        if errores:
+            detalle = "\n".join(f"{tarea.descripcion}: {mensaje}" for tarea, mensaje in errores)
             dialogo = DialogoConfirmacionMejorado(
                 self,
                 "Error al Generar Reporte",
-                f"No se pudo generar el reporte de ventas:\n\n{str(e)}",
+                f"No se pudieron generar {len(errores)} reporte(s) de {prefijo.lower()}:\n\n{detalle}",
                 "error"
             )
             dialogo.exec()
 
-    def generar_reporte_listas(self):
-        """Genera el reporte de listas de producción y pedidos"""
-        tab_actual = self.tabs.currentIndex()
-
-        if tab_actual == 0:
-            fecha = self.date_clientes.date().toPython()
-            sucursal = self.cmb_sucursal_clientes.currentText()
-        elif tab_actual == 1:
-            fecha = self.date_normales.date().toPython()
-            sucursal = self.cmb_sucursal_normales.currentText()
-        else:
-            return
-
-        # Diálogo para seleccionar tipo de reporte
-        dialog = QDialog(self)
-        dialog.setWindowTitle("Generar Reporte de Lista")
-        dialog.resize(450, 250)
-        dialog.setStyleSheet(DARK_STYLE)
-
-        layout = QVBoxLayout(dialog)
-        layout.setSpacing(15)
-        layout.setContentsMargins(20, 20, 20, 20)
-
-        titulo = QLabel("Seleccione el tipo de lista:")
-        titulo.setStyleSheet("font-size: 15pt; margin-bottom: 10px;")
-        layout.addWidget(titulo)
-
-        # Radio buttons
-        radio_layout = QVBoxLayout()
-        radio_fecha = QRadioButton("Lista de fecha específica")
-        radio_rango = QRadioButton("Lista por rango de fechas")
-        radio_fecha.setChecked(True)
-        radio_layout.addWidget(radio_fecha)
-        radio_layout.addWidget(radio_rango)
-        layout.addLayout(radio_layout)
-
-        # Sección rango de fechas
-        rango_widget = QWidget()
-        rango_layout = QVBoxLayout(rango_widget)
-
-        fecha_inicio_layout = QHBoxLayout()
-        fecha_inicio_layout.addWidget(QLabel("Fecha Inicio:"))
-        date_inicio = QDateEdit(calendarPopup=True)
-        date_inicio.setDate(QDate.currentDate())
-        date_inicio.setMaximumWidth(150)
-        fecha_inicio_layout.addWidget(date_inicio)
-        fecha_inicio_layout.addStretch()
-        rango_layout.addLayout(fecha_inicio_layout)
-
-        fecha_fin_layout = QHBoxLayout()
-        fecha_fin_layout.addWidget(QLabel("Fecha Fin:"))
-        date_fin = QDateEdit(calendarPopup=True)
-        date_fin.setDate(QDate.currentDate())
-        date_fin.setMaximumWidth(150)
-        fecha_fin_layout.addWidget(date_fin)
-        fecha_fin_layout.addStretch()
-        rango_layout.addLayout(fecha_fin_layout)
-
-        rango_widget.setVisible(False)
-        layout.addWidget(rango_widget)
-
-        # Mostrar/ocultar rango
-        radio_fecha.toggled.connect(lambda checked: rango_widget.setVisible(not checked))
-
-        layout.addStretch()
-
-        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
-        buttons.button(QDialogButtonBox.Ok).setText("Generar")
-        buttons.button(QDialogButtonBox.Cancel).setText("Cancelar")
-        buttons.accepted.connect(dialog.accept)
-        buttons.rejected.connect(dialog.reject)
-        buttons.setCenterButtons(True)
-        layout.addWidget(buttons)
-
-        if dialog.exec() != QDialog.Accepted:
+        if not rutas:
             return
 
-        from pdf_reportes import generar_pdf_listas, generar_pdf_rango_fechas
+        destino = rutas[0] if len(rutas) == 1 else os.path.dirname(rutas[0])
+        dialogo = DialogoConfirmacionMejorado(
+            self,
+            "Reporte Generado",
+            f"Se generaron {len(rutas)} reporte(s) de {prefijo.lower()} exitosamente:\n\n{destino}",
+            "success"
+        )
+        dialogo.exec()
 
-        if sucursal == "Todas":
-            sucursal = None
+        self.statusBar().showMessage("Reportes generados exitosamente", 5000)
+        self._abrir_archivo(destino)
 
+    def _abrir_archivo(self, ruta: str):
+        """Abre un PDF o una carpeta con la aplicación del sistema"""
         try:
-            # Reporte fecha única
-            if radio_fecha.isChecked():
-                ruta = "reportes"
-                os.makedirs(ruta, exist_ok=True)
-                default_name = f"{ruta}/Listas_{fecha.strftime('%Y-%m-%d')}_{sucursal or 'TODAS'}.pdf"
-
-                nombre_pdf, _ = QFileDialog.getSaveFileName(
-                    self, "Guardar Reporte de Listas", default_name, "PDF Files (*.pdf)"
-                )
-
-                if not nombre_pdf:
-                    self.statusBar().showMessage("Generación de reporte cancelada")
-                    return
-
-                self.statusBar().showMessage("Generando reporte de listas...")
-
-                generar_pdf_listas(
-                    target_date=fecha,
-                    sucursal=sucursal,
-                    output_path=nombre_pdf
-                )
-
-            # Reporte por rango
-            else:
-                fecha_inicio = date_inicio.date().toPython()
-                fecha_fin = date_fin.date().toPython()
-
-                if fecha_fin < fecha_inicio:
-                    dialogo_error = DialogoConfirmacionMejorado(
-                        self,
-                        "Error de Fechas",
-                        "La fecha fin debe ser posterior a la fecha inicio",
-                        "error"
-                    )
-                    dialogo_error.exec()
-                    return
-
-                ruta = "reportes"
-                os.makedirs(ruta, exist_ok=True)
-                default_name = (
-                    f"{ruta}/Listas_{fecha_inicio.strftime('%Y-%m-%d')}"
-                    f"_a_{fecha_fin.strftime('%Y-%m-%d')}_{sucursal or 'TODAS'}.pdf"
-                )
-
-                nombre_pdf, _ = QFileDialog.getSaveFileName(
-                    self, "Guardar Reporte de Listas", default_name, "PDF Files (*.pdf)"
-                )
-
-                if not nombre_pdf:
-                    self.statusBar().showMessage("Generación de reporte cancelada")
-                    return
-
-                self.statusBar().showMessage("Generando reporte de rango...")
-
-                generar_pdf_rango_fechas(
-                    fecha_inicio=fecha_inicio,
-                    fecha_fin=fecha_fin,
-                    sucursal=sucursal,
-                    output_path=nombre_pdf
-                )
-
-            # Confirmación
-            dialogo = DialogoConfirmacionMejorado(
-                self,
-                "Reporte Generado",
-                f"El reporte se ha generado exitosamente:\n\n{nombre_pdf}",
-                "success"
-            )
-            dialogo.exec()
-
-            self.statusBar().showMessage("Reporte generado exitosamente", 5000)
-
-            # Abrir PDF automáticamente
-            try:
-                if os.name == 'nt':
-                    os.startfile(os.path.realpath(nombre_pdf))
-                elif os.name == 'posix':
-                    import subprocess
-                    if os.uname().sysname == 'Darwin':
-                        subprocess.call(['open', nombre_pdf])
-                    else:
-                        subprocess.call(['xdg-open', nombre_pdf])
-            except Exception as e:
-                logger.warning(f"No se pudo abrir el PDF automáticamente: {e}")
-
+            if os.name == 'nt':
+                os.startfile(os.path.realpath(ruta))
+            elif os.name == 'posix':
+                import subprocess
+                if os.uname().sysname == 'Darwin':
+                    subprocess.call(['open', ruta])
+                else:
+                    subprocess.call(['xdg-open', ruta])
         except Exception as e:
-            logger.error(f"ERROR DETALLADO (generar_reporte_listas): {e}", exc_info=True)
-            dialogo = DialogoConfirmacionMejorado(
-                self,
-                "Error al Generar Reporte",
-                f"No se pudo generar el reporte:\n\n{str(e)}",
-                "error"
-            )
-            dialogo.exec()
+            logger.warning(f"No se pudo abrir el PDF automáticamente: {e}")
+
+    def closeEvent(self, event):
+        for lote in list(self._lotes_reporte):
+            lote.cancelar()
+        super().closeEvent(event)
@@ -0,0 +1,132 @@
+import logging
+from typing import Optional
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal, Slot
+
+from api.catalogo_precios import CatalogoPrecios, InstantaneaPrecios, catalogo_precios
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SenalesVerificador(QObject):
+    lista = Signal(object)
+    fallo = Signal(str)
+
+
+class VerificadorPrecios(QRunnable):
+    """Trae la instantánea del catálogo (huella y, si cambió, la tabla) fuera del hilo de la interfaz."""
+
+    def __init__(self, catalogo: CatalogoPrecios):
+        super().__init__()
+        self.catalogo = catalogo
+        self.senales = SenalesVerificador()
+
+    def run(self):
+        try:
+            # Siempre compara la huella; si la tabla no cambió no se vuelve a leer
+            self.catalogo.invalidar()
+            instantanea = self.catalogo.instantanea()
+        except Exception as e:
+            logger.error(f"Error al verificar el catálogo de precios: {e}", exc_info=True)
+            self.senales.fallo.emit(str(e))
+            return
+        self.senales.lista.emit(instantanea)
+
+
+class CatalogoEscritorio(QObject):
+    """
+    Precios del admin de escritorio, compartidos por todos los diálogos de la sesión.
+
+    Los diálogos leen de la instantánea en memoria; nunca consultan la base
+    desde el hilo de la interfaz. Cada ``intervalo_s`` (y al llamar a
+    ``verificar()``) un QRunnable compara la huella del catálogo y, si la
+    versión cambió, ``actualizado`` avisa a los diálogos abiertos.
+    """
+
+    actualizado = Signal(str)
+    fallo = Signal(str)
+
+    def __init__(self, catalogo: CatalogoPrecios = catalogo_precios, intervalo_s: Optional[float] = None,
+                 pool: Optional[QThreadPool] = None, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.catalogo = catalogo
+        self._pool = pool
+        self._instantanea: Optional[InstantaneaPrecios] = None
+        self._verificador: Optional[VerificadorPrecios] = None
+        self.error: Optional[str] = None
+
+        intervalo_s = settings.PRECIOS_CACHE_TTL_SECONDS if intervalo_s is None else intervalo_s
+        self._timer = QTimer(self)
+        self._timer.setInterval(max(int(intervalo_s * 1000), 1000))
+        self._timer.timeout.connect(self.verificar)
+
+    @property
+    def cargado(self) -> bool:
+        return self._instantanea is not None
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._instantanea.version if self._instantanea is not None else None
+
+    def iniciar(self):
+        self.verificar()
+        self._timer.start()
+
+    @Slot()
+    def verificar(self):
+        """Verifica el catálogo en segundo plano; no hace nada si ya hay una verificación en curso."""
+        if self._verificador is not None:
+            return
+        verificador = VerificadorPrecios(self.catalogo)
+        verificador.senales.lista.connect(self._al_recibir)
+        verificador.senales.fallo.connect(self._al_fallar)
+        self._verificador = verificador
+        (self._pool or QThreadPool.globalInstance()).start(verificador)
+
+    @Slot(object)
+    def _al_recibir(self, instantanea: InstantaneaPrecios):
+        self._verificador = None
+        self._reemplazar(instantanea)
+
+    def _reemplazar(self, instantanea: InstantaneaPrecios):
+        self.error = None
+        if self._instantanea is not None and self._instantanea.version == instantanea.version:
+            return
+        self._instantanea = instantanea
+        logger.info(f"Precios del admin en la versión {instantanea.version}")
+        self.actualizado.emit(instantanea.version)
+
+    @Slot(str)
+    def _al_fallar(self, mensaje: str):
+        self._verificador = None
+        # Con un catálogo ya cargado se siguen usando esos precios hasta la próxima verificación
+        if self._instantanea is None:
+            self.error = mensaje
+            self.fallo.emit(mensaje)
+
+    def precio(self, sabor: str, tamano: str) -> Optional[float]:
+        """Precio en memoria, o None si el catálogo todavía no termina de cargar."""
+        if self._instantanea is None:
+            return None
+        return self._instantanea.precio(sabor, tamano)
+
+    def precio_para_guardar(self, sabor: str, tamano: str) -> float:
+        """Como ``precio()``, pero si aún no hay catálogo lo lee ahora: guardar un pedido necesita el precio."""
+        precio = self.precio(sabor, tamano)
+        if precio is None:
+            self._reemplazar(self.catalogo.instantanea())
+            precio = self._instantanea.precio(sabor, tamano)
+        return precio
+
+
+_catalogo_escritorio: Optional[CatalogoEscritorio] = None
+
+
+def obtener_catalogo() -> CatalogoEscritorio:
+    """Catálogo de la sesión; se crea y empieza a cargar la primera vez que se pide."""
+    global _catalogo_escritorio
+    if _catalogo_escritorio is None:
+        _catalogo_escritorio = CatalogoEscritorio()
+        _catalogo_escritorio.iniciar()
+    return _catalogo_escritorio
@@ -8,7 +8,7 @@ from PySide6.QtWidgets import (
     QTableWidget, QTableWidgetItem, QAbstractItemView, QHeaderView,
     QPushButton, QDateEdit
 )
-from PySide6.QtCore import Qt, Slot, QDate
+from PySide6.QtCore import Qt, Slot, QDate, QTimer
 
 try:
     from database import (
@@ -20,12 +20,16 @@ try:
         actualizar_pedido_cliente_db
     )
     from config import SABORES_NORMALES, SABORES_CLIENTES, TAMANOS_NORMALES, TAMANOS_CLIENTES, SUCURSALES
+    from admin.catalogo import obtener_catalogo
 except ImportError as e:
     logging.error(f"Error fatal en imports de dialogos.py: {e}")
     sys.exit(f"Error fatal en imports de dialogos: {e}")
 
 logger = logging.getLogger(__name__)
 
+# Espera tras el último cambio de sabor o tamaño antes de buscar el precio
+ESPERA_PRECIO_MS = 150
+
 
 class DialogoConfirmacionMejorado(QDialog):
     """Diálogo de confirmación """
@@ -217,6 +221,7 @@ class DialogoPrecios(QDialog):
 
     @Slot()
     def guardar_precios(self):
+        """Envía solo las filas editadas; la base escribe las que de verdad cambiaron."""
         try:
             precios_actualizados = []
             filas_con_error = []
@@ -231,11 +236,16 @@ class DialogoPrecios(QDialog):
                     if not all([id_item, sabor_item, tamano_item, precio_item]):
                         raise ValueError("Fila incompleta")
 
+                    sabor = sabor_item.text().strip()
+                    tamano = tamano_item.text().strip()
                     nuevo_precio = float(precio_item.text().replace("Q", "").strip())
+                    if f"{sabor}|{tamano}|{nuevo_precio:.2f}" == self.precios_originales.get(row):
+                        continue
+
                     precios_actualizados.append({
                         'id': int(id_item.text()),
-                        'sabor': sabor_item.text().strip(),
-                        'tamano': tamano_item.text().strip(),
+                        'sabor': sabor,
+                        'tamano': tamano,
                         'precio': nuevo_precio
                     })
                 except Exception as e:
@@ -256,8 +266,14 @@ class DialogoPrecios(QDialog):
                                              QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
 
             if respuesta == QMessageBox.StandardButton.Yes:
-                actualizar_precios_db(precios_actualizados)
-                QMessageBox.information(self, "Éxito", f"Se actualizaron {len(precios_actualizados)} precios")
+                try:
+                    resultado = actualizar_precios_db(precios_actualizados)
+                except ValueError as e:
+                    QMessageBox.warning(self, "Error de Formato", f"No se pudo guardar.\n{e}")
+                    return
+                logger.info(f"Catálogo de precios en la versión {resultado['version']}")
+                obtener_catalogo().verificar()
+                QMessageBox.information(self, "Éxito", f"Se actualizaron {resultado['actualizados']} precios")
                 self.cargar_precios()
         except Exception as e:
             logger.error(f"Error al guardar precios: {e}", exc_info=True)
@@ -308,9 +324,20 @@ class _BaseFormDialog(QDialog):
         self.line_detalles = QLineEdit()
         self.botones = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
 
-        self.cmb_sabor.currentTextChanged.connect(self.actualizar_precio)
-        self.cmb_tamano.currentTextChanged.connect(self.actualizar_precio)
-        self.spin_cantidad.valueChanged.connect(self.actualizar_precio)
+        # Precios en memoria compartidos por la sesión; la cantidad solo recalcula el total
+        self.catalogo = obtener_catalogo()
+        self.precio_unitario = 0.0
+        self.timer_precio = QTimer(self)
+        self.timer_precio.setSingleShot(True)
+        self.timer_precio.setInterval(ESPERA_PRECIO_MS)
+        self.timer_precio.timeout.connect(self.actualizar_precio)
+
+        self.cmb_sabor.currentTextChanged.connect(self.programar_precio)
+        self.cmb_tamano.currentTextChanged.connect(self.programar_precio)
+        self.spin_cantidad.valueChanged.connect(self.actualizar_total)
+        self.catalogo.actualizado.connect(self.actualizar_precio)
+        self.catalogo.fallo.connect(self.actualizar_precio)
+        self._escuchando_catalogo = True
         self.check_es_otro.toggled.connect(self.toggle_sabor_personalizado)
         self.botones.accepted.connect(self.accept)
         self.botones.rejected.connect(self.reject)
@@ -324,38 +351,65 @@ class _BaseFormDialog(QDialog):
             self.line_sabor_personalizado.clear()
         self.actualizar_precio()
 
+    @Slot()
+    def programar_precio(self):
+        """Agrupa los cambios seguidos de sabor/tamaño en una sola búsqueda de precio."""
+        self.timer_precio.start()
+
     @Slot()
     def actualizar_precio(self):
         """Calcula el precio unitario y total automáticamente."""
+        self.timer_precio.stop()
         sabor = self.cmb_sabor.currentText()
         tamano = self.cmb_tamano.currentText()
-        cantidad = self.spin_cantidad.value()
         es_otro = self.check_es_otro.isChecked()
 
         if es_otro and not self.is_edit_mode:
-            precio_unitario = 0.0
+            self.precio_unitario = 0.0
             self.line_precio_unitario.setText("0.00 (Manual)")
             self.line_precio_unitario.setReadOnly(False)
 
         elif es_otro and self.is_edit_mode:
-            precio_unitario = float(self.data_dict.get('precio', 0.0))
-            self.line_precio_unitario.setText(f"{precio_unitario:.2f} (Manual)")
+            self.precio_unitario = float(self.data_dict.get('precio', 0.0))
+            self.line_precio_unitario.setText(f"{self.precio_unitario:.2f} (Manual)")
             self.line_precio_unitario.setReadOnly(False)
 
         else:
-            try:
-                precio_unitario = obtener_precio_db(sabor, tamano)
-                self.line_precio_unitario.setText(f"{precio_unitario:.2f}")
-                self.line_precio_unitario.setReadOnly(True)
-            except Exception as e:
-                logger.error(f"Error al obtener precio: {e}")
-                precio_unitario = 0.0
-                self.line_precio_unitario.setText("Error")
-                self.line_precio_unitario.setReadOnly(True)
-
-        total = precio_unitario * cantidad
+            precio = self.catalogo.precio(sabor, tamano)
+            self.precio_unitario = precio or 0.0
+            if precio is not None:
+                self.line_precio_unitario.setText(f"{precio:.2f}")
+            else:
+                # Si el catálogo aún carga, se vuelve a llamar cuando emita 'actualizado' o 'fallo'
+                self.line_precio_unitario.setText("Error" if self.catalogo.error else "Cargando...")
+            self.line_precio_unitario.setReadOnly(True)
+
+        self.actualizar_total()
+
+    @Slot()
+    def actualizar_total(self):
+        """Recalcula el total con el último precio unitario, sin buscar el precio de nuevo."""
+        total = self.precio_unitario * self.spin_cantidad.value()
         self.line_precio_total.setText(f"{total:.2f}")
 
+    def precio_formulario(self) -> float:
+        """Precio unitario a guardar: el manual si el campo es editable, si no el del catálogo."""
+        if not self.line_precio_unitario.isReadOnly():
+            try:
+                return float(self.line_precio_unitario.text())
+            except ValueError:
+                raise ValueError("El precio unitario manual no es un número válido.")
+        return self.catalogo.precio_para_guardar(self.cmb_sabor.currentText(), self.cmb_tamano.currentText())
+
+    def done(self, resultado):
+        """Al cerrar deja de seguir el catálogo: el diálogo sigue vivo como hijo de la ventana principal."""
+        self.timer_precio.stop()
+        if self._escuchando_catalogo:
+            self.catalogo.actualizado.disconnect(self.actualizar_precio)
+            self.catalogo.fallo.disconnect(self.actualizar_precio)
+            self._escuchando_catalogo = False
+        super().done(resultado)
+
     def accept(self):
         """Valida y guarda los datos antes de cerrar."""
         try:
@@ -442,13 +496,7 @@ class DialogoNuevoNormal(_BaseFormDialog):
         """Recoge los datos del formulario de Pedido Normal."""
         sabor_real = self.line_sabor_personalizado.text() if self.check_es_otro.isChecked() else self.cmb_sabor.currentText()
 
-        if not self.line_precio_unitario.isReadOnly():
-            try:
-                precio_unitario = float(self.line_precio_unitario.text())
-            except ValueError:
-                raise ValueError("El precio unitario manual no es un número válido.")
-        else:
-            precio_unitario = obtener_precio_db(self.cmb_sabor.currentText(), self.cmb_tamano.currentText())
+        precio_unitario = self.precio_formulario()
 
         total = precio_unitario * self.spin_cantidad.value()
 
@@ -539,15 +587,7 @@ class DialogoNuevoCliente(_BaseFormDialog):
             else self.cmb_sabor.currentText()
         )
 
-        if not self.line_precio_unitario.isReadOnly():
-            try:
-                precio_unitario = float(self.line_precio_unitario.text())
-            except ValueError:
-                raise ValueError("El precio unitario manual no es un número válido.")
-        else:
-            precio_unitario = obtener_precio_db(
-                self.cmb_sabor.currentText(), self.cmb_tamano.currentText()
-            )
+        precio_unitario = self.precio_formulario()
 
         total = precio_unitario * self.spin_cantidad.value()
 
@@ -0,0 +1,545 @@
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from PySide6.QtCore import (
+    QAbstractTableModel, QModelIndex, QObject, QRunnable, QSortFilterProxyModel,
+    QThreadPool, Qt, Signal, Slot
+)
+from PySide6.QtGui import QIcon
+
+from utils.uploads import ruta_miniatura
+
+logger = logging.getLogger(__name__)
+
+# Filas que el cargador manda a la vez a la tabla
+TAMANO_LOTE = 500
+
+# Valor crudo de la celda (p. ej. el id de la fila)
+ROL_VALOR = Qt.UserRole
+
+NUMERO, TEXTO, FECHA_HORA, FECHA, MONEDA, FOTO = "numero", "texto", "fecha_hora", "fecha", "moneda", "foto"
+
+COLUMNAS_CLIENTES = [
+    ("ID", NUMERO), ("Cant.", NUMERO), ("Tamaño", TEXTO), ("Sabor", TEXTO), ("Sucursal", TEXTO),
+    ("Fecha", FECHA_HORA), ("Fecha Entrega", FECHA), ("Detalles", TEXTO), ("Dedicatoria", TEXTO),
+    ("Color", TEXTO), ("Precio U.", MONEDA), ("Total", MONEDA), ("Foto", FOTO),
+]
+
+COLUMNAS_NORMALES = [
+    ("ID", NUMERO), ("Cant.", NUMERO), ("Tamaño", TEXTO), ("Sabor", TEXTO), ("Sucursal", TEXTO),
+    ("Fecha", FECHA_HORA), ("Fecha Entrega", FECHA), ("Precio U.", MONEDA), ("Total", MONEDA),
+]
+
+CENTRADO = int(Qt.AlignCenter)
+DERECHA = int(Qt.AlignRight | Qt.AlignVCenter)
+
+
+def formatear_celda(tipo: str, valor: Any) -> str:
+    """Texto que muestra la tabla para ``valor`` en una columna de ``tipo``."""
+    if tipo == FECHA_HORA:
+        return valor.strftime('%Y-%m-%d %H:%M') if valor else ''
+    if tipo == FECHA:
+        return valor.strftime('%Y-%m-%d') if valor else 'Sin especificar'
+    if tipo == MONEDA:
+        if valor is None:
+            return ''
+        try:
+            return f"Q{float(valor):,.2f}"
+        except (ValueError, TypeError):
+            return str(valor)
+    if tipo == FOTO:
+        if not valor:
+            return "Sin foto"
+        return "" if ruta_miniatura(valor) is not None else os.path.basename(valor)
+    return str(valor if valor is not None else '')
+
+
+def clave_orden(tipo: str, valor: Any) -> Any:
+    # Claves de un mismo tipo por columna: los nulos quedan juntos y no se mezclan tipos al comparar
+    if tipo in (NUMERO, MONEDA):
+        try:
+            return float(valor) if valor is not None else float("-inf")
+        except (ValueError, TypeError):
+            return float("-inf")
+    if tipo in (FECHA_HORA, FECHA):
+        return valor.isoformat() if valor else ""
+    return str(valor).lower() if valor is not None else ""
+
+
+class ConsultaPedidos:
+    """Tabla, columnas y filtro (fecha y sucursal) de lo que muestra una tabla del admin."""
+
+    def __init__(self, tabla: str, columnas: Sequence[str], filtro: str, params: Sequence):
+        self.tabla = tabla
+        self.columnas = tuple(columnas)
+        self.filtro = filtro
+        self.params = tuple(params)
+
+    def _clave(self) -> tuple:
+        return self.tabla, self.columnas, self.filtro, self.params
+
+    def __eq__(self, otra) -> bool:
+        return isinstance(otra, ConsultaPedidos) and self._clave() == otra._clave()
+
+    def __hash__(self) -> int:
+        return hash(self._clave())
+
+    def sql_marca(self) -> str:
+        # Si la migración 002 no se aplicó, la tabla no tiene version_fila
+        return (f"SELECT CASE WHEN COL_LENGTH('dbo.{self.tabla}', 'version_fila') IS NULL THEN 0 ELSE 1 END, "
+                f"MIN_ACTIVE_ROWVERSION()")
+
+    def sql_filas(self, extra: str = "") -> str:
+        return f"SELECT {', '.join(self.columnas)} FROM {self.tabla} WHERE {self.filtro}{extra} ORDER BY id DESC"
+
+    def sql_ids(self) -> str:
+        return f"SELECT id FROM {self.tabla} WHERE {self.filtro}"
+
+    def sql_cambios(self, marca: Optional[bytes], max_id: int, editados: Sequence[int]) -> Tuple[str, tuple]:
+        """
+        Filas nuevas o modificadas desde la última carga.
+
+        Con ``marca`` (MIN_ACTIVE_ROWVERSION de la carga anterior) son las de
+        version_fila >= marca; sin ella, las de id mayor al más alto visto y
+        las que ``editados`` indica que cambiaron.
+        """
+        if marca is not None:
+            return self.sql_filas(" AND version_fila >= ?"), self.params + (marca,)
+        ids = sorted(set(editados))
+        extra = " AND (id > ?"
+        if ids:
+            extra += f" OR id IN ({', '.join('?' * len(ids))})"
+        return self.sql_filas(extra + ")"), self.params + (max_id, *ids)
+
+
+class SenalesCargador(QObject):
+    marca = Signal(int, bool, object)
+    lote = Signal(int, list)
+    terminado = Signal(int, int)
+    cambios = Signal(int, list, object, bool, object)
+    fallo = Signal(int, str)
+
+
+def _leer_marca(cursor, consulta: ConsultaPedidos) -> Tuple[bool, Optional[bytes]]:
+    cursor.execute(consulta.sql_marca())
+    con_version, marca = cursor.fetchone()
+    return bool(con_version), (bytes(marca) if con_version else None)
+
+
+class CargadorPedidos(QRunnable):
+    """Ejecuta la consulta fuera del hilo de la interfaz y manda las filas por lotes."""
+
+    def __init__(self, generacion: int, conectar: Callable, consulta: ConsultaPedidos,
+                 tamano_lote: int = TAMANO_LOTE):
+        super().__init__()
+        self.generacion = generacion
+        self.conectar = conectar
+        self.consulta = consulta
+        self.tamano_lote = tamano_lote
+        self.cancelado = False
+        self.senales = SenalesCargador()
+
+    def run(self):
+        total = 0
+        try:
+            conn = self.conectar()
+            try:
+                cursor = conn.cursor()
+                # La marca se toma antes de leer: lo que cambie durante la carga entra en el siguiente refresco
+                self.senales.marca.emit(self.generacion, *_leer_marca(cursor, self.consulta))
+                cursor.execute(self.consulta.sql_filas(), self.consulta.params)
+                while not self.cancelado:
+                    filas = cursor.fetchmany(self.tamano_lote)
+                    if not filas:
+                        break
+                    total += len(filas)
+                    self.senales.lote.emit(self.generacion, [tuple(f) for f in filas])
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.error(f"Error al cargar pedidos: {e}", exc_info=True)
+            self.senales.fallo.emit(self.generacion, str(e))
+            return
+        self.senales.terminado.emit(self.generacion, total)
+
+
+class RefrescoPedidos(QRunnable):
+    """Trae solo lo nuevo o modificado y los ids vigentes del filtro, para detectar borrados."""
+
+    def __init__(self, generacion: int, conectar: Callable, consulta: ConsultaPedidos,
+                 marca: Optional[bytes], max_id: int, editados: Sequence[int]):
+        super().__init__()
+        self.generacion = generacion
+        self.conectar = conectar
+        self.consulta = consulta
+        self.marca = marca
+        self.max_id = max_id
+        self.editados = list(editados)
+        self.senales = SenalesCargador()
+
+    def run(self):
+        try:
+            conn = self.conectar()
+            try:
+                cursor = conn.cursor()
+                con_version, nueva_marca = _leer_marca(cursor, self.consulta)
+                sql, params = self.consulta.sql_cambios(self.marca, self.max_id, self.editados)
+                cursor.execute(sql, params)
+                filas = [tuple(f) for f in cursor.fetchall()]
+                cursor.execute(self.consulta.sql_ids(), self.consulta.params)
+                ids = {fila[0] for fila in cursor.fetchall()}
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.error(f"Error al refrescar pedidos: {e}", exc_info=True)
+            self.senales.fallo.emit(self.generacion, str(e))
+            return
+        self.senales.cambios.emit(self.generacion, filas, ids, con_version, nueva_marca)
+
+
+class ModeloPedidos(QAbstractTableModel):
+    """
+    Pedidos guardados como tuplas tal cual vienen de la base de datos.
+
+    El texto de cada celda se arma en data() solo cuando la vista lo pide,
+    y las miniaturas se buscan la primera vez que una fila con foto se
+    muestra. cargar() reemplaza el contenido con lo que va llegando del
+    cargador; los lotes de una carga anterior se descartan por su número de
+    generación.
+
+    sort() ordena las tuplas en Python con una clave por columna: dejar
+    que QSortFilterProxyModel compare fila contra fila llamaría a data()
+    cientos de miles de veces en una vista de un mes.
+
+    Con la misma consulta, mostrar() no recarga: refrescar() pide solo las
+    filas nuevas o modificadas (por version_fila, o por id si la tabla no
+    la tiene) y los ids vigentes, y aplica inserciones, cambios y borrados
+    fila por fila. La carga completa queda para cuando cambia el filtro.
+    """
+
+    cargaTerminada = Signal(int)
+    cargaFallida = Signal(str)
+    refrescado = Signal(int, int, int)
+
+    # Más filas fuera de orden que esto se agregan al final y se reordena todo
+    INSERCION_PUNTUAL = 32
+
+    def __init__(self, columnas: List[Tuple[str, str]], parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.columnas = columnas
+        self.tipos = [tipo for _, tipo in columnas]
+        self._filas: List[tuple] = []
+        self._busqueda: List[Optional[str]] = []
+        self._iconos: Dict[str, Optional[QIcon]] = {}
+        self.generacion = 0
+        self.cargando = False
+        self._orden: Optional[Tuple[int, Qt.SortOrder]] = None
+        self._cargador: Optional[QRunnable] = None
+        self._conectar: Optional[Callable] = None
+        self._pool: Optional[QThreadPool] = None
+        self.consulta: Optional[ConsultaPedidos] = None
+        self.completa = False
+        self.marca: Optional[bytes] = None
+        self.max_id = 0
+        self._editados_pendientes: Optional[set] = None
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._filas)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.columnas)
+
+    def headerData(self, section: int, orientation, role: int = Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal and 0 <= section < len(self.columnas):
+            return self.columnas[section][0]
+        return None
+
+    def flags(self, index: QModelIndex):
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable if index.isValid() else Qt.NoItemFlags
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        fila, col = index.row(), index.column()
+        valor = self._filas[fila][col]
+        tipo = self.tipos[col]
+
+        if role == Qt.DisplayRole:
+            return formatear_celda(tipo, valor)
+        if role == Qt.TextAlignmentRole:
+            return DERECHA if tipo == MONEDA and valor is not None and self._es_numero(valor) else CENTRADO
+        if role == ROL_VALOR:
+            return valor
+        if tipo == FOTO and valor:
+            if role == Qt.DecorationRole:
+                return self._icono(valor)
+            if role == Qt.ToolTipRole:
+                return valor
+        return None
+
+    @staticmethod
+    def _es_numero(valor: Any) -> bool:
+        try:
+            float(valor)
+            return True
+        except (ValueError, TypeError):
+            return False
+
+    def _icono(self, ruta: str) -> Optional[QIcon]:
+        if ruta not in self._iconos:
+            miniatura = ruta_miniatura(ruta)
+            self._iconos[ruta] = QIcon(str(miniatura)) if miniatura is not None else None
+        return self._iconos[ruta]
+
+    def valor(self, fila: int, col: int) -> Any:
+        return self._filas[fila][col]
+
+    def texto_busqueda(self, fila: int) -> str:
+        """Texto de toda la fila en minúsculas, armado una sola vez, para el filtro."""
+        texto = self._busqueda[fila]
+        if texto is None:
+            texto = "\t".join(formatear_celda(tipo, valor) for tipo, valor in zip(self.tipos, self._filas[fila])).lower()
+            self._busqueda[fila] = texto
+        return texto
+
+    def sort(self, columna: int, orden: Qt.SortOrder = Qt.AscendingOrder):
+        self._orden = (columna, orden) if 0 <= columna < len(self.columnas) else None
+        self._ordenar()
+
+    def _ordenar(self):
+        if self._orden is None or len(self._filas) < 2:
+            return
+        columna, orden = self._orden
+        tipo = self.tipos[columna]
+        filas = self._filas
+
+        self.layoutAboutToBeChanged.emit()
+        indices = sorted(range(len(filas)), key=lambda i: clave_orden(tipo, filas[i][columna]),
+                         reverse=orden == Qt.DescendingOrder)
+        posicion = [0] * len(indices)
+        for nueva, vieja in enumerate(indices):
+            posicion[vieja] = nueva
+        self._filas = [filas[i] for i in indices]
+        self._busqueda = [self._busqueda[i] for i in indices]
+
+        persistentes = self.persistentIndexList()
+        self.changePersistentIndexList(
+            persistentes, [self.index(posicion[i.row()], i.column()) for i in persistentes]
+        )
+        self.layoutChanged.emit()
+
+    def _posicion(self, fila: tuple) -> int:
+        # Búsqueda binaria sobre el orden activo; a igual clave la fila nueva va después
+        columna, orden = self._orden
+        tipo = self.tipos[columna]
+        descendente = orden == Qt.DescendingOrder
+        clave = clave_orden(tipo, fila[columna])
+        bajo, alto = 0, len(self._filas)
+        while bajo < alto:
+            medio = (bajo + alto) // 2
+            actual = clave_orden(tipo, self._filas[medio][columna])
+            if (actual >= clave) if descendente else (actual <= clave):
+                bajo = medio + 1
+            else:
+                alto = medio
+        return bajo
+
+    def _insertar(self, filas: list):
+        if not filas:
+            return
+        self.max_id = max(self.max_id, max(fila[0] for fila in filas))
+        en_orden = True
+        if self._orden is not None:
+            columna, orden = self._orden
+            tipo = self.tipos[columna]
+            descendente = orden == Qt.DescendingOrder
+            filas = sorted(filas, key=lambda f: clave_orden(tipo, f[columna]), reverse=descendente)
+            if self._filas:
+                ultima = clave_orden(tipo, self._filas[-1][columna])
+                primera = clave_orden(tipo, filas[0][columna])
+                en_orden = ultima >= primera if descendente else ultima <= primera
+            if not en_orden and len(filas) <= self.INSERCION_PUNTUAL:
+                for fila in filas:
+                    posicion = self._posicion(fila)
+                    self.beginInsertRows(QModelIndex(), posicion, posicion)
+                    self._filas.insert(posicion, fila)
+                    self._busqueda.insert(posicion, None)
+                    self.endInsertRows()
+                return
+
+        inicio = len(self._filas)
+        self.beginInsertRows(QModelIndex(), inicio, inicio + len(filas) - 1)
+        self._filas.extend(filas)
+        self._busqueda.extend([None] * len(filas))
+        self.endInsertRows()
+        # Lo normal es que el lote siga al anterior (ORDER BY id DESC); si no, se reordena todo
+        if not en_orden:
+            self._ordenar()
+
+    def reiniciar(self) -> int:
+        """Vacía la tabla y abre una generación nueva; devuelve su número."""
+        self.generacion += 1
+        if self._cargador is not None:
+            self._cargador.cancelado = True
+            self._cargador = None
+        self.cargando = False
+        self.completa = False
+        self.marca = None
+        self.max_id = 0
+        self._editados_pendientes = None
+        self.beginResetModel()
+        self._filas = []
+        self._busqueda = []
+        self.endResetModel()
+        return self.generacion
+
+    def _iniciar(self, tarea: QRunnable):
+        tarea.senales.fallo.connect(self._al_fallar)
+        self._cargador = tarea
+        self.cargando = True
+        (self._pool or QThreadPool.globalInstance()).start(tarea)
+
+    def cargar(self, conectar: Callable, consulta: ConsultaPedidos,
+               pool: Optional[QThreadPool] = None, tamano_lote: int = TAMANO_LOTE):
+        """Lanza la consulta en ``pool`` (el global por defecto) y llena la tabla por lotes."""
+        generacion = self.reiniciar()
+        self._conectar = conectar
+        self._pool = pool
+        self.consulta = consulta
+        cargador = CargadorPedidos(generacion, conectar, consulta, tamano_lote)
+        cargador.senales.marca.connect(self._al_marcar)
+        cargador.senales.lote.connect(self.agregar_lote)
+        cargador.senales.terminado.connect(self._al_terminar)
+        self._iniciar(cargador)
+
+    def refrescar(self, editados: Sequence[int] = ()):
+        """
+        Trae en segundo plano lo que cambió desde la última carga o refresco.
+
+        ``editados`` son ids que esta aplicación acaba de modificar; solo hacen
+        falta cuando la tabla no tiene version_fila. Si hay una carga en curso,
+        el refresco se hace al terminar.
+        """
+        if self.consulta is None:
+            return
+        if self.cargando or not self.completa:
+            self._editados_pendientes = (self._editados_pendientes or set()) | set(editados)
+            return
+        refresco = RefrescoPedidos(self.generacion, self._conectar, self.consulta, self.marca, self.max_id, editados)
+        refresco.senales.cambios.connect(self.aplicar_cambios)
+        self._iniciar(refresco)
+
+    def mostrar(self, conectar: Callable, consulta: ConsultaPedidos, editados: Sequence[int] = ()) -> bool:
+        """Refresca si el filtro es el mismo y ya cargó; si no, recarga. Devuelve True si recargó."""
+        if consulta == self.consulta and (self.completa or self.cargando):
+            self.refrescar(editados)
+            return False
+        self.cargar(conectar, consulta, self._pool)
+        return True
+
+    def _despues_de_tarea(self):
+        self._cargador = None
+        self.cargando = False
+        pendientes, self._editados_pendientes = self._editados_pendientes, None
+        if pendientes is not None and self.completa:
+            self.refrescar(pendientes)
+
+    @Slot(int, bool, object)
+    def _al_marcar(self, generacion: int, con_version: bool, marca):
+        if generacion == self.generacion:
+            self.marca = marca if con_version else None
+
+    @Slot(int, list)
+    def agregar_lote(self, generacion: int, filas: list):
+        if generacion != self.generacion or not filas:
+            return
+        self._insertar(filas)
+
+    @Slot(int, list, object, bool, object)
+    def aplicar_cambios(self, generacion: int, filas: list, ids_vigentes, con_version: bool, marca):
+        """Aplica un refresco: borra lo que ya no está, actualiza en su lugar e inserta lo nuevo."""
+        if generacion != self.generacion:
+            return
+
+        quitar = [i for i, fila in enumerate(self._filas) if fila[0] not in ids_vigentes]
+        eliminados = len(quitar)
+        while quitar:
+            # Rangos contiguos, de abajo hacia arriba para no mover los que faltan
+            fin = quitar.pop()
+            inicio = fin
+            while quitar and quitar[-1] == inicio - 1:
+                inicio = quitar.pop()
+            self.beginRemoveRows(QModelIndex(), inicio, fin)
+            del self._filas[inicio:fin + 1]
+            del self._busqueda[inicio:fin + 1]
+            self.endRemoveRows()
+
+        posiciones = {fila[0]: i for i, fila in enumerate(self._filas)}
+        nuevas = []
+        actualizadas = 0
+        reordenar = False
+        columna_orden = self._orden[0] if self._orden is not None else None
+        for fila in filas:
+            if fila[0] not in ids_vigentes:
+                continue
+            i = posiciones.get(fila[0])
+            if i is None:
+                nuevas.append(fila)
+                continue
+            anterior = self._filas[i]
+            if anterior == fila:
+                continue
+            self._filas[i] = fila
+            self._busqueda[i] = None
+            actualizadas += 1
+            if columna_orden is not None and anterior[columna_orden] != fila[columna_orden]:
+                reordenar = True
+            self.dataChanged.emit(self.index(i, 0), self.index(i, len(self.columnas) - 1))
+        if reordenar:
+            self._ordenar()
+        self._insertar(nuevas)
+
+        self.marca = marca if con_version else None
+        self._despues_de_tarea()
+        self.refrescado.emit(len(nuevas), actualizadas, eliminados)
+
+    @Slot(int, int)
+    def _al_terminar(self, generacion: int, total: int):
+        if generacion != self.generacion:
+            return
+        self.completa = True
+        self._despues_de_tarea()
+        self.cargaTerminada.emit(total)
+
+    @Slot(int, str)
+    def _al_fallar(self, generacion: int, mensaje: str):
+        if generacion != self.generacion:
+            return
+        self._editados_pendientes = None
+        self._despues_de_tarea()
+        self.cargaFallida.emit(mensaje)
+
+
+class FiltroPedidos(QSortFilterProxyModel):
+    """Ordena y filtra por texto sobre el modelo en memoria, sin consultar la base."""
+
+    def __init__(self, modelo: ModeloPedidos, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.setSourceModel(modelo)
+        self._patron = ""
+
+    def sort(self, columna: int, orden: Qt.SortOrder = Qt.AscendingOrder):
+        # El modelo ordena sus tuplas; el proxy solo sigue el cambio de layout
+        self.sourceModel().sort(columna, orden)
+
+    def establecer_busqueda(self, texto: str):
+        patron = texto.strip().lower()
+        if patron != self._patron:
+            self._patron = patron
+            self.invalidateRowsFilter()
+
+    def filterAcceptsRow(self, fila: int, padre: QModelIndex) -> bool:
+        if not self._patron:
+            return True
+        return self._patron in self.sourceModel().texto_busqueda(fila)
@@ -0,0 +1,88 @@
+"""
+Lo que corre dentro de los procesos que generan reportes PDF.
+
+No importa Qt: cada proceso hijo (spawn) importa este módulo para
+desempaquetar su tarea, y cargar PySide6 ahí solo haría más lento el arranque.
+"""
+
+import os
+from datetime import date
+from typing import Callable, Optional
+
+# Avisos que manda cada reporte: inicio, datos leídos y PDF escrito
+PASOS_POR_REPORTE = 3
+
+AVANCE, LISTO, ERROR = "avance", "listo", "error"
+
+SUFIJO_PARCIAL = ".parcial"
+
+
+class TareaReporte:
+    """Un PDF a generar; ``fecha_fin`` None significa reporte de un solo día."""
+
+    def __init__(self, tipo: str, fecha_inicio: date, fecha_fin: Optional[date],
+                 sucursal: Optional[str], destino: str):
+        if tipo not in ("ventas", "listas"):
+            raise ValueError(f"Tipo de reporte desconocido: {tipo}")
+        self.tipo = tipo
+        self.fecha_inicio = fecha_inicio
+        self.fecha_fin = fecha_fin
+        self.sucursal = sucursal
+        self.destino = destino
+
+    @property
+    def descripcion(self) -> str:
+        return f"{self.tipo.capitalize()} {self.sucursal or 'todas las sucursales'}"
+
+
+def nombre_reporte(prefijo: str, fecha_inicio: date, fecha_fin: Optional[date] = None,
+                   sucursal: Optional[str] = None) -> str:
+    """Nombre de archivo por defecto, p. ej. ``Ventas_2025-01-01_a_2025-01-31_Progreso.pdf``."""
+    nombre = f"{prefijo}_{fecha_inicio.strftime('%Y-%m-%d')}"
+    if fecha_fin is not None:
+        nombre += f"_a_{fecha_fin.strftime('%Y-%m-%d')}"
+    return f"{nombre}_{sucursal or 'TODAS'}.pdf"
+
+
+def renderizar_reporte(tarea: TareaReporte, avisar: Callable[[str], None]):
+    """Lee los datos y maqueta el PDF de ``tarea``. Se ejecuta en el proceso hijo."""
+    import pdf_reportes
+
+    fecha_fin = tarea.fecha_fin or tarea.fecha_inicio
+    datos = pdf_reportes.obtener_datos(None, tarea.fecha_inicio, fecha_fin, tarea.sucursal)
+    avisar(f"Maquetando {tarea.descripcion}")
+
+    if tarea.tipo == "ventas" and tarea.fecha_fin is None:
+        pdf_reportes.generar_pdf_ventas(tarea.fecha_inicio, tarea.sucursal, tarea.destino, datos=datos)
+    elif tarea.tipo == "ventas":
+        pdf_reportes.generar_pdf_ventas_rango(tarea.fecha_inicio, tarea.fecha_fin, tarea.sucursal,
+                                              tarea.destino, datos=datos)
+    elif tarea.fecha_fin is None:
+        pdf_reportes.generar_pdf_listas(tarea.fecha_inicio, tarea.sucursal, tarea.destino, datos=datos)
+    else:
+        pdf_reportes.generar_pdf_rango_fechas(tarea.fecha_inicio, tarea.fecha_fin, tarea.sucursal,
+                                              tarea.destino, datos=datos)
+
+
+def proceso_reporte(indice: int, tarea: TareaReporte, cola, funcion: Callable):
+    """
+    Punto de entrada del proceso hijo.
+
+    El PDF se escribe en ``destino + .parcial`` y se renombra al terminar, así
+    un reporte cancelado o fallido nunca deja un PDF truncado con el nombre final.
+    """
+    destino = tarea.destino
+    tarea.destino = destino + SUFIJO_PARCIAL
+
+    def avisar(mensaje: str):
+        cola.put((indice, AVANCE, mensaje))
+
+    try:
+        avisar(f"Leyendo datos de {tarea.descripcion}")
+        funcion(tarea, avisar)
+        os.replace(tarea.destino, destino)
+        cola.put((indice, LISTO, destino))
+    except BaseException as e:
+        if os.path.exists(tarea.destino):
+            os.remove(tarea.destino)
+        cola.put((indice, ERROR, str(e) or type(e).__name__))
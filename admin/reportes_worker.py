@@ -0,0 +1,153 @@
+import logging
+import multiprocessing
+import os
+import queue
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from PySide6.QtCore import QObject, QTimer, Signal, Slot
+
+from admin.reportes_proceso import (
+    AVANCE, LISTO, ERROR, PASOS_POR_REPORTE, SUFIJO_PARCIAL, TareaReporte, proceso_reporte, renderizar_reporte
+)
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LoteReportes(QObject):
+    """
+    Genera uno o varios PDFs en procesos aparte para no congelar la ventana.
+
+    Cada reporte corre en su propio proceso (spawn: no hereda el estado de Qt
+    ni las conexiones abiertas del admin), hasta ``max_procesos`` a la vez. Un
+    QTimer en el hilo principal lee la cola de avisos y emite ``progreso``;
+    ``cancelar()`` termina los procesos vivos y borra los archivos a medias.
+    """
+
+    progreso = Signal(int, int, str)
+    terminado = Signal(list, list)
+    cancelado = Signal()
+
+    def __init__(self, tareas: Sequence[TareaReporte], funcion: Callable = renderizar_reporte,
+                 max_procesos: Optional[int] = None, intervalo_ms: int = 100, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        if not tareas:
+            raise ValueError("No hay reportes que generar")
+        self.tareas = list(tareas)
+        self.funcion = funcion
+        self.max_procesos = max(1, max_procesos or settings.ADMIN_REPORTS_MAX_PROCESSES)
+
+        self._contexto = multiprocessing.get_context("spawn")
+        self._cola = None
+        self._pendientes: List[int] = []
+        self._procesos: Dict[int, multiprocessing.Process] = {}
+        self._pasos = [0] * len(self.tareas)
+        self._rutas: List[str] = []
+        self._errores: List[Tuple[TareaReporte, str]] = []
+        self._finalizados = set()
+        self._activo = False
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(intervalo_ms)
+        self._timer.timeout.connect(self._revisar)
+
+    @property
+    def activo(self) -> bool:
+        return self._activo
+
+    @property
+    def total_pasos(self) -> int:
+        return PASOS_POR_REPORTE * len(self.tareas)
+
+    def iniciar(self):
+        if self._activo:
+            return
+        for tarea in self.tareas:
+            os.makedirs(os.path.dirname(os.path.abspath(tarea.destino)), exist_ok=True)
+        self._cola = self._contexto.Queue()
+        self._pendientes = list(range(len(self.tareas)))
+        self._activo = True
+        self._lanzar()
+        self._timer.start()
+
+    def _lanzar(self):
+        while self._pendientes and len(self._procesos) < self.max_procesos:
+            indice = self._pendientes.pop(0)
+            proceso = self._contexto.Process(
+                target=proceso_reporte,
+                args=(indice, self.tareas[indice], self._cola, self.funcion),
+                daemon=True,
+            )
+            proceso.start()
+            self._procesos[indice] = proceso
+
+    def _leer_cola(self) -> str:
+        ultimo = ""
+        while True:
+            try:
+                indice, tipo, valor = self._cola.get_nowait()
+            except queue.Empty:
+                return ultimo
+            if tipo == AVANCE:
+                self._pasos[indice] = min(self._pasos[indice] + 1, PASOS_POR_REPORTE - 1)
+                ultimo = valor
+            else:
+                ultimo = self._finalizar(indice, tipo, valor)
+
+    @Slot()
+    def _revisar(self):
+        ultimo = self._leer_cola()
+
+        for indice, proceso in list(self._procesos.items()):
+            if proceso.exitcode is None:
+                continue
+            if indice not in self._finalizados:
+                # El aviso final pudo llegar entre la lectura de la cola y la salida del proceso
+                ultimo = self._leer_cola() or ultimo
+            if indice not in self._finalizados:
+                ultimo = self._finalizar(indice, ERROR, f"El proceso terminó inesperadamente (código {proceso.exitcode})")
+            proceso.join()
+            del self._procesos[indice]
+
+        self._lanzar()
+        self.progreso.emit(sum(self._pasos), self.total_pasos, ultimo)
+
+        if len(self._finalizados) == len(self.tareas):
+            self._cerrar()
+            self.terminado.emit(self._rutas, self._errores)
+
+    def _finalizar(self, indice: int, tipo: str, valor: str) -> str:
+        tarea = self.tareas[indice]
+        self._finalizados.add(indice)
+        self._pasos[indice] = PASOS_POR_REPORTE
+        if tipo == LISTO:
+            self._rutas.append(valor)
+            return f"Listo: {os.path.basename(valor)}"
+        logger.error(f"Error generando {tarea.destino}: {valor}")
+        self._errores.append((tarea, valor))
+        return f"Error en {tarea.descripcion}"
+
+    def cancelar(self):
+        """Detiene los reportes en curso; los ya terminados se conservan."""
+        if not self._activo:
+            return
+        for proceso in self._procesos.values():
+            if proceso.is_alive():
+                proceso.terminate()
+        for indice, proceso in self._procesos.items():
+            proceso.join(5)
+            parcial = self.tareas[indice].destino + SUFIJO_PARCIAL
+            if os.path.exists(parcial):
+                os.remove(parcial)
+        self._procesos.clear()
+        self._pendientes.clear()
+        self._cerrar()
+        self.cancelado.emit()
+
+    def _cerrar(self):
+        self._timer.stop()
+        self._activo = False
+        if self._cola is not None:
+            self._cola.close()
+            self._cola.cancel_join_thread()
+            self._cola = None
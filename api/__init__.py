@@ -1,14 +1,18 @@
-from .auth import verificar_credenciales, crear_respuesta_con_sesion, cerrar_sesion, verificar_sesion, requiere_autenticacion
+from .auth import verificar_credenciales, verificar_credenciales_async, crear_respuesta_con_sesion, cerrar_sesion, verificar_sesion, requiere_autenticacion
 from .database import DatabaseManager
+from .async_database import AsyncDatabaseManager, run_db
 from .models import *
 from .audit import registrar_auditoria
 
 __all__ = [
     'verificar_credenciales',
+    'verificar_credenciales_async',
     'crear_respuesta_con_sesion',
     'cerrar_sesion',
     'verificar_sesion',
     'requiere_autenticacion',
     'DatabaseManager',
+    'AsyncDatabaseManager',
+    'run_db',
     'registrar_auditoria'
 ]
@@ -0,0 +1,102 @@
+"""
+Fachada asíncrona sobre DatabaseManager.
+
+pyodbc bloquea el hilo que ejecuta la consulta, así que los handlers async
+delegan cada llamada a un ThreadPoolExecutor propio y el event loop queda libre
+mientras SQL Server responde. El executor tiene tantos hilos como la suma de los
+pools de conexiones, así que no crece sin límite; pero los hilos no están
+repartidos por pool: si todas las llamadas van a la misma base, los que no
+consiguen conexión esperan en ese pool hasta DB_POOL_TIMEOUT_SECONDS.
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from config.database import db_pool_normales, db_pool_clientes
+from config.settings import settings
+from utils.logger import logger
+from .database import DatabaseManager
+
+
+class DatabaseTimeoutError(Exception):
+    """La llamada a la base de datos excedió el tiempo permitido."""
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def obtener_executor() -> ThreadPoolExecutor:
+    """Devuelve el executor de base de datos, creándolo la primera vez."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=db_pool_normales.max_size + db_pool_clientes.max_size,
+                thread_name_prefix="mipastel-db"
+            )
+        return _executor
+
+
+def cerrar_executor():
+    """Detiene el executor; las llamadas que aún no empezaron se cancelan."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+async def run_db(func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+    """
+    Ejecuta una función síncrona de base de datos fuera del event loop.
+
+    Args:
+        func: Función o método bloqueante a ejecutar
+        timeout: Segundos máximos de espera (por defecto DB_QUERY_TIMEOUT_SECONDS)
+
+    Returns:
+        El valor devuelto por ``func``
+
+    Raises:
+        DatabaseTimeoutError: Si la llamada no termina a tiempo. Si aún no había
+            empezado a ejecutarse, se cancela y nunca llega a la base de datos.
+    """
+    loop = asyncio.get_running_loop()
+    limite = settings.DB_QUERY_TIMEOUT_SECONDS if timeout is None else timeout
+    futuro = loop.run_in_executor(obtener_executor(), functools.partial(func, *args, **kwargs))
+
+    try:
+        return await asyncio.wait_for(futuro, limite)
+    except asyncio.TimeoutError:
+        nombre = getattr(func, "__name__", repr(func))
+        logger.error(f"Tiempo de espera agotado en {nombre} ({limite}s)")
+        raise DatabaseTimeoutError(f"La consulta {nombre} excedió {limite} segundos")
+
+
+class AsyncDatabaseManager:
+    """
+    Envuelve un DatabaseManager y expone sus métodos como corrutinas.
+
+    Ejemplo:
+        db = AsyncDatabaseManager(DatabaseManager())
+        pedidos = await db.obtener_pasteles_normales(sucursal="Jutiapa 1")
+    """
+
+    def __init__(self, manager: Optional[DatabaseManager] = None, timeout: Optional[float] = None):
+        self._manager = manager if manager is not None else DatabaseManager()
+        self._timeout = timeout
+
+    def __getattr__(self, nombre: str):
+        atributo = getattr(self._manager, nombre)
+        if not callable(atributo):
+            return atributo
+
+        @functools.wraps(atributo)
+        async def llamada(*args, **kwargs):
+            return await run_db(atributo, *args, timeout=self._timeout, **kwargs)
+
+        return llamada
@@ -1,146 +1,25 @@
+import asyncio
 import bcrypt
+import hashlib
+import hmac
 import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import HTTPException, status, Request
-from typing import Optional
+from typing import Optional, Tuple
 from datetime import datetime, timedelta
 from config.settings import settings
-import os
-import json
+from api import sesiones
+from api.sesiones import COOKIE_SESION
+from api.usuarios import USUARIOS, UsuariosDB, almacen_usuarios
 
 SECRET_KEY = settings.SECRET_KEY
 SESSION_DURATION = timedelta(hours=settings.SESSION_DURATION_HOURS)
 
-# Archivo para guardar los hashes generados
-HASHES_FILE = os.path.join(os.path.dirname(__file__), ".password_hashes.json")
-
-# Contraseñas por defecto (solo se usan para generar hashes la primera vez)
-DEFAULT_PASSWORDS = {
-    "jutiapa1": "jut1pass",
-    "jutiapa2": "jut2pass",
-    "jutiapa3": "jut3pass",
-    "progreso": "progpass",
-    "quesada": "quespass",
-    "acatempa": "acatpass",
-    "yupiltepeque": "yupepass",
-    "atescatempa": "atespass",
-    "adelanto": "adelpass",
-    "jerez": "jerpass",
-    "comapa": "comapass",
-    "carina": "caripass",
-    "admin": "admin123"
-}
-
-def _load_or_generate_hashes():
-    """Cargar hashes existentes o generar nuevos si no existen"""
-    if os.path.exists(HASHES_FILE):
-        try:
-            with open(HASHES_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            pass
-    
-    # Generar nuevos hashes
-    print("Generando hashes de contraseñas por primera vez...")
-    hashes = {}
-    for username, password in DEFAULT_PASSWORDS.items():
-        hash_value = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=12)).decode('utf-8')
-        hashes[username] = hash_value
-        print(f"  {username}: OK")
-    
-    # Guardar para uso futuro
-    try:
-        with open(HASHES_FILE, 'w') as f:
-            json.dump(hashes, f, indent=2)
-        print(f"Hashes guardados en {HASHES_FILE}")
-    except Exception as e:
-        print(f"No se pudieron guardar los hashes: {e}")
-    
-    return hashes
-
-# Cargar o generar hashes
-_PASSWORD_HASHES = _load_or_generate_hashes()
-
-# Base de datos de usuarios
-USERS_DB = {
-    "jutiapa1": {
-        "password_hash": _PASSWORD_HASHES.get("jutiapa1"),
-        "nombre": "Jutiapa 1",
-        "sucursal": "Jutiapa 1",
-        "rol": "sucursal"
-    },
-    "jutiapa2": {
-        "password_hash": _PASSWORD_HASHES.get("jutiapa2"),
-        "nombre": "Jutiapa 2",
-        "sucursal": "Jutiapa 2",
-        "rol": "sucursal"
-    },
-    "jutiapa3": {
-        "password_hash": _PASSWORD_HASHES.get("jutiapa3"),
-        "nombre": "Jutiapa 3",
-        "sucursal": "Jutiapa 3",
-        "rol": "sucursal"
-    },
-    "progreso": {
-        "password_hash": _PASSWORD_HASHES.get("progreso"),
-        "nombre": "Progreso",
-        "sucursal": "Progreso",
-        "rol": "sucursal"
-    },
-    "quesada": {
-        "password_hash": _PASSWORD_HASHES.get("quesada"),
-        "nombre": "Quesada",
-        "sucursal": "Quesada",
-        "rol": "sucursal"
-    },
-    "acatempa": {
-        "password_hash": _PASSWORD_HASHES.get("acatempa"),
-        "nombre": "Acatempa",
-        "sucursal": "Acatempa",
-        "rol": "sucursal"
-    },
-    "yupiltepeque": {
-        "password_hash": _PASSWORD_HASHES.get("yupiltepeque"),
-        "nombre": "Yupiltepeque",
-        "sucursal": "Yupiltepeque",
-        "rol": "sucursal"
-    },
-    "atescatempa": {
-        "password_hash": _PASSWORD_HASHES.get("atescatempa"),
-        "nombre": "Atescatempa",
-        "sucursal": "Atescatempa",
-        "rol": "sucursal"
-    },
-    "adelanto": {
-        "password_hash": _PASSWORD_HASHES.get("adelanto"),
-        "nombre": "Adelanto",
-        "sucursal": "Adelanto",
-        "rol": "sucursal"
-    },
-    "jerez": {
-        "password_hash": _PASSWORD_HASHES.get("jerez"),
-        "nombre": "Jeréz",
-        "sucursal": "Jeréz",
-        "rol": "sucursal"
-    },
-    "comapa": {
-        "password_hash": _PASSWORD_HASHES.get("comapa"),
-        "nombre": "Comapa",
-        "sucursal": "Comapa",
-        "rol": "sucursal"
-    },
-    "carina": {
-        "password_hash": _PASSWORD_HASHES.get("carina"),
-        "nombre": "Carina",
-        "sucursal": "Carina",
-        "rol": "sucursal"
-    },
-    "admin": {
-        "password_hash": _PASSWORD_HASHES.get("admin"),
-        "nombre": "Administrador",
-        "sucursal": None,
-        "rol": "admin"
-    }
-}
+# Los hashes se cargan en el primer login, no al importar (ver api/usuarios.py)
+USERS_DB = UsuariosDB(almacen_usuarios)
 
 class LoginAttempts:
     def __init__(self):
@@ -172,6 +51,83 @@ def verify_password(password: str, hashed: str) -> bool:
         print(f"Error verifying password: {e}")
         return False
 
+class CacheCredenciales:
+    """
+    Recently verified username/password pairs, so a repeated login skips bcrypt.
+
+    Keys are HMAC-SHA256 digests under a random per-process key: the cache
+    never holds passwords or anything that could be checked offline. Each
+    entry remembers the bcrypt hash it was verified against, so changing a
+    password invalidates it.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_entradas: int = 1024):
+        self.ttl = settings.LOGIN_CACHE_TTL_SECONDS if ttl is None else ttl
+        self.max_entradas = max_entradas
+        self._clave = secrets.token_bytes(32)
+        self._entradas: "OrderedDict[bytes, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _llave(self, username: str, password: str) -> bytes:
+        return hmac.new(self._clave, f"{username}\0{password}".encode(), hashlib.sha256).digest()
+
+    def contiene(self, username: str, password: str, password_hash: str) -> bool:
+        if self.ttl <= 0:
+            return False
+        llave = self._llave(username, password)
+        with self._lock:
+            entrada = self._entradas.get(llave)
+            if entrada is None:
+                return False
+            vence, hash_verificado = entrada
+            if vence <= time.monotonic() or not hmac.compare_digest(hash_verificado, password_hash):
+                del self._entradas[llave]
+                return False
+            return True
+
+    def agregar(self, username: str, password: str, password_hash: str):
+        if self.ttl <= 0:
+            return
+        llave = self._llave(username, password)
+        with self._lock:
+            self._entradas[llave] = (time.monotonic() + self.ttl, password_hash)
+            self._entradas.move_to_end(llave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+cache_credenciales = CacheCredenciales()
+
+# bcrypt cuesta ~250 ms de CPU por intento: se limita cuántos corren a la vez
+_executor_login: Optional[ThreadPoolExecutor] = None
+_executor_login_lock = threading.Lock()
+
+def obtener_executor_login() -> ThreadPoolExecutor:
+    global _executor_login
+    with _executor_login_lock:
+        if _executor_login is None:
+            _executor_login = ThreadPoolExecutor(
+                max_workers=settings.LOGIN_MAX_CONCURRENT,
+                thread_name_prefix="mipastel-login"
+            )
+        return _executor_login
+
+def cerrar_executor_login():
+    global _executor_login
+    with _executor_login_lock:
+        if _executor_login is not None:
+            _executor_login.shutdown(wait=False, cancel_futures=True)
+            _executor_login = None
+
+def _password_correcta(username: str, password: str, password_hash: str) -> bool:
+    if verify_password(password, password_hash):
+        cache_credenciales.agregar(username, password, password_hash)
+        return True
+    return False
+
 def verificar_credenciales(username: str, password: str) -> Optional[dict]:
     if not login_attempts.check_attempt(username):
         return None
@@ -180,38 +136,60 @@ def verificar_credenciales(username: str, password: str) -> Optional[dict]:
         return None
 
     user = USERS_DB[username]
-    if verify_password(password, user["password_hash"]):
-        return {
-            "username": username,
-            "nombre": user["nombre"],
-            "sucursal": user["sucursal"],
-            "rol": user["rol"]
-        }
+    if cache_credenciales.contiene(username, password, user["password_hash"]) or \
+            _password_correcta(username, password, user["password_hash"]):
+        return datos_usuario(username)
     return None
 
-def hash_session(username: str) -> str:
-    import hashlib
-    return hashlib.sha256(f"{username}{SECRET_KEY}".encode()).hexdigest()
-
-def verificar_sesion(request: Request) -> Optional[dict]:
-    session_token = request.cookies.get("session_token")
-    username = request.cookies.get("username")
-    sucursal = request.cookies.get("sucursal")
-    rol = request.cookies.get("rol")
+async def verificar_credenciales_async(username: str, password: str) -> Optional[dict]:
+    """
+    verificar_credenciales for async handlers.
 
-    if not session_token or not username:
+    bcrypt runs on a pool of LOGIN_MAX_CONCURRENT threads instead of the
+    event loop, so a burst of logins queues there while every other request
+    keeps being served. Pairs verified in the last LOGIN_CACHE_TTL_SECONDS
+    skip bcrypt entirely.
+    """
+    if not login_attempts.check_attempt(username):
         return None
 
-    expected_token = hash_session(username)
-    if session_token != expected_token or username not in USERS_DB:
+    if username not in USERS_DB:
         return None
 
+    loop = asyncio.get_running_loop()
+    if not almacen_usuarios.cargado:
+        # La primera carga lee el archivo de hashes (y quizá genera alguno): fuera del loop
+        await loop.run_in_executor(obtener_executor_login(), lambda: almacen_usuarios.usuarios)
+    user = USERS_DB[username]
+    if not cache_credenciales.contiene(username, password, user["password_hash"]):
+        correcta = await loop.run_in_executor(
+            obtener_executor_login(), _password_correcta, username, password, user["password_hash"]
+        )
+        if not correcta:
+            return None
+    return datos_usuario(username)
+
+def datos_usuario(username: str) -> dict:
+    user = USUARIOS[username]
     return {
         "username": username,
-        "sucursal": sucursal,
-        "rol": rol
+        "nombre": user["nombre"],
+        "sucursal": user["sucursal"],
+        "rol": user["rol"]
     }
 
+def verificar_sesion(request: Request) -> Optional[dict]:
+    """
+    Return the session user, as resolved once per request by SesionMiddleware.
+
+    Requests that did not go through the middleware resolve the session
+    cookie against the store directly.
+    """
+    try:
+        return request.state.sesion
+    except AttributeError:
+        return sesiones.almacen_sesiones.obtener(request.cookies.get(COOKIE_SESION))
+
 def requiere_autenticacion(request: Request) -> dict:
     """
     Dependency to require authentication for endpoints.
@@ -272,41 +250,25 @@ def requiere_permiso_sucursal(user_data: dict, sucursal: str) -> None:
         )
 
 def crear_respuesta_con_sesion(response, user_data: dict):
-    session_token = hash_session(user_data["username"])
+    session_id = sesiones.almacen_sesiones.crear(user_data)
     max_age = int(SESSION_DURATION.total_seconds())
 
     response.set_cookie(
-        key="session_token",
-        value=session_token,
-        httponly=True,
-        max_age=max_age,
-        samesite="lax"
-    )
-    response.set_cookie(
-        key="username",
-        value=user_data["username"],
-        httponly=True,
-        max_age=max_age,
-        samesite="lax"
-    )
-    response.set_cookie(
-        key="sucursal",
-        value=user_data["sucursal"] or "",
-        httponly=True,
-        max_age=max_age,
-        samesite="lax"
-    )
-    response.set_cookie(
-        key="rol",
-        value=user_data["rol"],
+        key=COOKIE_SESION,
+        value=session_id,
         httponly=True,
         max_age=max_age,
         samesite="lax"
     )
+    # Cookies del esquema anterior, que guardaba usuario, sucursal y rol en el navegador
+    for cookie in ("username", "sucursal", "rol"):
+        response.delete_cookie(cookie)
     return response
 
-def cerrar_sesion(response):
-    response.delete_cookie("session_token")
+def cerrar_sesion(response, request: Optional[Request] = None):
+    if request is not None:
+        sesiones.almacen_sesiones.eliminar(request.cookies.get(COOKIE_SESION))
+    response.delete_cookie(COOKIE_SESION)
     response.delete_cookie("username")
     response.delete_cookie("sucursal")
     response.delete_cookie("rol")
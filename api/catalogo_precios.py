@@ -0,0 +1,153 @@
+"""
+Catálogo de precios en memoria.
+
+La tabla PastelesPrecios casi nunca cambia, pero se consulta en cada cambio de
+sabor, tamaño o cantidad de los formularios. El catálogo completo se carga una
+vez en una instantánea inmutable indexada por (sabor, tamaño); las búsquedas
+son lecturas de diccionario. Cada PRECIOS_CACHE_TTL_SECONDS se compara una
+huella barata de la tabla (COUNT + CHECKSUM_AGG) para detectar cambios hechos
+fuera de este proceso, y actualizar_precios_db reemplaza la instantánea al
+confirmar.
+
+La huella es también la versión del catálogo: actualizar_precios_db la
+devuelve para que el admin de escritorio y los navegadores sepan que sus
+precios quedaron viejos.
+"""
+
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config.database import db_pool_normales
+from config.settings import settings
+from utils.logger import logger
+
+SQL_HUELLA = "SELECT COUNT(*), CHECKSUM_AGG(BINARY_CHECKSUM(id, sabor, tamano, precio)) FROM PastelesPrecios"
+SQL_CATALOGO = "SELECT id, sabor, tamano, precio FROM PastelesPrecios ORDER BY sabor, id"
+
+
+def clave_precio(sabor: str, tamano: str) -> Tuple[str, str]:
+    """Normaliza la clave igual que la intercalación de SQL Server (sin mayúsculas ni espacios)."""
+    return ((sabor or "").strip().casefold(), (tamano or "").strip().casefold())
+
+
+CENTAVO = Decimal("0.01")
+
+
+class InstantaneaPrecios:
+    """Copia inmutable del catálogo de precios."""
+
+    __slots__ = ("version", "filas", "precios", "por_id")
+
+    def __init__(self, version: str, filas):
+        self.version = version
+        self.filas = tuple((fila[0], fila[1], fila[2], float(fila[3])) for fila in filas)
+        self.precios = MappingProxyType({clave_precio(s, t): p for _, s, t, p in self.filas})
+        self.por_id = MappingProxyType({fila[0]: fila for fila in self.filas})
+
+    def precio(self, sabor: str, tamano: str) -> float:
+        return self.precios.get(clave_precio(sabor, tamano), 0.0)
+
+
+def diferencias_precios(instantanea: InstantaneaPrecios,
+                        precios: Iterable[Dict[str, Any]]) -> List[Tuple[int, str, str, Decimal]]:
+    """
+    Filas (id, sabor, tamano, precio) de ``precios`` que cambian algo del catálogo.
+
+    Cada elemento necesita ``id``; ``sabor``, ``tamano`` y ``precio`` que falten
+    se toman de la instantánea. Lanza ValueError si un id no existe o un
+    precio no es un número positivo.
+    """
+    cambios = {}
+    for precio in precios:
+        try:
+            id_precio = int(precio["id"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Id de precio inválido: {precio.get('id')!r}")
+        actual = instantanea.por_id.get(id_precio)
+        if actual is None:
+            raise ValueError(f"El precio {id_precio} no existe")
+
+        _, sabor_actual, tamano_actual, precio_actual = actual
+        sabor = (precio.get("sabor") or sabor_actual).strip()
+        tamano = (precio.get("tamano") or tamano_actual).strip()
+        try:
+            nuevo = Decimal(str(precio.get("precio", precio_actual)).replace("Q", "").strip()).quantize(CENTAVO)
+        except InvalidOperation:
+            raise ValueError(f"Precio inválido para {sabor} {tamano}: {precio.get('precio')!r}")
+        if not nuevo.is_finite() or nuevo <= 0:
+            raise ValueError(f"El precio de {sabor} {tamano} debe ser mayor a 0")
+
+        if (sabor, tamano, nuevo) != (sabor_actual, tamano_actual, Decimal(str(precio_actual)).quantize(CENTAVO)):
+            cambios[id_precio] = (id_precio, sabor, tamano, nuevo)
+        else:
+            cambios.pop(id_precio, None)
+    return list(cambios.values())
+
+
+class CatalogoPrecios:
+    def __init__(self, db_pool, ttl_seconds: Optional[float] = None):
+        self._pool = db_pool
+        self.ttl_seconds = settings.PRECIOS_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._lock = threading.Lock()
+        self._instantanea: Optional[InstantaneaPrecios] = None
+        self._verificada = 0.0
+
+    def _vigente(self) -> bool:
+        return self._instantanea is not None and time.monotonic() - self._verificada < self.ttl_seconds
+
+    def instantanea_vigente(self) -> Optional[InstantaneaPrecios]:
+        """Devuelve la instantánea sin tocar la base de datos, o None si hay que verificarla."""
+        return self._instantanea if self._vigente() else None
+
+    def instantanea(self) -> InstantaneaPrecios:
+        """Devuelve la instantánea actual, verificándola contra la base si venció el TTL."""
+        if self._vigente():
+            return self._instantanea
+        return self._sincronizar(forzar=False)
+
+    def recargar(self) -> InstantaneaPrecios:
+        """Vuelve a leer el catálogo completo y reemplaza la instantánea."""
+        return self._sincronizar(forzar=True)
+
+    def _sincronizar(self, forzar: bool) -> InstantaneaPrecios:
+        with self._lock:
+            if not forzar and self._vigente():
+                return self._instantanea
+
+            try:
+                with self._pool.get_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute(SQL_HUELLA)
+                    cantidad, checksum = cursor.fetchone()
+                    version = f"{cantidad}-{(checksum or 0) & 0xFFFFFFFF:08x}"
+
+                    actual = self._instantanea
+                    if forzar or actual is None or actual.version != version:
+                        cursor.execute(SQL_CATALOGO)
+                        self._instantanea = InstantaneaPrecios(version, cursor.fetchall())
+                        logger.info(f"Catálogo de precios cargado: {cantidad} precios (versión {version})")
+            except Exception as e:
+                if "Invalid object name 'PastelesPrecios'" not in str(e):
+                    raise
+                logger.warning("Tabla 'PastelesPrecios' no encontrada")
+                self._instantanea = InstantaneaPrecios("0-00000000", [])
+
+            self._verificada = time.monotonic()
+            return self._instantanea
+
+    def invalidar(self):
+        """Obliga a verificar la huella en la siguiente lectura."""
+        self._verificada = 0.0
+
+    def obtener_precio(self, sabor: str, tamano: str) -> float:
+        return self.instantanea().precio(sabor, tamano)
+
+    @property
+    def version(self) -> str:
+        return self.instantanea().version
+
+
+catalogo_precios = CatalogoPrecios(db_pool_normales)
@@ -1,46 +1,102 @@
 import pyodbc
+from operator import itemgetter
 from typing import List, Dict, Any, Optional
 from config.database import db_pool_normales, db_pool_clientes
+from .catalogo_precios import catalogo_precios, diferencias_precios
+from .eventos import (
+    ACCION_ACTUALIZADO, ACCION_CREADO, ACCION_ELIMINADO, TIPO_CLIENTE, TIPO_NORMAL,
+    difusor_eventos, pedido_evento,
+)
+from .versiones import TABLA_CLIENTES, TABLA_NORMALES, versiones_pedidos
+from .estadisticas import obtener_estadisticas_db
+from .reportes_datos import obtener_matriz_produccion_db
+from utils.fechas import rango_dias
+from utils.pagination import keyset_filter
+from utils.uploads import url_miniatura
+from utils.json_rapido import CodificadorFilas, TIPO_DECIMAL, TIPO_ENTERO, TIPO_FECHA, TIPO_TEXTO
 from utils.logger import logger
 
+def _notificar_cambio(tipo: str, accion: str, pedido_id: int, sucursal: Optional[str],
+                      pedido: Optional[Dict[str, Any]] = None, sucursal_anterior: Optional[str] = None):
+    """Cambio ya confirmado: invalida los ETags de los listados y lo publica a los suscriptores."""
+    versiones_pedidos.incrementar(TABLA_NORMALES if tipo == TIPO_NORMAL else TABLA_CLIENTES,
+                                  sucursal, sucursal_anterior)
+    difusor_eventos.publicar_seguro(tipo, accion, pedido_id, sucursal, pedido,
+                                    **({"sucursal_anterior": sucursal_anterior} if sucursal_anterior else {}))
+
+def _publicar_altas(tipo: str, columnas: List[tuple], ids: List[int], lista: List[Dict[str, Any]]):
+    for pedido_id, data in zip(ids, lista):
+        _notificar_cambio(
+            tipo, ACCION_CREADO, pedido_id, data.get('sucursal'),
+            pedido_evento(pedido_id, data, (nombre for nombre, _ in columnas))
+        )
+
 def obtener_precio_db(sabor: str = None, tamano: str = None) -> Any:
     try:
-        with db_pool_normales.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            if sabor and tamano:
-                query = "SELECT precio FROM PastelesPrecios WHERE sabor = ? AND tamano = ?"
-                cursor.execute(query, (sabor, tamano))
-                resultado = cursor.fetchone()
-                return float(resultado[0]) if resultado else 0.0
-            else:
-                query = "SELECT id, sabor, tamano, precio FROM PastelesPrecios ORDER BY sabor, id"
-                cursor.execute(query)
-                resultados = cursor.fetchall()
-                return resultados
-
+        instantanea = catalogo_precios.instantanea()
     except Exception as e:
         logger.error(f"Error al obtener precios: {e}", exc_info=True)
-        if "Invalid object name 'PastelesPrecios'" in str(e):
-            logger.warning("Tabla 'PastelesPrecios' no encontrada")
-            return [] if not sabor else 0.0
         raise e
 
-def actualizar_precios_db(lista_precios: List[Dict[str, Any]]) -> bool:
+    if sabor and tamano:
+        return instantanea.precio(sabor, tamano)
+    return list(instantanea.filas)
+
+# 4 parámetros por precio: 500 filas quedan bajo el límite de 2100 de SQL Server
+PRECIOS_POR_SENTENCIA = 500
+
+def actualizar_precios_db(lista_precios: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Guarda solo los precios que cambiaron respecto al catálogo, en una transacción.
+
+    La huella del catálogo se verifica antes de comparar, y el MERGE vuelve a
+    comparar contra la tabla (con intercalación binaria, para que un cambio
+    de mayúsculas cuente), así una fila igual nunca se reescribe. Devuelve
+    ``{"actualizados": n, "version": versión del catálogo tras guardar}``.
+    """
+    try:
+        catalogo_precios.invalidar()
+        base = catalogo_precios.instantanea()
+    except Exception as e:
+        logger.error(f"Error al leer el catálogo de precios: {e}", exc_info=True)
+        raise Exception(f"Error al actualizar precios: {e}")
+
+    cambios = diferencias_precios(base, lista_precios)
+    if not cambios:
+        return {"actualizados": 0, "version": base.version}
+
+    actualizados = 0
     try:
         with db_pool_normales.get_connection() as conn:
             cursor = conn.cursor()
-            query = "UPDATE PastelesPrecios SET sabor = ?, tamano = ?, precio = ? WHERE id = ?"
-            params = [(p['sabor'], p['tamano'], p['precio'], p['id']) for p in lista_precios]
-            
-            cursor.executemany(query, params)
+            for inicio in range(0, len(cambios), PRECIOS_POR_SENTENCIA):
+                bloque = cambios[inicio:inicio + PRECIOS_POR_SENTENCIA]
+                filas = ", ".join(["(?, CAST(? AS NVARCHAR(100)), CAST(? AS NVARCHAR(50)), CAST(? AS DECIMAL(10,2)))"]
+                                  * len(bloque))
+                cursor.execute(f"""
+                    MERGE INTO PastelesPrecios AS destino
+                    USING (VALUES {filas}) AS origen (id, sabor, tamano, precio)
+                    ON destino.id = origen.id
+                    WHEN MATCHED AND (destino.sabor <> origen.sabor COLLATE Latin1_General_BIN2
+                                      OR destino.tamano <> origen.tamano COLLATE Latin1_General_BIN2
+                                      OR destino.precio <> origen.precio) THEN
+                        UPDATE SET sabor = origen.sabor, tamano = origen.tamano, precio = origen.precio;
+                """, [valor for fila in bloque for valor in fila])
+                actualizados += max(cursor.rowcount, 0)
             conn.commit()
-            logger.info(f"Se actualizaron {len(params)} precios")
-            return True
+            logger.info(f"Se actualizaron {actualizados} de {len(lista_precios)} precios enviados")
     except Exception as e:
         logger.error(f"Error al actualizar precios: {e}", exc_info=True)
         raise Exception(f"Error al actualizar precios: {e}")
 
+    version = None
+    try:
+        version = catalogo_precios.recargar().version
+    except Exception as e:
+        logger.warning(f"No se pudo recargar el catálogo de precios: {e}")
+        catalogo_precios.invalidar()
+    return {"actualizados": actualizados, "version": version}
+
 def registrar_pastel_normal_db(data: Dict[str, Any]) -> int:
     query = """
         INSERT INTO PastelesNormales 
@@ -69,6 +125,7 @@ def registrar_pastel_normal_db(data: Dict[str, Any]) -> int:
             
             conn.commit()
             logger.info(f"Pedido normal #{new_id} registrado exitosamente")
+            _publicar_altas(TIPO_NORMAL, COLUMNAS_LOTE_NORMALES, [int(new_id)], [data])
             return int(new_id)
             
     except Exception as e:
@@ -77,10 +134,14 @@ def registrar_pastel_normal_db(data: Dict[str, Any]) -> int:
 
 def actualizar_pastel_normal_db(pedido_id: int, data: Dict[str, Any]) -> bool:
     query = """
+        SET NOCOUNT ON;
+        DECLARE @anterior TABLE (sucursal NVARCHAR(100));
         UPDATE PastelesNormales SET
             sabor = ?, tamano = ?, cantidad = ?, precio = ?, sucursal = ?, 
             fecha_entrega = ?, detalles = ?, sabor_personalizado = ?
-        WHERE id = ?
+        OUTPUT DELETED.sucursal INTO @anterior
+        WHERE id = ?;
+        SELECT sucursal FROM @anterior;
     """
     params = (
         data.get('sabor'), data.get('tamano'), data.get('cantidad'),
@@ -92,8 +153,15 @@ def actualizar_pastel_normal_db(pedido_id: int, data: Dict[str, Any]) -> bool:
         with db_pool_normales.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, params)
+            anterior = cursor.fetchone()
             conn.commit()
             logger.info(f"Pedido normal #{pedido_id} actualizado")
+            if anterior:
+                _notificar_cambio(
+                    TIPO_NORMAL, ACCION_ACTUALIZADO, pedido_id, data.get('sucursal'),
+                    pedido_evento(pedido_id, data, (nombre for nombre, _ in COLUMNAS_LOTE_NORMALES)),
+                    sucursal_anterior=anterior[0]
+                )
             return True
     except Exception as e:
         logger.error(f"Error al actualizar pastel normal ID {pedido_id}: {e}", exc_info=True)
@@ -103,9 +171,17 @@ def eliminar_normal_db(pedido_id: int) -> bool:
     try:
         with db_pool_normales.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("DELETE FROM PastelesNormales WHERE id = ?", (pedido_id,))
+            cursor.execute("""
+                SET NOCOUNT ON;
+                DECLARE @borrado TABLE (sucursal NVARCHAR(100));
+                DELETE FROM PastelesNormales OUTPUT DELETED.sucursal INTO @borrado WHERE id = ?;
+                SELECT sucursal FROM @borrado;
+            """, (pedido_id,))
+            borrado = cursor.fetchone()
             conn.commit()
             logger.info(f"Pedido normal #{pedido_id} eliminado")
+            if borrado:
+                _notificar_cambio(TIPO_NORMAL, ACCION_ELIMINADO, pedido_id, borrado[0])
             return True
     except Exception as e:
         logger.error(f"Error al eliminar pastel normal ID {pedido_id}: {e}", exc_info=True)
@@ -159,6 +235,7 @@ def registrar_pedido_cliente_db(data: Dict[str, Any]) -> int:
             
             conn.commit()
             logger.info(f"Pedido cliente #{new_id} registrado exitosamente")
+            _publicar_altas(TIPO_CLIENTE, COLUMNAS_LOTE_CLIENTES, [int(new_id)], [data])
             return int(new_id)
     except Exception as e:
         logger.error(f"Error al registrar pedido cliente: {e}", exc_info=True)
@@ -170,11 +247,15 @@ def actualizar_pedido_cliente_db(pedido_id: int, data: Dict[str, Any]) -> bool:
         raise ValueError("El precio debe ser mayor a 0")
     
     query = """
+        SET NOCOUNT ON;
+        DECLARE @anterior TABLE (sucursal NVARCHAR(100));
         UPDATE PastelesClientes SET
             color = ?, sabor = ?, tamano = ?, cantidad = ?, precio = ?, sucursal = ?,
             dedicatoria = ?, detalles = ?, sabor_personalizado = ?, 
             foto_path = ?, fecha_entrega = ?
-        WHERE id = ?
+        OUTPUT DELETED.sucursal INTO @anterior
+        WHERE id = ?;
+        SELECT sucursal FROM @anterior;
     """
     params = (
         data.get('color'), data.get('sabor'), data.get('tamano'), data.get('cantidad'),
@@ -187,8 +268,15 @@ def actualizar_pedido_cliente_db(pedido_id: int, data: Dict[str, Any]) -> bool:
         with db_pool_clientes.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, params)
+            anterior = cursor.fetchone()
             conn.commit()
             logger.info(f"Pedido cliente #{pedido_id} actualizado")
+            if anterior:
+                _notificar_cambio(
+                    TIPO_CLIENTE, ACCION_ACTUALIZADO, pedido_id, data.get('sucursal'),
+                    pedido_evento(pedido_id, data, (nombre for nombre, _ in COLUMNAS_LOTE_CLIENTES)),
+                    sucursal_anterior=anterior[0]
+                )
             return True
     except Exception as e:
         logger.error(f"Error al actualizar pedido cliente ID {pedido_id}: {e}", exc_info=True)
@@ -198,9 +286,17 @@ def eliminar_cliente_db(pedido_id: int) -> bool:
     try:
         with db_pool_clientes.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("DELETE FROM PastelesClientes WHERE id = ?", (pedido_id,))
+            cursor.execute("""
+                SET NOCOUNT ON;
+                DECLARE @borrado TABLE (sucursal NVARCHAR(100));
+                DELETE FROM PastelesClientes OUTPUT DELETED.sucursal INTO @borrado WHERE id = ?;
+                SELECT sucursal FROM @borrado;
+            """, (pedido_id,))
+            borrado = cursor.fetchone()
             conn.commit()
             logger.info(f"Pedido cliente #{pedido_id} eliminado")
+            if borrado:
+                _notificar_cambio(TIPO_CLIENTE, ACCION_ELIMINADO, pedido_id, borrado[0])
             return True
     except Exception as e:
         logger.error(f"Error al eliminar cliente ID {pedido_id}: {e}", exc_info=True)
@@ -233,6 +329,114 @@ def obtener_cliente_por_id_db(pedido_id: int) -> Optional[Dict[str, Any]]:
         logger.error(f"Error al obtener cliente por ID {pedido_id}: {e}", exc_info=True)
         raise Exception(f"Error de base de datos: {e}")
 
+COLUMNAS_LOTE_NORMALES = [
+    ('sabor', 'NVARCHAR(50)'), ('tamano', 'NVARCHAR(50)'), ('cantidad', 'INT'),
+    ('precio', 'DECIMAL(10,2)'), ('sucursal', 'NVARCHAR(100)'), ('fecha_entrega', 'DATETIME2'),
+    ('detalles', 'NVARCHAR(MAX)'), ('sabor_personalizado', 'NVARCHAR(100)'),
+]
+
+COLUMNAS_LOTE_CLIENTES = [
+    ('color', 'NVARCHAR(50)'), ('sabor', 'NVARCHAR(50)'), ('tamano', 'NVARCHAR(50)'),
+    ('cantidad', 'INT'), ('precio', 'DECIMAL(10,2)'), ('sucursal', 'NVARCHAR(100)'),
+    ('dedicatoria', 'NVARCHAR(MAX)'), ('detalles', 'NVARCHAR(MAX)'),
+    ('sabor_personalizado', 'NVARCHAR(100)'), ('foto_path', 'NVARCHAR(500)'),
+    ('fecha_entrega', 'DATETIME2'),
+]
+
+# SQL Server admite 2100 parámetros por sentencia: 100 filas x 12 columnas queda holgado
+FILAS_POR_SENTENCIA_LOTE = 100
+
+def _insertar_lote(db_pool, tabla: str, columnas: List[tuple], lista: List[Dict[str, Any]]) -> List[int]:
+    """
+    Inserta todas las filas en una sola transacción y devuelve sus ids en el mismo orden.
+
+    Las tablas tienen triggers, así que en lugar de OUTPUT directo se usa
+    MERGE ... OUTPUT INTO una variable de tabla, que además permite devolver
+    la posición de cada fila junto con su id.
+    """
+    nombres = ", ".join(nombre for nombre, _ in columnas)
+    fila_sql = "(?, " + ", ".join(f"CAST(? AS {tipo})" for _, tipo in columnas) + ")"
+
+    ids = []
+    with db_pool.get_connection() as conn:
+        cursor = conn.cursor()
+        for inicio in range(0, len(lista), FILAS_POR_SENTENCIA_LOTE):
+            bloque = lista[inicio:inicio + FILAS_POR_SENTENCIA_LOTE]
+            query = f"""
+                SET NOCOUNT ON;
+                DECLARE @ids TABLE (orden INT, id INT);
+                MERGE INTO {tabla} AS destino
+                USING (VALUES {", ".join([fila_sql] * len(bloque))}) AS origen (orden, {nombres})
+                ON 1 = 0
+                WHEN NOT MATCHED THEN
+                    INSERT ({nombres}, fecha)
+                    VALUES ({", ".join(f"origen.{nombre}" for nombre, _ in columnas)}, GETDATE())
+                OUTPUT origen.orden, INSERTED.id INTO @ids (orden, id);
+                SELECT id FROM @ids ORDER BY orden;
+            """
+            params = []
+            for orden, data in enumerate(bloque):
+                params.append(orden)
+                params.extend(data.get(nombre) for nombre, _ in columnas)
+
+            cursor.execute(query, params)
+            ids.extend(int(fila[0]) for fila in cursor.fetchall())
+
+        conn.commit()
+    return ids
+
+def registrar_pasteles_normales_lote_db(lista: List[Dict[str, Any]]) -> List[int]:
+    if not lista:
+        return []
+    try:
+        ids = _insertar_lote(db_pool_normales, "PastelesNormales", COLUMNAS_LOTE_NORMALES, lista)
+        logger.info(f"Lote de {len(ids)} pedidos normales registrado")
+        _publicar_altas(TIPO_NORMAL, COLUMNAS_LOTE_NORMALES, ids, lista)
+        return ids
+    except Exception as e:
+        logger.error(f"Error al registrar lote de pasteles normales: {e}", exc_info=True)
+        raise Exception(f"Error de base de datos: {e}")
+
+def registrar_pedidos_clientes_lote_db(lista: List[Dict[str, Any]]) -> List[int]:
+    if not lista:
+        return []
+    for data in lista:
+        precio = data.get('precio')
+        if not precio or precio <= 0:
+            raise ValueError("El precio debe ser mayor a 0")
+    try:
+        ids = _insertar_lote(db_pool_clientes, "PastelesClientes", COLUMNAS_LOTE_CLIENTES, lista)
+        logger.info(f"Lote de {len(ids)} pedidos de clientes registrado")
+        _publicar_altas(TIPO_CLIENTE, COLUMNAS_LOTE_CLIENTES, ids, lista)
+        return ids
+    except Exception as e:
+        logger.error(f"Error al registrar lote de pedidos de clientes: {e}", exc_info=True)
+        raise Exception(f"Error de base de datos: {e}")
+
+COLUMNAS_LISTADO_NORMALES = (
+    "id, sabor, tamano, precio, cantidad, sucursal, fecha, fecha_entrega, detalles, sabor_personalizado"
+)
+COLUMNAS_LISTADO_CLIENTES = (
+    "id, color, sabor, tamano, cantidad, precio, total, sucursal, fecha, "
+    "foto_path, dedicatoria, detalles, fecha_entrega, sabor_personalizado"
+)
+
+# Mismos campos, en el mismo orden, que los dicts de obtener_pasteles_normales / obtener_pedidos_clientes
+CODIFICADOR_NORMALES = CodificadorFilas([
+    ('id', TIPO_ENTERO, 0), ('sabor', TIPO_TEXTO, 1), ('tamano', TIPO_TEXTO, 2), ('precio', TIPO_DECIMAL, 3),
+    ('cantidad', TIPO_ENTERO, 4), ('sucursal', TIPO_TEXTO, 5), ('fecha', TIPO_FECHA, 6),
+    ('fecha_entrega', TIPO_FECHA, 7), ('detalles', TIPO_TEXTO, 8), ('sabor_personalizado', TIPO_TEXTO, 9),
+])
+CODIFICADOR_CLIENTES = CodificadorFilas([
+    ('id', TIPO_ENTERO, 0), ('color', TIPO_TEXTO, 1), ('sabor', TIPO_TEXTO, 2), ('tamano', TIPO_TEXTO, 3),
+    ('cantidad', TIPO_ENTERO, 4), ('precio', TIPO_DECIMAL, 5), ('total', TIPO_DECIMAL, 6),
+    ('sucursal', TIPO_TEXTO, 7), ('fecha', TIPO_FECHA, 8), ('foto_path', TIPO_TEXTO, 9),
+    ('foto_miniatura', url_miniatura, 9), ('dedicatoria', TIPO_TEXTO, 10), ('detalles', TIPO_TEXTO, 11),
+    ('fecha_entrega', TIPO_FECHA, 12), ('sabor_personalizado', TIPO_TEXTO, 13),
+])
+CLAVE_NORMALES = itemgetter(6, 0)
+CLAVE_CLIENTES = itemgetter(8, 0)
+
 class DatabaseManager:
     def _ejecutar_query(self, db_pool, query, params=(), commit=False, fetchone=False, fetchall=False):
         try:
@@ -269,7 +473,7 @@ class DatabaseManager:
     def obtener_precio_por_sabor_tamano(self, sabor: str, tamano: str) -> float:
         return obtener_precio_db(sabor, tamano)
 
-    def actualizar_precios(self, lista_precios: List[Dict[str, Any]]) -> bool:
+    def actualizar_precios(self, lista_precios: List[Dict[str, Any]]) -> Dict[str, Any]:
         return actualizar_precios_db(lista_precios)
 
     def registrar_pastel_normal(self, data: Dict[str, Any]) -> int:
@@ -284,28 +488,46 @@ class DatabaseManager:
     def guardar_pastel_normal(self, data: Dict[str, Any]) -> int:
         return registrar_pastel_normal_db(data)
 
-    def obtener_pasteles_normales(self, fecha_inicio: str = None, fecha_fin: str = None, sucursal: str = None) -> List[Dict[str, Any]]:
-        query = "SELECT id, sabor, tamano, precio, cantidad, sucursal, fecha, fecha_entrega, detalles, sabor_personalizado FROM PastelesNormales WHERE 1=1"
-        params = []
-
-        if fecha_inicio and not fecha_fin:
-            fecha_fin = fecha_inicio
+    def registrar_pasteles_normales_lote(self, lista: List[Dict[str, Any]]) -> List[int]:
+        return registrar_pasteles_normales_lote_db(lista)
 
-        if fecha_inicio and fecha_fin:
-            query += " AND CAST(fecha AS DATE) BETWEEN ? AND ?"
-            params.extend([fecha_inicio, fecha_fin])
-        elif not fecha_inicio:
-            query += " AND CAST(fecha AS DATE) = CAST(GETDATE() AS DATE)"
+    def _filtro_listado(self, fecha_inicio, fecha_fin, sucursal):
+        where = " WHERE fecha >= ? AND fecha < ?"
+        params = list(rango_dias(fecha_inicio, fecha_fin))
 
         if sucursal:
             sucursal_lower = sucursal.lower()
             if sucursal_lower != "todas":
-                query += " AND sucursal = ?"
+                where += " AND sucursal = ?"
                 params.append(sucursal)
-
-        query += " ORDER BY fecha DESC"
-
-        resultados = self._ejecutar_query(db_pool_normales, query, tuple(params), fetchall=True)
+        return where, params
+
+    def _consulta_listado(self, columnas: str, tabla: str, fecha_inicio, fecha_fin, sucursal,
+                          limite: int = None, despues_de: tuple = None):
+        where, params = self._filtro_listado(fecha_inicio, fecha_fin, sucursal)
+        if despues_de:
+            filtro, valores = keyset_filter(despues_de)
+            where += filtro
+            params.extend(valores)
+
+        top = ""
+        if limite:
+            top = "TOP (?) "
+            params.insert(0, limite)
+
+        query = f"SELECT {top}{columnas} FROM {tabla}{where} ORDER BY fecha DESC, id DESC"
+        return query, tuple(params)
+
+    def obtener_pasteles_normales_filas(self, fecha_inicio: str = None, fecha_fin: str = None, sucursal: str = None,
+                                        limite: int = None, despues_de: tuple = None) -> List[tuple]:
+        query, params = self._consulta_listado(
+            COLUMNAS_LISTADO_NORMALES, "PastelesNormales", fecha_inicio, fecha_fin, sucursal, limite, despues_de
+        )
+        return self._ejecutar_query(db_pool_normales, query, params, fetchall=True)
+
+    def obtener_pasteles_normales(self, fecha_inicio: str = None, fecha_fin: str = None, sucursal: str = None,
+                                  limite: int = None, despues_de: tuple = None) -> List[Dict[str, Any]]:
+        resultados = self.obtener_pasteles_normales_filas(fecha_inicio, fecha_fin, sucursal, limite, despues_de)
 
         pasteles = []
         for row in resultados:
@@ -338,30 +560,19 @@ class DatabaseManager:
     def guardar_pedido_cliente(self, data: Dict[str, Any]) -> int:
         return registrar_pedido_cliente_db(data)
 
-    def obtener_pedidos_clientes(self, fecha_inicio: str = None, fecha_fin: str = None, sucursal: str = None) -> List[Dict[str, Any]]:
-        query = ("SELECT id, color, sabor, tamano, cantidad, precio, total, sucursal, fecha, "
-                 "foto_path, dedicatoria, detalles, fecha_entrega, sabor_personalizado FROM PastelesClientes WHERE 1=1")
-        params = []
+    def registrar_pedidos_clientes_lote(self, lista: List[Dict[str, Any]]) -> List[int]:
+        return registrar_pedidos_clientes_lote_db(lista)
 
-        if fecha_inicio and not fecha_fin:
-            fecha_fin = fecha_inicio
+    def obtener_pedidos_clientes_filas(self, fecha_inicio: str = None, fecha_fin: str = None, sucursal: str = None,
+                                       limite: int = None, despues_de: tuple = None) -> List[tuple]:
+        query, params = self._consulta_listado(
+            COLUMNAS_LISTADO_CLIENTES, "PastelesClientes", fecha_inicio, fecha_fin, sucursal, limite, despues_de
+        )
+        return self._ejecutar_query(db_pool_clientes, query, params, fetchall=True)
 
-        if fecha_inicio and fecha_fin:
-            query += " AND CAST(fecha AS DATE) BETWEEN ? AND ?"
-            params.extend([fecha_inicio, fecha_fin])
-
-        if not fecha_inicio:
-            query += " AND CAST(fecha AS DATE) = CAST(GETDATE() AS DATE)"
-
-        if sucursal:
-            sucursal_lower = sucursal.lower()
-            if sucursal_lower != "todas":
-                query += " AND sucursal = ?"
-                params.append(sucursal)
-
-        query += " ORDER BY fecha DESC"
-
-        resultados = self._ejecutar_query(db_pool_clientes, query, tuple(params), fetchall=True)
+    def obtener_pedidos_clientes(self, fecha_inicio: str = None, fecha_fin: str = None, sucursal: str = None,
+                                 limite: int = None, despues_de: tuple = None) -> List[Dict[str, Any]]:
+        resultados = self.obtener_pedidos_clientes_filas(fecha_inicio, fecha_fin, sucursal, limite, despues_de)
 
         pedidos = []
         for row in resultados:
@@ -376,6 +587,7 @@ class DatabaseManager:
                 'sucursal': row[7],
                 'fecha': row[8].isoformat() if row[8] else None,
                 'foto_path': row[9],
+                'foto_miniatura': url_miniatura(row[9]),
                 'dedicatoria': row[10],
                 'detalles': row[11],
                 'fecha_entrega': row[12].isoformat() if row[12] else None,
@@ -386,19 +598,18 @@ class DatabaseManager:
     def eliminar_pedido_cliente(self, pedido_id: int) -> bool:
         return eliminar_cliente_db(pedido_id)
 
-    def obtener_estadisticas(self, fecha_inicio: str = None, fecha_fin: str = None) -> Dict[str, Any]:
-        if fecha_inicio and not fecha_fin:
-            fecha_fin = fecha_inicio
-
-        normales = self.obtener_pasteles_normales(fecha_inicio, fecha_fin)
-        clientes = self.obtener_pedidos_clientes(fecha_inicio, fecha_fin)
-
-        stats = {
-            'normales_count': len(normales),
-            'normales_cantidad': sum(p['cantidad'] for p in normales),
-            'normales_ingresos': sum(p['precio'] * p['cantidad'] for p in normales),
-            'clientes_count': len(clientes),
-            'clientes_cantidad': sum(p['cantidad'] for p in clientes),
-            'clientes_ingresos': sum(p['total'] for p in clientes),
-        }
-        return stats
+    def contar_pasteles_normales(self, fecha_inicio: str = None, fecha_fin: str = None, sucursal: str = None) -> int:
+        where, params = self._filtro_listado(fecha_inicio, fecha_fin, sucursal)
+        fila = self._ejecutar_query(db_pool_normales, f"SELECT COUNT(*) FROM PastelesNormales{where}", tuple(params), fetchone=True)
+        return fila[0] if fila else 0
+
+    def contar_pedidos_clientes(self, fecha_inicio: str = None, fecha_fin: str = None, sucursal: str = None) -> int:
+        where, params = self._filtro_listado(fecha_inicio, fecha_fin, sucursal)
+        fila = self._ejecutar_query(db_pool_clientes, f"SELECT COUNT(*) FROM PastelesClientes{where}", tuple(params), fetchone=True)
+        return fila[0] if fila else 0
+
+    def obtener_estadisticas(self, fecha_inicio: str = None, fecha_fin: str = None, sucursal: str = None) -> Dict[str, Any]:
+        return obtener_estadisticas_db(fecha_inicio, fecha_fin, sucursal)
+
+    def obtener_matriz_produccion(self, fecha_inicio: str = None, fecha_fin: str = None, sucursal: str = None) -> Dict[str, Any]:
+        return obtener_matriz_produccion_db(fecha_inicio, fecha_fin, sucursal)
@@ -0,0 +1,98 @@
+"""
+Estadísticas agregadas en SQL Server.
+
+En lugar de traer cada pedido del periodo a Python, cada base devuelve una
+fila por (sucursal, sabor, tamaño, día) con COUNT y SUM ya calculados. Con
+esas pocas filas se arman los totales históricos de obtener_estadisticas y los
+desgloses por sucursal, día y producto.
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+from config.database import db_pool_normales, db_pool_clientes
+from utils.fechas import rango_dias
+from utils.logger import logger
+
+CAMPOS = ("count", "cantidad", "ingresos")
+
+# Los ingresos conservan la definición anterior: precio * cantidad en tienda y total en clientes
+SQL_AGREGADO = """
+    SELECT sucursal, sabor, tamano, CAST(fecha AS DATE) AS dia,
+           COUNT(*), SUM(cantidad), SUM({ingreso})
+    FROM {tabla}
+    WHERE fecha >= ? AND fecha < ?{filtro_sucursal}
+    GROUP BY sucursal, sabor, tamano, CAST(fecha AS DATE)
+"""
+
+
+def consultar_agregados(db_pool, tabla: str, ingreso: str, fecha_inicio=None, fecha_fin=None,
+                        sucursal: Optional[str] = None) -> List[tuple]:
+    """
+    Ejecuta la agregación de una tabla.
+
+    Returns:
+        Filas (sucursal, sabor, tamano, dia, count, cantidad, ingresos)
+    """
+    params = list(rango_dias(fecha_inicio, fecha_fin))
+    filtro_sucursal = ""
+    if sucursal and sucursal.lower() != "todas":
+        filtro_sucursal = " AND sucursal = ?"
+        params.append(sucursal)
+
+    query = SQL_AGREGADO.format(tabla=tabla, ingreso=ingreso, filtro_sucursal=filtro_sucursal)
+    with db_pool.get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, tuple(params))
+        return cursor.fetchall()
+
+
+def _vacio() -> Dict[str, float]:
+    return {f"{origen}_{campo}": 0 for origen in ("normales", "clientes") for campo in CAMPOS}
+
+
+def _acumular(destino: Dict[str, float], origen: str, count, cantidad, ingresos):
+    destino[f"{origen}_count"] += count or 0
+    destino[f"{origen}_cantidad"] += cantidad or 0
+    destino[f"{origen}_ingresos"] += float(ingresos or 0)
+
+
+def combinar_estadisticas(normales: Iterable[tuple], clientes: Iterable[tuple]) -> Dict[str, Any]:
+    """
+    Combina las filas agregadas de ambas bases.
+
+    Returns:
+        Los seis totales históricos (normales_count, normales_cantidad, ...)
+        más las listas por_sucursal, por_dia y por_producto con las mismas claves.
+    """
+    totales = _vacio()
+    por_sucursal = defaultdict(_vacio)
+    por_dia = defaultdict(_vacio)
+    por_producto = defaultdict(_vacio)
+
+    for origen, filas in (("normales", normales), ("clientes", clientes)):
+        for sucursal, sabor, tamano, dia, count, cantidad, ingresos in filas:
+            for destino in (totales, por_sucursal[sucursal], por_dia[dia], por_producto[(sabor, tamano)]):
+                _acumular(destino, origen, count, cantidad, ingresos)
+
+    stats = dict(totales)
+    stats["por_sucursal"] = [{"sucursal": s, **v} for s, v in sorted(por_sucursal.items())]
+    stats["por_dia"] = [
+        {"fecha": d.isoformat() if hasattr(d, "isoformat") else str(d), **v} for d, v in sorted(por_dia.items())
+    ]
+    productos = sorted(por_producto.items(), key=lambda item: -(item[1]["normales_cantidad"] + item[1]["clientes_cantidad"]))
+    stats["por_producto"] = [{"sabor": s, "tamano": t, **v} for (s, t), v in productos]
+    return stats
+
+
+def obtener_estadisticas_db(fecha_inicio=None, fecha_fin=None, sucursal: Optional[str] = None) -> Dict[str, Any]:
+    """Calcula las estadísticas del periodo (hoy por defecto) agregando en el servidor."""
+    try:
+        normales = consultar_agregados(db_pool_normales, "PastelesNormales", "precio * cantidad",
+                                       fecha_inicio, fecha_fin, sucursal)
+        clientes = consultar_agregados(db_pool_clientes, "PastelesClientes", "total",
+                                       fecha_inicio, fecha_fin, sucursal)
+    except Exception as e:
+        logger.error(f"Error al calcular estadísticas: {e}", exc_info=True)
+        raise Exception(f"Error de base de datos: {e}")
+    return combinar_estadisticas(normales, clientes)
@@ -0,0 +1,166 @@
+"""
+Difusión en vivo de altas, ediciones y bajas de pedidos.
+
+Las funciones de escritura de api/database.py publican aquí cada cambio ya
+confirmado y el endpoint /api/pedidos/eventos lo reenvía por Server-Sent
+Events a los navegadores suscritos, filtrado por sucursal. Así las tablas se
+actualizan al instante sin que cada pestaña vuelva a pedir los listados
+completos cada minuto.
+
+Las escrituras corren en hilos del executor, por eso publicar() nunca toca
+las colas directamente: entrega cada evento con call_soon_threadsafe en el
+loop del suscriptor. Si un suscriptor lento llena su cola, se descartan sus
+eventos pendientes y recibe un único evento "recargar" para que vuelva a
+pedir el listado completo.
+
+Sólo se publica lo que escribe este proceso. El admin de escritorio escribe
+en la base desde su propio proceso y no publica nada, así que el navegador
+debe volver a pedir los listados de vez en cuando (por ejemplo al volver a
+mostrar la pestaña) para recoger esos cambios.
+"""
+
+import asyncio
+import itertools
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+from config.settings import settings
+from utils.json_rapido import dumps
+from utils.logger import logger
+
+TIPO_NORMAL = "normal"
+TIPO_CLIENTE = "cliente"
+
+ACCION_CREADO = "creado"
+ACCION_ACTUALIZADO = "actualizado"
+ACCION_ELIMINADO = "eliminado"
+ACCION_RECARGAR = "recargar"
+
+
+def _valor_evento(valor: Any) -> Any:
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return valor
+
+
+def pedido_evento(pedido_id: int, data: Dict[str, Any], campos: Iterable[str]) -> Dict[str, Any]:
+    """Los campos escritos de un pedido, listos para JSON."""
+    pedido = {"id": pedido_id}
+    pedido.update((campo, _valor_evento(data.get(campo))) for campo in campos)
+    return pedido
+
+
+class Suscripcion:
+    """Cola de eventos de un navegador conectado."""
+
+    def __init__(self, sucursal: Optional[str], loop: asyncio.AbstractEventLoop, max_pendientes: int):
+        # None: administrador, recibe los cambios de todas las sucursales
+        self.sucursal = sucursal
+        self.loop = loop
+        self.cola: asyncio.Queue = asyncio.Queue(max_pendientes)
+        self.desbordada = False
+
+    def adaptar(self, evento: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """El evento tal como lo debe ver esta suscripción, o None si no le corresponde."""
+        if self.sucursal is None:
+            return evento
+        if evento["sucursal"] == self.sucursal:
+            if evento.get("sucursal_anterior") is not None:
+                # El pedido llegó desde otra sucursal: ésta nunca lo vio, para ella es un alta
+                return {**evento, "accion": ACCION_CREADO}
+            return evento
+        if evento.get("sucursal_anterior") == self.sucursal:
+            # El pedido se movió a otra sucursal: para ésta es una baja
+            return {**evento, "accion": ACCION_ELIMINADO, "pedido": None}
+        return None
+
+    def entregar(self, evento: Dict[str, Any]):
+        """Encola el evento; sólo se llama desde el loop de la suscripción."""
+        if self.desbordada:
+            return
+        try:
+            self.cola.put_nowait(evento)
+        except asyncio.QueueFull:
+            self.desbordada = True
+            while not self.cola.empty():
+                self.cola.get_nowait()
+            self.cola.put_nowait({"id": evento["id"], "accion": ACCION_RECARGAR})
+
+    async def siguiente(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Espera el próximo evento; None si pasó ``timeout`` sin cambios."""
+        try:
+            evento = await asyncio.wait_for(self.cola.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if evento["accion"] == ACCION_RECARGAR:
+            self.desbordada = False
+        return evento
+
+
+class DifusorEventos:
+    """Reparte los cambios de pedidos entre las suscripciones abiertas."""
+
+    def __init__(self, max_pendientes: Optional[int] = None):
+        self.max_pendientes = settings.EVENTS_QUEUE_SIZE if max_pendientes is None else max_pendientes
+        self._suscripciones: List[Suscripcion] = []
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def suscribir(self, sucursal: Optional[str]) -> Suscripcion:
+        """Abre una suscripción; debe llamarse desde el event loop que la va a leer."""
+        suscripcion = Suscripcion(sucursal, asyncio.get_running_loop(), self.max_pendientes)
+        with self._lock:
+            self._suscripciones.append(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion: Suscripcion):
+        with self._lock:
+            if suscripcion in self._suscripciones:
+                self._suscripciones.remove(suscripcion)
+
+    @property
+    def suscriptores(self) -> int:
+        return len(self._suscripciones)
+
+    def publicar(self, tipo: str, accion: str, pedido_id: int, sucursal: Optional[str],
+                 pedido: Optional[Dict[str, Any]] = None, sucursal_anterior: Optional[str] = None):
+        """Publica un cambio ya confirmado. Se puede llamar desde cualquier hilo."""
+        if not self._suscripciones:
+            return
+
+        evento = {"id": next(self._ids), "tipo": tipo, "accion": accion, "pedido_id": pedido_id,
+                  "sucursal": sucursal, "pedido": pedido}
+        if sucursal_anterior is not None and sucursal_anterior != sucursal:
+            evento["sucursal_anterior"] = sucursal_anterior
+
+        with self._lock:
+            suscripciones = list(self._suscripciones)
+        for suscripcion in suscripciones:
+            adaptado = suscripcion.adaptar(evento)
+            if adaptado is None:
+                continue
+            try:
+                suscripcion.loop.call_soon_threadsafe(suscripcion.entregar, adaptado)
+            except RuntimeError:
+                # El loop ya se cerró: la conexión no volverá a leer
+                self.cancelar(suscripcion)
+
+    def publicar_seguro(self, *args, **kwargs):
+        """publicar() para las rutas de escritura: un fallo al notificar no debe deshacer el pedido."""
+        try:
+            self.publicar(*args, **kwargs)
+        except Exception as e:
+            logger.warning(f"No se pudo publicar el evento del pedido: {e}")
+
+
+def formatear_evento(evento: Dict[str, Any]) -> bytes:
+    """Un evento en formato text/event-stream."""
+    nombre = "recargar" if evento["accion"] == ACCION_RECARGAR else "pedido"
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (evento["id"], nombre.encode(), dumps(evento))
+
+
+difusor_eventos = DifusorEventos()
@@ -0,0 +1,292 @@
+"""
+Datos de los reportes PDF.
+
+Antes cada generador de pdf_reportes repetía las mismas dos consultas (una por
+base) y reagrupaba las filas con bucles de Python. Aquí ambos conjuntos se
+leen una sola vez, en paralelo desde sus dos pools, y se guardan por columna
+en arreglos de NumPy. Las secciones de los reportes (producción, control de
+clientes, ventas por sucursal) leen de esa estructura, así que generar las
+listas y las ventas del mismo periodo comparte una sola lectura.
+
+La matriz de producción (producto × sucursal) se arma con códigos
+categóricos tomados de config.constants y una sola acumulación con bincount;
+la misma matriz alimenta el PDF y el JSON del panel de administración.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from functools import cached_property
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.constants import SABORES_NORMALES, SUCURSALES, TAMANOS_NORMALES
+from config.database import db_pool_normales, db_pool_clientes
+from utils.fechas import rango_dias
+from utils.logger import logger
+
+COLUMNAS_NORMALES = ("id", "sabor", "tamano", "precio", "cantidad", "sucursal", "fecha_entrega", "sabor_personalizado")
+COLUMNAS_CLIENTES = (
+    "id", "sabor", "tamano", "cantidad", "sucursal", "dedicatoria", "detalles", "precio", "total",
+    "foto_path", "sabor_personalizado", "color", "fecha_entrega"
+)
+
+# Columnas numéricas; NULL se guarda como 0 igual que hacían los generadores
+TIPOS_NUMERICOS = {"id": np.int64, "cantidad": np.int64, "precio": np.float64, "total": np.float64}
+
+SQL_REPORTE = "SELECT {columnas} FROM {tabla} WHERE fecha >= ? AND fecha < ?{filtro_sucursal}"
+
+# Filas de la hoja de producción: cada sabor en los tamaños de tienda, más extra grande de fresas y frutas
+TAMANOS_PRODUCCION = ("Mini", "Pequeño", "Mediano", "Grande")
+SABORES_EXTRA_GRANDE = ("Fresas", "Frutas")
+PRODUCTOS_PRODUCCION = tuple(
+    producto
+    for sabor in SABORES_NORMALES
+    for producto in (
+        [(sabor, tamano) for tamano in TAMANOS_PRODUCCION]
+        + ([(sabor, "Extra grande")] if sabor in SABORES_EXTRA_GRANDE else [])
+    )
+)
+
+
+def codificar(valores: np.ndarray, categorias: Sequence[str], mayusculas: bool = True) -> np.ndarray:
+    """
+    Código de cada valor dentro de ``categorias``, o -1 si no pertenece.
+
+    Sólo se buscan los valores distintos; el resto es indexación de NumPy.
+    """
+    if not len(valores):
+        return np.empty(0, dtype=np.int64)
+    unicos, inversa = np.unique(valores.astype(str), return_inverse=True)
+    normalizar = str.upper if mayusculas else str
+    indice = {normalizar(c): i for i, c in enumerate(categorias)}
+    codigos_unicos = np.array([indice.get(normalizar(str(v)), -1) for v in unicos], dtype=np.int64)
+    return codigos_unicos[inversa.ravel()]
+
+
+class TablaColumnar:
+    """Filas de una consulta guardadas como un arreglo por columna."""
+
+    def __init__(self, columnas: Sequence[str], filas: Sequence[tuple]):
+        self.columnas = tuple(columnas)
+        self._n = len(filas)
+        valores = list(zip(*filas)) if filas else [()] * len(self.columnas)
+        self._datos: Dict[str, np.ndarray] = {}
+
+        for nombre, columna in zip(self.columnas, valores):
+            tipo = TIPOS_NUMERICOS.get(nombre)
+            if tipo is None:
+                arreglo = np.empty(self._n, dtype=object)
+                arreglo[:] = columna
+            else:
+                arreglo = np.fromiter((v or 0 for v in columna), dtype=tipo, count=self._n)
+            self._datos[nombre] = arreglo
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, columna: str) -> np.ndarray:
+        return self._datos[columna]
+
+    def filas(self, *columnas: str) -> Iterator[tuple]:
+        """Recorre las filas en el orden original con las columnas pedidas."""
+        return zip(*(self._datos[c] for c in (columnas or self.columnas)))
+
+    @cached_property
+    def sabor_real(self) -> np.ndarray:
+        """El sabor personalizado cuando existe, si no el sabor del catálogo."""
+        personalizado = self._datos["sabor_personalizado"]
+        return np.where(personalizado.astype(bool), personalizado, self._datos["sabor"])
+
+    @cached_property
+    def descripcion(self) -> np.ndarray:
+        """'<tamaño> de <sabor>' de cada fila."""
+        descripcion = np.empty(self._n, dtype=object)
+        descripcion[:] = [f"{t} de {s}" for t, s in zip(self._datos["tamano"], self.sabor_real)]
+        return descripcion
+
+
+class MatrizProduccion:
+    """
+    Cantidades por producto (filas) y sucursal (columnas).
+
+    Los productos se comparan sin distinguir mayúsculas, como la hoja impresa;
+    las sucursales deben coincidir exactamente con config.constants.
+    """
+
+    def __init__(self, cantidades: np.ndarray, productos: Sequence[Tuple[str, str]] = PRODUCTOS_PRODUCCION,
+                 sucursales: Sequence[str] = SUCURSALES):
+        self.cantidades = cantidades
+        self.productos = tuple(productos)
+        self.sucursales = tuple(sucursales)
+
+    @classmethod
+    def desde_tabla(cls, normales: TablaColumnar) -> "MatrizProduccion":
+        n_sabores, n_tamanos, n_sucursales = len(SABORES_NORMALES), len(TAMANOS_NORMALES), len(SUCURSALES)
+        sabor = codificar(normales.sabor_real, SABORES_NORMALES)
+        tamano = codificar(normales["tamano"], TAMANOS_NORMALES)
+        sucursal = codificar(normales["sucursal"], SUCURSALES, mayusculas=False)
+
+        validos = (sabor >= 0) & (tamano >= 0) & (sucursal >= 0)
+        celda = (sabor * n_tamanos + tamano) * n_sucursales + sucursal
+        cubo = np.bincount(
+            celda[validos], weights=normales["cantidad"][validos], minlength=n_sabores * n_tamanos * n_sucursales
+        ).astype(np.int64).reshape(n_sabores, n_tamanos, n_sucursales)
+
+        filas_sabor = [SABORES_NORMALES.index(s) for s, _ in PRODUCTOS_PRODUCCION]
+        filas_tamano = [TAMANOS_NORMALES.index(t) for _, t in PRODUCTOS_PRODUCCION]
+        return cls(cubo[filas_sabor, filas_tamano])
+
+    @staticmethod
+    def etiqueta(producto: Tuple[str, str]) -> str:
+        sabor, tamano = producto
+        return f"{tamano} de {sabor}".upper()
+
+    @property
+    def totales_producto(self) -> np.ndarray:
+        return self.cantidades.sum(axis=1)
+
+    @property
+    def totales_sucursal(self) -> np.ndarray:
+        return self.cantidades.sum(axis=0)
+
+    @property
+    def total(self) -> int:
+        return int(self.cantidades.sum())
+
+    def a_dict(self) -> Dict:
+        return {
+            "sucursales": list(self.sucursales),
+            "productos": [
+                {
+                    "sabor": sabor,
+                    "tamano": tamano,
+                    "producto": self.etiqueta((sabor, tamano)),
+                    "cantidades": fila,
+                    "total": total,
+                }
+                for (sabor, tamano), fila, total in zip(
+                    self.productos, self.cantidades.tolist(), self.totales_producto.tolist()
+                )
+            ],
+            "totales_sucursal": self.totales_sucursal.tolist(),
+            "total": self.total,
+        }
+
+
+class DatosReporte:
+    """Pedidos de tienda y de clientes de un periodo, listos para cualquier reporte."""
+
+    def __init__(self, fecha_inicio: date, fecha_fin: date, sucursal: Optional[str],
+                 normales: TablaColumnar, clientes: TablaColumnar):
+        self.fecha_inicio = fecha_inicio
+        self.fecha_fin = fecha_fin
+        self.sucursal = sucursal
+        self.normales = normales
+        self.clientes = clientes
+
+    @cached_property
+    def produccion(self) -> MatrizProduccion:
+        return MatrizProduccion.desde_tabla(self.normales)
+
+    @cached_property
+    def ventas_normales(self) -> List[Tuple[str, str, float, int]]:
+        """
+        Ventas de tienda agrupadas por (sucursal, producto, precio unitario).
+
+        Returns:
+            Tuplas (sucursal, producto, precio, cantidad) ordenadas por esa clave
+        """
+        if not len(self.normales):
+            return []
+        claves = np.rec.fromarrays(
+            [self.normales["sucursal"].astype(str), self.normales.descripcion.astype(str), self.normales["precio"]],
+            names="sucursal,producto,precio"
+        )
+        grupos, indices = np.unique(claves, return_inverse=True)
+        cantidades = np.bincount(indices.ravel(), weights=self.normales["cantidad"], minlength=len(grupos))
+        return [
+            (str(g.sucursal), str(g.producto), float(g.precio), int(c))
+            for g, c in zip(grupos, cantidades)
+        ]
+
+    @cached_property
+    def total_normales(self) -> float:
+        return float(np.dot(self.normales["precio"], self.normales["cantidad"]))
+
+    @cached_property
+    def total_por_cliente(self) -> np.ndarray:
+        """Total cobrado por pedido; si no se guardó, precio * cantidad."""
+        calculado = self.clientes["precio"] * self.clientes["cantidad"]
+        return np.where(self.clientes["total"] != 0, self.clientes["total"], calculado)
+
+    @cached_property
+    def total_clientes(self) -> float:
+        return float(self.total_por_cliente.sum())
+
+
+def _consultar(db_pool, tabla: str, columnas: Sequence[str], params: Tuple, filtro_sucursal: str) -> List[tuple]:
+    query = SQL_REPORTE.format(columnas=", ".join(columnas), tabla=tabla, filtro_sucursal=filtro_sucursal)
+    with db_pool.get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+
+def normalizar_sucursal(sucursal: Optional[str]) -> Optional[str]:
+    """La sucursal a filtrar en un reporte; None (vacía o "Todas") significa todas las sucursales."""
+    if not sucursal or sucursal.lower() == "todas":
+        return None
+    return sucursal
+
+
+def _parametros(fecha_inicio, fecha_fin, sucursal: Optional[str]) -> Tuple[Tuple, str]:
+    params = list(rango_dias(fecha_inicio, fecha_fin))
+    filtro_sucursal = ""
+    sucursal = normalizar_sucursal(sucursal)
+    if sucursal:
+        filtro_sucursal = " AND sucursal = ?"
+        params.append(sucursal)
+    return tuple(params), filtro_sucursal
+
+
+def cargar_datos_reporte(fecha_inicio: date, fecha_fin: Optional[date] = None,
+                         sucursal: Optional[str] = None) -> DatosReporte:
+    """
+    Lee los pedidos del periodo de ambas bases en paralelo.
+
+    Raises:
+        Exception: Si falla alguna de las dos consultas
+    """
+    fecha_fin = fecha_fin or fecha_inicio
+    params, filtro_sucursal = _parametros(fecha_inicio, fecha_fin, sucursal)
+
+    try:
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="reporte-datos") as executor:
+            normales = executor.submit(
+                _consultar, db_pool_normales, "PastelesNormales", COLUMNAS_NORMALES, params, filtro_sucursal
+            )
+            clientes = executor.submit(
+                _consultar, db_pool_clientes, "PastelesClientes", COLUMNAS_CLIENTES, params, filtro_sucursal
+            )
+            filas_normales, filas_clientes = normales.result(), clientes.result()
+    except Exception as e:
+        logger.error(f"Error al leer datos del reporte: {e}", exc_info=True)
+        raise Exception(f"Error de base de datos: {e}")
+
+    return DatosReporte(
+        fecha_inicio, fecha_fin, sucursal,
+        TablaColumnar(COLUMNAS_NORMALES, filas_normales),
+        TablaColumnar(COLUMNAS_CLIENTES, filas_clientes)
+    )
+
+
+def obtener_matriz_produccion_db(fecha_inicio=None, fecha_fin=None, sucursal: Optional[str] = None) -> Dict:
+    """Matriz de producción del periodo (hoy por defecto) para el panel web; sólo lee PastelesNormales."""
+    params, filtro_sucursal = _parametros(fecha_inicio, fecha_fin, sucursal)
+    try:
+        filas = _consultar(db_pool_normales, "PastelesNormales", COLUMNAS_NORMALES, params, filtro_sucursal)
+    except Exception as e:
+        logger.error(f"Error al leer la producción: {e}", exc_info=True)
+        raise Exception(f"Error de base de datos: {e}")
+    return MatrizProduccion.desde_tabla(TablaColumnar(COLUMNAS_NORMALES, filas)).a_dict()
@@ -0,0 +1,334 @@
+"""
+Generación de reportes PDF en segundo plano.
+
+Maquetar un mes de pedidos con ReportLab toma segundos de CPU; dentro de un
+handler async eso congelaba todo el servidor. Los reportes se encolan como
+trabajos: un ProcessPoolExecutor los renderiza fuera del event loop y el
+resultado queda en una caché en disco.
+
+Cada trabajo se identifica por (tipo, rango de fechas, sucursal, versión de
+los datos). La versión es una huella barata de las filas del periodo
+(COUNT, MAX(id), CHECKSUM_AGG), así que dos solicitudes idénticas sobre datos
+que no cambiaron comparten el mismo PDF, y cualquier alta, edición o baja en
+el periodo produce una clave nueva. La caché se limita por tamaño total y
+desaloja primero los archivos usados hace más tiempo.
+"""
+
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import date
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Optional
+
+from config.database import db_pool_normales, db_pool_clientes
+from config.settings import settings
+from utils.fechas import rango_dias
+from utils.logger import logger
+from .async_database import run_db
+from .reportes_datos import normalizar_sucursal
+
+# Subir este número cuando cambie el diseño de los PDFs invalida la caché existente
+VERSION_PLANTILLA = 1
+
+TIPOS_REPORTE = ("listas", "rango", "ventas")
+
+ESTADO_PENDIENTE = "pendiente"
+ESTADO_EN_PROCESO = "en_proceso"
+ESTADO_LISTO = "listo"
+ESTADO_ERROR = "error"
+
+SQL_VERSION = """
+    SELECT COUNT(*), MAX(id), CHECKSUM_AGG(BINARY_CHECKSUM({columnas}))
+    FROM {tabla}
+    WHERE fecha >= ? AND fecha < ?{filtro_sucursal}
+"""
+
+COLUMNAS_VERSION = {
+    "PastelesNormales": "id, sabor, tamano, cantidad, precio, sucursal, fecha_entrega, detalles, sabor_personalizado",
+    "PastelesClientes": ("id, sabor, tamano, cantidad, precio, total, sucursal, fecha_entrega, color, "
+                         "dedicatoria, detalles, sabor_personalizado, foto_path"),
+}
+
+
+def obtener_version_datos(fecha_inicio: date, fecha_fin: date, sucursal: Optional[str] = None) -> str:
+    """Huella de las filas de ambas bases que entran en el reporte."""
+    params = list(rango_dias(fecha_inicio, fecha_fin))
+    filtro_sucursal = ""
+    sucursal = normalizar_sucursal(sucursal)
+    if sucursal:
+        filtro_sucursal = " AND sucursal = ?"
+        params.append(sucursal)
+
+    partes = []
+    for db_pool, tabla in ((db_pool_normales, "PastelesNormales"), (db_pool_clientes, "PastelesClientes")):
+        query = SQL_VERSION.format(columnas=COLUMNAS_VERSION[tabla], tabla=tabla, filtro_sucursal=filtro_sucursal)
+        with db_pool.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, tuple(params))
+            cantidad, maximo, checksum = cursor.fetchone()
+        partes.append(f"{cantidad}-{maximo or 0}-{(checksum or 0) & 0xFFFFFFFF:08x}")
+    return ".".join(partes)
+
+
+def renderizar_reporte(tipo: str, fecha_inicio: date, fecha_fin: date, sucursal: Optional[str], destino: str) -> str:
+    """Genera el PDF en ``destino``. Se ejecuta en un proceso del pool."""
+    import pdf_reportes
+
+    if tipo == "listas":
+        return pdf_reportes.generar_pdf_listas(target_date=fecha_inicio, sucursal=sucursal, output_path=destino)
+    if tipo == "rango":
+        return pdf_reportes.generar_pdf_rango_fechas(fecha_inicio, fecha_fin, sucursal=sucursal, output_path=destino)
+    if tipo == "ventas":
+        return pdf_reportes.generar_pdf_ventas(target_date=fecha_inicio, sucursal=sucursal, output_path=destino)
+    raise ValueError(f"Tipo de reporte desconocido: {tipo}")
+
+
+def nombre_descarga(tipo: str, fecha_inicio: date, fecha_fin: date, sucursal: Optional[str]) -> str:
+    if tipo == "rango":
+        nombre = f"Reporte_{fecha_inicio.isoformat()}_a_{fecha_fin.isoformat()}"
+    elif tipo == "ventas":
+        nombre = f"Ventas_MiPastel_{fecha_inicio.isoformat()}"
+    else:
+        nombre = f"Listas_MiPastel_{fecha_inicio.isoformat()}"
+    if sucursal:
+        nombre += f"_{sucursal}"
+    return nombre + ".pdf"
+
+
+class TrabajoReporte:
+    """Estado de una solicitud de reporte."""
+
+    def __init__(self, clave: str, tipo: str, fecha_inicio: date, fecha_fin: date, sucursal: Optional[str]):
+        self.id = uuid.uuid4().hex
+        self.clave = clave
+        self.tipo = tipo
+        self.fecha_inicio = fecha_inicio
+        self.fecha_fin = fecha_fin
+        self.sucursal = sucursal
+        self.estado = ESTADO_PENDIENTE
+        self.error: Optional[str] = None
+        self.ruta: Optional[Path] = None
+        self.desde_cache = False
+        self.creado = time.time()
+        self.terminado: Optional[float] = None
+        self.listo = asyncio.Event()
+
+    @property
+    def nombre_descarga(self) -> str:
+        return nombre_descarga(self.tipo, self.fecha_inicio, self.fecha_fin, self.sucursal)
+
+    @property
+    def terminado_ok(self) -> bool:
+        return self.estado == ESTADO_LISTO and self.ruta is not None and self.ruta.exists()
+
+    def abrir(self) -> Optional[BinaryIO]:
+        """
+        Abre el PDF para enviarlo. Devuelve None si no está listo o ya se desalojó.
+
+        Con el archivo abierto, un desalojo posterior no corta la descarga en curso.
+        """
+        if self.estado != ESTADO_LISTO or self.ruta is None:
+            return None
+        try:
+            return open(self.ruta, "rb")
+        except FileNotFoundError:
+            return None
+
+    def a_dict(self) -> Dict:
+        estado = self.estado
+        if estado == ESTADO_LISTO and not self.terminado_ok:
+            estado = "expirado"
+        return {
+            "job_id": self.id,
+            "tipo": self.tipo,
+            "fecha_inicio": self.fecha_inicio.isoformat(),
+            "fecha_fin": self.fecha_fin.isoformat(),
+            "sucursal": self.sucursal,
+            "estado": estado,
+            "error": self.error,
+            "desde_cache": self.desde_cache,
+            "url_descarga": f"/reportes/jobs/{self.id}/descargar" if estado == ESTADO_LISTO else None,
+        }
+
+
+class GestorReportes:
+    """
+    Cola de trabajos de reportes con caché en disco.
+
+    Args:
+        directorio: Carpeta de la caché de PDFs
+        max_bytes: Tamaño máximo de la caché antes de desalojar
+        max_workers: Procesos que renderizan en paralelo
+        renderizar: Función que genera el PDF (debe poder enviarse a otro proceso)
+        version_datos: Función que devuelve la versión de los datos del periodo
+        executor: Executor propio (por defecto un ProcessPoolExecutor con spawn)
+    """
+
+    def __init__(
+            self,
+            directorio=None,
+            max_bytes: Optional[int] = None,
+            max_workers: Optional[int] = None,
+            renderizar: Callable = renderizar_reporte,
+            version_datos: Callable = obtener_version_datos,
+            ttl_trabajos: Optional[float] = None,
+            executor: Optional[Executor] = None
+    ):
+        self.directorio = Path(directorio or settings.REPORTS_CACHE_DIR)
+        self.max_bytes = max_bytes if max_bytes is not None else settings.REPORTS_CACHE_MAX_MB * 1024 * 1024
+        self.max_workers = max_workers or settings.REPORTS_MAX_WORKERS
+        self.ttl_trabajos = settings.REPORTS_JOB_TTL_SECONDS if ttl_trabajos is None else ttl_trabajos
+        self._renderizar = renderizar
+        self._version_datos = version_datos
+        self._executor: Optional[Executor] = executor
+        self._executor_lock = threading.Lock()
+        self._trabajos: Dict[str, TrabajoReporte] = {}
+        self._en_curso: Dict[str, TrabajoReporte] = {}
+        self._tareas = set()
+
+    def _obtener_executor(self) -> Executor:
+        with self._executor_lock:
+            if self._executor is None:
+                # spawn: los procesos no heredan hilos, locks ni conexiones abiertas del servidor
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def cerrar(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    @staticmethod
+    def calcular_clave(tipo: str, fecha_inicio: date, fecha_fin: date, sucursal: Optional[str], version: str) -> str:
+        datos = json.dumps(
+            [VERSION_PLANTILLA, tipo, fecha_inicio.isoformat(), fecha_fin.isoformat(), sucursal or "", version]
+        )
+        return hashlib.sha256(datos.encode("utf-8")).hexdigest()[:32]
+
+    def _ruta_cache(self, clave: str) -> Path:
+        return self.directorio / f"{clave}.pdf"
+
+    async def enviar(self, tipo: str, fecha_inicio: date, fecha_fin: Optional[date] = None,
+                     sucursal: Optional[str] = None) -> TrabajoReporte:
+        """
+        Encola un reporte, o devuelve uno equivalente ya generado o en curso.
+
+        Raises:
+            ValueError: Si el tipo o el rango no son válidos
+        """
+        if tipo not in TIPOS_REPORTE:
+            raise ValueError(f"Tipo de reporte desconocido: {tipo}")
+        fecha_fin = fecha_fin or fecha_inicio
+        if fecha_fin < fecha_inicio:
+            raise ValueError("La fecha fin debe ser posterior a la fecha inicio")
+        # "Todas" y vacía son el mismo reporte: misma versión, misma clave y mismo PDF
+        sucursal = normalizar_sucursal(sucursal)
+
+        self._purgar_trabajos()
+        version = await run_db(self._version_datos, fecha_inicio, fecha_fin, sucursal)
+        clave = self.calcular_clave(tipo, fecha_inicio, fecha_fin, sucursal, version)
+
+        en_curso = self._en_curso.get(clave)
+        if en_curso is not None:
+            return en_curso
+
+        trabajo = TrabajoReporte(clave, tipo, fecha_inicio, fecha_fin, sucursal)
+        self._trabajos[trabajo.id] = trabajo
+
+        ruta = self._ruta_cache(clave)
+        if ruta.exists():
+            os.utime(ruta)
+            self._terminar(trabajo, ESTADO_LISTO, ruta=ruta)
+            trabajo.desde_cache = True
+            return trabajo
+
+        self._en_curso[clave] = trabajo
+        tarea = asyncio.create_task(self._ejecutar(trabajo))
+        self._tareas.add(tarea)
+        tarea.add_done_callback(self._tareas.discard)
+        return trabajo
+
+    async def _ejecutar(self, trabajo: TrabajoReporte):
+        ruta = self._ruta_cache(trabajo.clave)
+        temporal = ruta.with_name(f"{ruta.stem}.{trabajo.id}.tmp")
+        trabajo.estado = ESTADO_EN_PROCESO
+        inicio = time.perf_counter()
+
+        try:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                self._obtener_executor(), self._renderizar,
+                trabajo.tipo, trabajo.fecha_inicio, trabajo.fecha_fin, trabajo.sucursal, str(temporal)
+            )
+            os.replace(temporal, ruta)
+            self._terminar(trabajo, ESTADO_LISTO, ruta=ruta)
+            logger.info(
+                f"Reporte {trabajo.tipo} {trabajo.fecha_inicio}..{trabajo.fecha_fin} generado "
+                f"en {time.perf_counter() - inicio:.2f}s"
+            )
+            self._desalojar()
+        except Exception as e:
+            logger.error(f"Error al generar reporte {trabajo.tipo}: {e}", exc_info=True)
+            self._terminar(trabajo, ESTADO_ERROR, error=str(e))
+            temporal.unlink(missing_ok=True)
+        finally:
+            self._en_curso.pop(trabajo.clave, None)
+
+    def _terminar(self, trabajo: TrabajoReporte, estado: str, ruta: Optional[Path] = None, error: Optional[str] = None):
+        trabajo.estado = estado
+        trabajo.ruta = ruta
+        trabajo.error = error
+        trabajo.terminado = time.time()
+        trabajo.listo.set()
+
+    def obtener(self, job_id: str) -> Optional[TrabajoReporte]:
+        return self._trabajos.get(job_id)
+
+    async def esperar(self, trabajo: TrabajoReporte, timeout: Optional[float] = None) -> TrabajoReporte:
+        """Espera a que el trabajo termine sin bloquear el event loop."""
+        await asyncio.wait_for(trabajo.listo.wait(), timeout)
+        return trabajo
+
+    def _desalojar(self):
+        """Borra los PDFs usados hace más tiempo hasta que la caché quepa en max_bytes."""
+        archivos = []
+        for ruta in self.directorio.glob("*.pdf"):
+            try:
+                info = ruta.stat()
+            except FileNotFoundError:
+                continue
+            archivos.append((info.st_mtime, info.st_size, ruta))
+
+        total = sum(tamano for _, tamano, _ in archivos)
+        for _, tamano, ruta in sorted(archivos):
+            if total <= self.max_bytes:
+                break
+            try:
+                ruta.unlink(missing_ok=True)
+            except OSError as e:
+                # En Windows no se puede borrar un PDF que se está descargando
+                logger.warning(f"No se pudo desalojar {ruta.name}: {e}")
+                continue
+            total -= tamano
+            logger.info(f"Reporte desalojado de la caché: {ruta.name}")
+
+    def _purgar_trabajos(self):
+        limite = time.time() - self.ttl_trabajos
+        for job_id, trabajo in list(self._trabajos.items()):
+            if trabajo.terminado is not None and trabajo.terminado < limite:
+                del self._trabajos[job_id]
+
+
+gestor_reportes = GestorReportes()
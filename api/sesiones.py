@@ -0,0 +1,192 @@
+"""
+Sesiones de usuario con identificadores opacos.
+
+Al iniciar sesión se genera un id aleatorio (secrets.token_urlsafe) que es
+lo único que viaja en la cookie; usuario, sucursal y rol quedan guardados
+del lado del servidor. SesionMiddleware resuelve la cookie una sola vez por
+petición y deja los datos en request.state.sesion, de modo que
+verificar_sesion() y requiere_autenticacion() ya no recalculan hashes ni
+leen varias cookies en cada handler.
+
+El almacén habla el subconjunto de Redis que necesita (GET, SET con EX,
+DELETE). Por defecto usa ClienteRedisLocal, un sustituto en memoria con
+TTL; con SESSION_BACKEND=redis usa el servidor de settings.REDIS_URL, lo
+que permite compartir sesiones entre varios procesos.
+
+Cada sesión vence por inactividad (SESSION_IDLE_MINUTES) y, en todo caso,
+SESSION_DURATION_HOURS después de creada. Para no escribir en el almacén en
+cada petición, el vencimiento por inactividad se renueva como mucho una vez
+cada SESSION_TOUCH_SECONDS.
+"""
+
+import json
+import secrets
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import cookie_parser
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from config.settings import settings
+from utils.logger import logger
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+COOKIE_SESION = "session_token"
+PREFIJO_CLAVE = "mipastel:sesion:"
+
+
+class ClienteRedisLocal:
+    """Sustituto en memoria de un cliente Redis: GET, SET con EX y DELETE, con vencimiento."""
+
+    # No hay red de por medio: el middleware lo consulta sin pasar por el threadpool
+    bloqueante = False
+
+    def __init__(self):
+        self._datos: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self._proxima_purga = time.monotonic()
+
+    def get(self, clave: str) -> Optional[Any]:
+        entrada = self._datos.get(clave)
+        if entrada is None:
+            return None
+        valor, vence = entrada
+        if vence is not None and vence <= time.monotonic():
+            self.delete(clave)
+            return None
+        return valor
+
+    def set(self, clave: str, valor: Any, ex: Optional[float] = None):
+        ahora = time.monotonic()
+        with self._lock:
+            self._datos[clave] = (valor, ahora + ex if ex else None)
+            if ahora >= self._proxima_purga:
+                self._purgar(ahora)
+
+    def delete(self, *claves: str) -> int:
+        with self._lock:
+            return sum(self._datos.pop(clave, None) is not None for clave in claves)
+
+    def _purgar(self, ahora: float):
+        # Las sesiones abandonadas nunca se vuelven a leer: se barren cada tanto
+        vencidas = [c for c, (_, vence) in self._datos.items() if vence is not None and vence <= ahora]
+        for clave in vencidas:
+            del self._datos[clave]
+        self._proxima_purga = ahora + 60
+
+    def __len__(self):
+        return len(self._datos)
+
+
+class AlmacenSesiones:
+    """Sesiones sobre un cliente con la interfaz de Redis."""
+
+    def __init__(self, cliente=None):
+        self.cliente = cliente if cliente is not None else ClienteRedisLocal()
+        # Con Redis real los valores viajan como JSON; en memoria se guarda el dict tal cual
+        self.serializar = not isinstance(self.cliente, ClienteRedisLocal)
+        self.bloqueante = getattr(self.cliente, "bloqueante", True)
+
+    @property
+    def idle(self) -> float:
+        return settings.SESSION_IDLE_MINUTES * 60
+
+    @property
+    def absoluta(self) -> float:
+        return settings.SESSION_DURATION_HOURS * 3600
+
+    def _ttl(self, datos: Dict[str, Any], ahora: float) -> float:
+        return min(self.idle, datos["creada"] + self.absoluta - ahora)
+
+    def _guardar(self, session_id: str, datos: Dict[str, Any], ttl: float):
+        valor = json.dumps(datos) if self.serializar else datos
+        self.cliente.set(PREFIJO_CLAVE + session_id, valor, ex=max(1, int(ttl)))
+
+    def crear(self, usuario: Dict[str, Any]) -> str:
+        """Guarda una sesión nueva para ``usuario`` y devuelve su id."""
+        session_id = secrets.token_urlsafe(32)
+        ahora = time.time()
+        datos = {
+            "username": usuario["username"],
+            "nombre": usuario.get("nombre"),
+            "sucursal": usuario.get("sucursal"),
+            "rol": usuario["rol"],
+            "creada": ahora,
+            "tocada": ahora,
+        }
+        self._guardar(session_id, datos, self._ttl(datos, ahora))
+        return session_id
+
+    def obtener(self, session_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Datos del usuario de la sesión, o None si no existe o ya venció."""
+        if not session_id:
+            return None
+        valor = self.cliente.get(PREFIJO_CLAVE + session_id)
+        if valor is None:
+            return None
+        datos = json.loads(valor) if self.serializar else valor
+
+        ahora = time.time()
+        if ahora - datos["creada"] >= self.absoluta or ahora - datos["tocada"] >= self.idle:
+            self.eliminar(session_id)
+            return None
+        if ahora - datos["tocada"] >= settings.SESSION_TOUCH_SECONDS:
+            datos = {**datos, "tocada": ahora}
+            self._guardar(session_id, datos, self._ttl(datos, ahora))
+
+        return {"username": datos["username"], "nombre": datos["nombre"],
+                "sucursal": datos["sucursal"], "rol": datos["rol"]}
+
+    def eliminar(self, session_id: Optional[str]):
+        if session_id:
+            self.cliente.delete(PREFIJO_CLAVE + session_id)
+
+
+def _crear_almacen() -> AlmacenSesiones:
+    if settings.SESSION_BACKEND == "redis":
+        if REDIS_AVAILABLE:
+            return AlmacenSesiones(redis.Redis.from_url(settings.REDIS_URL))
+        logger.warning("SESSION_BACKEND=redis pero el paquete redis no está instalado; se usan sesiones en memoria")
+    return AlmacenSesiones()
+
+
+def session_id_de(scope: Scope) -> Optional[str]:
+    for nombre, valor in scope.get("headers", ()):
+        if nombre == b"cookie":
+            return cookie_parser(valor.decode("latin-1")).get(COOKIE_SESION)
+    return None
+
+
+class SesionMiddleware:
+    """Resuelve la sesión una vez por petición y la deja en request.state.sesion."""
+
+    def __init__(self, app: ASGIApp, almacen: Optional[AlmacenSesiones] = None):
+        self.app = app
+        self._almacen = almacen
+
+    @property
+    def almacen(self) -> AlmacenSesiones:
+        return self._almacen or almacen_sesiones
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] in ("http", "websocket"):
+            session_id = session_id_de(scope)
+            sesion = None
+            if session_id:
+                almacen = self.almacen
+                if almacen.bloqueante:
+                    sesion = await run_in_threadpool(almacen.obtener, session_id)
+                else:
+                    sesion = almacen.obtener(session_id)
+            scope.setdefault("state", {})["sesion"] = sesion
+        await self.app(scope, receive, send)
+
+
+almacen_sesiones = _crear_almacen()
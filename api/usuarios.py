@@ -0,0 +1,197 @@
+"""
+Usuarios de la aplicación y sus hashes de contraseña.
+
+Los datos de cada usuario (nombre, sucursal, rol) son fijos y están aquí
+mismo; los hashes bcrypt viven en un archivo JSON versionado
+(settings.PASSWORD_HASHES_FILE) que se lee la primera vez que alguien
+necesita un hash, no al importar el módulo. Así arrancar la aplicación (o
+importar app.main en las pruebas) no paga ningún costo de bcrypt.
+
+Solo si al archivo le falta algún usuario se generan los hashes que faltan,
+a partir de DEFAULT_PASSWORDS, y se reescribe el archivo de forma atómica.
+Después de cargado, el conjunto de usuarios es de solo lectura
+(MappingProxyType) y se comparte entre todas las peticiones.
+
+Formato del archivo::
+
+    {"version": 2, "rounds": 12, "hashes": {"admin": "$2b$12$...", ...}}
+
+El formato anterior (un objeto plano usuario -> hash) se sigue aceptando y
+se reescribe al formato nuevo la siguiente vez que haga falta guardar.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Dict, Iterator, Optional
+
+import bcrypt
+
+from config.settings import settings
+from utils.logger import logger
+
+VERSION_ARCHIVO = 2
+RONDAS_BCRYPT = 12
+
+# Contraseñas por defecto (solo se usan para generar hashes que falten en el archivo)
+DEFAULT_PASSWORDS = {
+    "jutiapa1": "jut1pass",
+    "jutiapa2": "jut2pass",
+    "jutiapa3": "jut3pass",
+    "progreso": "progpass",
+    "quesada": "quespass",
+    "acatempa": "acatpass",
+    "yupiltepeque": "yupepass",
+    "atescatempa": "atespass",
+    "adelanto": "adelpass",
+    "jerez": "jerpass",
+    "comapa": "comapass",
+    "carina": "caripass",
+    "admin": "admin123"
+}
+
+
+def _sucursal(nombre: str) -> MappingProxyType:
+    return MappingProxyType({"nombre": nombre, "sucursal": nombre, "rol": "sucursal"})
+
+
+# Datos de los usuarios sin contraseña: no requieren cargar nada
+USUARIOS = MappingProxyType({
+    "jutiapa1": _sucursal("Jutiapa 1"),
+    "jutiapa2": _sucursal("Jutiapa 2"),
+    "jutiapa3": _sucursal("Jutiapa 3"),
+    "progreso": _sucursal("Progreso"),
+    "quesada": _sucursal("Quesada"),
+    "acatempa": _sucursal("Acatempa"),
+    "yupiltepeque": _sucursal("Yupiltepeque"),
+    "atescatempa": _sucursal("Atescatempa"),
+    "adelanto": _sucursal("Adelanto"),
+    "jerez": _sucursal("Jeréz"),
+    "comapa": _sucursal("Comapa"),
+    "carina": _sucursal("Carina"),
+    "admin": MappingProxyType({"nombre": "Administrador", "sucursal": None, "rol": "admin"}),
+})
+
+
+def construir_usuarios(hashes: Dict[str, str]) -> Mapping:
+    """Usuarios de solo lectura, cada uno con su ``password_hash``."""
+    return MappingProxyType({
+        username: MappingProxyType({"password_hash": hashes.get(username), **datos})
+        for username, datos in USUARIOS.items()
+    })
+
+
+def leer_hashes(ruta: str) -> Optional[Dict[str, str]]:
+    """Hashes guardados en ``ruta`` (formato versionado o plano), o None si no se pueden leer."""
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            contenido = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"No se pudo leer {ruta}: {e}")
+        return None
+
+    if not isinstance(contenido, dict):
+        return None
+    if "version" in contenido:
+        if contenido["version"] > VERSION_ARCHIVO:
+            logger.warning(f"{ruta} tiene la versión {contenido['version']}, más nueva que la soportada")
+        contenido = contenido.get("hashes") or {}
+    return {u: h for u, h in contenido.items() if isinstance(h, str)}
+
+
+def guardar_hashes(ruta: str, hashes: Dict[str, str]):
+    """Escribe ``hashes`` en el formato versionado reemplazando el archivo de una sola vez."""
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    fd, temporal = tempfile.mkstemp(prefix=".hashes-", dir=directorio)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"version": VERSION_ARCHIVO, "rounds": RONDAS_BCRYPT, "hashes": hashes}, f, indent=2)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+class AlmacenUsuarios:
+    """Carga los hashes una sola vez, en el primer uso, y los deja en memoria de solo lectura."""
+
+    def __init__(self, ruta: Optional[str] = None):
+        self._ruta = ruta
+        self._usuarios: Optional[Mapping] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ruta(self) -> str:
+        return str(self._ruta or settings.PASSWORD_HASHES_FILE)
+
+    @property
+    def cargado(self) -> bool:
+        return self._usuarios is not None
+
+    @property
+    def usuarios(self) -> Mapping:
+        usuarios = self._usuarios
+        if usuarios is None:
+            with self._lock:
+                if self._usuarios is None:
+                    self._usuarios = construir_usuarios(self._cargar_hashes())
+                usuarios = self._usuarios
+        return usuarios
+
+    def _cargar_hashes(self) -> Dict[str, str]:
+        ruta = self.ruta
+        guardados = leer_hashes(ruta)
+        hashes = dict(guardados or {})
+        faltantes = [u for u in USUARIOS if not hashes.get(u) and u in DEFAULT_PASSWORDS]
+
+        if faltantes:
+            logger.info(f"Generando hashes de contraseña para: {', '.join(faltantes)}")
+            for username in faltantes:
+                hashes[username] = bcrypt.hashpw(
+                    DEFAULT_PASSWORDS[username].encode("utf-8"), bcrypt.gensalt(rounds=RONDAS_BCRYPT)
+                ).decode("utf-8")
+        if faltantes or guardados is None:
+            try:
+                guardar_hashes(ruta, hashes)
+                logger.info(f"Hashes guardados en {ruta}")
+            except OSError as e:
+                logger.warning(f"No se pudieron guardar los hashes en {ruta}: {e}")
+        return hashes
+
+    def recargar(self):
+        """Descarta lo cargado; el siguiente acceso vuelve a leer el archivo."""
+        with self._lock:
+            self._usuarios = None
+
+
+class UsuariosDB(Mapping):
+    """
+    Vista de los usuarios con su hash, cargada al primer acceso a un hash.
+
+    Preguntar si un usuario existe, recorrer los nombres o contarlos usa
+    solo los datos fijos y no dispara la carga.
+    """
+
+    def __init__(self, almacen: AlmacenUsuarios):
+        self._almacen = almacen
+
+    def __getitem__(self, username: str) -> Mapping:
+        return self._almacen.usuarios[username]
+
+    def __contains__(self, username) -> bool:
+        return username in USUARIOS
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(USUARIOS)
+
+    def __len__(self) -> int:
+        return len(USUARIOS)
+
+
+almacen_usuarios = AlmacenUsuarios()
@@ -0,0 +1,96 @@
+"""
+Versiones de los listados de pedidos para GET condicional.
+
+Cada escritura de api/database.py incrementa un contador por (tabla,
+sucursal) y otro por tabla completa. Los listados arman con esos contadores
+y los parámetros de la consulta un ETag débil; si el navegador manda el
+mismo ETag en If-None-Match se responde 304 sin tocar la base de datos.
+
+Los contadores viven en memoria de este proceso, así que el ETag también
+incluye un identificador de arranque (un reinicio invalida todo) y una
+ventana de ETAG_MAX_AGE_SECONDS: los cambios hechos por otros procesos,
+como la aplicación de escritorio, se ven a más tardar al cerrar la ventana.
+"""
+
+import hashlib
+import secrets
+import threading
+import time
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+from config.settings import settings
+
+TABLA_NORMALES = "PastelesNormales"
+TABLA_CLIENTES = "PastelesClientes"
+
+
+def _clave_sucursal(sucursal: Optional[str]) -> Optional[str]:
+    if not sucursal or sucursal.lower() == "todas":
+        return None
+    return sucursal
+
+
+class VersionesPedidos:
+    """Contadores de cambios por tabla y sucursal."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versiones: Dict[Tuple[str, Optional[str]], int] = defaultdict(int)
+        self.arranque = secrets.token_hex(4)
+
+    def incrementar(self, tabla: str, *sucursales: Optional[str]):
+        """Registra un cambio en las sucursales dadas (y por lo tanto en la tabla completa)."""
+        with self._lock:
+            self._versiones[(tabla, None)] += 1
+            for sucursal in {_clave_sucursal(s) for s in sucursales} - {None}:
+                self._versiones[(tabla, sucursal)] += 1
+
+    def version(self, tabla: str, sucursal: Optional[str] = None) -> int:
+        return self._versiones.get((tabla, _clave_sucursal(sucursal)), 0)
+
+    def etag(self, tabla: str, sucursal: Optional[str], *partes) -> str:
+        """
+        ETag débil de un listado de ``tabla`` filtrado por ``sucursal``.
+
+        ``partes`` son los demás parámetros que cambian el contenido (fechas,
+        cursor, tamaño de página...). Se calcula antes de consultar: si otra
+        escritura entra durante la consulta, la siguiente petición ya trae
+        una versión más nueva y no se sirve nada viejo.
+        """
+        ventana = int(time.time() // settings.ETAG_MAX_AGE_SECONDS) if settings.ETAG_MAX_AGE_SECONDS > 0 else 0
+        huella = hashlib.sha1(repr((partes, date.today().isoformat(), ventana)).encode("utf-8")).hexdigest()[:12]
+        return f'W/"{self.arranque}-{self.version(tabla, sucursal)}-{huella}"'
+
+
+def _sin_debil(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def coincide_etag(request: Request, etag: str) -> bool:
+    """Comparación débil de If-None-Match contra ``etag``."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    etiquetas = {_sin_debil(e.strip()) for e in if_none_match.split(",")}
+    return "*" in etiquetas or _sin_debil(etag) in etiquetas
+
+
+def cabeceras_etag(etag: str) -> Dict[str, str]:
+    # private: cada usuario ve su sucursal; no-cache: revalidar siempre con el ETag
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def no_modificado(etag: str) -> Response:
+    return Response(status_code=304, headers=cabeceras_etag(etag))
+
+
+def etag_listado(request: Request, tabla: str, sucursal: Optional[str]) -> str:
+    """ETag del listado pedido en ``request``: ruta, parámetros de consulta y sucursal efectiva."""
+    return versiones_pedidos.etag(tabla, sucursal, request.url.path, sorted(request.query_params.multi_items()), sucursal)
+
+
+versiones_pedidos = VersionesPedidos()
@@ -1,19 +1,26 @@
-import os
 import socket
 from pathlib import Path
 from contextlib import asynccontextmanager
+from typing import Optional
 from datetime import datetime, date
-from fastapi import FastAPI, Request, Form, Depends
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, Request, Form, Depends, Body, HTTPException
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
 
 from config.settings import settings
 from config.constants import SABORES_NORMALES, SABORES_CLIENTES, TAMANOS_NORMALES, TAMANOS_CLIENTES, SUCURSALES
-from api.auth import verificar_credenciales, crear_respuesta_con_sesion, cerrar_sesion, verificar_sesion, requiere_autenticacion
-from api.database import obtener_precio_db
-from pdf_reportes import generar_pdf_listas, generar_pdf_ventas, generar_pdf_rango_fechas
+from api.auth import (
+    verificar_credenciales_async, crear_respuesta_con_sesion, cerrar_sesion, verificar_sesion,
+    requiere_autenticacion, cerrar_executor_login
+)
+from api.catalogo_precios import catalogo_precios
+from api.async_database import run_db, cerrar_executor
+from config.database import db_pool_normales, db_pool_clientes
+from api.reportes_jobs import gestor_reportes, ESTADO_LISTO, ESTADO_ERROR
 from utils.logger import logger
+from utils.streaming import stream_file
+from utils.static_assets import EstaticosConCache, configurar_plantillas
 from app.middleware import setup_security_middleware
 
 try:
@@ -44,8 +51,21 @@ async def lifespan(app: FastAPI):
     print(f"Acceso local: http://127.0.0.1:5000")
     print(f"Acceso desde red WiFi: http://{local_ip}:5000")
     print(f"{'='*60}\n")
+
+    for pool in (db_pool_normales, db_pool_clientes):
+        try:
+            await run_in_threadpool(pool.warm_up)
+        except Exception as e:
+            logger.warning(f"No se pudo precalentar el pool de {pool.database}: {e}")
+
     yield
 
+    gestor_reportes.cerrar()
+    cerrar_executor()
+    cerrar_executor_login()
+    for pool in (db_pool_normales, db_pool_clientes):
+        pool.close_all()
+
 app = FastAPI(
     title="Mi Pastel - Sistema de Gestión",
     description="""
@@ -121,8 +141,8 @@ app = FastAPI(
 
 setup_security_middleware(app)
 
-app.mount("/static", StaticFiles(directory=str(settings.STATIC_DIR)), name="static")
-templates = Jinja2Templates(directory=str(settings.TEMPLATES_DIR))
+app.mount("/static", EstaticosConCache(directory=str(settings.STATIC_DIR)), name="static")
+templates = configurar_plantillas(Jinja2Templates(directory=str(settings.TEMPLATES_DIR)))
 
 app.include_router(normales.router)
 app.include_router(clientes.router)
@@ -165,7 +185,7 @@ async def procesar_login(
     """
     from utils.audit import AuditLogger
     
-    user_data = verificar_credenciales(username, password)
+    user_data = await verificar_credenciales_async(username, password)
     if user_data:
         # Log successful login
         client_ip = request.client.host if request.client else None
@@ -203,7 +223,7 @@ async def cerrar_sesion_usuario(request: Request):
         AuditLogger.log_logout(user_data.get("username"), ip_address=client_ip)
     
     response = RedirectResponse(url="/login", status_code=302)
-    cerrar_sesion(response)
+    cerrar_sesion(response, request)
     return response
 
 @app.get("/", response_class=HTMLResponse)
@@ -228,17 +248,34 @@ async def api_obtener_precio(sabor: str, tamano: str):
         if sabor.lower() == "otro":
             return {"precio": 0, "encontrado": False, "detalle": "Precio manual requerido"}
 
-        precio = obtener_precio_db(sabor, tamano)
+        instantanea = catalogo_precios.instantanea_vigente()
+        if instantanea is None:
+            instantanea = await run_db(catalogo_precios.instantanea)
+        precio = instantanea.precio(sabor, tamano)
 
         if precio and precio > 0:
-            return {"precio": precio, "encontrado": True}
+            return {"precio": precio, "encontrado": True, "version": instantanea.version}
         else:
-            return {"precio": 0, "encontrado": False, "detalle": "No registrado"}
+            return {"precio": 0, "encontrado": False, "detalle": "No registrado", "version": instantanea.version}
     except Exception as e:
         logger.error(f"Error al obtener precio: {e}")
         return {"precio": 0, "encontrado": False, "error": str(e)}
 
-@app.get("/reportes/pdf")
+async def _servir_reporte(tipo: str, fecha_inicio: date, fecha_fin: date, sucursal: Optional[str]):
+    """Encola el reporte y espera el PDF sin bloquear el event loop."""
+    trabajo = await gestor_reportes.enviar(tipo, fecha_inicio, fecha_fin, sucursal)
+    await gestor_reportes.esperar(trabajo, timeout=settings.REPORTS_TIMEOUT_SECONDS)
+
+    archivo = trabajo.abrir()
+    if archivo is None:
+        return JSONResponse(
+            status_code=500,
+            content={"error": f"No se pudo generar el PDF: {trabajo.error or 'archivo no disponible'}"}
+        )
+
+    return stream_file(archivo, trabajo.nombre_descarga)
+
+@app.get("/reportes/pdf", tags=["Reportes"])
 async def generar_reporte_pdf(request: Request, fecha: str, sucursal: str = None):
     try:
         try:
@@ -249,24 +286,7 @@ async def generar_reporte_pdf(request: Request, fecha: str, sucursal: str = None
                 content={"error": "Formato de fecha inválido. Use YYYY-MM-DD"}
             )
 
-        nombre_archivo = generar_pdf_listas(target_date=fecha_obj, sucursal=sucursal if sucursal else None)
-
-        if not os.path.exists(nombre_archivo):
-            return JSONResponse(
-                status_code=500,
-                content={"error": "No se pudo generar el PDF"}
-            )
-
-        nombre_descarga = f'Listas_MiPastel_{fecha}'
-        if sucursal:
-            nombre_descarga += f'_{sucursal}'
-        nombre_descarga += '.pdf'
-
-        return FileResponse(
-            path=nombre_archivo,
-            media_type='application/pdf',
-            filename=nombre_descarga
-        )
+        return await _servir_reporte("listas", fecha_obj, fecha_obj, sucursal)
 
     except Exception as e:
         logger.error(f"Error al generar PDF de listas: {e}", exc_info=True)
@@ -275,7 +295,7 @@ async def generar_reporte_pdf(request: Request, fecha: str, sucursal: str = None
             content={"error": f"Error al generar el reporte: {str(e)}"}
         )
 
-@app.get("/reportes/rango-pdf")
+@app.get("/reportes/rango-pdf", tags=["Reportes"])
 async def generar_reporte_rango_pdf(
         request: Request,
         fecha_inicio: str,
@@ -298,28 +318,7 @@ async def generar_reporte_rango_pdf(
                 content={"error": "La fecha fin debe ser posterior a la fecha inicio"}
             )
 
-        nombre_archivo = generar_pdf_rango_fechas(
-            fecha_inicio=fecha_inicio_obj,
-            fecha_fin=fecha_fin_obj,
-            sucursal=sucursal if sucursal else None
-        )
-
-        if not os.path.exists(nombre_archivo):
-            return JSONResponse(
-                status_code=500,
-                content={"error": "No se pudo generar el PDF"}
-            )
-
-        nombre_descarga = f'Reporte_{fecha_inicio}_a_{fecha_fin}'
-        if sucursal:
-            nombre_descarga += f'_{sucursal}'
-        nombre_descarga += '.pdf'
-
-        return FileResponse(
-            path=nombre_archivo,
-            media_type='application/pdf',
-            filename=nombre_descarga
-        )
+        return await _servir_reporte("rango", fecha_inicio_obj, fecha_fin_obj, sucursal)
 
     except Exception as e:
         logger.error(f"Error al generar PDF de rango: {e}", exc_info=True)
@@ -328,7 +327,7 @@ async def generar_reporte_rango_pdf(
             content={"error": f"Error al generar el reporte: {str(e)}"}
         )
 
-@app.get("/reportes/ventas-pdf")
+@app.get("/reportes/ventas-pdf", tags=["Reportes"])
 async def generar_reporte_ventas_pdf(request: Request, fecha: str, sucursal: str = None):
     try:
         try:
@@ -339,24 +338,7 @@ async def generar_reporte_ventas_pdf(request: Request, fecha: str, sucursal: str
                 content={"error": "Formato de fecha inválido. Use YYYY-MM-DD"}
             )
 
-        nombre_archivo = generar_pdf_ventas(target_date=fecha_obj, sucursal=sucursal if sucursal else None)
-
-        if not os.path.exists(nombre_archivo):
-            return JSONResponse(
-                status_code=500,
-                content={"error": "No se pudo generar el PDF de ventas"}
-            )
-
-        nombre_descarga = f'Ventas_MiPastel_{fecha}'
-        if sucursal:
-            nombre_descarga += f'_{sucursal}'
-        nombre_descarga += '.pdf'
-
-        return FileResponse(
-            path=nombre_archivo,
-            media_type='application/pdf',
-            filename=nombre_descarga
-        )
+        return await _servir_reporte("ventas", fecha_obj, fecha_obj, sucursal)
 
     except Exception as e:
         logger.error(f"Error al generar PDF de ventas: {e}", exc_info=True)
@@ -365,6 +347,62 @@ async def generar_reporte_ventas_pdf(request: Request, fecha: str, sucursal: str
             content={"error": f"Error al generar el reporte de ventas: {str(e)}"}
         )
 
+@app.post("/reportes/jobs", status_code=202, tags=["Reportes"])
+async def crear_trabajo_reporte(
+        solicitud: dict = Body(...),
+        user_data: dict = Depends(requiere_autenticacion)
+):
+    """
+    Encola la generación de un reporte PDF.
+
+    Body: {"tipo": "listas" | "rango" | "ventas", "fecha_inicio": "YYYY-MM-DD",
+    "fecha_fin": "YYYY-MM-DD" (opcional), "sucursal": "..." (opcional)}.
+    Los usuarios de sucursal sólo pueden pedir reportes de su sucursal.
+    """
+    try:
+        fecha_inicio = datetime.strptime(solicitud.get("fecha_inicio") or "", "%Y-%m-%d").date()
+        fecha_fin = solicitud.get("fecha_fin")
+        fecha_fin = datetime.strptime(fecha_fin, "%Y-%m-%d").date() if fecha_fin else fecha_inicio
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Formato de fecha inválido. Use YYYY-MM-DD")
+
+    sucursal = solicitud.get("sucursal") or None
+    if user_data["rol"] != "admin":
+        sucursal = user_data["sucursal"]
+
+    try:
+        trabajo = await gestor_reportes.enviar(solicitud.get("tipo", "listas"), fecha_inicio, fecha_fin, sucursal)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error al encolar reporte: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error al encolar el reporte: {str(e)}")
+
+    return trabajo.a_dict()
+
+@app.get("/reportes/jobs/{job_id}", tags=["Reportes"])
+async def estado_trabajo_reporte(job_id: str, user_data: dict = Depends(requiere_autenticacion)):
+    trabajo = gestor_reportes.obtener(job_id)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return trabajo.a_dict()
+
+@app.get("/reportes/jobs/{job_id}/descargar", tags=["Reportes"])
+async def descargar_trabajo_reporte(job_id: str, user_data: dict = Depends(requiere_autenticacion)):
+    trabajo = gestor_reportes.obtener(job_id)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    if trabajo.estado == ESTADO_ERROR:
+        raise HTTPException(status_code=500, detail=f"No se pudo generar el PDF: {trabajo.error}")
+    if trabajo.estado != ESTADO_LISTO:
+        raise HTTPException(status_code=409, detail="El reporte aún se está generando")
+
+    archivo = trabajo.abrir()
+    if archivo is None:
+        raise HTTPException(status_code=410, detail="El reporte expiró de la caché; vuelva a solicitarlo")
+
+    return stream_file(archivo, trabajo.nombre_descarga)
+
 @app.get("/health", tags=["Sistema"])
 async def health_check():
     """
@@ -381,7 +419,11 @@ async def health_check():
             "/clientes",
             "/admin",
             "/api/pedidos"
-        ]
+        ],
+        "pools": {
+            "normales": db_pool_normales.stats(),
+            "clientes": db_pool_clientes.stats()
+        }
     })
 
 @app.get("/debug/routes", tags=["Sistema"])
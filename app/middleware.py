@@ -1,7 +1,176 @@
+import zlib
+from typing import Optional
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from config.settings import settings
+from api.sesiones import SesionMiddleware
+from utils.static_assets import BROTLI_AVAILABLE, elegir_codificacion
+
+if BROTLI_AVAILABLE:
+    import brotli
+
+# Contenido que ya viene comprimido o que no se debe retener (SSE)
+TIPOS_SIN_COMPRESION = (
+    "image/", "video/", "audio/", "font/woff", "application/pdf", "application/zip",
+    "application/gzip", "application/octet-stream", "text/event-stream",
+)
+
+
+class Compresor:
+    """Incremental gzip or brotli compressor for one response."""
+
+    def __init__(self, codificacion: str):
+        if codificacion == "br":
+            compresor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+            self._procesar, self._vaciar, self._terminar = compresor.process, compresor.flush, compresor.finish
+        else:
+            # wbits=31: formato gzip
+            compresor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._procesar = compresor.compress
+            self._vaciar = lambda: compresor.flush(zlib.Z_SYNC_FLUSH)
+            self._terminar = lambda: compresor.flush(zlib.Z_FINISH)
+
+    def comprimir(self, datos: bytes, final: bool) -> bytes:
+        """Compress ``datos``; each chunk is flushed so streamed responses reach the client as they go."""
+        return self._procesar(datos) + (self._terminar() if final else self._vaciar())
+
+
+def es_comprimible(status: int, headers: Headers) -> bool:
+    if status < 200 or status in (204, 304):
+        return False
+    if "content-encoding" in headers or "no-transform" in headers.get("cache-control", ""):
+        return False
+    tipo = headers.get("content-type", "").lower()
+    return bool(tipo) and not tipo.startswith(TIPOS_SIN_COMPRESION)
+
+
+class _RespuestaComprimida:
+    """Send wrapper that compresses a single response."""
+
+    def __init__(self, send: Send, codificacion: Optional[str], minimo: int):
+        self.send = send
+        self.codificacion = codificacion
+        self.minimo = minimo
+        self.inicio: Optional[Message] = None
+        self.pendiente = bytearray()
+        self.compresor: Optional[Compresor] = None
+        self.directo = False
+
+    async def __call__(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.inicio = message
+            headers = MutableHeaders(scope=message)
+            if not es_comprimible(message["status"], headers):
+                self.directo = True
+                await self.send(message)
+            elif self.codificacion is None:
+                # El cliente no acepta gzip/br: se envía tal cual, pero las cachés deben distinguirlo
+                self.directo = True
+                headers.add_vary_header("Accept-Encoding")
+                await self.send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.directo:
+            await self.send(message)
+            return
+
+        cuerpo = message.get("body", b"")
+        mas = message.get("more_body", False)
+
+        if self.compresor is not None:
+            await self.send({"type": "http.response.body", "body": self.compresor.comprimir(cuerpo, not mas),
+                             "more_body": mas})
+            return
+
+        # Se junta el cuerpo hasta saber si supera el mínimo
+        self.pendiente += cuerpo
+        if mas and len(self.pendiente) < self.minimo:
+            return
+
+        headers = MutableHeaders(scope=self.inicio)
+        headers.add_vary_header("Accept-Encoding")
+        if len(self.pendiente) < self.minimo:
+            self.directo = True
+            await self.send(self.inicio)
+            await self.send({"type": "http.response.body", "body": bytes(self.pendiente), "more_body": False})
+            return
+
+        self.compresor = Compresor(self.codificacion)
+        comprimido = self.compresor.comprimir(bytes(self.pendiente), not mas)
+        self.pendiente = bytearray()
+        headers["Content-Encoding"] = self.codificacion
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # El cuerpo comprimido no es byte a byte la misma representación
+            headers["ETag"] = f"W/{etag}"
+        if mas:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(len(comprimido))
+        await self.send(self.inicio)
+        await self.send({"type": "http.response.body", "body": comprimido, "more_body": mas})
+
+
+class CompresionMiddleware:
+    """
+    gzip/brotli compression for JSON and HTML responses.
+
+    Pure ASGI so streamed bodies are compressed chunk by chunk instead of
+    being buffered a second time. Only bodies of at least
+    COMPRESSION_MIN_BYTES are compressed; images, PDFs, SSE streams and
+    responses that already carry a Content-Encoding pass through untouched.
+    """
+
+    def __init__(self, app: ASGIApp, minimo: Optional[int] = None):
+        self.app = app
+        self.minimo = settings.COMPRESSION_MIN_BYTES if minimo is None else minimo
+        self.disponibles = ("br", "gzip") if BROTLI_AVAILABLE else ("gzip",)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        codificacion = elegir_codificacion(Headers(scope=scope).get("accept-encoding", ""), self.disponibles)
+        await self.app(scope, receive, _RespuestaComprimida(send, codificacion, self.minimo))
+
+
+class LimiteSubidaMiddleware:
+    """
+    Refuses oversized multipart uploads before their body is read.
+
+    Starlette receives and spools the whole multipart body before the route
+    runs, so the per-chunk limit in guardar_foto only caps what is copied to
+    the uploads folder. This guard answers 413 from the Content-Length
+    header alone; bodies sent without one still hit that per-chunk check.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http":
+            headers = Headers(scope=scope)
+            if headers.get("content-type", "").lower().startswith("multipart/form-data"):
+                limite = settings.MAX_FILE_SIZE + settings.UPLOAD_FORM_OVERHEAD_BYTES
+                try:
+                    longitud = int(headers.get("content-length", ""))
+                except ValueError:
+                    longitud = None
+                if longitud is not None and longitud > limite:
+                    respuesta = JSONResponse(
+                        {"detail": f"La imagen supera el máximo de {settings.MAX_FILE_SIZE / (1024 * 1024):g} MB"},
+                        status_code=413,
+                        headers={"Connection": "close"},
+                    )
+                    await respuesta(scope, receive, send)
+                    return
+        await self.app(scope, receive, send)
+
 
 def setup_security_middleware(app: FastAPI):
     app.add_middleware(
@@ -25,3 +194,11 @@ def setup_security_middleware(app: FastAPI):
         response.headers["X-XSS-Protection"] = "1; mode=block"
         response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
         return response
+
+    app.add_middleware(SesionMiddleware)
+
+    # La última en agregarse es la más externa: comprime la respuesta ya completa
+    app.add_middleware(CompresionMiddleware)
+
+    # Y por fuera de todo, una subida demasiado grande se rechaza sin leer el cuerpo
+    app.add_middleware(LimiteSubidaMiddleware)
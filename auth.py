@@ -1,7 +1,8 @@
-from api.auth import verificar_credenciales, crear_respuesta_con_sesion, cerrar_sesion, verificar_sesion, requiere_autenticacion
+from api.auth import verificar_credenciales, verificar_credenciales_async, crear_respuesta_con_sesion, cerrar_sesion, verificar_sesion, requiere_autenticacion
 
 __all__ = [
     'verificar_credenciales',
+    'verificar_credenciales_async',
     'crear_respuesta_con_sesion',
     'cerrar_sesion',
     'verificar_sesion',
@@ -1,13 +1,50 @@
 import pyodbc
+import threading
+import time
+from collections import deque
 from contextlib import contextmanager
-from typing import Generator
+from typing import Dict, Generator, Optional
 import logging
 from .settings import settings
 
 logger = logging.getLogger(__name__)
 
+
+class PoolTimeoutError(Exception):
+    """No se liberó ninguna conexión del pool dentro del tiempo de espera."""
+
+
+class _ConexionPool:
+    __slots__ = ("conn", "creada", "ultimo_uso")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.creada = time.monotonic()
+        self.ultimo_uso = self.creada
+
+
 class DatabasePool:
-    def __init__(self, server: str, database: str, driver: str):
+    """
+    Pool acotado de conexiones pyodbc.
+
+    Mantiene hasta ``max_size`` conexiones abiertas. Las conexiones devueltas
+    se guardan ociosas y se reutilizan; sólo se validan con ``SELECT 1`` si
+    estuvieron ociosas más de ``idle_check_seconds`` y se reciclan al superar
+    ``max_lifetime_seconds``. Si todas están en uso, ``get_connection`` espera
+    hasta ``timeout`` segundos y luego lanza ``PoolTimeoutError``.
+    """
+
+    def __init__(
+        self,
+        server: str,
+        database: str,
+        driver: str,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+        idle_check_seconds: Optional[float] = None,
+        max_lifetime_seconds: Optional[float] = None,
+    ):
         self.server = server
         self.database = database
         self.driver = driver
@@ -17,25 +54,183 @@ class DatabasePool:
             f'DATABASE={database};'
             f'Trusted_Connection=yes;'
         )
-    
+
+        self.max_size = max(1, max_size if max_size is not None else settings.DB_POOL_MAX_SIZE)
+        self.min_size = min(self.max_size, max(0, min_size if min_size is not None else settings.DB_POOL_MIN_SIZE))
+        self.timeout = timeout if timeout is not None else settings.DB_POOL_TIMEOUT_SECONDS
+        self.idle_check_seconds = (
+            idle_check_seconds if idle_check_seconds is not None else settings.DB_POOL_IDLE_CHECK_SECONDS
+        )
+        self.max_lifetime_seconds = (
+            max_lifetime_seconds if max_lifetime_seconds is not None else settings.DB_POOL_MAX_LIFETIME_SECONDS
+        )
+
+        self._ociosas = deque()
+        self._abiertas = 0
+        self._cerrado = False
+        self._condicion = threading.Condition()
+        self._contadores = {"checkouts": 0, "waits": 0, "creations": 0, "discards": 0}
+
+    def _abrir(self) -> _ConexionPool:
+        conn = pyodbc.connect(self.connection_string)
+        conn.autocommit = False
+        with self._condicion:
+            self._contadores["creations"] += 1
+        return _ConexionPool(conn)
+
+    def _cerrar(self, entrada: _ConexionPool):
+        try:
+            entrada.conn.close()
+        except Exception:
+            pass
+
+    def _descartar(self, entrada: _ConexionPool):
+        self._cerrar(entrada)
+        with self._condicion:
+            self._abiertas -= 1
+            self._contadores["discards"] += 1
+            self._condicion.notify()
+
+    def _expirada(self, entrada: _ConexionPool, ahora: float) -> bool:
+        return self.max_lifetime_seconds > 0 and ahora - entrada.creada > self.max_lifetime_seconds
+
+    def _es_utilizable(self, entrada: _ConexionPool) -> bool:
+        ahora = time.monotonic()
+        if self._expirada(entrada, ahora):
+            return False
+        if ahora - entrada.ultimo_uso < self.idle_check_seconds:
+            return True
+        try:
+            cursor = entrada.conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except pyodbc.Error as e:
+            logger.warning(f"Conexión ociosa inválida en {self.database}, se descarta: {e}")
+            return False
+
+    def _reservar(self, limite: float) -> Optional[_ConexionPool]:
+        """Devuelve una conexión ociosa o ``None`` si se reservó un cupo para abrir una nueva."""
+        with self._condicion:
+            espero = False
+            while True:
+                if self._ociosas:
+                    return self._ociosas.pop()
+                if self._abiertas < self.max_size:
+                    self._abiertas += 1
+                    return None
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    raise PoolTimeoutError(
+                        f"No hay conexiones disponibles a {self.database} "
+                        f"después de {self.timeout} segundos (máximo {self.max_size})"
+                    )
+                if not espero:
+                    self._contadores["waits"] += 1
+                    espero = True
+                self._condicion.wait(restante)
+
+    def _obtener(self) -> _ConexionPool:
+        limite = time.monotonic() + self.timeout
+        with self._condicion:
+            self._contadores["checkouts"] += 1
+
+        while True:
+            entrada = self._reservar(limite)
+            if entrada is None:
+                try:
+                    return self._abrir()
+                except Exception:
+                    with self._condicion:
+                        self._abiertas -= 1
+                        self._condicion.notify()
+                    raise
+            if self._es_utilizable(entrada):
+                return entrada
+            self._descartar(entrada)
+
+    def _devolver(self, entrada: _ConexionPool):
+        # Equivalente a cerrar la conexión: lo que no se confirmó se descarta
+        try:
+            entrada.conn.rollback()
+        except pyodbc.Error as e:
+            logger.warning(f"No se pudo limpiar la conexión a {self.database}, se descarta: {e}")
+            self._descartar(entrada)
+            return
+
+        ahora = time.monotonic()
+        if self._expirada(entrada, ahora):
+            self._descartar(entrada)
+            return
+
+        entrada.ultimo_uso = ahora
+        with self._condicion:
+            if not self._cerrado:
+                self._ociosas.append(entrada)
+                self._condicion.notify()
+                return
+        # El pool se cerró mientras la conexión estaba en uso
+        self._descartar(entrada)
+
     @contextmanager
     def get_connection(self) -> Generator:
-        conn = None
+        entrada = self._obtener()
         try:
-            conn = pyodbc.connect(self.connection_string)
-            conn.autocommit = False
-            yield conn
+            yield entrada.conn
         except pyodbc.Error as e:
-            if conn:
-                conn.rollback()
             logger.error(f"Error de conexión a {self.database}: {e}")
             raise
         finally:
-            if conn:
-                conn.close()
+            self._devolver(entrada)
+
+    def warm_up(self) -> int:
+        """Abre conexiones hasta tener ``min_size`` listas. Devuelve cuántas se abrieron."""
+        with self._condicion:
+            self._cerrado = False
+        abiertas = 0
+        while True:
+            with self._condicion:
+                if self._abiertas >= self.min_size:
+                    return abiertas
+                self._abiertas += 1
+            try:
+                entrada = self._abrir()
+            except Exception:
+                with self._condicion:
+                    self._abiertas -= 1
+                    self._condicion.notify()
+                raise
+            with self._condicion:
+                self._ociosas.append(entrada)
+                self._condicion.notify()
+            abiertas += 1
+
+    def close_all(self):
+        """Cierra las conexiones ociosas; las que están en uso se cierran al devolverse."""
+        with self._condicion:
+            self._cerrado = True
+            ociosas = list(self._ociosas)
+            self._ociosas.clear()
+            self._abiertas -= len(ociosas)
+            self._condicion.notify_all()
+        for entrada in ociosas:
+            self._cerrar(entrada)
+
+    def stats(self) -> Dict[str, int]:
+        with self._condicion:
+            ociosas = len(self._ociosas)
+            return {
+                **self._contadores,
+                "open": self._abiertas,
+                "idle": ociosas,
+                "in_use": self._abiertas - ociosas,
+                "max_size": self.max_size,
+            }
+
 
 db_pool_normales = DatabasePool(
-    settings.DB_SERVER, 
+    settings.DB_SERVER,
     settings.DB_NAME_NORMALES,
     settings.DB_DRIVER
 )
@@ -12,6 +12,13 @@ class Settings:
         self.DB_NAME_NORMALES = os.getenv("DB_NAME_NORMALES", "MiPastel")
         self.DB_NAME_CLIENTES = os.getenv("DB_NAME_CLIENTES", "MiPastel_Clientes")
         self.DB_DRIVER = os.getenv("DB_DRIVER", "ODBC Driver 17 for SQL Server")
+        self.DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+        self.DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+        self.DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "10"))
+        self.DB_POOL_IDLE_CHECK_SECONDS = float(os.getenv("DB_POOL_IDLE_CHECK_SECONDS", "30"))
+        self.DB_POOL_MAX_LIFETIME_SECONDS = float(os.getenv("DB_POOL_MAX_LIFETIME_SECONDS", "1800"))
+        self.DB_QUERY_TIMEOUT_SECONDS = float(os.getenv("DB_QUERY_TIMEOUT_SECONDS", "30"))
+        self.PRECIOS_CACHE_TTL_SECONDS = float(os.getenv("PRECIOS_CACHE_TTL_SECONDS", "60"))
         
         self.SECRET_KEY = os.getenv("SECRET_KEY", os.urandom(32).hex())
         self.ADMIN_PASSWORD_HASH = os.getenv("ADMIN_PASSWORD_HASH", "")
@@ -27,14 +34,41 @@ class Settings:
         self.ALLOWED_ORIGINS = [origin.strip() for origin in allowed_origins_str.split(",")]
         
         self.SESSION_DURATION_HOURS = int(os.getenv("SESSION_DURATION_HOURS", "8"))
+        self.SESSION_IDLE_MINUTES = float(os.getenv("SESSION_IDLE_MINUTES", "60"))
+        self.SESSION_TOUCH_SECONDS = float(os.getenv("SESSION_TOUCH_SECONDS", "60"))
+        self.SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memoria").lower()
         self.MAX_LOGIN_ATTEMPTS = int(os.getenv("MAX_LOGIN_ATTEMPTS", "999"))  # Aumentado para desarrollo
         self.LOGIN_TIMEOUT_SECONDS = int(os.getenv("LOGIN_TIMEOUT_SECONDS", "300"))
+        self.LOGIN_MAX_CONCURRENT = int(os.getenv("LOGIN_MAX_CONCURRENT", "2"))
+        self.LOGIN_CACHE_TTL_SECONDS = float(os.getenv("LOGIN_CACHE_TTL_SECONDS", "300"))
         
         self.BASE_DIR = Path(__file__).parent.parent.absolute()
         self.STATIC_DIR = self.BASE_DIR / "static"
         self.UPLOADS_DIR = self.STATIC_DIR / "uploads"
         self.TEMPLATES_DIR = self.BASE_DIR / "templates"
         self.LOGS_DIR = self.BASE_DIR / "logs"
+        self.PASSWORD_HASHES_FILE = Path(os.getenv("PASSWORD_HASHES_FILE", str(self.BASE_DIR / "api" / ".password_hashes.json")))
+
+        self.REPORTS_CACHE_DIR = Path(os.getenv("REPORTS_CACHE_DIR", str(self.BASE_DIR / "reportes" / "cache")))
+        self.REPORTS_CACHE_MAX_MB = float(os.getenv("REPORTS_CACHE_MAX_MB", "200"))
+        self.REPORTS_MAX_WORKERS = int(os.getenv("REPORTS_MAX_WORKERS", "2"))
+        self.REPORTS_JOB_TTL_SECONDS = float(os.getenv("REPORTS_JOB_TTL_SECONDS", "3600"))
+        self.REPORTS_TIMEOUT_SECONDS = float(os.getenv("REPORTS_TIMEOUT_SECONDS", "120"))
+        self.ADMIN_REPORTS_MAX_PROCESSES = int(os.getenv("ADMIN_REPORTS_MAX_PROCESSES", "4"))
+        self.PDF_SPOOL_MAX_MB = float(os.getenv("PDF_SPOOL_MAX_MB", "16"))
+        self.STREAM_CHUNK_BYTES = int(os.getenv("STREAM_CHUNK_BYTES", str(64 * 1024)))
+        self.COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+        self.COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+        self.COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+        self.EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+        self.EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "256"))
+        self.EVENTS_RETRY_MS = int(os.getenv("EVENTS_RETRY_MS", "3000"))
+        self.ETAG_MAX_AGE_SECONDS = float(os.getenv("ETAG_MAX_AGE_SECONDS", "30"))
+
+        self.MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", str(5 * 1024 * 1024)))
+        self.UPLOAD_FORM_OVERHEAD_BYTES = int(os.getenv("UPLOAD_FORM_OVERHEAD_BYTES", str(64 * 1024)))
+        self.UPLOAD_MAX_DIMENSION = int(os.getenv("UPLOAD_MAX_DIMENSION", "1600"))
+        self.UPLOAD_THUMB_DIMENSION = int(os.getenv("UPLOAD_THUMB_DIMENSION", "256"))
         
         os.makedirs(self.UPLOADS_DIR, exist_ok=True)
         os.makedirs(self.LOGS_DIR, exist_ok=True)
@@ -9,6 +9,8 @@ from api.database import (
     actualizar_pedido_cliente_db,
     eliminar_cliente_db,
     obtener_cliente_por_id_db,
+    registrar_pasteles_normales_lote_db,
+    registrar_pedidos_clientes_lote_db,
     DatabaseManager
 )
 
@@ -23,8 +25,11 @@ from api.database import (
     actualizar_pedido_cliente_db,
     eliminar_cliente_db,
     obtener_cliente_por_id_db,
+    registrar_pasteles_normales_lote_db,
+    registrar_pedidos_clientes_lote_db,
     DatabaseManager
 )
+from api.async_database import AsyncDatabaseManager, DatabaseTimeoutError, run_db
 from config.database import db_pool_normales, db_pool_clientes
 
 def get_conn_normales():
@@ -112,7 +117,12 @@ __all__ = [
     'actualizar_pedido_cliente_db',
     'eliminar_cliente_db',
     'obtener_cliente_por_id_db',
+    'registrar_pasteles_normales_lote_db',
+    'registrar_pedidos_clientes_lote_db',
     'DatabaseManager',
+    'AsyncDatabaseManager',
+    'DatabaseTimeoutError',
+    'run_db',
     'get_conn_normales',
     'get_conn_clientes'
 ]
\ No newline at end of file
@@ -0,0 +1,54 @@
+-- =============================================================================
+-- Migración 001: índices de cobertura para listados y reportes
+--
+-- Los listados filtran por rango de fecha (fecha >= ? AND fecha < ?) y,
+-- opcionalmente, por sucursal. Los índices anteriores (fecha, sucursal) no
+-- cubrían las columnas del SELECT, así que cada fila encontrada requería un
+-- Key Lookup contra el índice clúster.
+--
+--   * (sucursal, fecha): listado de una sucursal, búsqueda por igualdad + rango.
+--   * (fecha):           listado de todas las sucursales y reportes generales.
+--
+-- Ambos incluyen todas las columnas que leen DatabaseManager, el admin de
+-- escritorio y pdf_reportes.py. Se puede ejecutar más de una vez.
+-- =============================================================================
+
+USE MiPastel;
+GO
+
+IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'idx_fecha_sucursal' AND object_id = OBJECT_ID('dbo.PastelesNormales'))
+    DROP INDEX idx_fecha_sucursal ON dbo.PastelesNormales;
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'idx_normales_sucursal_fecha' AND object_id = OBJECT_ID('dbo.PastelesNormales'))
+    CREATE NONCLUSTERED INDEX idx_normales_sucursal_fecha
+        ON dbo.PastelesNormales (sucursal, fecha)
+        INCLUDE (sabor, tamano, cantidad, precio, total, fecha_entrega, sabor_personalizado, detalles);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'idx_normales_fecha' AND object_id = OBJECT_ID('dbo.PastelesNormales'))
+    CREATE NONCLUSTERED INDEX idx_normales_fecha
+        ON dbo.PastelesNormales (fecha)
+        INCLUDE (sucursal, sabor, tamano, cantidad, precio, total, fecha_entrega, sabor_personalizado, detalles);
+GO
+
+USE MiPastel_Clientes;
+GO
+
+IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'idx_fecha_sucursal_clientes' AND object_id = OBJECT_ID('dbo.PastelesClientes'))
+    DROP INDEX idx_fecha_sucursal_clientes ON dbo.PastelesClientes;
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'idx_clientes_sucursal_fecha' AND object_id = OBJECT_ID('dbo.PastelesClientes'))
+    CREATE NONCLUSTERED INDEX idx_clientes_sucursal_fecha
+        ON dbo.PastelesClientes (sucursal, fecha)
+        INCLUDE (color, sabor, tamano, cantidad, precio, total, fecha_entrega, sabor_personalizado,
+                 foto_path, dedicatoria, detalles);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'idx_clientes_fecha' AND object_id = OBJECT_ID('dbo.PastelesClientes'))
+    CREATE NONCLUSTERED INDEX idx_clientes_fecha
+        ON dbo.PastelesClientes (fecha)
+        INCLUDE (sucursal, color, sabor, tamano, cantidad, precio, total, fecha_entrega, sabor_personalizado,
+                 foto_path, dedicatoria, detalles);
+GO
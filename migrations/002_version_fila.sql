@@ -0,0 +1,63 @@
+-- =============================================================================
+-- Migración 002: columna version_fila (ROWVERSION) en las tablas de pedidos
+--
+-- SQL Server cambia version_fila en cada INSERT y UPDATE de la fila, incluido
+-- el UPDATE que hacen los triggers de total. El admin de escritorio guarda
+-- MIN_ACTIVE_ROWVERSION() al cargar una tabla y, al refrescar, pide solo las
+-- filas con version_fila >= esa marca en lugar de volver a leer el día entero.
+-- Las filas borradas se detectan comparando los ids vigentes del filtro.
+--
+-- Los índices de cobertura de la migración 001 se recrean incluyendo
+-- version_fila para que esa consulta no haga Key Lookups. Cada índice solo
+-- se recrea si ya existe: ejecute 001 antes; si 002 corrió primero, ejecute
+-- 001 y luego 002 otra vez.
+--
+-- Sin esta migración el admin sigue funcionando: detecta que la columna no
+-- existe (COL_LENGTH) y refresca por id más alto visto más los pedidos que
+-- él mismo editó. Se puede ejecutar más de una vez.
+-- =============================================================================
+
+USE MiPastel;
+GO
+
+IF COL_LENGTH('dbo.PastelesNormales', 'version_fila') IS NULL
+    ALTER TABLE dbo.PastelesNormales ADD version_fila ROWVERSION;
+GO
+
+IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'idx_normales_sucursal_fecha' AND object_id = OBJECT_ID('dbo.PastelesNormales'))
+    CREATE NONCLUSTERED INDEX idx_normales_sucursal_fecha
+        ON dbo.PastelesNormales (sucursal, fecha)
+        INCLUDE (sabor, tamano, cantidad, precio, total, fecha_entrega, sabor_personalizado, detalles, version_fila)
+        WITH (DROP_EXISTING = ON);
+GO
+
+IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'idx_normales_fecha' AND object_id = OBJECT_ID('dbo.PastelesNormales'))
+    CREATE NONCLUSTERED INDEX idx_normales_fecha
+        ON dbo.PastelesNormales (fecha)
+        INCLUDE (sucursal, sabor, tamano, cantidad, precio, total, fecha_entrega, sabor_personalizado, detalles,
+                 version_fila)
+        WITH (DROP_EXISTING = ON);
+GO
+
+USE MiPastel_Clientes;
+GO
+
+IF COL_LENGTH('dbo.PastelesClientes', 'version_fila') IS NULL
+    ALTER TABLE dbo.PastelesClientes ADD version_fila ROWVERSION;
+GO
+
+IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'idx_clientes_sucursal_fecha' AND object_id = OBJECT_ID('dbo.PastelesClientes'))
+    CREATE NONCLUSTERED INDEX idx_clientes_sucursal_fecha
+        ON dbo.PastelesClientes (sucursal, fecha)
+        INCLUDE (color, sabor, tamano, cantidad, precio, total, fecha_entrega, sabor_personalizado,
+                 foto_path, dedicatoria, detalles, version_fila)
+        WITH (DROP_EXISTING = ON);
+GO
+
+IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'idx_clientes_fecha' AND object_id = OBJECT_ID('dbo.PastelesClientes'))
+    CREATE NONCLUSTERED INDEX idx_clientes_fecha
+        ON dbo.PastelesClientes (fecha)
+        INCLUDE (sucursal, color, sabor, tamano, cantidad, precio, total, fecha_entrega, sabor_personalizado,
+                 foto_path, dedicatoria, detalles, version_fila)
+        WITH (DROP_EXISTING = ON);
+GO
@@ -2,11 +2,14 @@ from fastapi import APIRouter, Request, HTTPException, Query, Depends, Body
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from datetime import datetime
+import asyncio
 import logging
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 from database import (
+    AsyncDatabaseManager,
     DatabaseManager,
+    run_db,
     obtener_normal_por_id_db,
     obtener_cliente_por_id_db,
     actualizar_pastel_normal_db,
@@ -20,10 +23,15 @@ from config import (
     SUCURSALES
 )
 
+from api.database import CLAVE_CLIENTES, CLAVE_NORMALES, CODIFICADOR_CLIENTES, CODIFICADOR_NORMALES
+from api.versiones import TABLA_CLIENTES, TABLA_NORMALES, cabeceras_etag, coincide_etag, etag_listado, no_modificado
 from auth import requiere_autenticacion, verificar_sesion
+from utils.json_rapido import respuesta_listado
+from utils.pagination import DEFAULT_PAGE_SIZE, fetch_keyset_page
+from utils.static_assets import configurar_plantillas
 
 router = APIRouter(prefix="/admin", tags=["Administración"])
-templates = Jinja2Templates(directory="templates")
+templates = configurar_plantillas(Jinja2Templates(directory="templates"))
 logger = logging.getLogger(__name__)
 
 
@@ -35,7 +43,7 @@ async def vista_admin(
         user_data: dict = Depends(requiere_autenticacion)
 ):
     try:
-        db = DatabaseManager()
+        db = AsyncDatabaseManager(DatabaseManager())
         hoy = datetime.now().date()
         fecha_str = hoy.isoformat()
 
@@ -53,11 +61,11 @@ async def vista_admin(
 
 
 
-        normales = db.obtener_pasteles_normales(fecha_inicio=fecha_inicio_filtro, fecha_fin=fecha_fin_filtro, sucursal=sucursal_filtro)
-
-
-        clientes = db.obtener_pedidos_clientes(fecha_inicio=fecha_inicio_filtro, fecha_fin=fecha_fin_filtro, sucursal=sucursal_filtro)
-        precios = db.obtener_precios()
+        normales, clientes, precios = await asyncio.gather(
+            db.obtener_pasteles_normales(fecha_inicio=fecha_inicio_filtro, fecha_fin=fecha_fin_filtro, sucursal=sucursal_filtro, limite=DEFAULT_PAGE_SIZE),
+            db.obtener_pedidos_clientes(fecha_inicio=fecha_inicio_filtro, fecha_fin=fecha_fin_filtro, sucursal=sucursal_filtro, limite=DEFAULT_PAGE_SIZE),
+            db.obtener_precios()
+        )
 
         return templates.TemplateResponse("admin.html", {
             "request": request,
@@ -86,17 +94,30 @@ async def obtener_normales(
         fecha_inicio: str = Query(None, description="Fecha inicio en formato YYYY-MM-DD"),
         fecha_fin: str = Query(None, description="Fecha fin en formato YYYY-MM-DD"),
         sucursal: str = Query(None, description="Nombre de la sucursal"),
+        limite: int = Query(DEFAULT_PAGE_SIZE, description="Pedidos por página"),
+        cursor: str = Query(None, description="next_cursor de la página anterior"),
+        incluir_total: bool = Query(False, description="Calcular el total de pedidos del periodo"),
         user_data: dict = Depends(requiere_autenticacion)
 ):
     try:
-        db = DatabaseManager()
-
         sucursal_filtro = sucursal
         if user_data["rol"] != "admin" and not sucursal:
             sucursal_filtro = user_data["sucursal"]
 
-        normales = db.obtener_pasteles_normales(fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, sucursal=sucursal_filtro)
-        return {"normales": normales}
+        etag = etag_listado(request, TABLA_NORMALES, sucursal_filtro)
+        if coincide_etag(request, etag):
+            return no_modificado(etag)
+
+        db = AsyncDatabaseManager(DatabaseManager())
+        pagina = await fetch_keyset_page(
+            db.obtener_pasteles_normales_filas, db.contar_pasteles_normales, limite, cursor, incluir_total,
+            key=CLAVE_NORMALES, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, sucursal=sucursal_filtro
+        )
+        respuesta = respuesta_listado("normales", CODIFICADOR_NORMALES, pagina)
+        respuesta.headers.update(cabeceras_etag(etag))
+        return respuesta
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error en /admin/normales: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error al obtener pasteles normales: {str(e)}")
@@ -108,7 +129,7 @@ async def obtener_normal_por_id(
         user_data: dict = Depends(requiere_autenticacion)
 ):
     try:
-        pedido = obtener_normal_por_id_db(pedido_id)
+        pedido = await run_db(obtener_normal_por_id_db, pedido_id)
         if not pedido:
             raise HTTPException(status_code=404, detail="Pedido no encontrado")
 
@@ -130,14 +151,14 @@ async def actualizar_normal(
         user_data: dict = Depends(requiere_autenticacion)
 ):
     try:
-        pedido_actual = obtener_normal_por_id_db(pedido_id)
+        pedido_actual = await run_db(obtener_normal_por_id_db, pedido_id)
         if not pedido_actual:
             raise HTTPException(status_code=404, detail="Pedido no encontrado")
 
         if user_data["rol"] != "admin" and pedido_actual.get("sucursal") != user_data["sucursal"]:
             raise HTTPException(status_code=403, detail="No autorizado")
 
-        actualizar_pastel_normal_db(pedido_id, pedido_data)
+        await run_db(actualizar_pastel_normal_db, pedido_id, pedido_data)
         return {"message": "Pedido actualizado correctamente"}
     except HTTPException:
         raise
@@ -152,15 +173,15 @@ async def eliminar_normal(
         user_data: dict = Depends(requiere_autenticacion)
 ):
     try:
-        pedido = obtener_normal_por_id_db(pedido_id)
+        pedido = await run_db(obtener_normal_por_id_db, pedido_id)
         if not pedido:
             raise HTTPException(status_code=404, detail="Pedido no encontrado")
 
         if user_data["rol"] != "admin" and pedido.get("sucursal") != user_data["sucursal"]:
             raise HTTPException(status_code=403, detail="No autorizado")
 
-        db = DatabaseManager()
-        if db.eliminar_pastel_normal(pedido_id):
+        db = AsyncDatabaseManager(DatabaseManager())
+        if await db.eliminar_pastel_normal(pedido_id):
             return {"message": f"Pedido #{pedido_id} eliminado correctamente"}
 
         raise HTTPException(status_code=500, detail="Error al eliminar")
@@ -177,17 +198,30 @@ async def obtener_clientes(
         fecha_inicio: str = Query(None, description="Fecha inicio en formato YYYY-MM-DD"),
         fecha_fin: str = Query(None, description="Fecha fin en formato YYYY-MM-DD"),
         sucursal: str = Query(None, description="Nombre de la sucursal"),
+        limite: int = Query(DEFAULT_PAGE_SIZE, description="Pedidos por página"),
+        cursor: str = Query(None, description="next_cursor de la página anterior"),
+        incluir_total: bool = Query(False, description="Calcular el total de pedidos del periodo"),
         user_data: dict = Depends(requiere_autenticacion)
 ):
     try:
-        db = DatabaseManager()
-
         sucursal_filtro = sucursal
         if user_data["rol"] != "admin" and not sucursal:
             sucursal_filtro = user_data["sucursal"]
 
-        clientes = db.obtener_pedidos_clientes(fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, sucursal=sucursal_filtro)
-        return {"clientes": clientes}
+        etag = etag_listado(request, TABLA_CLIENTES, sucursal_filtro)
+        if coincide_etag(request, etag):
+            return no_modificado(etag)
+
+        db = AsyncDatabaseManager(DatabaseManager())
+        pagina = await fetch_keyset_page(
+            db.obtener_pedidos_clientes_filas, db.contar_pedidos_clientes, limite, cursor, incluir_total,
+            key=CLAVE_CLIENTES, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, sucursal=sucursal_filtro
+        )
+        respuesta = respuesta_listado("clientes", CODIFICADOR_CLIENTES, pagina)
+        respuesta.headers.update(cabeceras_etag(etag))
+        return respuesta
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error en /admin/clientes: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error al obtener pedidos de clientes: {str(e)}")
@@ -199,7 +233,7 @@ async def obtener_cliente_por_id(
         user_data: dict = Depends(requiere_autenticacion)
 ):
     try:
-        pedido = obtener_cliente_por_id_db(pedido_id)
+        pedido = await run_db(obtener_cliente_por_id_db, pedido_id)
         if not pedido:
             raise HTTPException(status_code=404, detail="Pedido no encontrado")
 
@@ -221,14 +255,14 @@ async def actualizar_cliente(
         user_data: dict = Depends(requiere_autenticacion)
 ):
     try:
-        pedido_actual = obtener_cliente_por_id_db(pedido_id)
+        pedido_actual = await run_db(obtener_cliente_por_id_db, pedido_id)
         if not pedido_actual:
             raise HTTPException(status_code=404, detail="Pedido no encontrado")
 
         if user_data["rol"] != "admin" and pedido_actual.get("sucursal") != user_data["sucursal"]:
             raise HTTPException(status_code=403, detail="No autorizado")
 
-        actualizar_pedido_cliente_db(pedido_id, pedido_data)
+        await run_db(actualizar_pedido_cliente_db, pedido_id, pedido_data)
         return {"message": "Pedido actualizado correctamente"}
     except HTTPException:
         raise
@@ -243,15 +277,15 @@ async def eliminar_cliente(
         user_data: dict = Depends(requiere_autenticacion)
 ):
     try:
-        pedido = obtener_cliente_por_id_db(pedido_id)
+        pedido = await run_db(obtener_cliente_por_id_db, pedido_id)
         if not pedido:
             raise HTTPException(status_code=404, detail="Pedido no encontrado")
 
         if user_data["rol"] != "admin" and pedido.get("sucursal") != user_data["sucursal"]:
             raise HTTPException(status_code=403, detail="No autorizado")
 
-        db = DatabaseManager()
-        if db.eliminar_pedido_cliente(pedido_id):
+        db = AsyncDatabaseManager(DatabaseManager())
+        if await db.eliminar_pedido_cliente(pedido_id):
             return {"message": f"Pedido #{pedido_id} eliminado correctamente"}
 
         raise HTTPException(status_code=500, detail="Error al eliminar")
@@ -268,8 +302,8 @@ async def obtener_precios(
         user_data: dict = Depends(requiere_autenticacion)
 ):
     try:
-        db = DatabaseManager()
-        precios = db.obtener_precios()
+        db = AsyncDatabaseManager(DatabaseManager())
+        precios = await db.obtener_precios()
         return {"precios": precios}
     except Exception as e:
         logger.error(f"Error en /admin/precios: {e}", exc_info=True)
@@ -278,25 +312,30 @@ async def obtener_precios(
 
 @router.post("/precios/actualizar")
 async def actualizar_precios(
-        precios_data: list,
+        precios_data: List[Dict[str, Any]] = Body(...),
         user_data: dict = Depends(requiere_autenticacion)
 ):
+    """Guarda solo los precios que cambiaron y devuelve la nueva versión del catálogo."""
     try:
         if user_data["rol"] != "admin":
             raise HTTPException(status_code=403, detail="Solo administradores pueden actualizar precios")
 
-        db = DatabaseManager()
+        db = AsyncDatabaseManager(DatabaseManager())
 
         for precio in precios_data:
             if not all(k in precio for k in ("id", "precio")):
                 raise HTTPException(status_code=400, detail="Datos de precios incompletos")
 
-        resultado = db.actualizar_precios(precios_data)
-
-        if resultado:
-            return {"message": "Precios actualizados correctamente", "actualizados": len(precios_data)}
+        try:
+            resultado = await db.actualizar_precios(precios_data)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-        raise HTTPException(status_code=500, detail="Error al actualizar precios")
+        return {
+            "message": "Precios actualizados correctamente" if resultado["actualizados"] else "No hubo cambios",
+            "actualizados": resultado["actualizados"],
+            "version": resultado["version"],
+        }
 
     except HTTPException:
         raise
@@ -308,22 +347,58 @@ async def actualizar_precios(
 @router.get("/estadisticas")
 async def obtener_estadisticas(
         fecha: str = Query(None, description="YYYY-MM-DD"),
+        fecha_inicio: str = Query(None, description="Fecha inicio en formato YYYY-MM-DD"),
+        fecha_fin: str = Query(None, description="Fecha fin en formato YYYY-MM-DD"),
+        sucursal: str = Query(None, description="Nombre de la sucursal"),
         user_data: dict = Depends(requiere_autenticacion)
 ):
     try:
-        db = DatabaseManager()
-        estadisticas = db.obtener_estadisticas(fecha_inicio=fecha)
+        db = AsyncDatabaseManager(DatabaseManager())
+
+        sucursal_filtro = sucursal if user_data["rol"] == "admin" else user_data["sucursal"]
+
+        estadisticas = await db.obtener_estadisticas(
+            fecha_inicio=fecha_inicio or fecha,
+            fecha_fin=fecha_fin,
+            sucursal=sucursal_filtro
+        )
         return {"estadisticas": estadisticas}
     except Exception as e:
         logger.error(f"Error obteniendo estadísticas: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error al obtener estadísticas: {str(e)}")
 
 
+@router.get("/produccion")
+async def obtener_produccion(
+        fecha_inicio: str = Query(None, description="Fecha inicio en formato YYYY-MM-DD"),
+        fecha_fin: str = Query(None, description="Fecha fin en formato YYYY-MM-DD"),
+        sucursal: str = Query(None, description="Nombre de la sucursal"),
+        user_data: dict = Depends(requiere_autenticacion)
+):
+    """Matriz producto × sucursal de la hoja de producción, la misma que se imprime en el PDF."""
+    try:
+        db = AsyncDatabaseManager(DatabaseManager())
+
+        sucursal_filtro = sucursal if user_data["rol"] == "admin" else user_data["sucursal"]
+
+        produccion = await db.obtener_matriz_produccion(
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            sucursal=sucursal_filtro
+        )
+        return {"produccion": produccion}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Fecha inválida: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error obteniendo producción: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error al obtener producción: {str(e)}")
+
+
 @router.get("/health")
 async def health_check():
     try:
-        db = DatabaseManager()
-        precios = db.obtener_precios()
+        db = AsyncDatabaseManager(DatabaseManager())
+        precios = await db.obtener_precios()
 
         return {
             "status": "healthy",
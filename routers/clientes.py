@@ -8,24 +8,20 @@ from fastapi.templating import Jinja2Templates
 
 from api.auth import requiere_autenticacion, requiere_permiso_sucursal
 from config import SABORES_CLIENTES, TAMANOS_CLIENTES, SUCURSALES
-from database import DatabaseManager, obtener_precio_db
+from database import AsyncDatabaseManager, DatabaseManager, obtener_precio_db, run_db
+from utils.uploads import ArchivoDemasiadoGrande, ImagenInvalida, extension_permitida, guardar_foto
+from utils.static_assets import configurar_plantillas
 
 router = APIRouter(prefix="/clientes", tags=["Pedidos de Clientes"])
 logger = logging.getLogger(__name__)
-templates = Jinja2Templates(directory="templates")
+templates = configurar_plantillas(Jinja2Templates(directory="templates"))
 
 UPLOAD_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "static", "uploads"))
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp'}
-MAX_FILE_SIZE = 5 * 1024 * 1024
-
 
 def validar_imagen(file: UploadFile) -> bool:
-    if not file or not file.filename:
-        return False
-    ext = os.path.splitext(file.filename)[1].lower()
-    return ext in ALLOWED_EXTENSIONS
+    return bool(file) and extension_permitida(file.filename)
 
 
 @router.get("/formulario")
@@ -75,6 +71,7 @@ async def registrar_pedido_cliente(
     Requires authentication and branch permission.
     Users can only register orders for their assigned branch (except admins).
     """
+    foto_guardada = None
     try:
         # Verificar permiso de sucursal
         requiere_permiso_sucursal(user_data, sucursal)
@@ -88,21 +85,10 @@ async def registrar_pedido_cliente(
             except ValueError:
                 raise HTTPException(status_code=400, detail="Formato de fecha inválido (use YYYY-MM-DD)")
 
-        db = DatabaseManager()
-        foto_path = None
-
-        # Procesar foto si existe
-        if foto and foto.filename:
-            if not validar_imagen(foto):
-                raise HTTPException(status_code=400, detail="Formato de imagen no permitido")
-            extension = os.path.splitext(foto.filename)[1]
-            filename = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{sabor}{extension}"
-            file_location = os.path.join(UPLOAD_DIR, filename)
+        db = AsyncDatabaseManager(DatabaseManager())
 
-            # Guardar archivo
-            with open(file_location, "wb") as f:
-                f.write(await foto.read())
-            foto_path = file_location
+        if foto and foto.filename and not validar_imagen(foto):
+            raise HTTPException(status_code=400, detail="Formato de imagen no permitido")
 
         # Determinar sabor real
         sabor_real = sabor_personalizado if sabor_personalizado else sabor
@@ -112,7 +98,7 @@ async def registrar_pedido_cliente(
             precio_unitario = precio
             logger.info(f"Usando precio del cliente: Q{precio_unitario:.2f}")
         else:
-            precio_unitario = obtener_precio_db(sabor_real, tamano)
+            precio_unitario = await run_db(obtener_precio_db, sabor_real, tamano)
             logger.info(f"Obtenido precio de base de datos: Q{precio_unitario:.2f}")
 
         if precio_unitario <= 0 and not es_otro:
@@ -120,6 +106,10 @@ async def registrar_pedido_cliente(
 
         precio_total = precio_unitario * cantidad
 
+        # Procesar foto si existe: se guarda por bloques, nombrada por su contenido
+        if foto and foto.filename:
+            foto_guardada = await guardar_foto(foto, UPLOAD_DIR)
+
         # Preparar datos del pedido
         pedido_data = {
             "sabor": sabor_real,
@@ -132,11 +122,11 @@ async def registrar_pedido_cliente(
             "dedicatoria": dedicatoria,
             "detalles": detalles,
             "sabor_personalizado": sabor_personalizado or '',
-            "foto_path": foto_path
+            "foto_path": foto_guardada.url if foto_guardada else None
         }
 
         # Registrar en base de datos
-        resultado = db.registrar_pedido_cliente(pedido_data)
+        resultado = await db.registrar_pedido_cliente(pedido_data)
 
         if resultado:
             logger.info(
@@ -168,6 +158,10 @@ async def registrar_pedido_cliente(
 
     except HTTPException:
         raise
+    except ArchivoDemasiadoGrande as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ImagenInvalida as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error en /clientes/registrar: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error al registrar pedido de cliente: {str(e)}")
\ No newline at end of file
@@ -9,11 +9,12 @@ from api.auth import requiere_autenticacion, requiere_permiso_sucursal
 from config import (
     SABORES_NORMALES, TAMANOS_NORMALES, SUCURSALES
 )
-from database import DatabaseManager, obtener_precio_db
+from database import AsyncDatabaseManager, DatabaseManager, obtener_precio_db, run_db
+from utils.static_assets import configurar_plantillas
 
 router = APIRouter(prefix="/normales", tags=["Pasteles Normales"])
 logger = logging.getLogger(__name__)
-templates = Jinja2Templates(directory="templates")
+templates = configurar_plantillas(Jinja2Templates(directory="templates"))
 
 
 @router.get("/formulario")
@@ -74,7 +75,7 @@ async def registrar_pedido_normal(
             precio_unitario = precio
             logger.info(f"Usando precio del cliente: Q{precio_unitario:.2f}")
         else:
-            precio_unitario = obtener_precio_db(sabor, tamano)
+            precio_unitario = await run_db(obtener_precio_db, sabor, tamano)
             logger.info(f"Obtenido precio de base de datos: Q{precio_unitario:.2f}")
 
         if precio_unitario <= 0 and not es_otro:
@@ -104,8 +105,8 @@ async def registrar_pedido_normal(
             'fecha_entrega': fecha_entrega
         }
 
-        db = DatabaseManager()
-        resultado = db.registrar_pastel_normal(pastel_data)
+        db = AsyncDatabaseManager(DatabaseManager())
+        resultado = await db.registrar_pastel_normal(pastel_data)
 
         if resultado:
             logger.info(
@@ -1,11 +1,36 @@
+import asyncio
 import logging
 import os
-import shutil
 from datetime import datetime, date
 from pathlib import Path
-from typing import Optional
-
-from fastapi import APIRouter, Request, Form, HTTPException, UploadFile, File
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Request, Response, Form, HTTPException, UploadFile, File, Body, Query
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+from api.auth import requiere_permiso_sucursal
+from api.catalogo_precios import catalogo_precios
+from api.eventos import difusor_eventos, formatear_evento
+from api.versiones import TABLA_CLIENTES, TABLA_NORMALES, cabeceras_etag, coincide_etag, etag_listado, no_modificado
+from auth import verificar_sesion
+from config import TAMANOS_NORMALES
+from config.settings import settings
+from database import (
+    AsyncDatabaseManager,
+    DatabaseManager,
+    run_db,
+    obtener_normal_por_id_db,
+    obtener_cliente_por_id_db,
+    actualizar_pastel_normal_db,
+    actualizar_pedido_cliente_db,
+    eliminar_normal_db,
+    eliminar_cliente_db
+)
+from utils.audit import log_pedido_normal_created, log_pedido_cliente_created
+from utils.pagination import DEFAULT_PAGE_SIZE, fetch_keyset_page
+from utils.uploads import ArchivoDemasiadoGrande, ImagenInvalida, guardar_foto
+from utils.validators import ValidarPedidoNormal, ValidarPedidoCliente
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +40,8 @@ BASE_DIR = Path(__file__).parent.parent.absolute()
 STATIC_UPLOADS = BASE_DIR / "static" / "uploads"
 os.makedirs(STATIC_UPLOADS, exist_ok=True)
 
+LOTE_MAX_PEDIDOS = 200
+
 
 def parse_fecha_entrega(fecha_str):
     if not fecha_str:
@@ -35,29 +62,36 @@ def parse_fecha_entrega(fecha_str):
 @router.get("/normales")
 async def get_pedidos_normales(
         request: Request,
+        response: Response,
         fecha_inicio: Optional[str] = None,
-        fecha_fin: Optional[str] = None
+        fecha_fin: Optional[str] = None,
+        limite: int = Query(DEFAULT_PAGE_SIZE, description="Pedidos por página"),
+        cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+        incluir_total: bool = Query(False, description="Calcular el total de pedidos del periodo")
 ):
-    from auth import verificar_sesion
-
     user_data = verificar_sesion(request)
     if not user_data:
         raise HTTPException(status_code=401, detail="No autenticado")
 
+    etag = etag_listado(request, TABLA_NORMALES, user_data['sucursal'])
+    if coincide_etag(request, etag):
+        return no_modificado(etag)
+
     try:
-        from database import DatabaseManager
-        db = DatabaseManager()
+        db = AsyncDatabaseManager(DatabaseManager())
 
         if not fecha_inicio:
             fecha_inicio = date.today().isoformat()
         if not fecha_fin:
             fecha_fin = fecha_inicio
 
-        pedidos = db.obtener_pasteles_normales(
+        pagina = await fetch_keyset_page(
+            db.obtener_pasteles_normales, db.contar_pasteles_normales, limite, cursor, incluir_total,
             fecha_inicio=fecha_inicio,
             fecha_fin=fecha_fin,
             sucursal=user_data['sucursal']
         )
+        pedidos = pagina.pop("items")
 
         hoy = date.today()
         for pedido in pedidos:
@@ -67,7 +101,10 @@ async def get_pedidos_normales(
             if fecha_entrega:
                 pedido['fecha_entrega'] = fecha_entrega.isoformat()
 
-        return {"pedidos": pedidos}
+        response.headers.update(cabeceras_etag(etag))
+        return {"pedidos": pedidos, **pagina}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching normal orders: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -76,29 +113,36 @@ async def get_pedidos_normales(
 @router.get("/clientes")
 async def get_pedidos_clientes(
         request: Request,
+        response: Response,
         fecha_inicio: Optional[str] = None,
-        fecha_fin: Optional[str] = None
+        fecha_fin: Optional[str] = None,
+        limite: int = Query(DEFAULT_PAGE_SIZE, description="Pedidos por página"),
+        cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+        incluir_total: bool = Query(False, description="Calcular el total de pedidos del periodo")
 ):
-    from auth import verificar_sesion
-
     user_data = verificar_sesion(request)
     if not user_data:
         raise HTTPException(status_code=401, detail="No autenticado")
 
+    etag = etag_listado(request, TABLA_CLIENTES, user_data['sucursal'])
+    if coincide_etag(request, etag):
+        return no_modificado(etag)
+
     try:
-        from database import DatabaseManager
-        db = DatabaseManager()
+        db = AsyncDatabaseManager(DatabaseManager())
 
         if not fecha_inicio:
             fecha_inicio = date.today().isoformat()
         if not fecha_fin:
             fecha_fin = fecha_inicio
 
-        pedidos = db.obtener_pedidos_clientes(
+        pagina = await fetch_keyset_page(
+            db.obtener_pedidos_clientes, db.contar_pedidos_clientes, limite, cursor, incluir_total,
             fecha_inicio=fecha_inicio,
             fecha_fin=fecha_fin,
             sucursal=user_data['sucursal']
         )
+        pedidos = pagina.pop("items")
 
         hoy = date.today()
         for pedido in pedidos:
@@ -107,12 +151,49 @@ async def get_pedidos_clientes(
             if fecha_entrega:
                 pedido['fecha_entrega'] = fecha_entrega.isoformat()
 
-        return {"pedidos": pedidos}
+        response.headers.update(cabeceras_etag(etag))
+        return {"pedidos": pedidos, **pagina}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching client orders: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def flujo_eventos(sucursal: Optional[str]):
+    """Cuerpo text/event-stream de una suscripción; un comentario cada tanto mantiene viva la conexión."""
+    suscripcion = difusor_eventos.suscribir(sucursal)
+    try:
+        yield b"retry: %d\n\n" % settings.EVENTS_RETRY_MS
+        while True:
+            evento = await suscripcion.siguiente(settings.EVENTS_HEARTBEAT_SECONDS)
+            yield formatear_evento(evento) if evento else b": latido\n\n"
+    finally:
+        difusor_eventos.cancelar(suscripcion)
+
+
+@router.get("/eventos")
+async def eventos_pedidos(request: Request):
+    """
+    Altas, ediciones y bajas de pedidos en vivo (Server-Sent Events).
+
+    Cada evento "pedido" trae tipo ("normal" | "cliente"), accion ("creado" |
+    "actualizado" | "eliminado"), pedido_id, sucursal y los campos del pedido.
+    Los usuarios de sucursal sólo reciben los de su sucursal. Un evento
+    "recargar" pide volver a cargar el listado completo.
+    """
+    user_data = verificar_sesion(request)
+    if not user_data:
+        raise HTTPException(status_code=401, detail="No autenticado")
+
+    sucursal = None if user_data.get("rol") == "admin" else user_data.get("sucursal")
+    return StreamingResponse(
+        flujo_eventos(sucursal),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/registrar")
 async def registrar_pedido(
         request: Request,
@@ -131,8 +212,6 @@ async def registrar_pedido(
 
     REQUIERE AUTENTICACIÓN Y PERMISO DE SUCURSAL.
     """
-    from auth import verificar_sesion
-
     user_data = verificar_sesion(request)
     if not user_data:
         raise HTTPException(status_code=401, detail="No autenticado")
@@ -170,27 +249,21 @@ async def registrar_pedido(
             "sabor_personalizado": None
         }
 
-        # Guardar archivo foto (si viene) y devolver ruta relativa
-        foto_path = None
+        # Guardar foto (si viene) por bloques, nombrada por su contenido
         if foto and foto.filename:
-            filename = f"{int(datetime.now().timestamp())}_{os.path.basename(foto.filename)}"
-            destino = STATIC_UPLOADS / filename
-            with destino.open("wb") as f:
-                shutil.copyfileobj(foto.file, f)
-            foto_path = f"/static/uploads/{filename}"
-            pedido_data["foto_path"] = foto_path
+            foto_guardada = await guardar_foto(foto, STATIC_UPLOADS)
+            pedido_data["foto_path"] = foto_guardada.url
 
-        from database import DatabaseManager
-        db = DatabaseManager()
+        db = AsyncDatabaseManager(DatabaseManager())
 
         if tipo == "normal":
             try:
-                precio = db.obtener_precio_por_sabor_tamano(sabor.strip(), tamano.strip())
+                precio = await db.obtener_precio_por_sabor_tamano(sabor.strip(), tamano.strip())
                 pedido_data["precio"] = float(precio) if precio else 0
             except Exception:
                 pedido_data["precio"] = 0
 
-            new_id = db.insertar_pastel_normal(pedido_data)
+            new_id = await db.insertar_pastel_normal(pedido_data)
 
             # Auditoría
             try:
@@ -212,12 +285,12 @@ async def registrar_pedido(
             pedido_data["dedicatoria"] = dedicatoria.strip() if dedicatoria else None
 
             try:
-                precio = db.obtener_precio_por_sabor_tamano(sabor.strip(), tamano.strip())
+                precio = await db.obtener_precio_por_sabor_tamano(sabor.strip(), tamano.strip())
                 pedido_data["precio"] = float(precio) if precio else 0
             except Exception:
                 pedido_data["precio"] = 0
 
-            new_id = db.insertar_pedido_cliente(pedido_data)
+            new_id = await db.insertar_pedido_cliente(pedido_data)
 
             # Auditoría
             try:
@@ -236,19 +309,179 @@ async def registrar_pedido(
 
     except HTTPException:
         raise
+    except ArchivoDemasiadoGrande as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ImagenInvalida as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error registering order: {e}", exc_info=True)
-        # Si ocurrió un fallo guardando la foto, intenta limpiar el archivo
-        try:
-            if foto_path:
-                fp = STATIC_UPLOADS / Path(foto_path).name
-                if fp.exists():
-                    fp.unlink()
-        except Exception:
-            pass
         raise HTTPException(status_code=500, detail=f"Error al registrar pedido: {str(e)}")
 
 
+def _mensaje_validacion(error: ValidationError) -> str:
+    detalle = error.errors()[0]
+    campo = ".".join(str(parte) for parte in detalle.get("loc", ()))
+    return f"{campo}: {detalle.get('msg')}" if campo else detalle.get("msg", str(error))
+
+
+def _tiene_precio(item: Any) -> bool:
+    try:
+        return isinstance(item, dict) and float(item.get("precio") or 0) > 0
+    except (TypeError, ValueError):
+        return False
+
+
+def _preparar_pedido_lote(tipo: str, item: Dict[str, Any], user_data: dict, precios, hoy: date) -> Dict[str, Any]:
+    """Valida un pedido del carrito y devuelve los datos listos para insertar."""
+    if not isinstance(item, dict):
+        raise ValueError("Formato de pedido inválido")
+
+    sucursal = item.get("sucursal") or user_data.get("sucursal")
+    if not sucursal:
+        raise ValueError("Usuario sin sucursal asignada")
+    requiere_permiso_sucursal(user_data, sucursal)
+
+    tamano = (item.get("tamano") or "").strip()
+    if tipo == "normal" and tamano not in TAMANOS_NORMALES:
+        raise ValueError("Tamaño inválido")
+
+    fecha_entrega = item.get("fecha_entrega")
+    if fecha_entrega or tipo == "normal":
+        fecha_obj = parse_fecha_entrega(fecha_entrega)
+        if not fecha_obj:
+            raise ValueError("Formato de fecha inválido (use YYYY-MM-DD)")
+        if fecha_obj < hoy:
+            raise ValueError("La fecha de entrega no puede ser anterior a hoy")
+        fecha_entrega = fecha_obj.isoformat()
+
+    sabor_personalizado = (item.get("sabor_personalizado") or "").strip()
+    sabor = sabor_personalizado or (item.get("sabor") or "").strip()
+
+    try:
+        precio = float(item.get("precio") or 0)
+    except (TypeError, ValueError):
+        raise ValueError("Precio inválido")
+    if precio <= 0 and not item.get("es_otro"):
+        precio = precios.precio(sabor, tamano)
+        if precio <= 0:
+            raise ValueError(f"No se encontró precio para {sabor} {tamano}")
+
+    datos = {
+        "sabor": sabor,
+        "tamano": tamano,
+        "cantidad": item.get("cantidad"),
+        "precio": precio,
+        "sucursal": sucursal,
+        "fecha_entrega": fecha_entrega,
+        "detalles": item.get("detalles") or "",
+        "sabor_personalizado": sabor_personalizado,
+    }
+
+    if tipo == "normal":
+        validado = ValidarPedidoNormal(**datos)
+    else:
+        datos.update({
+            "color": item.get("color") or None,
+            "dedicatoria": item.get("dedicatoria") or None,
+        })
+        validado = ValidarPedidoCliente(**datos)
+
+    return validado.model_dump()
+
+
+@router.post("/lote")
+async def registrar_lote(
+        request: Request,
+        lote: Dict[str, Any] = Body(...)
+):
+    """
+    Registrar todos los pedidos del carrito en una sola petición.
+
+    Cada pedido se valida por separado: los inválidos se devuelven en
+    ``errores`` con su índice y el resto se inserta en una transacción
+    por base de datos.
+    """
+    user_data = verificar_sesion(request)
+    if not user_data:
+        raise HTTPException(status_code=401, detail="No autenticado")
+
+    normales = lote.get("normales") or []
+    clientes = lote.get("clientes") or []
+    if not isinstance(normales, list) or not isinstance(clientes, list):
+        raise HTTPException(status_code=400, detail="'normales' y 'clientes' deben ser listas")
+    if not normales and not clientes:
+        raise HTTPException(status_code=400, detail="No hay pedidos para registrar")
+    if len(normales) + len(clientes) > LOTE_MAX_PEDIDOS:
+        raise HTTPException(status_code=400, detail=f"Máximo {LOTE_MAX_PEDIDOS} pedidos por lote")
+
+    try:
+        precios = catalogo_precios.instantanea_vigente()
+        if precios is None and not all(_tiene_precio(item) for item in normales + clientes):
+            precios = await run_db(catalogo_precios.instantanea)
+        hoy = date.today()
+        errores = []
+        validos = {"normal": [], "cliente": []}
+
+        for tipo, items in (("normal", normales), ("cliente", clientes)):
+            for indice, item in enumerate(items):
+                try:
+                    validos[tipo].append((indice, _preparar_pedido_lote(tipo, item, user_data, precios, hoy)))
+                except HTTPException as e:
+                    errores.append({"tipo": tipo, "indice": indice, "error": e.detail})
+                except ValidationError as e:
+                    errores.append({"tipo": tipo, "indice": indice, "error": _mensaje_validacion(e)})
+                except ValueError as e:
+                    errores.append({"tipo": tipo, "indice": indice, "error": str(e)})
+
+        db = AsyncDatabaseManager(DatabaseManager())
+        resultados = await asyncio.gather(
+            db.registrar_pasteles_normales_lote([datos for _, datos in validos["normal"]]),
+            db.registrar_pedidos_clientes_lote([datos for _, datos in validos["cliente"]]),
+            return_exceptions=True
+        )
+
+        registrados = {"normal": [], "cliente": []}
+        for tipo, resultado in zip(("normal", "cliente"), resultados):
+            if isinstance(resultado, Exception):
+                logger.error(f"Error registering {tipo} batch: {resultado}")
+                errores.extend(
+                    {"tipo": tipo, "indice": indice, "error": str(resultado)}
+                    for indice, _ in validos[tipo]
+                )
+                continue
+
+            for (indice, datos), nuevo_id in zip(validos[tipo], resultado):
+                registrados[tipo].append({"indice": indice, "id": nuevo_id})
+                try:
+                    log_creado = log_pedido_normal_created if tipo == "normal" else log_pedido_cliente_created
+                    log_creado(
+                        username=user_data['username'],
+                        pedido_id=nuevo_id,
+                        sucursal=datos["sucursal"],
+                        sabor=datos["sabor"],
+                        tamano=datos["tamano"]
+                    )
+                except Exception as audit_error:
+                    logger.warning(f"Error al registrar auditoría: {audit_error}")
+
+        total = len(registrados["normal"]) + len(registrados["cliente"])
+        logger.info(f"Batch by {user_data['username']}: {total} registered, {len(errores)} rejected")
+
+        return {
+            "success": not errores,
+            "registrados": total,
+            "normales": registrados["normal"],
+            "clientes": registrados["cliente"],
+            "errores": errores
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error registering batch: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error al registrar pedidos: {str(e)}")
+
+
 @router.put("/normal/{pedido_id}")
 async def actualizar_pedido_normal(
         request: Request,
@@ -257,17 +490,12 @@ async def actualizar_pedido_normal(
         fecha_entrega: str = Form(...),
         detalles: Optional[str] = Form(None)
 ):
-    from auth import verificar_sesion
-
     user_data = verificar_sesion(request)
     if not user_data:
         raise HTTPException(status_code=401, detail="No autenticado")
 
     try:
-        from database import obtener_normal_por_id_db, actualizar_pastel_normal_db
-        from api.auth import requiere_permiso_sucursal
-
-        pedido = obtener_normal_por_id_db(pedido_id)
+        pedido = await run_db(obtener_normal_por_id_db, pedido_id)
         if not pedido:
             raise HTTPException(status_code=404, detail="Pedido no encontrado")
 
@@ -278,7 +506,7 @@ async def actualizar_pedido_normal(
         if fecha_entrega_obj < date.today():
             raise HTTPException(status_code=400, detail="No se pueden editar pedidos con fecha de entrega pasada")
 
-        actualizar_pastel_normal_db(pedido_id, {
+        await run_db(actualizar_pastel_normal_db, pedido_id, {
             'sabor': pedido.get('sabor'),
             'tamano': pedido.get('tamano'),
             'cantidad': cantidad,
@@ -321,17 +549,12 @@ async def actualizar_pedido_cliente(
         dedicatoria: Optional[str] = Form(None),
         detalles: Optional[str] = Form(None)
 ):
-    from auth import verificar_sesion
-
     user_data = verificar_sesion(request)
     if not user_data:
         raise HTTPException(status_code=401, detail="No autenticado")
 
     try:
-        from database import obtener_cliente_por_id_db, actualizar_pedido_cliente_db
-        from api.auth import requiere_permiso_sucursal
-
-        pedido = obtener_cliente_por_id_db(pedido_id)
+        pedido = await run_db(obtener_cliente_por_id_db, pedido_id)
         if not pedido:
             raise HTTPException(status_code=404, detail="Pedido no encontrado")
 
@@ -342,7 +565,7 @@ async def actualizar_pedido_cliente(
         if fecha_entrega_obj < date.today():
             raise HTTPException(status_code=400, detail="No se pueden editar pedidos con fecha de entrega pasada")
 
-        actualizar_pedido_cliente_db(pedido_id, {
+        await run_db(actualizar_pedido_cliente_db, pedido_id, {
             'color': color or pedido.get('color'),
             'sabor': pedido.get('sabor'),
             'tamano': pedido.get('tamano'),
@@ -380,17 +603,12 @@ async def actualizar_pedido_cliente(
 
 @router.delete("/normal/{pedido_id}")
 async def eliminar_pedido_normal(request: Request, pedido_id: int):
-    from auth import verificar_sesion
-
     user_data = verificar_sesion(request)
     if not user_data:
         raise HTTPException(status_code=401, detail="No autenticado")
 
     try:
-        from database import obtener_normal_por_id_db, eliminar_normal_db
-        from api.auth import requiere_permiso_sucursal
-
-        pedido = obtener_normal_por_id_db(pedido_id)
+        pedido = await run_db(obtener_normal_por_id_db, pedido_id)
         if not pedido:
             raise HTTPException(status_code=404, detail="Pedido no encontrado")
 
@@ -401,7 +619,7 @@ async def eliminar_pedido_normal(request: Request, pedido_id: int):
         if fecha_entrega and fecha_entrega < date.today():
             raise HTTPException(status_code=400, detail="No se pueden eliminar pedidos con fecha de entrega pasada")
 
-        eliminar_normal_db(pedido_id)
+        await run_db(eliminar_normal_db, pedido_id)
 
         # Auditoría
         try:
@@ -427,17 +645,12 @@ async def eliminar_pedido_normal(request: Request, pedido_id: int):
 
 @router.delete("/cliente/{pedido_id}")
 async def eliminar_pedido_cliente(request: Request, pedido_id: int):
-    from auth import verificar_sesion
-
     user_data = verificar_sesion(request)
     if not user_data:
         raise HTTPException(status_code=401, detail="No autenticado")
 
     try:
-        from database import obtener_cliente_por_id_db, eliminar_cliente_db
-        from api.auth import requiere_permiso_sucursal
-
-        pedido = obtener_cliente_por_id_db(pedido_id)
+        pedido = await run_db(obtener_cliente_por_id_db, pedido_id)
         if not pedido:
             raise HTTPException(status_code=404, detail="Pedido no encontrado")
 
@@ -448,7 +661,7 @@ async def eliminar_pedido_cliente(request: Request, pedido_id: int):
         if fecha_entrega and fecha_entrega < date.today():
             raise HTTPException(status_code=400, detail="No se pueden eliminar pedidos con fecha de entrega pasada")
 
-        eliminar_cliente_db(pedido_id)
+        await run_db(eliminar_cliente_db, pedido_id)
 
         # Auditoría
         try:
@@ -1,3 +1,4 @@
+import multiprocessing
 import sys
 import os
 import subprocess
@@ -241,4 +242,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Los reportes del admin se generan en procesos spawn; necesario en el ejecutable empaquetado
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -210,6 +210,30 @@ function actualizarVista() {
     });
 }
 
+function datosParaLote(pedido) {
+    return { ...pedido, sucursal: SUCURSAL };
+}
+
+// Antes de registrar confirma la versión del catálogo con un solo pedido;
+// si cambió, vuelve a poner precio a los pedidos del carrito. Devuelve true si alguno cambió.
+async function actualizarPreciosCarrito() {
+    const conCatalogo = [...cartaNormales, ...cartaClientes].filter(p => !p.es_otro);
+    if (conCatalogo.length === 0) return false;
+
+    if (!await revalidarPrecios(conCatalogo[0].sabor, conCatalogo[0].tamano)) return false;
+
+    let cambiaron = false;
+    for (const pedido of conCatalogo) {
+        const data = await obtenerPrecio(pedido.sabor, pedido.tamano);
+        if (data.encontrado && data.precio > 0 && data.precio !== pedido.precio) {
+            pedido.precio = data.precio;
+            cambiaron = true;
+        }
+    }
+    if (cambiaron) actualizarVista();
+    return cambiaron;
+}
+
 async function registrarTodos() {
     console.log('=== INICIANDO REGISTRO DE TODOS LOS PEDIDOS ===');
     console.log('Normales a registrar:', cartaNormales.length);
@@ -221,113 +245,64 @@ async function registrarTodos() {
         return;
     }
 
+    try {
+        if (await actualizarPreciosCarrito()) {
+            alert('Los precios cambiaron y la lista se actualizó. Revísala antes de registrar.');
+            return;
+        }
+    } catch (error) {
+        console.error('Error al revalidar precios:', error);
+    }
+
     if (!confirm('¿Registrar todos los pedidos?')) {
         return;
     }
 
-    let exitosos = 0;
-    let fallidos = 0;
-    const errores = [];
-
     try {
-        // Registrar pedidos normales
-        for (let i = 0; i < cartaNormales.length; i++) {
-            const pedido = cartaNormales[i];
-            console.log(`Registrando pedido normal ${i + 1}:`, pedido);
-
-            const formData = new FormData();
-            formData.append('sabor', pedido.sabor);
-            formData.append('tamano', pedido.tamano);
-            formData.append('cantidad', pedido.cantidad);
-            formData.append('sucursal', SUCURSAL);
-            formData.append('fecha_entrega', pedido.fecha_entrega);
-            formData.append('detalles', pedido.detalles || '');
-            formData.append('sabor_personalizado', pedido.sabor_personalizado || '');
-            formData.append('precio', pedido.precio);
-            formData.append('es_otro', pedido.es_otro || false);
-
-            try {
-                const resp = await fetch('/normales/registrar', {
-                    method: 'POST',
-                    body: formData
-                });
-
-                console.log(`Respuesta normal ${i + 1}:`, resp.status, resp.statusText);
-
-                if (resp.ok) {
-                    exitosos++;
-                    console.log(`✓ Pedido normal ${i + 1} registrado exitosamente`);
-                } else {
-                    const errorText = await resp.text();
-                    console.error(`✗ Error en pedido normal ${i + 1}:`, resp.status);
-                    console.error('Response:', errorText);
-                    errores.push(`Normal ${i + 1}: ${resp.status}`);
-                    fallidos++;
-                }
-            } catch (e) {
-                console.error(`✗ Excepción en pedido normal ${i + 1}:`, e);
-                errores.push(`Normal ${i + 1}: ${e.message}`);
-                fallidos++;
-            }
+        // Todo el carrito viaja en una sola petición
+        const resp = await fetch('/api/pedidos/lote', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                normales: cartaNormales.map(datosParaLote),
+                clientes: cartaClientes.map(datosParaLote)
+            })
+        });
+
+        if (!resp.ok) {
+            const errorText = await resp.text();
+            console.error('Error al registrar lote:', resp.status, errorText);
+            alert(`✗ Error: No se registraron pedidos (${resp.status}).`);
+            return;
         }
 
-        // Registrar pedidos de clientes
-        for (let i = 0; i < cartaClientes.length; i++) {
-            const pedido = cartaClientes[i];
-            console.log(`Registrando pedido cliente ${i + 1}:`, pedido);
-
-            const formData = new FormData();
-            formData.append('sabor', pedido.sabor);
-            formData.append('tamano', pedido.tamano);
-            formData.append('cantidad', pedido.cantidad);
-            formData.append('sucursal', SUCURSAL);
-            formData.append('fecha_entrega', pedido.fecha_entrega);
-            formData.append('color', pedido.color || '');
-            formData.append('dedicatoria', pedido.dedicatoria || '');
-            formData.append('detalles', pedido.detalles || '');
-            formData.append('sabor_personalizado', pedido.sabor_personalizado || '');
-            formData.append('precio', pedido.precio);
-            formData.append('es_otro', pedido.es_otro || false);
-
-            try {
-                const resp = await fetch('/clientes/registrar', {
-                    method: 'POST',
-                    body: formData
-                });
-
-                console.log(`Respuesta cliente ${i + 1}:`, resp.status, resp.statusText);
-
-                if (resp.ok) {
-                    exitosos++;
-                    console.log(`✓ Pedido cliente ${i + 1} registrado exitosamente`);
-                } else {
-                    const errorText = await resp.text();
-                    console.error(`✗ Error en pedido cliente ${i + 1}:`, resp.status);
-                    console.error('Response:', errorText);
-                    errores.push(`Cliente ${i + 1}: ${resp.status}`);
-                    fallidos++;
-                }
-            } catch (e) {
-                console.error(`✗ Excepción en pedido cliente ${i + 1}:`, e);
-                errores.push(`Cliente ${i + 1}: ${e.message}`);
-                fallidos++;
-            }
-        }
+        const resultado = await resp.json();
+        console.log('=== RESUMEN DE REGISTRO ===', resultado);
+
+        // Quitar del carrito sólo los pedidos que se registraron
+        const normalesOk = new Set(resultado.normales.map(r => r.indice));
+        const clientesOk = new Set(resultado.clientes.map(r => r.indice));
+        cartaNormales = cartaNormales.filter((_, i) => !normalesOk.has(i));
+        cartaClientes = cartaClientes.filter((_, i) => !clientesOk.has(i));
+        actualizarVista();
 
-        console.log('=== RESUMEN DE REGISTRO ===');
-        console.log('Exitosos:', exitosos);
-        console.log('Fallidos:', fallidos);
+        const errores = resultado.errores.map(e =>
+            `${e.tipo === 'normal' ? 'Normal' : 'Cliente'} ${e.indice + 1}: ${e.error}`
+        );
 
-        if (exitosos > 0) {
-            alert(`✓ ${exitosos} pedido(s) registrado(s) exitosamente`);
-            cartaNormales = [];
-            cartaClientes = [];
-            actualizarVista();
+        if (resultado.registrados > 0) {
+            let mensaje = `✓ ${resultado.registrados} pedido(s) registrado(s) exitosamente`;
+            if (errores.length > 0) {
+                mensaje += `\n\n✗ ${errores.length} pedido(s) quedaron en la lista:\n${errores.join('\n')}`;
+            }
+            alert(mensaje);
             cargarPedidosRegistrados();
-            const tab = new bootstrap.Tab(document.querySelector('[data-bs-target="#registrados"]'));
-            tab.show();
+            if (errores.length === 0) {
+                const tab = new bootstrap.Tab(document.querySelector('[data-bs-target="#registrados"]'));
+                tab.show();
+            }
         } else {
-            alert(`✗ Error: No se registraron pedidos.\n\nDetalles: ${errores.join(', ')}`);
+            alert(`✗ Error: No se registraron pedidos.\n\nDetalles:\n${errores.join('\n')}`);
         }
 
     } catch (error) {
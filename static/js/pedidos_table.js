@@ -16,53 +16,63 @@ async function cargarPedidosRegistrados(fecha = null) {
     }
 }
 
+// Estado de la paginación por tabla: fecha consultada, cursor siguiente y pedidos ya mostrados
+const paginasPedidos = {
+    normales: {fecha: '', cursor: null, pedidos: new Map(), cargada: false},
+    clientes: {fecha: '', cursor: null, pedidos: new Map(), cargada: false}
+};
+
+// Pide una página; sin cursor reinicia la tabla con la fecha indicada
+async function pedirPaginaPedidos(tipo, fecha, cursor) {
+    const estado = paginasPedidos[tipo];
+    if (!cursor) {
+        estado.fecha = fecha || '';
+        estado.pedidos.clear();
+    }
+
+    const params = new URLSearchParams();
+    if (estado.fecha) params.set('fecha_inicio', estado.fecha);
+    if (cursor) params.set('cursor', cursor);
+
+    const resp = await fetch(`/api/pedidos/${tipo}?${params}`);
+    const data = await resp.json();
+    data.pedidos = data.pedidos || [];
+
+    data.pedidos.forEach(pedido => estado.pedidos.set(pedido.id, pedido));
+    estado.cursor = data.next_cursor || null;
+    estado.cargada = true;
+
+    const boton = document.getElementById(tipo === 'normales' ? 'masNormalesRegistrados' : 'masClientesRegistrados');
+    if (boton) boton.classList.toggle('d-none', !data.has_next);
+
+    return data;
+}
+
+function cargarMasNormales() {
+    const estado = paginasPedidos.normales;
+    if (estado.cursor) cargarPedidosNormales(estado.fecha, estado.cursor);
+}
+
+function cargarMasClientes() {
+    const estado = paginasPedidos.clientes;
+    if (estado.cursor) cargarPedidosClientes(estado.fecha, estado.cursor);
+}
+
 // Cargar pedidos normales - ORDEN: ID, Tamaño, Sabor, Cantidad, Precio Unit., Total, Fecha Entrega, Estado, Acciones
-async function cargarPedidosNormales(fecha) {
+async function cargarPedidosNormales(fecha, cursor = null) {
     try {
-        const url = fecha ? `/api/pedidos/normales?fecha=${fecha}` : '/api/pedidos/normales';
-        const resp = await fetch(url);
-        const data = await resp.json();
+        const data = await pedirPaginaPedidos('normales', fecha, cursor);
 
         const tbody = document.getElementById('tablaNormalesRegistrados');
 
-        if (!data.pedidos || data.pedidos.length === 0) {
+        if (!cursor && (!data.pedidos || data.pedidos.length === 0)) {
             tbody.innerHTML = '<tr><td colspan="9" class="text-center text-muted">No hay pedidos para esta fecha</td></tr>';
             return;
         }
 
-        tbody.innerHTML = '';
-
-        data.pedidos.forEach(pedido => {
-            const row = document.createElement('tr');
-            const editable = pedido.editable;
-            const estadoBadge = editable
-                ? '<span class="badge bg-success">Editable</span>'
-                : '<span class="badge bg-secondary">Bloqueado</span>';
-
-            row.innerHTML = `
-                <td class="text-center"><strong>${pedido.id || ''}</strong></td>
-                <td><span class="badge bg-primary">${pedido.sucursal || ''}</span></td> 
-                <td>${pedido.tamano || ''}</td>
-                <td>${pedido.sabor || ''}</td>
-                <td class="text-center">${pedido.cantidad || 0}</td>
-                <td class="text-end">Q${(pedido.precio || 0).toFixed(2)}</td>
-                <td class="text-end"><strong>Q${(pedido.total || 0).toFixed(2)}</strong></td>
-                <td class="text-center">${formatearFechaSolo(pedido.fecha_entrega)}</td>
-                <td class="text-center">${estadoBadge}</td>
-                <td class="text-center" style="white-space: nowrap;">
-                    ${editable ? `
-                        <button class="btn btn-sm btn-primary me-1" onclick="editarPedidoNormal(${pedido.id})" title="Editar">
-                            <i class="fas fa-edit"></i>
-                        </button>
-                        <button class="btn btn-sm btn-danger" onclick="eliminarPedidoNormal(${pedido.id})" title="Eliminar">
-                            <i class="fas fa-trash"></i>
-                        </button>
-                    ` : '<span class="text-muted">-</span>'}
-                </td>
-            `;
-
-            tbody.appendChild(row);
-        });
+        if (!cursor) tbody.innerHTML = '';
+
+        data.pedidos.forEach(pedido => tbody.appendChild(filaPedidoNormal(pedido)));
     } catch (error) {
         console.error('Error cargando pedidos normales:', error);
         const tbody = document.getElementById('tablaNormalesRegistrados');
@@ -71,67 +81,20 @@ async function cargarPedidosNormales(fecha) {
 }
 
 // Cargar pedidos de clientes - ORDEN: ID, Tamaño, Sabor, Cantidad, Precio Unit., Total, Fecha Entrega, Color, Dedicatoria, Detalles, Imagen, Estado, Acciones
-async function cargarPedidosClientes(fecha) {
+async function cargarPedidosClientes(fecha, cursor = null) {
     try {
-        const url = fecha ? `/api/pedidos/clientes?fecha=${fecha}` : '/api/pedidos/clientes';
-        const resp = await fetch(url);
-        const data = await resp.json();
+        const data = await pedirPaginaPedidos('clientes', fecha, cursor);
 
         const tbody = document.getElementById('tablaClientesRegistrados');
 
-        if (!data.pedidos || data.pedidos.length === 0) {
+        if (!cursor && (!data.pedidos || data.pedidos.length === 0)) {
             tbody.innerHTML = '<tr><td colspan="13" class="text-center text-muted">No hay pedidos para esta fecha</td></tr>';
             return;
         }
 
-        tbody.innerHTML = '';
-
-        data.pedidos.forEach(pedido => {
-            const row = document.createElement('tr');
-            const editable = pedido.editable;
-            const estadoBadge = editable
-                ? '<span class="badge bg-success">Editable</span>'
-                : '<span class="badge bg-secondary">Bloqueado</span>';
-
-            // Mostrar imagen si existe
-            const imagenHtml = pedido.imagen
-                ? `<img src="${pedido.imagen}" style="max-width: 50px; max-height: 50px; border-radius: 5px;" title="Ver imagen">`
-                : '<span class="text-muted">-</span>';
-
-            row.innerHTML = `
-                <td class="text-center"><strong>${pedido.id || ''}</strong></td>
-                <td><span class="badge bg-primary">${pedido.sucursal || ''}</span></td> 
-                <td>${pedido.tamano || ''}</td>
-                <td>${pedido.sabor || ''}</td>
-                <td class="text-center">${pedido.cantidad || 0}</td>
-                <td class="text-end">Q${(pedido.precio || 0).toFixed(2)}</td>
-                <td class="text-end"><strong>Q${(pedido.total || 0).toFixed(2)}</strong></td>
-                <td class="text-center">${formatearFechaSolo(pedido.fecha_entrega)}</td>
-                <td class="text-center">
-                    ${pedido.color ? `
-                        <span class="badge-color" style="background-color: ${pedido.color}; color: #000; padding: 5px 10px; border-radius: 8px; font-weight: 600;">
-                            ${pedido.color}
-                        </span>
-                    ` : '<span class="text-muted">-</span>'}
-                </td>
-                <td class="text-truncate" style="max-width: 120px;" title="${pedido.dedicatoria || ''}">${pedido.dedicatoria || '-'}</td>
-                <td class="text-truncate" style="max-width: 120px;" title="${pedido.detalles || ''}">${pedido.detalles || '-'}</td>
-                <td class="text-center">${imagenHtml}</td>
-                <td class="text-center">${estadoBadge}</td>
-                <td class="text-center" style="white-space: nowrap;">
-                    ${editable ? `
-                        <button class="btn btn-sm btn-primary me-1" onclick="editarPedidoCliente(${pedido.id})" title="Editar">
-                            <i class="fas fa-edit"></i>
-                        </button>
-                        <button class="btn btn-sm btn-danger" onclick="eliminarPedidoCliente(${pedido.id})" title="Eliminar">
-                            <i class="fas fa-trash"></i>
-                        </button>
-                    ` : '<span class="text-muted">-</span>'}
-                </td>
-            `;
-
-            tbody.appendChild(row);
-        });
+        if (!cursor) tbody.innerHTML = '';
+
+        data.pedidos.forEach(pedido => tbody.appendChild(filaPedidoCliente(pedido)));
     } catch (error) {
         console.error('Error cargando pedidos clientes:', error);
         const tbody = document.getElementById('tablaClientesRegistrados');
@@ -139,6 +102,90 @@ async function cargarPedidosClientes(fecha) {
     }
 }
 
+// Fila de la tabla de pedidos normales
+function filaPedidoNormal(pedido) {
+    const row = document.createElement('tr');
+    row.dataset.id = pedido.id;
+    const editable = pedido.editable;
+    const estadoBadge = editable
+        ? '<span class="badge bg-success">Editable</span>'
+        : '<span class="badge bg-secondary">Bloqueado</span>';
+
+    row.innerHTML = `
+        <td class="text-center"><strong>${pedido.id || ''}</strong></td>
+        <td><span class="badge bg-primary">${pedido.sucursal || ''}</span></td> 
+        <td>${pedido.tamano || ''}</td>
+        <td>${pedido.sabor || ''}</td>
+        <td class="text-center">${pedido.cantidad || 0}</td>
+        <td class="text-end">Q${(pedido.precio || 0).toFixed(2)}</td>
+        <td class="text-end"><strong>Q${(pedido.total || 0).toFixed(2)}</strong></td>
+        <td class="text-center">${formatearFechaSolo(pedido.fecha_entrega)}</td>
+        <td class="text-center">${estadoBadge}</td>
+        <td class="text-center" style="white-space: nowrap;">
+            ${editable ? `
+                <button class="btn btn-sm btn-primary me-1" onclick="editarPedidoNormal(${pedido.id})" title="Editar">
+                    <i class="fas fa-edit"></i>
+                </button>
+                <button class="btn btn-sm btn-danger" onclick="eliminarPedidoNormal(${pedido.id})" title="Eliminar">
+                    <i class="fas fa-trash"></i>
+                </button>
+            ` : '<span class="text-muted">-</span>'}
+        </td>
+    `;
+
+    return row;
+}
+
+// Fila de la tabla de pedidos de clientes
+function filaPedidoCliente(pedido) {
+    const row = document.createElement('tr');
+    row.dataset.id = pedido.id;
+    const editable = pedido.editable;
+    const estadoBadge = editable
+        ? '<span class="badge bg-success">Editable</span>'
+        : '<span class="badge bg-secondary">Bloqueado</span>';
+
+    // Mostrar imagen si existe
+    const miniatura = pedido.foto_miniatura || pedido.foto_path;
+    const imagenHtml = miniatura
+        ? `<a href="${pedido.foto_path}" target="_blank"><img src="${miniatura}" loading="lazy" style="max-width: 50px; max-height: 50px; border-radius: 5px;" title="Ver imagen"></a>`
+        : '<span class="text-muted">-</span>';
+
+    row.innerHTML = `
+        <td class="text-center"><strong>${pedido.id || ''}</strong></td>
+        <td><span class="badge bg-primary">${pedido.sucursal || ''}</span></td> 
+        <td>${pedido.tamano || ''}</td>
+        <td>${pedido.sabor || ''}</td>
+        <td class="text-center">${pedido.cantidad || 0}</td>
+        <td class="text-end">Q${(pedido.precio || 0).toFixed(2)}</td>
+        <td class="text-end"><strong>Q${(pedido.total || 0).toFixed(2)}</strong></td>
+        <td class="text-center">${formatearFechaSolo(pedido.fecha_entrega)}</td>
+        <td class="text-center">
+            ${pedido.color ? `
+                <span class="badge-color" style="background-color: ${pedido.color}; color: #000; padding: 5px 10px; border-radius: 8px; font-weight: 600;">
+                    ${pedido.color}
+                </span>
+            ` : '<span class="text-muted">-</span>'}
+        </td>
+        <td class="text-truncate" style="max-width: 120px;" title="${pedido.dedicatoria || ''}">${pedido.dedicatoria || '-'}</td>
+        <td class="text-truncate" style="max-width: 120px;" title="${pedido.detalles || ''}">${pedido.detalles || '-'}</td>
+        <td class="text-center">${imagenHtml}</td>
+        <td class="text-center">${estadoBadge}</td>
+        <td class="text-center" style="white-space: nowrap;">
+            ${editable ? `
+                <button class="btn btn-sm btn-primary me-1" onclick="editarPedidoCliente(${pedido.id})" title="Editar">
+                    <i class="fas fa-edit"></i>
+                </button>
+                <button class="btn btn-sm btn-danger" onclick="eliminarPedidoCliente(${pedido.id})" title="Eliminar">
+                    <i class="fas fa-trash"></i>
+                </button>
+            ` : '<span class="text-muted">-</span>'}
+        </td>
+    `;
+
+    return row;
+}
+
 // Funciones auxiliares para formatear fechas
 function formatearFechaSolo(fecha) {
     if (!fecha) return '-';
@@ -171,11 +218,7 @@ function formatearFechaHora(fecha) {
 // Editar pedido normal
 async function editarPedidoNormal(id) {
     try {
-        const fecha = document.getElementById('fechaBusqueda')?.value || '';
-        const url = fecha ? `/api/pedidos/normales?fecha=${fecha}` : '/api/pedidos/normales';
-        const resp = await fetch(url);
-        const data = await resp.json();
-        const pedido = data.pedidos.find(p => p.id === id);
+        const pedido = paginasPedidos.normales.pedidos.get(id);
 
         if (!pedido) {
             alert('Pedido no encontrado');
@@ -245,11 +288,7 @@ async function guardarEdicionNormal() {
 // Editar pedido cliente
 async function editarPedidoCliente(id) {
     try {
-        const fecha = document.getElementById('fechaBusqueda')?.value || '';
-        const url = fecha ? `/api/pedidos/clientes?fecha=${fecha}` : '/api/pedidos/clientes';
-        const resp = await fetch(url);
-        const data = await resp.json();
-        const pedido = data.pedidos.find(p => p.id === id);
+        const pedido = paginasPedidos.clientes.pedidos.get(id);
 
         if (!pedido) {
             alert('Pedido no encontrado');
@@ -370,6 +409,93 @@ async function eliminarPedidoCliente(id) {
     }
 }
 
+// Tablas que se actualizan con /api/pedidos/eventos, según el tipo del evento
+const TABLAS_EVENTOS = {
+    normal: {tipo: 'normales', tbody: 'tablaNormalesRegistrados', columnas: 9, fila: filaPedidoNormal, cargar: cargarPedidosNormales},
+    cliente: {tipo: 'clientes', tbody: 'tablaClientesRegistrados', columnas: 13, fila: filaPedidoCliente, cargar: cargarPedidosClientes}
+};
+
+function hoyISO() {
+    return new Date().toISOString().split('T')[0];
+}
+
+// El evento trae sólo los campos escritos; se completan los que el listado calcula en el servidor
+function completarPedidoEvento(pedido) {
+    const fechaEntrega = (pedido.fecha_entrega || '').split('T')[0];
+    return {
+        ...pedido,
+        fecha_entrega: fechaEntrega || pedido.fecha_entrega,
+        total: (pedido.precio || 0) * (pedido.cantidad || 0),
+        editable: fechaEntrega ? fechaEntrega >= hoyISO() : false
+    };
+}
+
+// Aplica un alta, edición o baja a la tabla ya cargada sin volver a pedir el listado
+function aplicarEventoPedido(evento) {
+    const tabla = TABLAS_EVENTOS[evento.tipo];
+    const tbody = tabla && document.getElementById(tabla.tbody);
+    const estado = tabla && paginasPedidos[tabla.tipo];
+    // Una tabla que aún no se mostró se carga completa al abrir la pestaña
+    if (!tbody || !estado.cargada) return;
+
+    const anterior = estado.pedidos.get(evento.pedido_id);
+    const filaAnterior = tbody.querySelector(`tr[data-id="${evento.pedido_id}"]`);
+
+    if (evento.accion === 'eliminado') {
+        if (!anterior) return;
+        estado.pedidos.delete(evento.pedido_id);
+        if (filaAnterior) filaAnterior.remove();
+        if (!tbody.querySelector('tr[data-id]')) {
+            tbody.innerHTML = `<tr><td colspan="${tabla.columnas}" class="text-center text-muted">No hay pedidos para esta fecha</td></tr>`;
+        }
+        return;
+    }
+
+    if (anterior) {
+        const pedido = completarPedidoEvento({...anterior, ...evento.pedido});
+        estado.pedidos.set(pedido.id, pedido);
+        if (filaAnterior) filaAnterior.replaceWith(tabla.fila(pedido));
+        return;
+    }
+
+    if (evento.accion !== 'creado') return;
+    if (evento.sucursal_anterior) {
+        // Llegó desde otra sucursal: el evento no trae la fecha de registro, que decide si va en esta tabla
+        tabla.cargar(estado.fecha);
+        return;
+    }
+    // Los pedidos nuevos son de hoy y el listado va del más reciente al más antiguo
+    if ((estado.fecha || hoyISO()) !== hoyISO()) return;
+
+    const pedido = completarPedidoEvento(evento.pedido);
+    estado.pedidos.set(pedido.id, pedido);
+    if (!tbody.querySelector('tr[data-id]')) tbody.innerHTML = '';
+    tbody.prepend(tabla.fila(pedido));
+}
+
+function escucharEventosPedidos() {
+    if (!window.EventSource) return;
+
+    const fuente = new EventSource('/api/pedidos/eventos');
+    let reconectando = false;
+
+    fuente.addEventListener('pedido', e => aplicarEventoPedido(JSON.parse(e.data)));
+    fuente.addEventListener('recargar', () => recargarPedidosMostrados());
+    fuente.addEventListener('error', () => { reconectando = true; });
+    fuente.addEventListener('open', () => {
+        // Lo ocurrido mientras la conexión estuvo caída no llega como evento
+        if (reconectando) recargarPedidosMostrados();
+        reconectando = false;
+    });
+}
+
+function recargarPedidosMostrados() {
+    Object.values(TABLAS_EVENTOS).forEach(tabla => {
+        const estado = paginasPedidos[tabla.tipo];
+        if (estado.cargada) tabla.cargar(estado.fecha);
+    });
+}
+
 // Inicializar cuando se carga la página
 document.addEventListener('DOMContentLoaded', function () {
     const fechaBusqueda = document.getElementById('fechaBusqueda');
@@ -383,4 +509,12 @@ document.addEventListener('DOMContentLoaded', function () {
             cargarPedidosRegistrados();
         });
     }
+
+    escucharEventosPedidos();
+
+    // El admin de escritorio escribe desde otro proceso y no publica eventos:
+    // al volver a la pestaña se piden de nuevo los listados ya mostrados
+    document.addEventListener('visibilitychange', () => {
+        if (document.visibilityState === 'visible') recargarPedidosMostrados();
+    });
 });
\ No newline at end of file
@@ -76,6 +76,70 @@ function toggleOtro(selectId, inputId, priceInputId) {
     }
 }
 
+/**
+ * Guarda el precio de cada sabor/tamaño por PRECIOS_VIGENCIA_MS;
+ * los cambios de cantidad sólo recalculan el total.
+ * Si el servidor responde con otra versión del catálogo, los demás
+ * precios guardados quedaron viejos y se descartan.
+ */
+const PRECIOS_VIGENCIA_MS = 60000;
+const preciosConsultados = new Map();
+let versionPrecios = null;
+
+function consultarPrecio(sabor, tamano) {
+    return fetch(`/api/obtener-precio?sabor=${encodeURIComponent(sabor)}&tamano=${encodeURIComponent(tamano)}`)
+        .then(resp => resp.json());
+}
+
+// Anota la versión recibida; devuelve true si el catálogo cambió desde la última consulta
+function registrarVersionPrecios(clave, data) {
+    if (!data.version || data.version === versionPrecios) return false;
+    const cambio = versionPrecios !== null;
+    if (cambio) {
+        preciosConsultados.clear();
+        preciosConsultados.set(clave, {consulta: Promise.resolve(data), hasta: Date.now() + PRECIOS_VIGENCIA_MS});
+    }
+    versionPrecios = data.version;
+    return cambio;
+}
+
+async function obtenerPrecio(sabor, tamano) {
+    const clave = `${sabor}|${tamano}`;
+    const guardado = preciosConsultados.get(clave);
+    if (guardado && guardado.hasta > Date.now()) return guardado.consulta;
+
+    const consulta = consultarPrecio(sabor, tamano)
+        .then(data => {
+            if (data.error) {
+                preciosConsultados.delete(clave);
+            } else {
+                registrarVersionPrecios(clave, data);
+            }
+            return data;
+        })
+        .catch(error => {
+            preciosConsultados.delete(clave);
+            throw error;
+        });
+    preciosConsultados.set(clave, {consulta, hasta: Date.now() + PRECIOS_VIGENCIA_MS});
+    return consulta;
+}
+
+/**
+ * Pregunta al servidor, sin pasar por lo guardado, el precio de un sabor/tamaño.
+ * Devuelve true si la versión del catálogo cambió (y se descartaron los precios guardados).
+ */
+async function revalidarPrecios(sabor, tamano) {
+    const clave = `${sabor}|${tamano}`;
+    const data = await consultarPrecio(sabor, tamano);
+    if (data.error) return false;
+    const cambio = registrarVersionPrecios(clave, data);
+    if (!cambio) {
+        preciosConsultados.set(clave, {consulta: Promise.resolve(data), hasta: Date.now() + PRECIOS_VIGENCIA_MS});
+    }
+    return cambio;
+}
+
 /**
  * Actualiza precio para pedidos normales
  */
@@ -113,8 +177,7 @@ async function actualizarPrecioNormal() {
     }
 
     try {
-        const resp = await fetch(`/api/obtener-precio?sabor=${encodeURIComponent(sabor)}&tamano=${encodeURIComponent(tamano)}`);
-        const data = await resp.json();
+        const data = await obtenerPrecio(sabor, tamano);
 
         if (data.encontrado && data.precio > 0) {
             precioUnitarioEl.textContent = "Q" + data.precio.toFixed(2);
@@ -167,8 +230,7 @@ async function actualizarPrecioCliente() {
     }
 
     try {
-        const resp = await fetch(`/api/obtener-precio?sabor=${encodeURIComponent(sabor)}&tamano=${encodeURIComponent(tamano)}`);
-        const data = await resp.json();
+        const data = await obtenerPrecio(sabor, tamano);
 
         if (data.encontrado && data.precio > 0) {
             precioUnitarioEl.textContent = "Q" + data.precio.toFixed(2);
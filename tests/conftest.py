@@ -1,7 +1,8 @@
 import pytest
 from fastapi.testclient import TestClient
 
-from api.auth import hash_session
+from api.auth import datos_usuario
+from api.sesiones import COOKIE_SESION, almacen_sesiones
 
 
 @pytest.fixture
@@ -17,25 +18,13 @@ def db():
 @pytest.fixture
 def authenticated_client(client):
     """Create a client with authenticated session for a regular user."""
-    username = "jutiapa1"
-    session_token = hash_session(username)
-
-    client.cookies.set("session_token", session_token)
-    client.cookies.set("username", username)
-    client.cookies.set("sucursal", "Jutiapa 1")
-    client.cookies.set("rol", "sucursal")
+    client.cookies.set(COOKIE_SESION, almacen_sesiones.crear(datos_usuario("jutiapa1")))
 
     return client
 
 @pytest.fixture
 def admin_client(client):
     """Create a client with authenticated session for admin."""
-    username = "admin"
-    session_token = hash_session(username)
-
-    client.cookies.set("session_token", session_token)
-    client.cookies.set("username", username)
-    client.cookies.set("sucursal", "")
-    client.cookies.set("rol", "admin")
+    client.cookies.set(COOKIE_SESION, almacen_sesiones.crear(datos_usuario("admin")))
 
     return client
\ No newline at end of file
@@ -0,0 +1,38 @@
+"""
+Report functions used by the desktop report worker tests.
+
+They live outside the test module because spawned worker processes import
+them by name, and this module does not import Qt.
+"""
+
+import os
+import time
+
+
+def pdf_falso(tarea, avisar):
+    avisar(f"Maquetando {tarea.descripcion}")
+    with open(tarea.destino, "wb") as f:
+        f.write(f"%PDF {tarea.tipo} {tarea.sucursal}".encode())
+
+
+def pdf_lento(tarea, avisar):
+    with open(tarea.destino, "wb") as f:
+        f.write(b"%PDF a medias")
+    time.sleep(60)
+
+
+def pdf_con_error(tarea, avisar):
+    if tarea.sucursal == "Progreso":
+        raise RuntimeError("sin conexión")
+    pdf_falso(tarea, avisar)
+
+
+def pdf_que_revienta(tarea, avisar):
+    os._exit(3)
+
+
+def pdf_cpu(tarea, avisar):
+    fin = time.perf_counter() + 0.4
+    while time.perf_counter() < fin:
+        pass
+    pdf_falso(tarea, avisar)
@@ -0,0 +1,94 @@
+"""
+Async Database Facade Tests for MiPastel Application
+
+Tests for:
+- Blocking database calls running off the event loop
+- Per-call timeouts
+- Concurrent branch requests not serializing on the event loop
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from unittest.mock import MagicMock, patch
+
+from api.async_database import AsyncDatabaseManager, DatabaseTimeoutError, run_db
+from api.auth import USERS_DB, datos_usuario
+from api.sesiones import COOKIE_SESION, almacen_sesiones
+
+LATENCIA = 0.2
+
+
+def consulta_lenta(valor):
+    time.sleep(LATENCIA)
+    return valor
+
+
+class TestRunDb:
+    """Test the executor-backed helpers."""
+
+    def test_returns_value(self):
+        """run_db should return the function result."""
+        assert asyncio.run(run_db(consulta_lenta, 42)) == 42
+
+    def test_concurrent_calls_overlap(self):
+        """Blocking calls must run in parallel instead of blocking the loop."""
+        async def escenario():
+            inicio = time.perf_counter()
+            resultados = await asyncio.gather(*(run_db(consulta_lenta, i) for i in range(12)))
+            return resultados, time.perf_counter() - inicio
+
+        resultados, duracion = asyncio.run(escenario())
+        assert resultados == list(range(12))
+        assert duracion < LATENCIA * 4
+
+    def test_timeout(self):
+        """Calls exceeding the timeout raise DatabaseTimeoutError."""
+        with pytest.raises(DatabaseTimeoutError):
+            asyncio.run(run_db(consulta_lenta, 1, timeout=0.01))
+
+    def test_manager_methods_become_coroutines(self):
+        """AsyncDatabaseManager should proxy methods of the wrapped manager."""
+        manager = MagicMock()
+        manager.obtener_precios.return_value = [{"id": 1}]
+
+        db = AsyncDatabaseManager(manager)
+        assert asyncio.run(db.obtener_precios()) == [{"id": 1}]
+        manager.obtener_precios.assert_called_once_with()
+
+
+class TestConcurrentBranches:
+    """Load test: 12 branches listing orders at the same time."""
+
+    @patch('routers.pedidos_api.DatabaseManager')
+    def test_twelve_branches_do_not_serialize(self, mock_db):
+        """Twelve concurrent listings should take about one query latency, not twelve."""
+        from app.main import app
+
+        def obtener_pasteles_normales(**kwargs):
+            time.sleep(LATENCIA)
+            return [{"id": 1, "sucursal": kwargs["sucursal"], "precio": 50.0, "cantidad": 1}]
+
+        mock_db.return_value.obtener_pasteles_normales.side_effect = obtener_pasteles_normales
+
+        usuarios = [u for u, datos in USERS_DB.items() if datos["rol"] == "sucursal"]
+        assert len(usuarios) == 12
+
+        async def pedir(username):
+            cookie = f"{COOKIE_SESION}={almacen_sesiones.crear(datos_usuario(username))}"
+            async with httpx.AsyncClient(app=app, base_url="http://testserver") as cliente:
+                respuesta = await cliente.get("/api/pedidos/normales", headers={"cookie": cookie.encode("utf-8")})
+            return respuesta
+
+        async def escenario():
+            inicio = time.perf_counter()
+            respuestas = await asyncio.gather(*(pedir(u) for u in usuarios))
+            return respuestas, time.perf_counter() - inicio
+
+        respuestas, duracion = asyncio.run(escenario())
+
+        assert [r.status_code for r in respuestas] == [200] * 12
+        assert mock_db.return_value.obtener_pasteles_normales.call_count == 12
+        assert duracion < LATENCIA * 4, f"12 sucursales tardaron {duracion:.2f}s"
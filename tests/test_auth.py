@@ -3,13 +3,14 @@ Authentication Tests for MiPastel Application
 
 Tests for:
 - Password hashing and verification
-- Session creation and validation
+- Session creation and validation (opaque ids, server-side store)
 - Authentication requirements
 - Branch permission validation
 - Login attempt limiting
 """
 
 import pytest
+from collections.abc import Mapping
 from fastapi import HTTPException, Request
 from fastapi.testclient import TestClient
 from unittest.mock import Mock, MagicMock
@@ -23,9 +24,10 @@ from api.auth import (
     requiere_autenticacion,
     verificar_permiso_sucursal,
     requiere_permiso_sucursal,
-    hash_session,
+    datos_usuario,
     USERS_DB
 )
+from api.sesiones import COOKIE_SESION, almacen_sesiones
 
 
 class TestPasswordHashing:
@@ -99,62 +101,49 @@ class TestCredentialVerification:
         assert result is None
 
 
+def peticion_con_cookie(session_id=None):
+    headers = [(b"cookie", f"{COOKIE_SESION}={session_id}".encode())] if session_id else []
+    return Request({"type": "http", "headers": headers})
+
+
 class TestSessionManagement:
     """Test session creation and validation."""
     
-    def test_hash_session_consistent(self):
-        """Test that session hashing is consistent for same username."""
-        username = "test_user"
-        hash1 = hash_session(username)
-        hash2 = hash_session(username)
+    def test_session_ids_are_random(self):
+        """Test that each login gets a new opaque session id."""
+        id1 = almacen_sesiones.crear(datos_usuario("jutiapa1"))
+        id2 = almacen_sesiones.crear(datos_usuario("jutiapa1"))
         
-        assert hash1 == hash2
-        assert isinstance(hash1, str)
-        assert len(hash1) == 64  # SHA256 hex digest length
+        assert id1 != id2
+        assert "jutiapa1" not in id1
+        assert len(id1) >= 43  # 32 random bytes, base64url
     
     def test_verificar_sesion_valid(self):
         """Test session verification with valid session."""
-        username = "jutiapa1"
-        session_token = hash_session(username)
-        
-        # Create mock request with cookies
-        mock_request = Mock(spec=Request)
-        mock_request.cookies = MagicMock()
-        mock_request.cookies.get = MagicMock(side_effect=lambda key: {
-            "session_token": session_token,
-            "username": username,
-            "sucursal": "Jutiapa 1",
-            "rol": "sucursal"
-        }.get(key))
+        session_id = almacen_sesiones.crear(datos_usuario("jutiapa1"))
         
-        result = verificar_sesion(mock_request)
+        result = verificar_sesion(peticion_con_cookie(session_id))
         
         assert result is not None
-        assert result["username"] == username
+        assert result["username"] == "jutiapa1"
         assert result["sucursal"] == "Jutiapa 1"
         assert result["rol"] == "sucursal"
     
+    def test_verificar_sesion_uses_request_state(self):
+        """Test that a session resolved by the middleware is not looked up again."""
+        request = peticion_con_cookie("cualquiera")
+        request.state.sesion = {"username": "admin", "sucursal": None, "rol": "admin"}
+        
+        assert verificar_sesion(request)["rol"] == "admin"
+    
     def test_verificar_sesion_invalid_token(self):
         """Test session verification with invalid token."""
-        mock_request = Mock(spec=Request)
-        mock_request.cookies = MagicMock()
-        mock_request.cookies.get = MagicMock(side_effect=lambda key: {
-            "session_token": "invalid_token",
-            "username": "jutiapa1",
-            "sucursal": "Jutiapa 1",
-            "rol": "sucursal"
-        }.get(key))
-        
-        result = verificar_sesion(mock_request)
+        result = verificar_sesion(peticion_con_cookie("invalid_token"))
         assert result is None
     
     def test_verificar_sesion_missing_token(self):
         """Test session verification with missing token."""
-        mock_request = Mock(spec=Request)
-        mock_request.cookies = MagicMock()
-        mock_request.cookies.get = MagicMock(return_value=None)
-        
-        result = verificar_sesion(mock_request)
+        result = verificar_sesion(peticion_con_cookie())
         assert result is None
 
 
@@ -163,31 +152,17 @@ class TestAuthenticationRequirement:
     
     def test_requiere_autenticacion_valid_session(self):
         """Test authentication requirement with valid session."""
-        username = "jutiapa1"
-        session_token = hash_session(username)
+        session_id = almacen_sesiones.crear(datos_usuario("jutiapa1"))
         
-        mock_request = Mock(spec=Request)
-        mock_request.cookies = MagicMock()
-        mock_request.cookies.get = MagicMock(side_effect=lambda key: {
-            "session_token": session_token,
-            "username": username,
-            "sucursal": "Jutiapa 1",
-            "rol": "sucursal"
-        }.get(key))
-        
-        result = requiere_autenticacion(mock_request)
+        result = requiere_autenticacion(peticion_con_cookie(session_id))
         
         assert result is not None
-        assert result["username"] == username
+        assert result["username"] == "jutiapa1"
     
     def test_requiere_autenticacion_invalid_session(self):
         """Test authentication requirement with invalid session."""
-        mock_request = Mock(spec=Request)
-        mock_request.cookies = MagicMock()
-        mock_request.cookies.get = MagicMock(return_value=None)
-        
         with pytest.raises(HTTPException) as exc_info:
-            requiere_autenticacion(mock_request)
+            requiere_autenticacion(peticion_con_cookie())
         
         assert exc_info.value.status_code == 401
         assert "No autorizado" in exc_info.value.detail
@@ -241,12 +216,12 @@ class TestUserDatabase:
     
     def test_users_db_structure(self):
         """Test that USERS_DB has correct structure."""
-        assert isinstance(USERS_DB, dict)
+        assert isinstance(USERS_DB, Mapping)
         assert len(USERS_DB) > 0
         
         for username, user_data in USERS_DB.items():
             assert isinstance(username, str)
-            assert isinstance(user_data, dict)
+            assert isinstance(user_data, Mapping)
             assert "password_hash" in user_data
             assert "nombre" in user_data
             assert "rol" in user_data
@@ -0,0 +1,273 @@
+"""
+Desktop Admin Price Catalog Tests for MiPastel Application
+
+Tests for:
+- One shared price catalog per admin session, loaded in the background
+- Background fingerprint checks that notify open dialogs on a version change
+- Debounced flavor/size lookups and quantity changes that only recompute the total
+- Saving an order with the catalog price, even before the first load finishes
+- Database queries while scrolling the quantity spinner (benchmark)
+"""
+
+import os
+import time
+from decimal import Decimal
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+try:
+    from PySide6.QtCore import QCoreApplication, QThreadPool
+    from PySide6.QtWidgets import QApplication
+    PYSIDE_AVAILABLE = True
+except ImportError:
+    PYSIDE_AVAILABLE = False
+
+pytestmark = pytest.mark.skipif(not PYSIDE_AVAILABLE, reason="requiere PySide6")
+
+if PYSIDE_AVAILABLE:
+    from admin import catalogo as catalogo_admin
+    from admin import dialogos
+    from admin.catalogo import CatalogoEscritorio
+    from admin.dialogos import DialogoNuevoCliente, DialogoNuevoNormal
+    from api.catalogo_precios import CatalogoPrecios, SQL_CATALOGO, SQL_HUELLA
+    from tests.test_catalogo_precios import FakePool
+
+
+@pytest.fixture(scope="module")
+def qapp():
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def pool():
+    return FakePool([
+        (1, "Fresas", "Mediano", Decimal("150.00")),
+        (2, "Fresas", "Grande", Decimal("200.00")),
+        (3, "Chocolate", "Mediano", Decimal("140.00")),
+        (4, "Chocolate", "Grande", Decimal("190.00")),
+    ])
+
+
+@pytest.fixture
+def hilos():
+    hilos = QThreadPool()
+    yield hilos
+    hilos.waitForDone()
+
+
+@pytest.fixture
+def catalogo(qapp, pool, hilos, monkeypatch):
+    """Session catalog over a fake pool, installed as the one the dialogs use."""
+    catalogo = CatalogoEscritorio(CatalogoPrecios(pool, ttl_seconds=60), intervalo_s=3600, pool=hilos)
+    monkeypatch.setattr(catalogo_admin, "_catalogo_escritorio", catalogo)
+    yield catalogo
+    catalogo.deleteLater()
+
+
+def esperar(condicion, segundos=5):
+    limite = time.monotonic() + segundos
+    while not condicion() and time.monotonic() < limite:
+        QCoreApplication.processEvents()
+        time.sleep(0.005)
+    assert condicion()
+
+
+def cargar(catalogo):
+    catalogo.verificar()
+    esperar(lambda: catalogo.cargado)
+
+
+def dialogo_normal(catalogo, **kwargs):
+    dialogo = DialogoNuevoNormal(**kwargs)
+    dialogo.cmb_sabor.setCurrentText("Chocolate")
+    dialogo.cmb_tamano.setCurrentText("Grande")
+    dialogo.actualizar_precio()
+    return dialogo
+
+
+class TestCatalogoEscritorio:
+    """Test the session-wide price catalog."""
+
+    def test_loads_in_background_once(self, catalogo, pool):
+        """The first check loads the table; lookups afterwards never query."""
+        versiones = []
+        catalogo.actualizado.connect(versiones.append)
+        assert catalogo.precio("Fresas", "Mediano") is None
+
+        cargar(catalogo)
+        consultas = len(pool.consultas)
+        for _ in range(1000):
+            assert catalogo.precio("fresas", "MEDIANO") == 150.0
+
+        assert len(pool.consultas) == consultas
+        assert versiones == [catalogo.version]
+
+    def test_unchanged_table_does_not_notify(self, catalogo, pool):
+        """A later check with the same fingerprint only reads the fingerprint."""
+        cargar(catalogo)
+        versiones = []
+        catalogo.actualizado.connect(versiones.append)
+        pool.consultas.clear()
+
+        catalogo.verificar()
+        esperar(lambda: catalogo._verificador is None)
+
+        assert pool.consultas == [SQL_HUELLA]
+        assert versiones == []
+
+    def test_version_change_notifies(self, catalogo, pool):
+        """A price changed elsewhere is picked up by the next background check."""
+        cargar(catalogo)
+        anterior = catalogo.version
+        pool.filas = [(1, "Fresas", "Mediano", Decimal("165.00"))] + pool.filas[1:]
+        versiones = []
+        catalogo.actualizado.connect(versiones.append)
+
+        catalogo.verificar()
+        esperar(lambda: versiones)
+
+        assert versiones[0] != anterior
+        assert catalogo.precio("Fresas", "Mediano") == 165.0
+
+    def test_overlapping_checks_run_once(self, catalogo, pool):
+        catalogo.verificar()
+        catalogo.verificar()
+        esperar(lambda: catalogo.cargado)
+        assert pool.consultas.count(SQL_CATALOGO) == 1
+
+    def test_price_for_saving_loads_if_needed(self, catalogo):
+        """Saving before the background load finishes still uses the real price."""
+        assert catalogo.precio_para_guardar("Chocolate", "Mediano") == 140.0
+        assert catalogo.cargado
+
+
+class TestDialogosPrecio:
+    """Test price lookups in the order dialogs."""
+
+    def test_quantity_only_recomputes_total(self, catalogo, monkeypatch):
+        """Changing the quantity never looks the price up again."""
+        cargar(catalogo)
+        dialogo = dialogo_normal(catalogo)
+        busquedas = []
+        precio = catalogo.precio
+        monkeypatch.setattr(catalogo, "precio", lambda *a: busquedas.append(a) or precio(*a))
+
+        for cantidad in range(2, 30):
+            dialogo.spin_cantidad.setValue(cantidad)
+
+        assert busquedas == []
+        assert dialogo.line_precio_unitario.text() == "190.00"
+        assert dialogo.line_precio_total.text() == f"{190.0 * 29:.2f}"
+
+    def test_flavor_changes_are_debounced(self, catalogo, monkeypatch):
+        """Several quick flavor/size changes end in a single lookup."""
+        cargar(catalogo)
+        dialogo = dialogo_normal(catalogo)
+        busquedas = []
+        precio = catalogo.precio
+        monkeypatch.setattr(catalogo, "precio", lambda *a: busquedas.append(a) or precio(*a))
+
+        for sabor in ("Fresas", "Chocolate", "Fresas"):
+            dialogo.cmb_sabor.setCurrentText(sabor)
+        dialogo.cmb_tamano.setCurrentText("Mediano")
+        assert busquedas == []
+
+        esperar(lambda: busquedas)
+        assert busquedas == [("Fresas", "Mediano")]
+        assert dialogo.line_precio_unitario.text() == "150.00"
+
+    def test_dialog_opened_before_load_updates_itself(self, catalogo):
+        """A dialog shows 'Cargando...' until the catalog arrives, then fills in the price."""
+        dialogo = dialogo_normal(catalogo)
+        assert dialogo.line_precio_unitario.text() == "Cargando..."
+
+        cargar(catalogo)
+        assert dialogo.line_precio_unitario.text() == "190.00"
+
+    def test_failed_first_load_shows_error(self, catalogo, monkeypatch):
+        """Without a catalog the dialog says so instead of waiting forever."""
+        def sin_conexion():
+            raise RuntimeError("sin conexión")
+
+        monkeypatch.setattr(catalogo.catalogo, "instantanea", sin_conexion)
+        dialogo = dialogo_normal(catalogo)
+        catalogo.verificar()
+
+        esperar(lambda: dialogo.line_precio_unitario.text() == "Error")
+        assert dialogo.line_precio_total.text() == "0.00"
+
+    def test_open_dialog_follows_price_change(self, catalogo, pool):
+        cargar(catalogo)
+        dialogo = dialogo_normal(catalogo)
+        dialogo.spin_cantidad.setValue(2)
+
+        pool.filas = pool.filas[:3] + [(4, "Chocolate", "Grande", Decimal("210.00"))]
+        catalogo.verificar()
+        esperar(lambda: dialogo.line_precio_unitario.text() == "210.00")
+        assert dialogo.line_precio_total.text() == "420.00"
+
+    def test_closed_dialog_stops_following_catalog(self, catalogo, pool, monkeypatch):
+        """A closed dialog no longer recomputes its price on every version change."""
+        cargar(catalogo)
+        abierto, cerrado = dialogo_normal(catalogo), dialogo_normal(catalogo)
+        cerrado.reject()
+        recalculos = []
+        monkeypatch.setattr(cerrado, "actualizar_total", lambda: recalculos.append(1))
+
+        pool.filas = pool.filas[:3] + [(4, "Chocolate", "Grande", Decimal("210.00"))]
+        catalogo.verificar()
+        esperar(lambda: abierto.line_precio_unitario.text() == "210.00")
+
+        assert recalculos == []
+        assert cerrado.line_precio_unitario.text() == "190.00"
+
+    def test_form_data_uses_catalog(self, catalogo, monkeypatch):
+        """Saving takes the price from the catalog, not from a database query."""
+        cargar(catalogo)
+        monkeypatch.setattr(dialogos, "obtener_precio_db", lambda *a: pytest.fail("consultó la base"))
+        dialogo = DialogoNuevoCliente()
+        dialogo.cmb_sabor.setCurrentText("Fresas")
+        dialogo.cmb_tamano.setCurrentText("Grande")
+        dialogo.spin_cantidad.setValue(3)
+        dialogo.line_color.setText("Rosado")
+
+        datos = dialogo.obtener_datos_formulario()
+
+        assert datos["precio"] == 200.0
+        assert datos["total"] == 600.0
+
+    def test_manual_price_for_custom_flavor(self, catalogo):
+        cargar(catalogo)
+        dialogo = dialogo_normal(catalogo)
+        dialogo.check_es_otro.setChecked(True)
+        dialogo.line_sabor_personalizado.setText("Mandarina")
+        dialogo.line_precio_unitario.setText("175")
+
+        datos = dialogo.obtener_datos_formulario()
+
+        assert datos["sabor"] == "Mandarina"
+        assert datos["precio"] == 175.0
+
+
+class TestBenchmark:
+    """Benchmark database work while editing a dialog."""
+
+    def test_scrolling_quantity(self, catalogo, pool):
+        """Scrolling the spinner through its range runs no query; before, each tick ran a lookup."""
+        cargar(catalogo)
+        dialogo = dialogo_normal(catalogo)
+        pool.consultas.clear()
+
+        inicio = time.perf_counter()
+        maximo = dialogo.spin_cantidad.maximum()
+        for cantidad in range(2, maximo + 1):
+            dialogo.spin_cantidad.setValue(cantidad)
+        QCoreApplication.processEvents()
+        transcurrido = time.perf_counter() - inicio
+
+        print(f"\n{maximo - 1} cambios de cantidad: {transcurrido * 1000:.1f} ms, {len(pool.consultas)} consultas "
+              f"(antes: {maximo - 1} búsquedas de precio en el hilo de la interfaz)")
+        assert pool.consultas == []
+        assert dialogo.line_precio_total.text() == f"{190.0 * maximo:.2f}"
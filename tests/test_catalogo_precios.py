@@ -0,0 +1,254 @@
+"""
+Price Catalog Cache Tests for MiPastel Application
+
+Tests for:
+- O(1) in-memory lookups without database round-trips
+- Fingerprint check after the TTL
+- Atomic swap on reload
+- Diff-only price updates in one transaction returning the new catalog version
+- Rows written when one price changes in a full catalog save (benchmark)
+"""
+
+from contextlib import contextmanager
+from decimal import Decimal
+
+import pytest
+
+import api.database as database
+from api.catalogo_precios import CatalogoPrecios, SQL_CATALOGO, SQL_HUELLA, diferencias_precios
+
+
+class FakeCursor:
+    def __init__(self, pool):
+        self.pool = pool
+        self.resultado = None
+        self.rowcount = -1
+
+    def execute(self, query, *params):
+        self.pool.consultas.append(query)
+        if "MERGE INTO PastelesPrecios" in query:
+            valores = params[0]
+            nuevas = {valores[i]: tuple(valores[i:i + 4]) for i in range(0, len(valores), 4)}
+            self.rowcount = 0
+            for indice, fila in enumerate(self.pool.pendientes):
+                nueva = nuevas.get(fila[0])
+                if nueva and nueva != fila:
+                    self.pool.pendientes[indice] = nueva
+                    self.rowcount += 1
+        elif query == SQL_HUELLA:
+            self.resultado = [(len(self.pool.filas), hash(tuple(self.pool.filas)) & 0x7FFFFFFF)]
+        elif query == SQL_CATALOGO:
+            self.resultado = list(self.pool.filas)
+        return self
+
+    def fetchone(self):
+        return self.resultado[0]
+
+    def fetchall(self):
+        return self.resultado
+
+
+class FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def cursor(self):
+        return FakeCursor(self.pool)
+
+    def commit(self):
+        self.pool.filas = list(self.pool.pendientes)
+        self.pool.commits += 1
+
+
+class FakePool:
+    def __init__(self, filas):
+        self.filas = filas
+        self.consultas = []
+        self.commits = 0
+
+    @contextmanager
+    def get_connection(self):
+        # Lo no confirmado se descarta al devolver la conexión, como en el pool real
+        self.pendientes = list(self.filas)
+        yield FakeConnection(self)
+
+
+@pytest.fixture
+def pool():
+    return FakePool([
+        (1, "Fresas", "Mediano", Decimal("150.00")),
+        (2, "Fresas", "Grande", Decimal("200.00")),
+        (3, "Chocolate", "Mediano", Decimal("140.00")),
+    ])
+
+
+class TestCatalogoPrecios:
+    """Test the in-memory price catalog."""
+
+    def test_lookups_hit_memory_only(self, pool):
+        """After the first load, lookups must not query the database."""
+        catalogo = CatalogoPrecios(pool, ttl_seconds=60)
+
+        assert catalogo.obtener_precio("Fresas", "Mediano") == 150.0
+        consultas = len(pool.consultas)
+
+        for _ in range(100):
+            assert catalogo.obtener_precio("Chocolate", "Mediano") == 140.0
+        assert len(pool.consultas) == consultas
+
+    def test_lookup_is_case_and_space_insensitive(self, pool):
+        """Keys follow SQL Server's case-insensitive comparison."""
+        catalogo = CatalogoPrecios(pool, ttl_seconds=60)
+        assert catalogo.obtener_precio(" fresas ", "GRANDE") == 200.0
+        assert catalogo.obtener_precio("Vainilla", "Mediano") == 0.0
+
+    def test_unchanged_table_only_checks_fingerprint(self, pool):
+        """When the TTL expires and nothing changed, only the fingerprint is read."""
+        catalogo = CatalogoPrecios(pool, ttl_seconds=0)
+        primera = catalogo.instantanea()
+
+        pool.consultas.clear()
+        assert catalogo.instantanea() is primera
+        assert pool.consultas == [SQL_HUELLA]
+
+    def test_external_change_is_detected(self, pool):
+        """A change made outside the process is picked up after the TTL."""
+        catalogo = CatalogoPrecios(pool, ttl_seconds=0)
+        anterior = catalogo.instantanea()
+
+        pool.filas = [(1, "Fresas", "Mediano", Decimal("175.00"))] + pool.filas[1:]
+        nueva = catalogo.instantanea()
+
+        assert nueva is not anterior
+        assert nueva.version != anterior.version
+        assert nueva.precio("Fresas", "Mediano") == 175.0
+        assert anterior.precio("Fresas", "Mediano") == 150.0
+
+    def test_recargar_swaps_snapshot(self, pool):
+        """recargar always replaces the snapshot with fresh rows."""
+        catalogo = CatalogoPrecios(pool, ttl_seconds=60)
+        anterior = catalogo.instantanea()
+
+        pool.filas = pool.filas[:1]
+        nueva = catalogo.recargar()
+
+        assert nueva is not anterior
+        assert len(nueva.filas) == 1
+        assert catalogo.instantanea() is nueva
+
+    def test_snapshot_is_read_only(self, pool):
+        """The snapshot mapping cannot be mutated by callers."""
+        instantanea = CatalogoPrecios(pool, ttl_seconds=60).instantanea()
+        with pytest.raises(TypeError):
+            instantanea.precios[("fresas", "mediano")] = 1.0
+
+
+@pytest.fixture
+def base_de_datos(pool, monkeypatch):
+    """actualizar_precios_db against the fake pool with its own catalog."""
+    catalogo = CatalogoPrecios(pool, ttl_seconds=60)
+    monkeypatch.setattr(database, "db_pool_normales", pool)
+    monkeypatch.setattr(database, "catalogo_precios", catalogo)
+    return catalogo
+
+
+def merges(pool):
+    return [q for q in pool.consultas if "MERGE INTO PastelesPrecios" in q]
+
+
+class TestDiferenciasPrecios:
+    """Test the diff against the cached catalog."""
+
+    def test_only_changed_rows(self, pool):
+        """Unchanged rows are dropped; missing fields come from the catalog."""
+        instantanea = CatalogoPrecios(pool, ttl_seconds=60).instantanea()
+        cambios = diferencias_precios(instantanea, [
+            {"id": 1, "sabor": "Fresas", "tamano": "Mediano", "precio": 150},
+            {"id": 2, "precio": "Q210.50"},
+            {"id": 3, "sabor": "chocolate", "tamano": "Mediano", "precio": 140.0},
+        ])
+        assert cambios == [
+            (2, "Fresas", "Grande", Decimal("210.50")),
+            (3, "chocolate", "Mediano", Decimal("140.00")),
+        ]
+
+    def test_last_value_per_id_wins(self, pool):
+        """Editing a price and then putting it back leaves nothing to write."""
+        instantanea = CatalogoPrecios(pool, ttl_seconds=60).instantanea()
+        assert diferencias_precios(instantanea, [{"id": 1, "precio": 99}, {"id": 1, "precio": 150}]) == []
+
+    @pytest.mark.parametrize("precio", [{"id": 99, "precio": 10}, {"id": "x", "precio": 10},
+                                        {"id": 1, "precio": 0}, {"id": 1, "precio": "abc"},
+                                        {"id": 1, "precio": "NaN"}])
+    def test_invalid_input(self, pool, precio):
+        instantanea = CatalogoPrecios(pool, ttl_seconds=60).instantanea()
+        with pytest.raises(ValueError):
+            diferencias_precios(instantanea, [precio])
+
+
+class TestActualizarPrecios:
+    """Test diff-only writes through actualizar_precios_db."""
+
+    def test_writes_only_changes_in_one_transaction(self, pool, base_de_datos):
+        """One statement, one commit, and the returned version is the reloaded catalog."""
+        anterior = base_de_datos.instantanea().version
+        todos = [{"id": i, "sabor": s, "tamano": t, "precio": float(p)} for i, s, t, p in pool.filas]
+        todos[2]["precio"] = 155.0
+
+        resultado = database.actualizar_precios_db(todos)
+
+        assert resultado["actualizados"] == 1
+        assert resultado["version"] == base_de_datos.instantanea().version != anterior
+        assert len(merges(pool)) == 1 and pool.commits == 1
+        assert base_de_datos.obtener_precio("Chocolate", "Mediano") == 155.0
+
+    def test_no_changes_skip_the_database_write(self, pool, base_de_datos):
+        """Saving the catalog as it is does not open a write at all."""
+        version = base_de_datos.instantanea().version
+        resultado = database.actualizar_precios_db([{"id": 1, "precio": "150.00"}])
+
+        assert resultado == {"actualizados": 0, "version": version}
+        assert merges(pool) == [] and pool.commits == 0
+
+    def test_diff_checks_fingerprint_first(self, pool, base_de_datos):
+        """A change made elsewhere since the last load is seen before diffing."""
+        base_de_datos.instantanea()
+        pool.filas = [(1, "Fresas", "Mediano", Decimal("175.00"))] + pool.filas[1:]
+
+        resultado = database.actualizar_precios_db([{"id": 1, "precio": 150}])
+
+        assert resultado["actualizados"] == 1
+        assert pool.filas[0][3] == Decimal("150.00")
+
+    def test_large_save_is_chunked(self, monkeypatch, base_de_datos, pool):
+        """Statements stay under SQL Server's parameter limit but share one commit."""
+        monkeypatch.setattr(database, "PRECIOS_POR_SENTENCIA", 2)
+        resultado = database.actualizar_precios_db([{"id": i, "precio": 100 + i} for i in (1, 2, 3)])
+
+        assert resultado["actualizados"] == 3
+        assert len(merges(pool)) == 2 and pool.commits == 1
+
+    def test_invalid_price_writes_nothing(self, pool, base_de_datos):
+        with pytest.raises(ValueError):
+            database.actualizar_precios_db([{"id": 1, "precio": 120}, {"id": 2, "precio": -5}])
+        assert merges(pool) == [] and pool.commits == 0
+
+
+class TestBenchmark:
+    """Benchmark rows written by a price save."""
+
+    def test_one_edit_in_full_catalog(self, monkeypatch):
+        """Saving a 300-price catalog with one edit writes one row instead of 300."""
+        filas = [(i, f"Sabor {i // 6}", f"Tamaño {i % 6}", Decimal("100.00") + i) for i in range(1, 301)]
+        pool = FakePool(filas)
+        monkeypatch.setattr(database, "db_pool_normales", pool)
+        monkeypatch.setattr(database, "catalogo_precios", CatalogoPrecios(pool, ttl_seconds=60))
+
+        enviados = [{"id": i, "sabor": s, "tamano": t, "precio": float(p)} for i, s, t, p in filas]
+        enviados[150]["precio"] += 5
+
+        resultado = database.actualizar_precios_db(enviados)
+
+        print(f"\nguardar {len(enviados)} precios con 1 cambio: {resultado['actualizados']} fila(s) escrita(s) "
+              f"en {len(merges(pool))} sentencia(s); antes: {len(enviados)} UPDATE")
+        assert resultado["actualizados"] == 1
@@ -0,0 +1,159 @@
+"""
+Response Compression Tests for MiPastel Application
+
+Tests for:
+- gzip negotiation and the COMPRESSION_MIN_BYTES threshold
+- Streamed responses compressed chunk by chunk
+- Content that must pass through untouched (PDF, images, SSE, already encoded)
+- Bytes on the wire for a day's listing and the main page (benchmark)
+"""
+
+import gzip
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from fastapi import FastAPI, status
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock, patch
+
+from app.middleware import CompresionMiddleware, Compresor, es_comprimible
+from starlette.datastructures import Headers
+
+TEXTO = "Mediano de Fresas para Jutiapa 1; " * 200
+
+
+def crear_app():
+    app = FastAPI()
+
+    @app.get("/grande")
+    async def grande():
+        return JSONResponse({"texto": TEXTO}, headers={"ETag": '"abc"'})
+
+    @app.get("/chico")
+    async def chico():
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream():
+        async def partes():
+            for _ in range(5):
+                yield TEXTO.encode()
+        return StreamingResponse(partes(), media_type="text/html")
+
+    @app.get("/pdf")
+    async def pdf():
+        return Response(b"%PDF-1.4 " + TEXTO.encode(), media_type="application/pdf")
+
+    @app.get("/eventos")
+    async def eventos():
+        return StreamingResponse(iter([b"data: hola\n\n" * 200]), media_type="text/event-stream")
+
+    app.add_middleware(CompresionMiddleware)
+    return app
+
+
+@pytest.fixture
+def cliente():
+    return TestClient(crear_app())
+
+
+class TestNegociacion:
+    """Test when responses are compressed."""
+
+    def test_large_json_is_gzipped(self, cliente):
+        """Bodies above the threshold are compressed with an exact Content-Length and a weak ETag."""
+        response = cliente.get("/grande", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.headers["etag"] == 'W/"abc"'
+        assert int(response.headers["content-length"]) == response.num_bytes_downloaded
+        assert response.num_bytes_downloaded < len(TEXTO) / 10
+        assert response.json() == {"texto": TEXTO}
+
+    def test_small_or_not_accepted(self, cliente):
+        """Small bodies and clients without gzip get the identity body, still with Vary."""
+        chico = cliente.get("/chico", headers={"Accept-Encoding": "gzip"})
+        sin_gzip = cliente.get("/grande", headers={"Accept-Encoding": "gzip;q=0, identity"})
+
+        for response in (chico, sin_gzip):
+            assert "content-encoding" not in response.headers
+            assert response.headers["vary"] == "Accept-Encoding"
+        assert sin_gzip.headers["etag"] == '"abc"'
+
+    def test_streaming_compressed_incrementally(self, cliente):
+        """Streamed bodies are compressed without Content-Length and decode to the full body."""
+        response = cliente.get("/stream", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        assert response.text == TEXTO * 5
+
+    @pytest.mark.parametrize("ruta", ["/pdf", "/eventos"])
+    def test_excluded_types_pass_through(self, cliente, ruta):
+        """PDFs and SSE streams are never compressed or buffered."""
+        response = cliente.get(ruta, headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        assert "vary" not in response.headers
+
+    @pytest.mark.parametrize("cabeceras,esperado", [
+        ({"content-type": "application/json"}, True),
+        ({"content-type": "text/html; charset=utf-8"}, True),
+        ({"content-type": "image/jpeg"}, False),
+        ({"content-type": "application/javascript", "content-encoding": "br"}, False),
+        ({"content-type": "application/json", "cache-control": "no-transform"}, False),
+        ({}, False),
+    ])
+    def test_compressible_types(self, cabeceras, esperado):
+        """Only uncompressed text responses qualify."""
+        assert es_comprimible(200, Headers(headers=cabeceras)) is esperado
+
+    def test_incremental_gzip_is_valid(self):
+        """Chunks flushed one by one form a single valid gzip stream."""
+        compresor = Compresor("gzip")
+        datos = b"".join(compresor.comprimir(parte, final=False) for parte in (b"uno ", b"dos "))
+        datos += compresor.comprimir(b"tres", final=True)
+        assert gzip.decompress(datos) == b"uno dos tres"
+
+
+def pedidos_del_dia(cantidad):
+    inicio = datetime(2024, 5, 1, 8, 0)
+    sabores = ["Fresas", "Chocolate", "Tres leches", "Selva negra", "Moka"]
+    tamanos = ["Mini", "Pequeño", "Mediano", "Grande"]
+    sucursales = ["Jutiapa 1", "Progreso", "Quesada", "Comapa"]
+    return [
+        (10000 + i, sabores[i % 5], tamanos[i % 4], Decimal(95 + (i % 4) * 30), 1 + i % 3, sucursales[i % 4],
+         inicio + timedelta(minutes=7 * i), datetime(2024, 5, 2), "Sin nueces" if i % 6 == 0 else "", None)
+        for i in range(cantidad)
+    ]
+
+
+class TestBytesEnLinea:
+    """Benchmark bytes on the wire before and after compression."""
+
+    @patch('routers.admin.DatabaseManager')
+    def test_day_listing(self, mock_db, admin_client):
+        """A full page of a day's orders shrinks to a fraction of its JSON size."""
+        mock_db.return_value = MagicMock()
+        mock_db.return_value.obtener_pasteles_normales_filas.side_effect = lambda **kw: pedidos_del_dia(kw["limite"])
+        url = "/admin/normales?fecha_inicio=2024-05-01&limite=100"
+
+        antes = admin_client.get(url, headers={"Accept-Encoding": "identity"})
+        despues = admin_client.get(url, headers={"Accept-Encoding": "gzip"})
+
+        assert antes.json() == despues.json()
+        assert despues.headers["content-encoding"] == "gzip"
+        print(f"\n/admin/normales (100 pedidos): {antes.num_bytes_downloaded} -> {despues.num_bytes_downloaded} bytes")
+        assert despues.num_bytes_downloaded < antes.num_bytes_downloaded * 0.25
+
+    def test_index_page(self, authenticated_client):
+        """The main page HTML is compressed too."""
+        antes = authenticated_client.get("/", headers={"Accept-Encoding": "identity"})
+        despues = authenticated_client.get("/", headers={"Accept-Encoding": "gzip"})
+
+        assert antes.status_code == despues.status_code == status.HTTP_200_OK
+        assert despues.text == antes.text
+        print(f"\nindex.html: {antes.num_bytes_downloaded} -> {despues.num_bytes_downloaded} bytes")
+        assert despues.num_bytes_downloaded < antes.num_bytes_downloaded * 0.35
@@ -0,0 +1,156 @@
+"""
+Statistics Engine Tests for MiPastel Application
+
+Tests for:
+- Aggregation pushed into SQL (GROUP BY with sargable date filter)
+- Legacy totals and breakdowns by branch, day and product
+- /admin/estadisticas filters and branch restriction
+"""
+
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+import api.estadisticas as estadisticas
+from api.database import DatabaseManager
+
+HOY = date(2024, 5, 1)
+AYER = date(2024, 4, 30)
+
+
+class AgregadoCursor:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def execute(self, query, params=()):
+        self.pool.consultas.append((query, tuple(params)))
+        return self
+
+    def fetchall(self):
+        return self.pool.filas
+
+
+class AgregadoConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def cursor(self):
+        return AgregadoCursor(self.pool)
+
+
+class AgregadoPool:
+    def __init__(self, filas):
+        self.filas = filas
+        self.consultas = []
+
+    @contextmanager
+    def get_connection(self):
+        yield AgregadoConnection(self)
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    normales = AgregadoPool([
+        ("Jutiapa 1", "Fresas", "Mediano", HOY, 3, 5, Decimal("625.00")),
+        ("Jutiapa 1", "Fresas", "Mediano", AYER, 1, 1, Decimal("125.00")),
+        ("Progreso", "Chocolate", "Grande", HOY, 2, 2, Decimal("310.00")),
+    ])
+    clientes = AgregadoPool([
+        ("Progreso", "Fresas", "Mediano", HOY, 1, 2, Decimal("300.00")),
+    ])
+    monkeypatch.setattr(estadisticas, "db_pool_normales", normales)
+    monkeypatch.setattr(estadisticas, "db_pool_clientes", clientes)
+    return normales, clientes
+
+
+class TestAggregationQuery:
+    """Test the SQL sent to each database."""
+
+    def test_groups_on_server(self, pools):
+        """Both tables are aggregated with GROUP BY and a sargable range."""
+        DatabaseManager().obtener_estadisticas("2024-04-30", "2024-05-01", sucursal="Progreso")
+
+        for pool in pools:
+            query, params = pool.consultas[0]
+            assert "GROUP BY sucursal, sabor, tamano, CAST(fecha AS DATE)" in query
+            assert "fecha >= ? AND fecha < ?" in query
+            assert params == (datetime(2024, 4, 30), datetime(2024, 5, 2), "Progreso")
+
+    def test_revenue_definitions(self, pools):
+        """Store revenue is precio * cantidad, customer revenue is the stored total."""
+        DatabaseManager().obtener_estadisticas()
+        assert "SUM(precio * cantidad)" in pools[0].consultas[0][0]
+        assert "SUM(total)" in pools[1].consultas[0][0]
+
+    def test_todas_does_not_filter(self, pools):
+        """sucursal='todas' keeps the query for every branch."""
+        DatabaseManager().obtener_estadisticas(sucursal="todas")
+        assert "sucursal = ?" not in pools[0].consultas[0][0]
+
+
+class TestCombinarEstadisticas:
+    """Test the folding of aggregated rows."""
+
+    def test_legacy_totals(self, pools):
+        """The six historical keys keep their meaning."""
+        stats = DatabaseManager().obtener_estadisticas()
+
+        assert stats["normales_count"] == 6
+        assert stats["normales_cantidad"] == 8
+        assert stats["normales_ingresos"] == 1060.0
+        assert stats["clientes_count"] == 1
+        assert stats["clientes_cantidad"] == 2
+        assert stats["clientes_ingresos"] == 300.0
+
+    def test_breakdowns(self, pools):
+        """Branch, day and product breakdowns share the same keys."""
+        stats = DatabaseManager().obtener_estadisticas()
+
+        por_sucursal = {s["sucursal"]: s for s in stats["por_sucursal"]}
+        assert por_sucursal["Jutiapa 1"]["normales_ingresos"] == 750.0
+        assert por_sucursal["Progreso"]["clientes_count"] == 1
+
+        assert [d["fecha"] for d in stats["por_dia"]] == ["2024-04-30", "2024-05-01"]
+        assert stats["por_dia"][1]["normales_count"] == 5
+
+        primero = stats["por_producto"][0]
+        assert (primero["sabor"], primero["tamano"]) == ("Fresas", "Mediano")
+        assert primero["normales_cantidad"] + primero["clientes_cantidad"] == 8
+
+    def test_empty_period(self):
+        """A period without orders returns zeros and empty breakdowns."""
+        stats = estadisticas.combinar_estadisticas([], [])
+        assert stats["normales_count"] == 0
+        assert stats["por_sucursal"] == stats["por_dia"] == stats["por_producto"] == []
+
+
+class TestEstadisticasEndpoint:
+    """Test /admin/estadisticas."""
+
+    @patch('routers.admin.DatabaseManager')
+    def test_branch_user_is_restricted(self, mock_db, authenticated_client):
+        """A branch user always gets the statistics of their own branch."""
+        mock_db.return_value = MagicMock()
+        mock_db.return_value.obtener_estadisticas.return_value = {"normales_count": 0}
+
+        response = authenticated_client.get("/admin/estadisticas?fecha_inicio=2024-05-01&sucursal=Progreso")
+
+        assert response.status_code == 200
+        mock_db.return_value.obtener_estadisticas.assert_called_once_with(
+            fecha_inicio="2024-05-01", fecha_fin=None, sucursal="Jutiapa 1"
+        )
+
+    @patch('routers.admin.DatabaseManager')
+    def test_admin_filters(self, mock_db, admin_client):
+        """Admins can pick any branch and range; the legacy fecha parameter still works."""
+        mock_db.return_value = MagicMock()
+        mock_db.return_value.obtener_estadisticas.return_value = {"normales_count": 0}
+
+        admin_client.get("/admin/estadisticas?fecha=2024-05-01&fecha_fin=2024-05-31&sucursal=Progreso")
+
+        mock_db.return_value.obtener_estadisticas.assert_called_once_with(
+            fecha_inicio="2024-05-01", fecha_fin="2024-05-31", sucursal="Progreso"
+        )
@@ -0,0 +1,165 @@
+"""
+Conditional GET Tests for MiPastel Application
+
+Tests for:
+- Per-(table, sucursal) version counters bumped by the write paths
+- Weak ETags and If-None-Match matching
+- 304 responses on /admin and /api/pedidos listings before any DB query
+- DB queries saved by idle polling (benchmark)
+"""
+
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+from fastapi import status
+from unittest.mock import MagicMock, patch
+
+import api.database as database_api
+from api.versiones import TABLA_CLIENTES, TABLA_NORMALES, VersionesPedidos, coincide_etag, versiones_pedidos
+from config.settings import settings
+from starlette.requests import Request
+
+from tests.test_compresion import pedidos_del_dia
+
+
+def peticion(if_none_match):
+    return Request({"type": "http", "headers": [(b"if-none-match", if_none_match.encode())]})
+
+
+def pedidos(n):
+    return [{"id": 500 - i, "fecha": datetime(2024, 5, 1, 18, i).isoformat(), "precio": 10.0, "cantidad": 1,
+             "fecha_entrega": None} for i in range(n)]
+
+
+@pytest.fixture
+def mock_admin_db():
+    with patch('routers.admin.DatabaseManager') as mock_db:
+        mock_db.return_value = MagicMock()
+        mock_db.return_value.obtener_pasteles_normales_filas.side_effect = lambda **kw: pedidos_del_dia(5)
+        yield mock_db.return_value
+
+
+class TestVersiones:
+    """Test the version counters and ETags."""
+
+    def test_write_bumps_table_and_branch(self):
+        """A change invalidates its branch and the whole table, not other branches."""
+        versiones = VersionesPedidos()
+        antes = {s: versiones.etag(TABLA_NORMALES, s) for s in ("Jutiapa 1", "Progreso", None)}
+
+        versiones.incrementar(TABLA_NORMALES, "Jutiapa 1")
+
+        assert versiones.etag(TABLA_NORMALES, "Jutiapa 1") != antes["Jutiapa 1"]
+        assert versiones.etag(TABLA_NORMALES, None) != antes[None]
+        assert versiones.etag(TABLA_NORMALES, "Progreso") == antes["Progreso"]
+        assert versiones.version(TABLA_CLIENTES) == 0
+
+    def test_moved_order_bumps_both_branches(self):
+        """Moving an order changes the listings of the old and the new branch."""
+        versiones = VersionesPedidos()
+        versiones.incrementar(TABLA_CLIENTES, "Progreso", "Jutiapa 1")
+        assert versiones.version(TABLA_CLIENTES, "Progreso") == versiones.version(TABLA_CLIENTES, "Jutiapa 1") == 1
+        assert versiones.version(TABLA_CLIENTES, "Todas") == 1
+
+    def test_etag_expires_with_window(self, monkeypatch):
+        """Changes made by other processes are picked up once the window rolls over."""
+        versiones = VersionesPedidos()
+        monkeypatch.setattr(settings, "ETAG_MAX_AGE_SECONDS", 300)
+        with patch("api.versiones.time.time", return_value=900.0):
+            primero = versiones.etag(TABLA_NORMALES, None, "a")
+        with patch("api.versiones.time.time", return_value=1199.0):
+            assert versiones.etag(TABLA_NORMALES, None, "a") == primero
+        with patch("api.versiones.time.time", return_value=1200.0):
+            assert versiones.etag(TABLA_NORMALES, None, "a") != primero
+
+    @pytest.mark.parametrize("cabecera,esperado", [
+        ('W/"x-1-abc"', True),
+        ('"x-1-abc"', True),
+        ('"otro", W/"x-1-abc"', True),
+        ("*", True),
+        ('W/"x-2-abc"', False),
+    ])
+    def test_weak_comparison(self, cabecera, esperado):
+        """If-None-Match uses weak comparison, lists and '*'."""
+        assert coincide_etag(peticion(cabecera), 'W/"x-1-abc"') is esperado
+
+    def test_database_write_bumps_version(self, monkeypatch):
+        """The delete path bumps the version of the deleted row's branch."""
+        @contextmanager
+        def conexion():
+            conn = MagicMock()
+            conn.cursor.return_value.fetchone.return_value = ("Quesada",)
+            yield conn
+
+        monkeypatch.setattr(database_api, "db_pool_clientes", MagicMock(get_connection=conexion))
+        antes = versiones_pedidos.version(TABLA_CLIENTES, "Quesada")
+
+        database_api.eliminar_cliente_db(12)
+
+        assert versiones_pedidos.version(TABLA_CLIENTES, "Quesada") == antes + 1
+
+
+class TestListadosCondicionales:
+    """Test conditional GET on the listing endpoints."""
+
+    def test_admin_listing_304_without_query(self, mock_admin_db, admin_client):
+        """A matching If-None-Match answers 304 without touching the database."""
+        primera = admin_client.get("/admin/normales?fecha_inicio=2024-05-01")
+        etag = primera.headers["etag"]
+        llamadas = mock_admin_db.obtener_pasteles_normales_filas.call_count
+
+        segunda = admin_client.get("/admin/normales?fecha_inicio=2024-05-01", headers={"If-None-Match": etag})
+
+        assert etag.startswith('W/"')
+        assert primera.headers["cache-control"] == "private, no-cache"
+        assert segunda.status_code == status.HTTP_304_NOT_MODIFIED
+        assert segunda.content == b""
+        assert segunda.headers["etag"] == etag
+        assert mock_admin_db.obtener_pasteles_normales_filas.call_count == llamadas
+
+    def test_write_or_other_params_miss(self, mock_admin_db, admin_client):
+        """A write or a different query gets a fresh 200."""
+        etag = admin_client.get("/admin/normales?fecha_inicio=2024-05-01").headers["etag"]
+
+        otra_fecha = admin_client.get("/admin/normales?fecha_inicio=2024-05-02", headers={"If-None-Match": etag})
+        versiones_pedidos.incrementar(TABLA_NORMALES, "Progreso")
+        tras_escritura = admin_client.get("/admin/normales?fecha_inicio=2024-05-01", headers={"If-None-Match": etag})
+
+        assert otra_fecha.status_code == tras_escritura.status_code == status.HTTP_200_OK
+        assert tras_escritura.headers["etag"] != etag
+
+    @patch('routers.pedidos_api.DatabaseManager')
+    def test_branch_listing_ignores_other_branches(self, mock_db, authenticated_client):
+        """A branch user's ETag survives writes in other branches and expires on its own."""
+        mock_db.return_value = MagicMock()
+        mock_db.return_value.obtener_pasteles_normales.side_effect = lambda **kw: pedidos(3)
+        etag = authenticated_client.get("/api/pedidos/normales").headers["etag"]
+
+        versiones_pedidos.incrementar(TABLA_NORMALES, "Progreso")
+        otra_sucursal = authenticated_client.get("/api/pedidos/normales", headers={"If-None-Match": etag})
+        versiones_pedidos.incrementar(TABLA_NORMALES, "Jutiapa 1")
+        propia = authenticated_client.get("/api/pedidos/normales", headers={"If-None-Match": etag})
+
+        assert otra_sucursal.status_code == status.HTTP_304_NOT_MODIFIED
+        assert propia.status_code == status.HTTP_200_OK
+        assert len(propia.json()["pedidos"]) == 3
+
+
+class TestBenchmark:
+    """Benchmark the DB work of idle polling."""
+
+    def test_idle_polling_queries(self, mock_admin_db, admin_client):
+        """Fifty polls of an unchanged listing run a single query."""
+        url = "/admin/normales?fecha_inicio=2024-05-01"
+        etag = None
+        codigos = []
+        for _ in range(50):
+            response = admin_client.get(url, headers={"If-None-Match": etag} if etag else {})
+            etag = response.headers["etag"]
+            codigos.append(response.status_code)
+
+        consultas = mock_admin_db.obtener_pasteles_normales_filas.call_count
+        print(f"\n50 sondeos sin cambios: {consultas} consulta(s), {codigos.count(304)} respuestas 304")
+        assert consultas == 1
+        assert codigos.count(304) == 49
@@ -0,0 +1,262 @@
+"""
+Live Order Events Tests for MiPastel Application
+
+Tests for:
+- The in-process broadcaster: branch filtering, cross-thread delivery and overflow
+- Events published by the insert, update, delete and batch paths
+- The /api/pedidos/eventos Server-Sent Events stream
+- Latency from a committed write to the subscriber (benchmark)
+"""
+
+import asyncio
+import json
+import threading
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+
+import pytest
+from fastapi import status
+from unittest.mock import MagicMock
+
+import api.database as database_api
+from api.eventos import (
+    ACCION_ACTUALIZADO, ACCION_CREADO, ACCION_ELIMINADO, ACCION_RECARGAR,
+    DifusorEventos, formatear_evento, pedido_evento,
+)
+from config.settings import settings
+from routers.pedidos_api import flujo_eventos
+
+
+class FakeCursor:
+    def __init__(self, filas):
+        self.filas = list(filas)
+        self.queries = []
+
+    def execute(self, query, params=()):
+        self.queries.append((query, params))
+
+    def fetchone(self):
+        return self.filas.pop(0) if self.filas else None
+
+    def fetchall(self):
+        filas, self.filas = self.filas, []
+        return filas
+
+
+class FakePool:
+    def __init__(self, *filas):
+        self.cursor = FakeCursor(filas)
+
+    @contextmanager
+    def get_connection(self):
+        conn = MagicMock()
+        conn.cursor.return_value = self.cursor
+        yield conn
+
+
+@pytest.fixture
+def difusor(monkeypatch):
+    difusor = MagicMock()
+    monkeypatch.setattr(database_api, "difusor_eventos", difusor)
+    return difusor
+
+
+def publicados(difusor):
+    return [c.args for c in difusor.publicar_seguro.call_args_list]
+
+
+class TestDifusor:
+    """Test the broadcaster."""
+
+    def test_filters_by_branch(self):
+        """Branch subscribers only see their branch; admins (None) see everything."""
+        async def escenario():
+            difusor = DifusorEventos()
+            jutiapa, progreso, admin = (difusor.suscribir(s) for s in ("Jutiapa 1", "Progreso", None))
+            difusor.publicar("normal", ACCION_CREADO, 7, "Jutiapa 1", {"id": 7})
+            return [await s.siguiente(0.2) for s in (jutiapa, progreso, admin)]
+
+        jutiapa, progreso, admin = asyncio.run(escenario())
+
+        assert jutiapa["pedido_id"] == admin["pedido_id"] == 7
+        assert progreso is None
+
+    def test_delivered_from_worker_thread(self):
+        """Writes run in executor threads; their events still reach the loop."""
+        async def escenario():
+            difusor = DifusorEventos()
+            suscripcion = difusor.suscribir(None)
+            hilo = threading.Thread(target=difusor.publicar, args=("cliente", ACCION_ELIMINADO, 3, "Progreso"))
+            hilo.start()
+            evento = await suscripcion.siguiente(1)
+            hilo.join()
+            return evento
+
+        evento = asyncio.run(escenario())
+        assert (evento["tipo"], evento["accion"], evento["pedido_id"]) == ("cliente", ACCION_ELIMINADO, 3)
+
+    def test_moved_order_is_a_delete_and_a_create(self):
+        """Moving an order removes it from the old branch's table and adds it to the new one's."""
+        async def escenario():
+            difusor = DifusorEventos()
+            anterior, nueva, admin = difusor.suscribir("Jutiapa 1"), difusor.suscribir("Progreso"), difusor.suscribir(None)
+            difusor.publicar("normal", ACCION_ACTUALIZADO, 9, "Progreso", {"id": 9}, sucursal_anterior="Jutiapa 1")
+            return await anterior.siguiente(0.2), await nueva.siguiente(0.2), await admin.siguiente(0.2)
+
+        anterior, nueva, admin = asyncio.run(escenario())
+
+        assert anterior["accion"] == ACCION_ELIMINADO and anterior["pedido"] is None
+        assert nueva["accion"] == ACCION_CREADO and nueva["pedido"] == {"id": 9}
+        assert admin["accion"] == ACCION_ACTUALIZADO
+
+    def test_overflow_asks_to_reload(self):
+        """A subscriber that falls behind gets one 'recargar' instead of an unbounded queue."""
+        async def escenario():
+            difusor = DifusorEventos(max_pendientes=3)
+            suscripcion = difusor.suscribir(None)
+            for i in range(10):
+                difusor.publicar("normal", ACCION_CREADO, i, "Progreso", {"id": i})
+            await asyncio.sleep(0)
+            primero = await suscripcion.siguiente(0.2)
+            resto = await suscripcion.siguiente(0.05)
+            difusor.publicar("normal", ACCION_CREADO, 99, "Progreso", {"id": 99})
+            return primero, resto, await suscripcion.siguiente(0.2)
+
+        primero, resto, despues = asyncio.run(escenario())
+
+        assert primero["accion"] == ACCION_RECARGAR
+        assert resto is None
+        assert despues["pedido_id"] == 99
+
+    def test_cancel_and_no_subscribers(self):
+        """Cancelled subscriptions stop receiving; publishing with nobody listening is a no-op."""
+        async def escenario():
+            difusor = DifusorEventos()
+            difusor.publicar("normal", ACCION_CREADO, 1, "Progreso")
+            suscripcion = difusor.suscribir(None)
+            difusor.cancelar(suscripcion)
+            difusor.publicar("normal", ACCION_CREADO, 2, "Progreso")
+            return difusor.suscriptores, await suscripcion.siguiente(0.05)
+
+        assert asyncio.run(escenario()) == (0, None)
+
+    def test_sse_format(self):
+        """Events are framed as text/event-stream with their id and name."""
+        evento = {"id": 4, "tipo": "normal", "accion": ACCION_CREADO, "pedido_id": 1, "sucursal": "Progreso",
+                  "pedido": pedido_evento(1, {"precio": Decimal("125.50"), "sabor": "Fresas"}, ["precio", "sabor"])}
+
+        trama = formatear_evento(evento).decode()
+
+        assert trama.startswith("id: 4\nevent: pedido\ndata: ")
+        assert trama.endswith("\n\n")
+        assert json.loads(trama.split("data: ", 1)[1])["pedido"] == {"id": 1, "precio": 125.5, "sabor": "Fresas"}
+
+
+class TestRutasEscritura:
+    """Test that the write paths in api/database.py publish their changes."""
+
+    def test_insert_publishes_created(self, monkeypatch, difusor):
+        """A new store order is published with its id and written fields."""
+        monkeypatch.setattr(database_api, "db_pool_normales", FakePool((41,)))
+
+        database_api.registrar_pastel_normal_db({"sabor": "Fresas", "tamano": "Mediano", "cantidad": 2,
+                                                 "precio": 125.0, "sucursal": "Progreso"})
+
+        tipo, accion, pedido_id, sucursal, pedido = publicados(difusor)[0]
+        assert (tipo, accion, pedido_id, sucursal) == ("normal", ACCION_CREADO, 41, "Progreso")
+        assert pedido["sabor"] == "Fresas" and pedido["cantidad"] == 2
+
+    def test_update_reports_previous_branch(self, monkeypatch, difusor):
+        """The UPDATE returns the previous branch so it can drop the order from its table."""
+        pool = FakePool(("Jutiapa 1",))
+        monkeypatch.setattr(database_api, "db_pool_clientes", pool)
+
+        database_api.actualizar_pedido_cliente_db(5, {"sabor": "Chocolate", "precio": 160.0, "sucursal": "Progreso"})
+
+        assert "OUTPUT DELETED.sucursal INTO @anterior" in pool.cursor.queries[0][0]
+        llamada = difusor.publicar_seguro.call_args
+        assert llamada.args[:4] == ("cliente", ACCION_ACTUALIZADO, 5, "Progreso")
+        assert llamada.kwargs["sucursal_anterior"] == "Jutiapa 1"
+
+    def test_delete_publishes_branch_of_deleted_row(self, monkeypatch, difusor):
+        """Deletes learn the row's branch from OUTPUT; missing ids publish nothing."""
+        monkeypatch.setattr(database_api, "db_pool_normales", FakePool(("Quesada",)))
+        database_api.eliminar_normal_db(8)
+        monkeypatch.setattr(database_api, "db_pool_normales", FakePool())
+        database_api.eliminar_normal_db(9)
+
+        assert [p[:4] for p in publicados(difusor)] == [("normal", ACCION_ELIMINADO, 8, "Quesada")]
+
+    def test_batch_publishes_each_order(self, monkeypatch, difusor):
+        """Batch inserts publish one event per order with the id assigned to it."""
+        monkeypatch.setattr(database_api, "db_pool_normales", FakePool((100,), (101,)))
+
+        database_api.registrar_pasteles_normales_lote_db([{"sucursal": "Progreso"}, {"sucursal": "Comapa"}])
+
+        assert [(p[2], p[3]) for p in publicados(difusor)] == [(100, "Progreso"), (101, "Comapa")]
+
+    def test_publish_failure_does_not_fail_write(self, monkeypatch):
+        """A broken subscriber never turns a committed write into an error."""
+        monkeypatch.setattr(database_api, "db_pool_normales", FakePool(("Progreso",)))
+        difusor = DifusorEventos()
+        monkeypatch.setattr(difusor, "_suscripciones", [MagicMock(adaptar=MagicMock(side_effect=KeyError))])
+        monkeypatch.setattr(database_api, "difusor_eventos", difusor)
+
+        assert database_api.eliminar_normal_db(3) is True
+
+
+class TestEndpointEventos:
+    """Test the SSE endpoint."""
+
+    def test_requires_authentication(self, client):
+        """The event stream requires a session."""
+        response = client.get("/api/pedidos/eventos")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_stream_sends_retry_events_and_heartbeats(self, monkeypatch):
+        """The stream starts with the retry hint, forwards events and pings while idle."""
+        difusor = DifusorEventos()
+        monkeypatch.setattr("routers.pedidos_api.difusor_eventos", difusor)
+        monkeypatch.setattr(settings, "EVENTS_HEARTBEAT_SECONDS", 0.05)
+
+        async def escenario():
+            flujo = flujo_eventos("Progreso")
+            partes = [await flujo.__anext__()]
+            difusor.publicar("normal", ACCION_CREADO, 1, "Progreso", {"id": 1})
+            partes.append(await flujo.__anext__())
+            partes.append(await flujo.__anext__())
+            await flujo.aclose()
+            return partes, difusor.suscriptores
+
+        (retry, evento, latido), suscriptores = asyncio.run(escenario())
+
+        assert retry == b"retry: %d\n\n" % settings.EVENTS_RETRY_MS
+        assert evento.startswith(b"id: 1\nevent: pedido\n")
+        assert latido == b": latido\n\n"
+        assert suscriptores == 0
+
+
+class TestLatencia:
+    """Benchmark the delay between a committed write and its event."""
+
+    def test_event_arrives_within_milliseconds(self, monkeypatch):
+        """Replacing the 60 s polling interval, the change reaches the browser's queue almost at once."""
+        difusor = DifusorEventos()
+        monkeypatch.setattr(database_api, "difusor_eventos", difusor)
+        monkeypatch.setattr(database_api, "db_pool_normales", FakePool((77,)))
+
+        async def escenario():
+            suscripcion = difusor.suscribir("Progreso")
+            inicio = time.perf_counter()
+            await asyncio.get_running_loop().run_in_executor(
+                None, database_api.registrar_pastel_normal_db, {"sucursal": "Progreso", "precio": 95.0}
+            )
+            evento = await suscripcion.siguiente(1)
+            return evento, time.perf_counter() - inicio
+
+        evento, demora = asyncio.run(escenario())
+
+        print(f"\nEscritura -> evento: {demora * 1000:.2f} ms (antes: hasta 60000 ms de sondeo)")
+        assert evento["pedido_id"] == 77
+        assert demora < 0.5
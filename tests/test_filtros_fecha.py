@@ -0,0 +1,226 @@
+"""
+Date Filter Tests for MiPastel Application
+
+Tests for:
+- Half-open date ranges computed in Python
+- Listing queries without CAST(fecha AS DATE)
+- Query plans against a seeded dataset (opt-in: MIPASTEL_PLAN_TESTS=1)
+"""
+
+import os
+import re
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+
+import pytest
+
+import api.database as database_api
+from utils.fechas import rango_dias
+
+MIGRACION = Path(__file__).resolve().parent.parent / "migrations" / "001_indices_cobertura.sql"
+
+
+class CapturaCursor:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def execute(self, query, params=()):
+        self.pool.consultas.append((query, tuple(params)))
+        return self
+
+    def fetchall(self):
+        return []
+
+
+class CapturaConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def cursor(self):
+        return CapturaCursor(self.pool)
+
+
+class CapturaPool:
+    """Pool that records every statement instead of running it."""
+
+    def __init__(self):
+        self.consultas = []
+
+    @contextmanager
+    def get_connection(self):
+        yield CapturaConnection(self)
+
+
+@pytest.fixture
+def captura(monkeypatch):
+    pool = CapturaPool()
+    monkeypatch.setattr(database_api, "db_pool_normales", pool)
+    monkeypatch.setattr(database_api, "db_pool_clientes", pool)
+    return pool
+
+
+class TestRangoDias:
+    """Test the half-open range helper."""
+
+    def test_single_day(self):
+        """A single day ends at midnight of the next day."""
+        assert rango_dias("2024-03-31") == (datetime(2024, 3, 31), datetime(2024, 4, 1))
+
+    def test_range_is_inclusive_of_last_day(self):
+        """fecha_fin is included by pointing the upper bound at the following day."""
+        assert rango_dias(date(2024, 2, 28), "2024-02-29") == (datetime(2024, 2, 28), datetime(2024, 3, 1))
+
+    def test_defaults_to_today(self):
+        """Without dates the range covers today."""
+        desde, hasta = rango_dias()
+        assert desde.date() == date.today()
+        assert (hasta - desde).days == 1
+
+    def test_invalid_date(self):
+        """Malformed dates are rejected before reaching SQL Server."""
+        with pytest.raises(ValueError):
+            rango_dias("31/03/2024")
+
+
+class TestListingQueries:
+    """Test the SQL generated by the listing methods."""
+
+    @pytest.mark.parametrize("metodo", ["obtener_pasteles_normales", "obtener_pedidos_clientes"])
+    def test_date_filter_is_sargable(self, captura, metodo):
+        """The fecha column is compared directly against Python-computed bounds."""
+        getattr(database_api.DatabaseManager(), metodo)("2024-05-01", "2024-05-03", sucursal="Jutiapa 1")
+
+        query, params = captura.consultas[0]
+        assert "CAST(fecha" not in query
+        assert "fecha >= ? AND fecha < ?" in query
+        assert params == (datetime(2024, 5, 1), datetime(2024, 5, 4), "Jutiapa 1")
+
+    @pytest.mark.parametrize("metodo", ["obtener_pasteles_normales", "obtener_pedidos_clientes"])
+    def test_today_is_computed_in_python(self, captura, metodo):
+        """The default listing uses today's bounds instead of GETDATE()."""
+        getattr(database_api.DatabaseManager(), metodo)(sucursal="todas")
+
+        query, params = captura.consultas[0]
+        assert "GETDATE" not in query
+        assert params == rango_dias(date.today())
+
+
+def indices_migracion():
+    """(nombre, tabla, claves, incluidas) for each index in the migration."""
+    patron = re.compile(
+        r"CREATE NONCLUSTERED INDEX (\w+)\s+ON dbo\.(\w+) \(([^)]*)\)\s+INCLUDE \(([^)]*)\);", re.S
+    )
+    return [(n, t, c, " ".join(i.split())) for n, t, c, i in patron.findall(MIGRACION.read_text(encoding="utf-8"))]
+
+
+class TestMigration:
+    """Test the covering index migration."""
+
+    def test_indexes_cover_listing_columns(self, captura):
+        """Every column read by the listings is a key or included column."""
+        manager = database_api.DatabaseManager()
+        manager.obtener_pasteles_normales("2024-05-01")
+        manager.obtener_pedidos_clientes("2024-05-01")
+        indices = indices_migracion()
+        assert len(indices) == 4
+
+        for query, _ in captura.consultas:
+            columnas = {c.strip() for c in re.search(r"SELECT (.*?) FROM", query).group(1).split(",")}
+            tabla = re.search(r"FROM (\w+)", query).group(1)
+            for nombre, tabla_indice, claves, incluidas in indices:
+                if tabla_indice != tabla:
+                    continue
+                cubiertas = {c.strip() for c in f"{claves},{incluidas}".split(",")} | {"id"}
+                assert columnas <= cubiertas, f"{nombre} no cubre {columnas - cubiertas}"
+
+
+@pytest.mark.skipif(os.getenv("MIPASTEL_PLAN_TESTS") != "1", reason="requiere SQL Server (MIPASTEL_PLAN_TESTS=1)")
+class TestQueryPlans:
+    """
+    Regression test for the listing query plans.
+
+    Seeds a temporary copy of each table with MIPASTEL_PLAN_ROWS rows (a few
+    million by default), creates the indexes from the migration and checks
+    with SHOWPLAN_XML that the listing queries seek an index without lookups.
+    """
+
+    FILAS = int(os.getenv("MIPASTEL_PLAN_ROWS", "3000000"))
+
+    COLUMNAS = {
+        "PastelesNormales": (
+            "id INT IDENTITY(10000, 1) PRIMARY KEY, sabor NVARCHAR(50), tamano NVARCHAR(50), cantidad INT, "
+            "precio DECIMAL(10,2), total DECIMAL(10,2), sucursal NVARCHAR(100), fecha DATETIME2, "
+            "fecha_entrega DATETIME2, detalles NVARCHAR(MAX), sabor_personalizado NVARCHAR(100)"
+        ),
+        "PastelesClientes": (
+            "id INT IDENTITY(10000, 1) PRIMARY KEY, color NVARCHAR(50), sabor NVARCHAR(50), tamano NVARCHAR(50), "
+            "cantidad INT, precio DECIMAL(10,2), total DECIMAL(10,2), sucursal NVARCHAR(100), fecha DATETIME2, "
+            "dedicatoria NVARCHAR(MAX), detalles NVARCHAR(MAX), sabor_personalizado NVARCHAR(100), "
+            "foto_path NVARCHAR(500), fecha_entrega DATETIME2"
+        ),
+    }
+
+    @pytest.fixture(scope="class")
+    def conexion(self):
+        from config.database import DatabasePool
+        from config.settings import settings
+
+        pool = DatabasePool(settings.DB_SERVER, settings.DB_NAME_NORMALES, settings.DB_DRIVER, min_size=0, max_size=1)
+        with pool.get_connection() as conn:
+            cursor = conn.cursor()
+            for tabla, columnas in self.COLUMNAS.items():
+                cursor.execute(f"CREATE TABLE #{tabla} ({columnas})")
+                cursor.execute(f"""
+                    WITH n AS (
+                        SELECT TOP (?) ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) AS i
+                        FROM sys.all_objects a CROSS JOIN sys.all_objects b CROSS JOIN sys.all_objects c
+                    )
+                    INSERT INTO #{tabla} (sabor, tamano, cantidad, precio, total, sucursal, fecha)
+                    SELECT 'Fresas', 'Mediano', 1, 125, 125,
+                           CONCAT('Sucursal ', i % 12),
+                           DATEADD(SECOND, -CAST(i * 20 AS INT), SYSDATETIME())
+                    FROM n
+                """, self.FILAS)
+            for nombre, tabla, claves, incluidas in indices_migracion():
+                cursor.execute(f"CREATE INDEX {nombre} ON #{tabla} ({claves}) INCLUDE ({incluidas})")
+            for tabla in self.COLUMNAS:
+                cursor.execute(f"UPDATE STATISTICS #{tabla} WITH FULLSCAN")
+            conn.commit()
+            yield conn
+
+    @staticmethod
+    def literal(valor):
+        if isinstance(valor, datetime):
+            return f"CAST('{valor.isoformat(sep=' ')}' AS DATETIME2)"
+        return "N'" + str(valor).replace("'", "''") + "'"
+
+    def plan(self, conn, query, params):
+        # SHOWPLAN no admite sentencias preparadas: los parámetros se insertan como literales
+        for valor in params:
+            query = query.replace("?", self.literal(valor), 1)
+        cursor = conn.cursor()
+        cursor.execute("SET SHOWPLAN_XML ON")
+        try:
+            cursor.execute(query)
+            return cursor.fetchone()[0]
+        finally:
+            cursor.execute("SET SHOWPLAN_XML OFF")
+
+    @pytest.mark.parametrize("metodo", ["obtener_pasteles_normales", "obtener_pedidos_clientes"])
+    @pytest.mark.parametrize("sucursal", ["Sucursal 3", "todas"])
+    def test_listing_seeks_covering_index(self, conexion, monkeypatch, metodo, sucursal):
+        """The listing for one day must be an index seek with no key lookup or scan."""
+        captura = CapturaPool()
+        monkeypatch.setattr(database_api, "db_pool_normales", captura)
+        monkeypatch.setattr(database_api, "db_pool_clientes", captura)
+        getattr(database_api.DatabaseManager(), metodo)(str(date.today()), sucursal=sucursal)
+        query, params = captura.consultas[0]
+        query = re.sub(r"FROM (\w+)", r"FROM #\1", query)
+
+        plan = self.plan(conexion, query, params)
+
+        assert 'PhysicalOp="Index Seek"' in plan
+        assert 'Lookup="1"' not in plan
+        assert 'PhysicalOp="Clustered Index Scan"' not in plan
+        assert 'PhysicalOp="Table Scan"' not in plan
@@ -0,0 +1,153 @@
+"""
+Fast JSON Serialization Tests for MiPastel Application
+
+Tests for:
+- Compiled row encoders matching the previous dict + JSONResponse output byte for byte
+- orjson and stdlib code paths
+- Raw listing responses and their keyset cursors
+- Serialization time at 1k/10k rows (100k with MIPASTEL_BENCH=1) (benchmark)
+"""
+
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from unittest.mock import MagicMock, patch
+
+from api.database import (
+    CODIFICADOR_CLIENTES,
+    CODIFICADOR_NORMALES,
+    COLUMNAS_LISTADO_NORMALES,
+    DatabaseManager,
+)
+from utils.json_rapido import ORJSON_AVAILABLE, CodificadorFilas, respuesta_listado
+from utils.pagination import decode_cursor
+
+INICIO = datetime(2024, 5, 1, 8, 0)
+TEXTOS = ["Fresas", "Tres leches", "Piña \"colada\"", "Café\ncon leche", "Jeréz", "", None]
+
+
+def filas_normales(cantidad, semilla=3):
+    aleatorio = random.Random(semilla)
+    return [
+        (30000 - i, aleatorio.choice(TEXTOS[:5]), aleatorio.choice(["Mini", "Grande"]),
+         Decimal(aleatorio.choice(["95.00", "125.50", "210.00"])), aleatorio.randint(1, 4),
+         aleatorio.choice(["Jutiapa 1", "Progreso"]), INICIO - timedelta(minutes=3 * i, microseconds=i),
+         aleatorio.choice([None, datetime(2024, 5, 2)]), aleatorio.choice(TEXTOS), aleatorio.choice(TEXTOS))
+        for i in range(cantidad)
+    ]
+
+
+def filas_clientes(cantidad):
+    aleatorio = random.Random(5)
+    return [
+        (40000 - i, aleatorio.choice(["Rosa", "Azul", None]), "Chocolate", "Grande", 1,
+         Decimal("160.00"), Decimal("160.00"), "Progreso", INICIO - timedelta(hours=i),
+         aleatorio.choice([None, "/static/uploads/" + "b" * 64 + ".jpg", "C:\\fotos\\vieja.png"]),
+         aleatorio.choice(TEXTOS), aleatorio.choice(TEXTOS), datetime(2024, 5, 3), None)
+        for i in range(cantidad)
+    ]
+
+
+def legado(metodo, filas):
+    """Body of the previous path: DatabaseManager dicts rendered by JSONResponse."""
+    with patch.object(DatabaseManager, "_ejecutar_query", return_value=filas):
+        dicts = getattr(DatabaseManager(), metodo)()
+    return JSONResponse(jsonable_encoder(dicts)).body
+
+
+@pytest.fixture(params=[True, False] if ORJSON_AVAILABLE else [False], ids=lambda o: "orjson" if o else "stdlib")
+def usar_orjson(request):
+    return request.param
+
+
+class TestCodificadorFilas:
+    """Test the compiled row encoders."""
+
+    def test_normales_match_previous_output(self, usar_orjson):
+        """Store orders serialize to the same bytes as before."""
+        codificador = CodificadorFilas(CODIFICADOR_NORMALES.columnas, usar_orjson=usar_orjson)
+        filas = filas_normales(500)
+        assert codificador.codificar(filas) == legado("obtener_pasteles_normales", filas)
+
+    def test_clientes_match_previous_output(self, usar_orjson):
+        """Client orders, including the derived thumbnail URL, serialize to the same bytes."""
+        codificador = CodificadorFilas(CODIFICADOR_CLIENTES.columnas, usar_orjson=usar_orjson)
+        filas = filas_clientes(200)
+        assert codificador.codificar(filas) == legado("obtener_pedidos_clientes", filas)
+
+    def test_nulls_and_empty(self, usar_orjson):
+        """NULL numbers and dates become null; no rows is an empty array."""
+        codificador = CodificadorFilas(CODIFICADOR_NORMALES.columnas, usar_orjson=usar_orjson)
+        fila = (1, None, None, None, None, None, None, None, None, None)
+        assert codificador.codificar([fila]) == JSONResponse([dict.fromkeys(
+            [c[0] for c in CODIFICADOR_NORMALES.columnas], None) | {"id": 1}]).body
+        assert codificador.codificar([]) == b"[]"
+
+    def test_listing_columns_unchanged(self):
+        """The raw rows and the dicts read the same columns."""
+        assert [c.strip() for c in COLUMNAS_LISTADO_NORMALES.split(",")] == [
+            c[0] for c in CODIFICADOR_NORMALES.columnas
+        ]
+
+
+class TestRespuestaListado:
+    """Test the raw listing responses."""
+
+    def test_envelope(self):
+        """The page envelope matches what FastAPI produced for the dict."""
+        filas = filas_normales(3)
+        respuesta = respuesta_listado("normales", CODIFICADOR_NORMALES, {
+            "items": filas, "next_cursor": "abc", "has_next": True, "page_size": 3
+        })
+        with patch.object(DatabaseManager, "_ejecutar_query", return_value=filas):
+            dicts = DatabaseManager().obtener_pasteles_normales()
+        esperado = JSONResponse({"normales": dicts, "next_cursor": "abc", "has_next": True, "page_size": 3})
+
+        assert respuesta.body == esperado.body
+        assert respuesta.headers["content-type"] == "application/json"
+
+    @patch('routers.admin.DatabaseManager')
+    def test_endpoint_cursor_from_rows(self, mock_db, admin_client):
+        """The next cursor is built from the (fecha, id) of the last raw row."""
+        mock_db.return_value = MagicMock()
+        filas = filas_clientes(11)
+        mock_db.return_value.obtener_pedidos_clientes_filas.return_value = filas
+
+        data = admin_client.get("/admin/clientes?limite=10").json()
+
+        assert len(data["clientes"]) == 10
+        assert data["has_next"] is True
+        assert decode_cursor(data["next_cursor"]) == (filas[9][8], filas[9][0])
+        assert data["clientes"][0]["fecha"] == filas[0][8].isoformat()
+
+
+class TestBenchmark:
+    """Benchmark serialization against the dict path."""
+
+    @pytest.mark.parametrize("cantidad", [
+        1_000,
+        10_000,
+        pytest.param(100_000, marks=pytest.mark.skipif(
+            os.getenv("MIPASTEL_BENCH") != "1", reason="benchmark largo (MIPASTEL_BENCH=1)")),
+    ])
+    def test_faster_than_dicts(self, cantidad):
+        """Encoding rows directly beats building dicts and running jsonable_encoder."""
+        filas = filas_normales(cantidad)
+
+        inicio = time.perf_counter()
+        esperado = legado("obtener_pasteles_normales", filas)
+        tiempo_legado = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        cuerpo = CODIFICADOR_NORMALES.codificar(filas)
+        tiempo_rapido = time.perf_counter() - inicio
+
+        print(f"\n{cantidad} filas: dicts {tiempo_legado * 1000:.1f} ms -> codificador {tiempo_rapido * 1000:.1f} ms")
+        assert cuerpo == esperado
+        assert tiempo_rapido * 3 < tiempo_legado
@@ -0,0 +1,179 @@
+"""
+Login Verification Tests for MiPastel Application
+
+Tests for:
+- bcrypt running off the event loop on a bounded pool
+- The LOGIN_MAX_CONCURRENT cap
+- The HMAC-keyed cache of recently verified credentials
+- Event loop stalls during a burst of logins (benchmark)
+"""
+
+import asyncio
+import threading
+import time
+
+import bcrypt
+import pytest
+from fastapi import status
+from unittest.mock import patch
+
+import api.auth as auth
+from api.auth import (
+    USERS_DB, CacheCredenciales, cache_credenciales, cerrar_executor_login, login_attempts,
+    verificar_credenciales, verificar_credenciales_async,
+)
+from api.usuarios import almacen_usuarios, construir_usuarios
+from config.settings import settings
+
+PASSWORD = "turno-manana"
+SUCURSALES = [u for u, datos in USERS_DB.items() if datos["rol"] == "sucursal"]
+
+
+@pytest.fixture
+def usuarios(monkeypatch):
+    """Every user gets a known password hashed at cost 10 (~80 ms per check)."""
+    hash_prueba = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds=10)).decode()
+    monkeypatch.setattr(almacen_usuarios, "_usuarios", construir_usuarios(dict.fromkeys(USERS_DB, hash_prueba)))
+    login_attempts.attempts.clear()
+    cache_credenciales.limpiar()
+    cerrar_executor_login()
+    yield hash_prueba
+    cache_credenciales.limpiar()
+    cerrar_executor_login()
+
+
+async def medir_bloqueo(corrutina):
+    """Run ``corrutina`` while a 5 ms ticker measures the longest event loop stall."""
+    mayor = 0.0
+    terminado = False
+
+    async def ticker():
+        nonlocal mayor
+        anterior = time.perf_counter()
+        while not terminado:
+            await asyncio.sleep(0.005)
+            ahora = time.perf_counter()
+            mayor = max(mayor, ahora - anterior - 0.005)
+            anterior = ahora
+
+    tarea = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    resultado = await corrutina
+    terminado = True
+    await tarea
+    return resultado, mayor
+
+
+class TestVerificacionAsync:
+    """Test the non-blocking login path."""
+
+    def test_valid_and_invalid(self, usuarios):
+        """The async path accepts the right password and rejects wrong ones and unknown users."""
+        async def escenario():
+            return (await verificar_credenciales_async("progreso", PASSWORD),
+                    await verificar_credenciales_async("progreso", "otra"),
+                    await verificar_credenciales_async("nadie", PASSWORD))
+
+        correcto, incorrecto, desconocido = asyncio.run(escenario())
+
+        assert correcto["sucursal"] == "Progreso"
+        assert incorrecto is None and desconocido is None
+
+    def test_concurrency_is_capped(self, usuarios, monkeypatch):
+        """No more than LOGIN_MAX_CONCURRENT checks run at once."""
+        monkeypatch.setattr(settings, "LOGIN_MAX_CONCURRENT", 2)
+        activos = 0
+        maximo = 0
+        lock = threading.Lock()
+
+        def verify_lento(password, hashed):
+            nonlocal activos, maximo
+            with lock:
+                activos += 1
+                maximo = max(maximo, activos)
+            time.sleep(0.02)
+            with lock:
+                activos -= 1
+            return True
+
+        monkeypatch.setattr(auth, "verify_password", verify_lento)
+
+        async def escenario():
+            return await asyncio.gather(*(verificar_credenciales_async(u, PASSWORD) for u in SUCURSALES))
+
+        resultados = asyncio.run(escenario())
+
+        assert all(resultados)
+        assert maximo == 2
+
+    def test_login_endpoint(self, usuarios, client):
+        """POST /login goes through the async path and sets the session cookie."""
+        response = client.post("/login", data={"username": "comapa", "password": PASSWORD}, follow_redirects=False)
+        assert response.status_code == status.HTTP_302_FOUND
+        assert "session_token" in response.cookies
+
+
+class TestCacheCredenciales:
+    """Test the verified-credential cache."""
+
+    def test_repeat_login_skips_bcrypt(self, usuarios):
+        """The second login from the same device does not call bcrypt."""
+        with patch.object(auth.bcrypt, "checkpw", wraps=bcrypt.checkpw) as checkpw:
+            assert verificar_credenciales("quesada", PASSWORD)
+            assert verificar_credenciales("quesada", PASSWORD)
+            assert asyncio.run(verificar_credenciales_async("quesada", PASSWORD))
+        assert checkpw.call_count == 1
+
+    def test_failures_are_not_cached(self, usuarios):
+        """Wrong passwords always pay the full bcrypt cost."""
+        with patch.object(auth.bcrypt, "checkpw", wraps=bcrypt.checkpw) as checkpw:
+            verificar_credenciales("quesada", "mala")
+            verificar_credenciales("quesada", "mala")
+        assert checkpw.call_count == 2
+
+    def test_password_change_and_ttl_invalidate(self, usuarios):
+        """Entries die with their TTL or when the stored hash changes."""
+        cache = CacheCredenciales(ttl=60)
+        cache.agregar("adelanto", PASSWORD, usuarios)
+
+        assert cache.contiene("adelanto", PASSWORD, usuarios)
+        assert not cache.contiene("adelanto", PASSWORD, "$2b$12$otrohash")
+        cache.agregar("adelanto", PASSWORD, usuarios)
+        with patch.object(auth.time, "monotonic", return_value=time.monotonic() + 61):
+            assert not cache.contiene("adelanto", PASSWORD, usuarios)
+
+    def test_keys_do_not_hold_passwords(self):
+        """Keys are keyed digests, different per process key, and the cache is bounded."""
+        cache = CacheCredenciales(ttl=60, max_entradas=3)
+        for i in range(5):
+            cache.agregar(f"u{i}", PASSWORD, "h")
+
+        assert len(cache._entradas) == 3
+        assert all(PASSWORD.encode() not in llave and len(llave) == 32 for llave in cache._entradas)
+        assert CacheCredenciales()._llave("u", PASSWORD) != cache._llave("u", PASSWORD)
+
+
+class TestBenchmark:
+    """Benchmark event loop stalls during a shift-start burst."""
+
+    def test_burst_does_not_stall_loop(self, usuarios):
+        """Twelve simultaneous logins freeze the loop for the whole burst inline, and barely at all offloaded."""
+        async def en_linea():
+            return [verificar_credenciales(u, PASSWORD) for u in SUCURSALES]
+
+        async def delegado():
+            return await asyncio.gather(*(verificar_credenciales_async(u, PASSWORD) for u in SUCURSALES))
+
+        async def escenario():
+            resultados_linea, bloqueo_linea = await medir_bloqueo(en_linea())
+            cache_credenciales.limpiar()
+            resultados_delegado, bloqueo_delegado = await medir_bloqueo(delegado())
+            return resultados_linea + list(resultados_delegado), bloqueo_linea, bloqueo_delegado
+
+        resultados, bloqueo_linea, bloqueo_delegado = asyncio.run(escenario())
+
+        print(f"\n12 logins: mayor bloqueo del loop en línea {bloqueo_linea * 1000:.0f} ms, "
+              f"delegado {bloqueo_delegado * 1000:.0f} ms")
+        assert all(resultados)
+        assert bloqueo_linea > 0.5
+        assert bloqueo_delegado < 0.05
@@ -0,0 +1,391 @@
+"""
+Desktop Admin Table Tests for MiPastel Application
+
+Tests for:
+- Cell formatting computed in data() instead of per-cell items
+- Background loading in chunks with stale generations discarded
+- Sorting and text filtering in the proxy without touching the database
+- Incremental refresh by version_fila, or by highest id when the column is missing
+- Time the GUI thread spends filling a month of orders (benchmark)
+- Rows read by a refresh after one edit versus a full reload (benchmark)
+"""
+
+import os
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+try:
+    from PySide6.QtCore import QCoreApplication, Qt
+    from PySide6.QtWidgets import QApplication, QTableView, QTableWidget, QTableWidgetItem
+    PYSIDE_AVAILABLE = True
+except ImportError:
+    PYSIDE_AVAILABLE = False
+
+pytestmark = pytest.mark.skipif(not PYSIDE_AVAILABLE, reason="requiere PySide6")
+
+if PYSIDE_AVAILABLE:
+    from admin.modelos import (
+        COLUMNAS_CLIENTES, COLUMNAS_NORMALES, FECHA, FECHA_HORA, MONEDA, ROL_VALOR,
+        ConsultaPedidos, FiltroPedidos, ModeloPedidos, formatear_celda,
+    )
+
+
+@pytest.fixture(scope="module")
+def qapp():
+    return QApplication.instance() or QApplication([])
+
+
+def fila_normal(i):
+    return (i, 1 + i % 3, "Mediano", ["Fresa", "Chocolate", "Tres Leches"][i % 3], ["Progreso", "Jutiapa 1"][i % 2],
+            datetime(2024, 5, 1, 8) + timedelta(minutes=i), date(2024, 5, 2) if i % 4 else None,
+            Decimal("95.00") + i % 5, Decimal("95.00") * (1 + i % 3))
+
+
+CAMPOS = ("id", "cantidad", "tamano", "sabor", "sucursal", "fecha", "fecha_entrega", "precio", "total")
+
+
+def consulta(fecha="2024-05-01"):
+    return ConsultaPedidos("PastelesNormales", CAMPOS, "fecha >= ? AND fecha < ?", [fecha, "2024-05-02"])
+
+
+class FakeTabla:
+    """PastelesNormales already filtered, with a ROWVERSION bumped on every write."""
+
+    def __init__(self, filas=(), con_version=True):
+        self.con_version = con_version
+        self.contador = 0
+        self.filas = {}
+        self.leidas = 0
+        for fila in filas:
+            self.escribir(fila)
+
+    def escribir(self, fila):
+        self.contador += 1
+        self.filas[fila[0]] = (fila, self.contador)
+
+    def borrar(self, pedido_id):
+        del self.filas[pedido_id]
+
+    def marca(self):
+        return (self.contador + 1).to_bytes(8, "big")
+
+
+class FakeCursor:
+    def __init__(self, tabla):
+        self.tabla = tabla
+        self.resultado = []
+        self.lotes = 0
+
+    def execute(self, query, params=()):
+        tabla = self.tabla
+        params = list(params)
+        if "MIN_ACTIVE_ROWVERSION" in query:
+            self.resultado = [(int(tabla.con_version), tabla.marca())]
+            return
+        assert query.count("?") == len(params)
+        filas = sorted(tabla.filas.values(), key=lambda e: -e[0][0])
+        if query.startswith("SELECT id FROM"):
+            self.resultado = [(fila[0],) for fila, _ in filas]
+            return
+        if "version_fila >= ?" in query:
+            assert tabla.con_version
+            desde = int.from_bytes(params[-1], "big")
+            filas = [(f, v) for f, v in filas if v >= desde]
+        elif "id > ?" in query:
+            max_id, editados = params[2], set(params[3:])
+            filas = [(f, v) for f, v in filas if f[0] > max_id or f[0] in editados]
+        self.resultado = [fila for fila, _ in filas]
+        tabla.leidas += len(self.resultado)
+
+    def fetchone(self):
+        return self.resultado[0]
+
+    def fetchall(self):
+        resultado, self.resultado = self.resultado, []
+        return resultado
+
+    def fetchmany(self, n):
+        lote, self.resultado = self.resultado[:n], self.resultado[n:]
+        self.lotes += 1
+        return lote
+
+
+class FakeConn:
+    def __init__(self, tabla):
+        self._cursor = FakeCursor(tabla)
+        self.cerrada = False
+
+    def cursor(self):
+        return self._cursor
+
+    def close(self):
+        self.cerrada = True
+
+
+def esperar(condicion, segundos=5):
+    limite = time.monotonic() + segundos
+    while not condicion():
+        assert time.monotonic() < limite, "tiempo de espera agotado"
+        QCoreApplication.processEvents()
+        time.sleep(0.001)
+
+
+class TestFormato:
+    """Test the lazily computed cell text."""
+
+    def test_matches_previous_widgets(self):
+        """Dates, money and empty values render exactly as the QTableWidget cells did."""
+        assert formatear_celda(FECHA_HORA, datetime(2024, 5, 1, 9, 5)) == "2024-05-01 09:05"
+        assert formatear_celda(FECHA, None) == "Sin especificar"
+        assert formatear_celda(MONEDA, Decimal("1234.5")) == "Q1,234.50"
+        assert formatear_celda(MONEDA, None) == ""
+        assert formatear_celda("texto", None) == ""
+
+    def test_data_roles(self, qapp):
+        """data() formats on demand and exposes the raw value for ids."""
+        modelo = ModeloPedidos(COLUMNAS_NORMALES)
+        modelo.agregar_lote(modelo.reiniciar(), [fila_normal(7)])
+
+        assert modelo.index(0, 7).data() == "Q97.00"
+        assert modelo.index(0, 7).data(Qt.TextAlignmentRole) == int(Qt.AlignRight | Qt.AlignVCenter)
+        assert modelo.index(0, 0).data(ROL_VALOR) == 7
+        assert modelo.headerData(6, Qt.Horizontal) == "Fecha Entrega"
+
+
+class TestCarga:
+    """Test background loading."""
+
+    def test_loads_in_chunks_off_gui_thread(self, qapp):
+        """Rows arrive in chunks from the thread pool and the connection is closed."""
+        conn = FakeConn(FakeTabla(fila_normal(i) for i in range(1200)))
+        modelo = ModeloPedidos(COLUMNAS_NORMALES)
+        totales = []
+        modelo.cargaTerminada.connect(totales.append)
+
+        modelo.cargar(lambda: conn, consulta(), tamano_lote=500)
+        esperar(lambda: totales)
+
+        assert totales == [1200] and modelo.rowCount() == 1200
+        assert conn._cursor.lotes == 4 and conn.cerrada
+        assert not modelo.cargando and modelo.completa
+
+    def test_stale_generation_is_discarded(self, qapp):
+        """Chunks from a load that was replaced never reach the table."""
+        modelo = ModeloPedidos(COLUMNAS_NORMALES)
+        vieja = modelo.reiniciar()
+        nueva = modelo.reiniciar()
+
+        modelo.agregar_lote(vieja, [fila_normal(1)])
+        modelo.agregar_lote(nueva, [fila_normal(2), fila_normal(3)])
+
+        assert [modelo.valor(f, 0) for f in range(modelo.rowCount())] == [2, 3]
+
+    def test_error_is_reported(self, qapp):
+        """A failing query surfaces through cargaFallida instead of raising in the worker."""
+        modelo = ModeloPedidos(COLUMNAS_CLIENTES)
+        errores = []
+        modelo.cargaFallida.connect(errores.append)
+
+        def conectar():
+            raise RuntimeError("sin conexión")
+
+        modelo.cargar(conectar, consulta())
+        esperar(lambda: errores)
+
+        assert errores == ["sin conexión"]
+        assert not modelo.completa
+
+
+class TestProxy:
+    """Test sorting and filtering in memory."""
+
+    def test_sort_by_money_and_dates_with_nulls(self, qapp):
+        """Columns sort by their real value, nulls first, not by formatted text."""
+        modelo = ModeloPedidos(COLUMNAS_NORMALES)
+        filas = [fila_normal(i) for i in range(8)]
+        filas[3] = filas[3][:7] + (Decimal("1000.00"),) + filas[3][8:]
+        modelo.agregar_lote(modelo.reiniciar(), filas)
+        proxy = FiltroPedidos(modelo)
+
+        proxy.sort(7, Qt.DescendingOrder)
+        assert proxy.index(0, 0).data(ROL_VALOR) == 3
+
+        proxy.sort(6, Qt.AscendingOrder)
+        assert proxy.index(0, 6).data() == "Sin especificar"
+
+    def test_chunks_keep_active_sort(self, qapp):
+        """Chunks arriving while a column is sorted end up in order, in or out of sequence."""
+        modelo = ModeloPedidos(COLUMNAS_NORMALES)
+        proxy = FiltroPedidos(modelo)
+        proxy.sort(0, Qt.DescendingOrder)
+        generacion = modelo.reiniciar()
+
+        modelo.agregar_lote(generacion, [fila_normal(i) for i in (19, 18, 17)])
+        modelo.agregar_lote(generacion, [fila_normal(i) for i in (5, 9, 7)])
+        modelo.agregar_lote(generacion, [fila_normal(i) for i in (30, 2)])
+
+        assert [proxy.index(f, 0).data(ROL_VALOR) for f in range(proxy.rowCount())] == [30, 19, 18, 17, 9, 7, 5, 2]
+
+    def test_filter_without_db(self, qapp):
+        """The search box filters across every column of the loaded rows."""
+        modelo = ModeloPedidos(COLUMNAS_NORMALES)
+        modelo.agregar_lote(modelo.reiniciar(), [fila_normal(i) for i in range(30)])
+        proxy = FiltroPedidos(modelo)
+
+        proxy.establecer_busqueda("  TRES leches ")
+        assert proxy.rowCount() == 10
+        proxy.establecer_busqueda("q97.00")
+        assert proxy.rowCount() == 6
+        proxy.establecer_busqueda("")
+        assert proxy.rowCount() == 30
+
+
+def cargado(tabla, columnas=COLUMNAS_NORMALES):
+    """A model fully loaded from ``tabla``, plus the list its refreshes report to."""
+    modelo = ModeloPedidos(columnas)
+    refrescos = []
+    modelo.refrescado.connect(lambda *conteos: refrescos.append(conteos))
+    modelo.mostrar(lambda: FakeConn(tabla), consulta())
+    esperar(lambda: modelo.completa)
+    return modelo, refrescos
+
+
+def ids(modelo):
+    return [modelo.index(f, 0).data(ROL_VALOR) for f in range(modelo.rowCount())]
+
+
+class TestRefresco:
+    """Test incremental refresh."""
+
+    def test_applies_inserts_updates_and_deletes(self, qapp):
+        """Only changed rows are read, and each change lands on its own row."""
+        tabla = FakeTabla(fila_normal(i) for i in range(50))
+        modelo, refrescos = cargado(tabla)
+        proxy = FiltroPedidos(modelo)
+        proxy.sort(0, Qt.DescendingOrder)
+        tabla.leidas = 0
+
+        tabla.escribir(fila_normal(100))
+        tabla.escribir(fila_normal(10)[:3] + ("Zanahoria",) + fila_normal(10)[4:])
+        tabla.borrar(20)
+        assert modelo.mostrar(lambda: FakeConn(tabla), consulta()) is False
+        esperar(lambda: refrescos)
+
+        assert refrescos == [(1, 1, 1)]
+        assert tabla.leidas == 2
+        assert ids(proxy)[:2] == [100, 49] and 20 not in ids(proxy) and proxy.rowCount() == 50
+        fila_10 = ids(proxy).index(10)
+        assert proxy.index(fila_10, 3).data() == "Zanahoria"
+
+    def test_fallback_by_id_without_rowversion(self, qapp):
+        """Without version_fila new rows come by highest id and edits by the ids the app reports."""
+        tabla = FakeTabla((fila_normal(i) for i in range(20)), con_version=False)
+        modelo, refrescos = cargado(tabla)
+
+        tabla.escribir(fila_normal(30))
+        tabla.escribir(fila_normal(5)[:3] + ("Zanahoria",) + fila_normal(5)[4:])
+        modelo.refrescar(editados=[5])
+        esperar(lambda: refrescos)
+
+        assert refrescos == [(1, 1, 0)]
+        assert modelo.marca is None
+        assert modelo.index(ids(modelo).index(5), 3).data() == "Zanahoria"
+
+    def test_selection_survives_refresh(self, qapp):
+        """Rows inserted above or removed elsewhere do not move the user's selection."""
+        tabla = FakeTabla(fila_normal(i) for i in range(10))
+        modelo, refrescos = cargado(tabla)
+        vista = QTableView()
+        vista.setModel(FiltroPedidos(modelo))
+        vista.sortByColumn(0, Qt.DescendingOrder)
+        vista.selectRow(3)
+
+        tabla.escribir(fila_normal(50))
+        tabla.borrar(9)
+        modelo.refrescar()
+        esperar(lambda: refrescos)
+
+        seleccion = vista.selectionModel().selectedRows()
+        assert [i.data(ROL_VALOR) for i in seleccion] == [6]
+
+    def test_filter_change_reloads(self, qapp):
+        """A different date or branch is a full reload; a refresh asked during it runs afterwards."""
+        tabla = FakeTabla(fila_normal(i) for i in range(5))
+        modelo, refrescos = cargado(tabla)
+        cargas = []
+        modelo.cargaTerminada.connect(cargas.append)
+
+        assert modelo.mostrar(lambda: FakeConn(tabla), consulta("2024-05-02")) is True
+        tabla.escribir(fila_normal(40))
+        assert modelo.mostrar(lambda: FakeConn(tabla), consulta("2024-05-02")) is False
+        esperar(lambda: cargas and refrescos)
+
+        assert 40 in ids(modelo) and modelo.rowCount() == 6
+
+
+class TestBenchmark:
+    """Benchmark GUI-thread time to show a month of orders."""
+
+    def test_month_view(self, qapp):
+        """Inserting rows into the model costs a fraction of building one QTableWidgetItem per cell."""
+        # Como llegan de la consulta: ORDER BY id DESC
+        filas = [fila_normal(i) for i in reversed(range(20_000))]
+
+        tabla = QTableWidget()
+        tabla.setColumnCount(len(COLUMNAS_NORMALES))
+        inicio = time.perf_counter()
+        tabla.setRowCount(len(filas))
+        for f, datos in enumerate(filas):
+            for c, (valor, (_, tipo)) in enumerate(zip(datos, COLUMNAS_NORMALES)):
+                item = QTableWidgetItem(formatear_celda(tipo, valor))
+                item.setTextAlignment(Qt.AlignCenter)
+                item.setFlags(item.flags() & ~Qt.ItemIsEditable)
+                tabla.setItem(f, c, item)
+        widgets = time.perf_counter() - inicio
+
+        modelo = ModeloPedidos(COLUMNAS_NORMALES)
+        vista = QTableView()
+        vista.setModel(FiltroPedidos(modelo))
+        vista.setSortingEnabled(True)
+        vista.sortByColumn(0, Qt.DescendingOrder)
+        generacion = modelo.reiniciar()
+        inicio = time.perf_counter()
+        for i in range(0, len(filas), 500):
+            modelo.agregar_lote(generacion, filas[i:i + 500])
+        modelo_tiempo = time.perf_counter() - inicio
+
+        print(f"\n20.000 pedidos en el hilo de la interfaz: QTableWidget {widgets * 1000:.0f} ms, "
+              f"modelo {modelo_tiempo * 1000:.0f} ms")
+        assert vista.model().rowCount() == 20_000
+        assert modelo_tiempo < widgets / 3
+
+    def test_refresh_after_edit(self, qapp):
+        """After editing one order of a 20,000-row month, a refresh reads one row instead of all of them."""
+        tabla = FakeTabla(fila_normal(i) for i in range(20_000))
+        modelo, refrescos = cargado(tabla)
+
+        tabla.leidas = 0
+        tabla.escribir(fila_normal(77)[:1] + (9,) + fila_normal(77)[2:])
+        inicio = time.perf_counter()
+        modelo.refrescar(editados=[77])
+        esperar(lambda: refrescos)
+        refresco = time.perf_counter() - inicio
+        leidas_refresco = tabla.leidas
+
+        tabla.leidas = 0
+        cargas = []
+        modelo.cargaTerminada.connect(cargas.append)
+        inicio = time.perf_counter()
+        modelo.cargar(lambda: FakeConn(tabla), consulta())
+        esperar(lambda: cargas)
+        recarga = time.perf_counter() - inicio
+
+        print(f"\nTras editar 1 de 20.000 pedidos: refresco {leidas_refresco} fila(s) en {refresco * 1000:.0f} ms, "
+              f"recarga {tabla.leidas} filas en {recarga * 1000:.0f} ms")
+        assert leidas_refresco == 1 and tabla.leidas == 20_000
+        assert modelo.index(ids(modelo).index(77), 1).data() == "9"
@@ -0,0 +1,247 @@
+"""
+Keyset Pagination Tests for MiPastel Application
+
+Tests for:
+- Opaque cursors and page size caps
+- Keyset SQL on (fecha, id) with TOP and optional COUNT
+- Paginated listing endpoints
+"""
+
+import asyncio
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import status
+from unittest.mock import MagicMock, patch
+
+import api.database as database_api
+from utils.pagination import (
+    MAX_PAGE_SIZE,
+    clamp_page_size,
+    decode_cursor,
+    encode_cursor,
+    fetch_keyset_page,
+    keyset_filter,
+)
+
+
+class CapturaCursor:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def execute(self, query, params=()):
+        self.pool.consultas.append((query, tuple(params)))
+        return self
+
+    def fetchone(self):
+        return (7,)
+
+    def fetchall(self):
+        return []
+
+
+class CapturaConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def cursor(self):
+        return CapturaCursor(self.pool)
+
+
+class CapturaPool:
+    def __init__(self):
+        self.consultas = []
+
+    @contextmanager
+    def get_connection(self):
+        yield CapturaConnection(self)
+
+
+@pytest.fixture
+def captura(monkeypatch):
+    pool = CapturaPool()
+    monkeypatch.setattr(database_api, "db_pool_normales", pool)
+    monkeypatch.setattr(database_api, "db_pool_clientes", pool)
+    return pool
+
+
+def pedidos(n, inicio=datetime(2024, 5, 1, 18, 0)):
+    """n orders newest first, in pairs that share the same fecha (as batch inserts do)."""
+    filas = []
+    for i in range(n):
+        fecha = inicio - timedelta(minutes=i // 2)
+        filas.append({"id": 20000 - i, "fecha": fecha.isoformat(), "precio": 10.0, "cantidad": 1})
+    return filas
+
+
+class TestCursors:
+    """Test cursor encoding and page size limits."""
+
+    def test_round_trip(self):
+        """A cursor decodes back to its (fecha, id) key."""
+        fecha = datetime(2024, 5, 1, 12, 30, 15, 123456)
+        assert decode_cursor(encode_cursor(fecha, 10042)) == (fecha, 10042)
+        assert decode_cursor(encode_cursor(fecha.isoformat(), 10042)) == (fecha, 10042)
+
+    def test_cursor_is_opaque(self):
+        """Cursors are URL-safe and do not expose the raw key."""
+        cursor = encode_cursor(datetime(2024, 5, 1), 10042)
+        assert "2024" not in cursor
+        assert all(c.isalnum() or c in "-_" for c in cursor)
+
+    @pytest.mark.parametrize("cursor", ["", "no-es-un-cursor", encode_cursor("ayer", 1)])
+    def test_invalid_cursor(self, cursor):
+        """Tampered cursors raise ValueError."""
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+    def test_page_size_is_capped(self):
+        """Page sizes stay between 1 and MAX_PAGE_SIZE."""
+        assert clamp_page_size(10_000) == MAX_PAGE_SIZE
+        assert clamp_page_size(0) == clamp_page_size(None) == 50
+        assert clamp_page_size(20) == 20
+
+    def test_keyset_filter_covers_truncated_microsecond(self):
+        """The predicate tolerates DATETIME2 precision beyond Python microseconds."""
+        fecha = datetime(2024, 5, 1, 12, 0, 0, 3333)
+        sql, params = keyset_filter((fecha, 10042))
+        assert sql == " AND fecha < ? AND (fecha < ? OR id < ?)"
+        assert params == (fecha + timedelta(microseconds=1), fecha, 10042)
+
+
+class TestKeysetQuery:
+    """Test the SQL generated for a page."""
+
+    def test_page_query(self, captura):
+        """Pages use TOP, the keyset predicate and a deterministic order."""
+        clave = (datetime(2024, 5, 1, 12, 0), 10042)
+        database_api.DatabaseManager().obtener_pasteles_normales(
+            "2024-05-01", sucursal="Jutiapa 1", limite=51, despues_de=clave
+        )
+
+        query, params = captura.consultas[0]
+        assert query.startswith("SELECT TOP (?) id,")
+        assert "OFFSET" not in query
+        assert query.endswith("ORDER BY fecha DESC, id DESC")
+        assert params[0] == 51
+        assert params[-3:] == (clave[0] + timedelta(microseconds=1), clave[0], 10042)
+
+    def test_unpaginated_query_has_no_top(self, captura):
+        """Callers that need the whole period (reports, desktop) keep getting every row."""
+        database_api.DatabaseManager().obtener_pedidos_clientes("2024-05-01")
+        assert "TOP" not in captura.consultas[0][0]
+
+    def test_count_uses_same_filter(self, captura):
+        """COUNT runs with the listing filters and no ORDER BY."""
+        total = database_api.DatabaseManager().contar_pedidos_clientes("2024-05-01", sucursal="Progreso")
+
+        query, params = captura.consultas[0]
+        assert total == 7
+        assert query.startswith("SELECT COUNT(*) FROM PastelesClientes WHERE fecha >= ? AND fecha < ?")
+        assert "ORDER BY" not in query
+        assert params[-1] == "Progreso"
+
+
+class TestFetchKeysetPage:
+    """Walk a dataset page by page."""
+
+    def test_walk_covers_every_row_once(self):
+        """Following next_cursor returns each order exactly once, even with equal fechas."""
+        datos = pedidos(23)
+
+        async def obtener(limite, despues_de, **filtros):
+            filas = datos
+            if despues_de:
+                fecha, item_id = despues_de
+                filas = [f for f in datos if (datetime.fromisoformat(f["fecha"]), f["id"]) < (fecha, item_id)]
+            return filas[:limite]
+
+        async def recorrer():
+            vistos, cursor = [], None
+            while True:
+                pagina = await fetch_keyset_page(obtener, page_size=5, cursor=cursor)
+                vistos.extend(p["id"] for p in pagina["items"])
+                if not pagina["has_next"]:
+                    return vistos
+                cursor = pagina["next_cursor"]
+
+        assert asyncio.run(recorrer()) == [p["id"] for p in datos]
+
+    def test_total_only_on_request(self):
+        """COUNT is skipped unless the caller asks for it."""
+        contar = MagicMock()
+
+        async def fetch(**kwargs):
+            return []
+
+        async def count(**kwargs):
+            contar(**kwargs)
+            return 3
+
+        pagina = asyncio.run(fetch_keyset_page(fetch, count, page_size=5))
+        assert "total" not in pagina
+        contar.assert_not_called()
+
+        pagina = asyncio.run(fetch_keyset_page(fetch, count, page_size=5, include_total=True, sucursal="Progreso"))
+        assert pagina["total"] == 3
+        contar.assert_called_once_with(sucursal="Progreso")
+
+
+class TestPaginatedEndpoints:
+    """Test the listing endpoints."""
+
+    @patch('routers.pedidos_api.DatabaseManager')
+    def test_first_page(self, mock_db, authenticated_client):
+        """The endpoint fetches one extra row to know whether there is a next page."""
+        mock_db.return_value = MagicMock()
+        mock_db.return_value.obtener_pasteles_normales.return_value = pedidos(11)
+
+        response = authenticated_client.get("/api/pedidos/normales?limite=10")
+
+        data = response.json()
+        assert response.status_code == 200
+        assert len(data["pedidos"]) == 10
+        assert data["has_next"] is True
+        assert decode_cursor(data["next_cursor"])[1] == data["pedidos"][-1]["id"]
+        assert "total" not in data
+        kwargs = mock_db.return_value.obtener_pasteles_normales.call_args[1]
+        assert kwargs["limite"] == 11
+        assert kwargs["despues_de"] is None
+        mock_db.return_value.contar_pasteles_normales.assert_not_called()
+
+    @patch('routers.pedidos_api.DatabaseManager')
+    def test_next_page_with_total(self, mock_db, authenticated_client):
+        """A cursor is decoded into the keyset and the total is computed on request."""
+        mock_db.return_value = MagicMock()
+        mock_db.return_value.obtener_pedidos_clientes.return_value = pedidos(3)
+        mock_db.return_value.contar_pedidos_clientes.return_value = 13
+        cursor = encode_cursor(datetime(2024, 5, 1, 18, 0), 20000)
+
+        response = authenticated_client.get(f"/api/pedidos/clientes?limite=10&cursor={cursor}&incluir_total=true")
+
+        data = response.json()
+        assert data["has_next"] is False
+        assert data["next_cursor"] is None
+        assert data["total"] == 13
+        kwargs = mock_db.return_value.obtener_pedidos_clientes.call_args[1]
+        assert kwargs["despues_de"] == (datetime(2024, 5, 1, 18, 0), 20000)
+        assert kwargs["sucursal"] == "Jutiapa 1"
+
+    @patch('routers.admin.DatabaseManager')
+    def test_page_size_capped(self, mock_db, admin_client):
+        """Requests for huge pages are capped at MAX_PAGE_SIZE."""
+        mock_db.return_value = MagicMock()
+        mock_db.return_value.obtener_pasteles_normales_filas.return_value = []
+
+        response = admin_client.get("/admin/normales?limite=100000")
+
+        assert response.status_code == 200
+        assert response.json()["normales"] == []
+        assert mock_db.return_value.obtener_pasteles_normales_filas.call_args[1]["limite"] == MAX_PAGE_SIZE + 1
+
+    @patch('routers.admin.DatabaseManager')
+    def test_invalid_cursor_is_bad_request(self, mock_db, admin_client):
+        """A tampered cursor is a 400, not a server error."""
+        response = admin_client.get("/admin/clientes?cursor=basura")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
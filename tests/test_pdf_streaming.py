@@ -0,0 +1,145 @@
+"""
+PDF Streaming Tests for MiPastel Application
+
+Tests for:
+- Generators rendering into spooled buffers instead of named files
+- Spill to a private temp file above PDF_SPOOL_MAX_MB
+- Chunked responses with an exact Content-Length
+"""
+
+import asyncio
+import io
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import httpx
+import pytest
+from unittest.mock import MagicMock
+
+import api.reportes_datos as reportes_datos
+import pdf_reportes
+from api.reportes_jobs import GestorReportes, ESTADO_LISTO
+from config.settings import settings
+from utils.streaming import content_disposition, file_size, iter_file, stream_file
+
+DIA = date(2024, 5, 1)
+
+
+class PoolVacio:
+    @contextmanager
+    def get_connection(self):
+        conexion = MagicMock()
+        conexion.cursor.return_value.fetchall.return_value = []
+        yield conexion
+
+
+@pytest.fixture
+def sin_base(monkeypatch, tmp_path):
+    """Generators read empty tables and run from an empty working directory."""
+    monkeypatch.setattr(reportes_datos, "db_pool_normales", PoolVacio())
+    monkeypatch.setattr(reportes_datos, "db_pool_clientes", PoolVacio())
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+class TestGeneradoresEnBuffer:
+    """Test the PDF generators' output targets."""
+
+    @pytest.mark.parametrize("generar", [
+        lambda salida: pdf_reportes.generar_pdf_listas(DIA, output_path=salida),
+        lambda salida: pdf_reportes.generar_pdf_rango_fechas(DIA, date(2024, 5, 3), output_path=salida),
+        lambda salida: pdf_reportes.generar_pdf_ventas(DIA, output_path=salida),
+        lambda salida: pdf_reportes.generar_pdf_ventas_rango(DIA, date(2024, 5, 3), output_path=salida),
+    ])
+    def test_default_output_is_a_rewound_buffer(self, sin_base, generar):
+        """Without output_path the PDF is returned in a buffer and nothing is written to the CWD."""
+        buffer = generar(None)
+
+        assert buffer.read(5) == b"%PDF-"
+        assert list(sin_base.iterdir()) == []
+
+    def test_file_like_output(self, sin_base):
+        """Callers can pass their own file object."""
+        destino = io.BytesIO()
+        assert pdf_reportes.generar_pdf_ventas(DIA, output_path=destino) is destino
+        assert destino.getvalue().startswith(b"%PDF-")
+
+    def test_path_output_still_supported(self, sin_base):
+        """The desktop app keeps saving to the path the user picked."""
+        ruta = sin_base / "ventas.pdf"
+        assert pdf_reportes.generar_pdf_ventas(DIA, output_path=str(ruta)) == str(ruta)
+        assert ruta.read_bytes().startswith(b"%PDF-")
+
+    def test_large_reports_spill_to_disk(self, sin_base, monkeypatch):
+        """Above the ceiling the buffer moves to an anonymous temp file."""
+        monkeypatch.setattr(settings, "PDF_SPOOL_MAX_MB", 0.001)
+        buffer = pdf_reportes.generar_pdf_listas(DIA)
+        assert buffer._rolled is True
+        assert buffer.read(5) == b"%PDF-"
+
+        monkeypatch.setattr(settings, "PDF_SPOOL_MAX_MB", 16)
+        assert pdf_reportes.generar_pdf_listas(DIA)._rolled is False
+
+
+class TestStreamFile:
+    """Test the streaming helpers."""
+
+    def test_chunks_and_close(self):
+        """Files are read in chunks from the current position and closed at the end."""
+        archivo = io.BytesIO(b"x" * 10)
+        archivo.seek(2)
+        assert file_size(archivo) == 8
+        assert list(iter_file(archivo, chunk_size=3)) == [b"xxx", b"xxx", b"xx"]
+        assert archivo.closed
+
+    def test_headers(self):
+        """Content-Length is exact and non-ASCII names are RFC 5987 encoded."""
+        respuesta = stream_file(io.BytesIO(b"%PDF-1.4 abc"), "Ventas_Progreso.pdf")
+        assert respuesta.headers["content-length"] == "12"
+        assert respuesta.headers["content-disposition"] == 'attachment; filename="Ventas_Progreso.pdf"'
+        assert content_disposition("Reporte_Peñón.pdf") == "attachment; filename*=utf-8''Reporte_Pe%C3%B1%C3%B3n.pdf"
+
+
+class TestPdfEndpoints:
+    """Test the report endpoints' responses."""
+
+    def test_streamed_with_content_length(self, tmp_path, monkeypatch):
+        """Legacy endpoints stream the cached PDF with a matching Content-Length."""
+        import app.main as main
+
+        def renderizar(tipo, fecha_inicio, fecha_fin, sucursal, destino):
+            with open(destino, "wb") as archivo:
+                archivo.write(b"%PDF-1.4 " + b"0" * 200_000)
+            return destino
+
+        gestor = GestorReportes(
+            directorio=tmp_path, renderizar=renderizar, version_datos=lambda *args: "v1",
+            executor=ThreadPoolExecutor(max_workers=1)
+        )
+        monkeypatch.setattr(main, "gestor_reportes", gestor)
+
+        async def escenario():
+            async with httpx.AsyncClient(app=main.app, base_url="http://testserver") as cliente:
+                return await cliente.get("/reportes/ventas-pdf?fecha=2024-05-01&sucursal=Progreso")
+
+        respuesta = asyncio.run(escenario())
+        assert respuesta.status_code == 200
+        assert int(respuesta.headers["content-length"]) == len(respuesta.content) == 200_009
+        assert 'filename="Ventas_MiPastel_2024-05-01_Progreso.pdf"' in respuesta.headers["content-disposition"]
+
+    def test_evicted_while_listed(self, tmp_path):
+        """A finished job whose file was evicted cannot be opened."""
+        gestor = GestorReportes(
+            directorio=tmp_path, renderizar=lambda *args: open(args[-1], "wb").close(),
+            version_datos=lambda *args: "v1", executor=ThreadPoolExecutor(max_workers=1)
+        )
+
+        async def escenario():
+            trabajo = await gestor.enviar("listas", DIA)
+            return await gestor.esperar(trabajo, timeout=5)
+
+        trabajo = asyncio.run(escenario())
+        assert trabajo.estado == ESTADO_LISTO
+        trabajo.ruta.unlink()
+        assert trabajo.abrir() is None
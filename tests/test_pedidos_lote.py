@@ -0,0 +1,162 @@
+"""
+Batch Cart Submission Tests for MiPastel Application
+
+Tests for:
+- /api/pedidos/lote validation with per-item errors
+- Branch permission enforcement per item
+- Round-trips of the batch insert against the sequential path (benchmark)
+"""
+
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from fastapi import status
+from unittest.mock import MagicMock, patch
+
+import api.database as database_api
+
+MANANA = str(date.today() + timedelta(days=1))
+
+
+def pedido_normal(**kwargs):
+    pedido = {"sabor": "Fresas", "tamano": "Mediano", "cantidad": 1, "precio": 125.0, "fecha_entrega": MANANA}
+    pedido.update(kwargs)
+    return pedido
+
+
+def pedido_cliente(**kwargs):
+    pedido = {"sabor": "Chocolate", "tamano": "Grande", "cantidad": 1, "precio": 160.0,
+              "fecha_entrega": MANANA, "color": "Azul", "dedicatoria": "Feliz cumpleaños"}
+    pedido.update(kwargs)
+    return pedido
+
+
+class TestLoteEndpoint:
+    """Test the batch submission endpoint."""
+
+    def test_requires_authentication(self, client):
+        """The batch endpoint requires a session."""
+        response = client.post("/api/pedidos/lote", json={"normales": [pedido_normal()]})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @patch('routers.pedidos_api.DatabaseManager')
+    def test_registers_valid_items_and_reports_errors(self, mock_db, authenticated_client):
+        """Valid items are inserted in one call per DB; invalid ones come back with their index."""
+        mock_db_instance = MagicMock()
+        mock_db.return_value = mock_db_instance
+        mock_db_instance.registrar_pasteles_normales_lote.side_effect = lambda lista: [100 + i for i in range(len(lista))]
+        mock_db_instance.registrar_pedidos_clientes_lote.side_effect = lambda lista: [200 + i for i in range(len(lista))]
+
+        response = authenticated_client.post("/api/pedidos/lote", json={
+            "normales": [
+                pedido_normal(),
+                pedido_normal(tamano="Gigante"),
+                pedido_normal(cantidad=2),
+                pedido_normal(sucursal="Jutiapa 2"),
+            ],
+            "clientes": [pedido_cliente(), pedido_cliente(dedicatoria="<script>")],
+        })
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["registrados"] == 3
+        assert data["normales"] == [{"indice": 0, "id": 100}, {"indice": 2, "id": 101}]
+        assert data["clientes"] == [{"indice": 0, "id": 200}]
+        assert {(e["tipo"], e["indice"]) for e in data["errores"]} == {("normal", 1), ("normal", 3), ("cliente", 1)}
+
+        mock_db_instance.registrar_pasteles_normales_lote.assert_called_once()
+        insertados = mock_db_instance.registrar_pasteles_normales_lote.call_args[0][0]
+        assert [p["cantidad"] for p in insertados] == [1, 2]
+        assert all(p["sucursal"] == "Jutiapa 1" for p in insertados)
+
+    @patch('routers.pedidos_api.DatabaseManager')
+    def test_database_failure_marks_items_as_errors(self, mock_db, authenticated_client):
+        """If one database fails, its items are reported and the other database still commits."""
+        mock_db_instance = MagicMock()
+        mock_db.return_value = mock_db_instance
+        mock_db_instance.registrar_pasteles_normales_lote.side_effect = Exception("Error de base de datos")
+        mock_db_instance.registrar_pedidos_clientes_lote.return_value = [300]
+
+        response = authenticated_client.post("/api/pedidos/lote", json={
+            "normales": [pedido_normal(), pedido_normal()],
+            "clientes": [pedido_cliente()],
+        })
+
+        data = response.json()
+        assert data["registrados"] == 1
+        assert data["clientes"] == [{"indice": 0, "id": 300}]
+        assert [e["indice"] for e in data["errores"] if e["tipo"] == "normal"] == [0, 1]
+
+    def test_empty_batch_rejected(self, authenticated_client):
+        """An empty cart is a bad request."""
+        response = authenticated_client.post("/api/pedidos/lote", json={"normales": [], "clientes": []})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class RoundTripCursor:
+    def __init__(self, pool):
+        self.pool = pool
+        self.filas = 0
+
+    def execute(self, query, params=()):
+        self.pool.viajes += 1
+        time.sleep(self.pool.latencia)
+        if "MERGE" in query:
+            self.filas = len(params) // (len(database_api.COLUMNAS_LOTE_NORMALES) + 1)
+        return self
+
+    def fetchone(self):
+        return (1,)
+
+    def fetchall(self):
+        return [(10000 + i,) for i in range(self.filas)]
+
+
+class RoundTripConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def cursor(self):
+        return RoundTripCursor(self.pool)
+
+    def commit(self):
+        self.pool.viajes += 1
+        time.sleep(self.pool.latencia)
+
+
+class RoundTripPool:
+    """Pool whose every statement and commit costs one simulated network round-trip."""
+
+    def __init__(self, latencia):
+        self.latencia = latencia
+        self.viajes = 0
+
+    @contextmanager
+    def get_connection(self):
+        yield RoundTripConnection(self)
+
+
+class TestLoteBenchmark:
+    """Compare a 30-item cart against the sequential single-insert path."""
+
+    def test_thirty_item_cart(self, monkeypatch):
+        """The batch path needs a constant number of round-trips instead of one set per item."""
+        pool = RoundTripPool(latencia=0.002)
+        monkeypatch.setattr(database_api, "db_pool_normales", pool)
+        carrito = [pedido_normal(sucursal="Jutiapa 1", detalles="", sabor_personalizado="") for _ in range(30)]
+
+        inicio = time.perf_counter()
+        ids_secuenciales = [database_api.registrar_pastel_normal_db(p) for p in carrito]
+        tiempo_secuencial = time.perf_counter() - inicio
+        viajes_secuenciales = pool.viajes
+
+        pool.viajes = 0
+        inicio = time.perf_counter()
+        ids_lote = database_api.registrar_pasteles_normales_lote_db(carrito)
+        tiempo_lote = time.perf_counter() - inicio
+
+        assert len(ids_secuenciales) == len(ids_lote) == 30
+        assert viajes_secuenciales == 90
+        assert pool.viajes == 2
+        assert tiempo_lote < tiempo_secuencial / 5
@@ -0,0 +1,219 @@
+"""
+Connection Pool Tests for MiPastel Application
+
+Tests for:
+- Connection reuse and bounded size
+- Blocking checkout with timeout
+- Health check after idle timeout and max-lifetime recycling
+- Rollback of uncommitted work on release
+- Closing connections that are returned after shutdown
+"""
+
+import threading
+import time
+
+import pytest
+from unittest.mock import patch
+
+import pyodbc
+
+from config.database import DatabasePool, PoolTimeoutError
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, *params):
+        if self.conn.roto:
+            raise pyodbc.Error("08S01", "Conexión perdida")
+        self.conn.consultas.append(query)
+        return self
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.autocommit = True
+        self.roto = False
+        self.cerrada = False
+        self.rollbacks = 0
+        self.consultas = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def commit(self):
+        pass
+
+    def close(self):
+        self.cerrada = True
+
+
+@pytest.fixture
+def conexiones():
+    creadas = []
+
+    def connect(_connection_string):
+        conn = FakeConnection()
+        creadas.append(conn)
+        return conn
+
+    with patch("config.database.pyodbc.connect", side_effect=connect):
+        yield creadas
+
+
+def crear_pool(**kwargs):
+    opciones = dict(min_size=1, max_size=2, timeout=0.2, idle_check_seconds=30, max_lifetime_seconds=1800)
+    opciones.update(kwargs)
+    return DatabasePool("servidor", "MiPastel", "ODBC Driver 17 for SQL Server", **opciones)
+
+
+class TestDatabasePool:
+    """Test bounded pool behavior."""
+
+    def test_reuses_connections(self, conexiones):
+        """Sequential checkouts should reuse the same physical connection."""
+        pool = crear_pool()
+
+        for _ in range(5):
+            with pool.get_connection() as conn:
+                assert conn.autocommit is False
+
+        assert len(conexiones) == 1
+        stats = pool.stats()
+        assert stats["checkouts"] == 5
+        assert stats["creations"] == 1
+        assert stats["idle"] == 1
+        assert stats["in_use"] == 0
+
+    def test_warm_up_opens_min_size(self, conexiones):
+        """warm_up should open min_size connections ahead of time."""
+        pool = crear_pool(min_size=2)
+        assert pool.warm_up() == 2
+        assert pool.stats()["idle"] == 2
+
+        with pool.get_connection():
+            pass
+        assert len(conexiones) == 2
+
+    def test_checkout_times_out_when_exhausted(self, conexiones):
+        """When every connection is in use, checkout waits and then fails."""
+        pool = crear_pool(max_size=1, timeout=0.05)
+
+        with pool.get_connection():
+            with pytest.raises(PoolTimeoutError):
+                with pool.get_connection():
+                    pass
+
+        assert pool.stats()["waits"] == 1
+
+    def test_waiting_checkout_gets_released_connection(self, conexiones):
+        """A blocked checkout should proceed as soon as a connection is returned."""
+        pool = crear_pool(max_size=1, timeout=2)
+        obtenidas = []
+
+        def trabajador():
+            with pool.get_connection() as conn:
+                obtenidas.append(conn)
+
+        with pool.get_connection() as primera:
+            hilo = threading.Thread(target=trabajador)
+            hilo.start()
+            time.sleep(0.05)
+            assert obtenidas == []
+
+        hilo.join(timeout=2)
+        assert obtenidas == [primera]
+        assert len(conexiones) == 1
+
+    def test_health_check_only_after_idle_timeout(self, conexiones):
+        """SELECT 1 should only run for connections idle longer than the threshold."""
+        pool = crear_pool(idle_check_seconds=0.05)
+
+        with pool.get_connection():
+            pass
+        with pool.get_connection():
+            pass
+        assert conexiones[0].consultas == []
+
+        time.sleep(0.06)
+        with pool.get_connection():
+            pass
+        assert conexiones[0].consultas == ["SELECT 1"]
+
+    def test_broken_idle_connection_is_replaced(self, conexiones):
+        """A connection failing the health check is discarded and replaced."""
+        pool = crear_pool(idle_check_seconds=0)
+
+        with pool.get_connection():
+            pass
+        conexiones[0].roto = True
+
+        with pool.get_connection() as conn:
+            assert conn is conexiones[1]
+
+        assert conexiones[0].cerrada
+        stats = pool.stats()
+        assert stats["discards"] == 1
+        assert stats["open"] == 1
+
+    def test_recycles_after_max_lifetime(self, conexiones):
+        """Connections older than max lifetime are closed instead of reused."""
+        pool = crear_pool(max_lifetime_seconds=0.01)
+
+        with pool.get_connection():
+            pass
+        time.sleep(0.02)
+
+        with pool.get_connection() as conn:
+            assert conn is conexiones[1]
+        assert conexiones[0].cerrada
+
+    def test_release_rolls_back_uncommitted_work(self, conexiones):
+        """Returning a connection must discard any uncommitted transaction."""
+        pool = crear_pool()
+
+        with pytest.raises(ValueError):
+            with pool.get_connection():
+                raise ValueError("fallo")
+
+        assert conexiones[0].rollbacks == 1
+        assert pool.stats()["idle"] == 1
+
+    def test_connection_returned_after_close_all_is_closed(self, conexiones):
+        """close_all closes idle connections now and in-use ones when they come back."""
+        pool = crear_pool(max_size=2)
+        pool.warm_up()
+
+        with pool.get_connection():
+            with pool.get_connection():
+                pool.close_all()
+                assert pool.stats()["open"] == 2
+            assert conexiones[1].cerrada
+        assert all(conn.cerrada for conn in conexiones)
+        assert pool.stats()["open"] == 0
+
+        pool.warm_up()
+        with pool.get_connection():
+            pass
+        assert pool.stats()["idle"] == 1
+
+    def test_failed_connect_frees_slot(self):
+        """A failed connect must not leak a slot of the pool."""
+        pool = crear_pool(max_size=1)
+
+        with patch("config.database.pyodbc.connect", side_effect=pyodbc.Error("08001", "Sin servidor")):
+            with pytest.raises(pyodbc.Error):
+                with pool.get_connection():
+                    pass
+
+        assert pool.stats()["open"] == 0
@@ -0,0 +1,274 @@
+"""
+Report Data Layer Tests for MiPastel Application
+
+Tests for:
+- Single concurrent fetch of both databases per report period
+- Columnar storage with NumPy arrays
+- Sales grouping and totals matching the previous row-by-row loops
+- Production matrix from categorical codes, for the PDF and /admin/produccion
+"""
+
+import random
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from unittest.mock import MagicMock, patch
+
+import api.reportes_datos as reportes_datos
+import pdf_reportes
+from api.reportes_datos import (
+    COLUMNAS_CLIENTES,
+    COLUMNAS_NORMALES,
+    PRODUCTOS_PRODUCCION,
+    MatrizProduccion,
+    TablaColumnar,
+    cargar_datos_reporte,
+    codificar,
+    obtener_matriz_produccion_db,
+)
+from config.constants import SUCURSALES
+
+DIA = date(2024, 5, 1)
+
+
+class ReporteCursor:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def execute(self, query, params=()):
+        self.pool.consultas.append((query, tuple(params)))
+        if self.pool.barrera is not None:
+            # Sólo pasa si la otra base se está consultando al mismo tiempo
+            self.pool.barrera.wait()
+        return self
+
+    def fetchall(self):
+        return self.pool.filas
+
+
+class ReporteConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def cursor(self):
+        return ReporteCursor(self.pool)
+
+
+class ReportePool:
+    def __init__(self, filas, barrera=None):
+        self.filas = filas
+        self.barrera = barrera
+        self.consultas = []
+
+    @contextmanager
+    def get_connection(self):
+        yield ReporteConnection(self)
+
+
+FILAS_NORMALES = [
+    (10000, "Fresas", "Mediano", Decimal("125.00"), 3, "Progreso", None, None),
+    (10001, "Otro", "Grande", Decimal("200.00"), 1, "Jutiapa 1", None, "Maracuyá"),
+    (10002, "Fresas", "Mediano", Decimal("125.00"), 2, "Progreso", None, ""),
+    (10003, "Fresas", "Mediano", None, 1, "Progreso", None, None),
+]
+
+FILAS_CLIENTES = [
+    (20000, "Fresas", "Mediano", 2, "Progreso", "Feliz día", None, Decimal("150.00"), Decimal("300.00"),
+     "abc.jpg", None, "Rosa", datetime(2024, 5, 2)),
+    (20001, "Otro", "Grande", 1, "Jutiapa 1", None, "Sin nueces", Decimal("250.00"), None,
+     None, "Zanahoria", None, None),
+]
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    barrera = threading.Barrier(2, timeout=5)
+    normales = ReportePool(FILAS_NORMALES, barrera)
+    clientes = ReportePool(FILAS_CLIENTES, barrera)
+    monkeypatch.setattr(reportes_datos, "db_pool_normales", normales)
+    monkeypatch.setattr(reportes_datos, "db_pool_clientes", clientes)
+    return normales, clientes
+
+
+def ventas_legacy(filas):
+    """The grouping pdf_reportes used to do row by row."""
+    ventas = {}
+    for _id, sabor, tamano, precio, cantidad, sucursal, _, sabor_personalizado in filas:
+        descripcion = f"{tamano} de {sabor_personalizado if sabor_personalizado else sabor}"
+        key = (sucursal, descripcion, float(precio) if precio is not None else 0.0)
+        ventas[key] = ventas.get(key, 0) + cantidad
+    return [(s, d, p, c) for (s, d, p), c in sorted(ventas.items())]
+
+
+def produccion_legacy(filas):
+    """The dict-of-dicts the production sheet used to build, as {etiqueta: {sucursal: cantidad}}."""
+    totales = {}
+    for _id, sabor, tamano, precio, cantidad, sucursal, _, sabor_personalizado in filas:
+        clave = f"{tamano} de {sabor_personalizado if sabor_personalizado else sabor}".upper()
+        totales.setdefault(clave, {s: 0 for s in SUCURSALES})
+        if sucursal in totales[clave]:
+            totales[clave][sucursal] += cantidad
+    return totales
+
+
+class TestCargarDatos:
+    """Test the fetch of a report period."""
+
+    def test_both_databases_queried_concurrently(self, pools):
+        """Each pool gets one query with the sargable range, and both run at the same time."""
+        datos = cargar_datos_reporte(DIA, date(2024, 5, 3), sucursal="Progreso")
+
+        for pool in pools:
+            assert len(pool.consultas) == 1
+            query, params = pool.consultas[0]
+            assert "WHERE fecha >= ? AND fecha < ? AND sucursal = ?" in query
+            assert params == (datetime(2024, 5, 1), datetime(2024, 5, 4), "Progreso")
+        assert len(datos.normales) == 4
+        assert len(datos.clientes) == 2
+
+    def test_errors_are_database_errors(self, monkeypatch):
+        """A failing pool surfaces as the usual database error."""
+        class PoolRoto:
+            @contextmanager
+            def get_connection(self):
+                raise RuntimeError("sin conexión")
+                yield
+
+        monkeypatch.setattr(reportes_datos, "db_pool_normales", PoolRoto())
+        monkeypatch.setattr(reportes_datos, "db_pool_clientes", ReportePool([]))
+        with pytest.raises(Exception, match="Error de base de datos"):
+            cargar_datos_reporte(DIA)
+
+    def test_listas_and_ventas_share_one_fetch(self, pools, tmp_path):
+        """Both PDFs for the same period render from a single read of each database."""
+        datos = cargar_datos_reporte(DIA)
+        pdf_reportes.generar_pdf_listas(DIA, output_path=str(tmp_path / "listas.pdf"), datos=datos)
+        pdf_reportes.generar_pdf_ventas(DIA, output_path=str(tmp_path / "ventas.pdf"), datos=datos)
+
+        assert [len(pool.consultas) for pool in pools] == [1, 1]
+        assert (tmp_path / "ventas.pdf").read_bytes().startswith(b"%PDF-")
+
+
+class TestTablaColumnar:
+    """Test the columnar structure."""
+
+    def test_columns_are_typed_arrays(self):
+        """Numeric columns become NumPy arrays with NULL as 0; text stays as objects."""
+        tabla = TablaColumnar(COLUMNAS_NORMALES, FILAS_NORMALES)
+        assert tabla["cantidad"].dtype == np.int64
+        assert tabla["precio"].tolist() == [125.0, 200.0, 125.0, 0.0]
+        assert tabla["sucursal"].dtype == object
+
+    def test_derived_description(self):
+        """Custom flavours replace the catalogue flavour only when present."""
+        tabla = TablaColumnar(COLUMNAS_NORMALES, FILAS_NORMALES)
+        assert tabla.descripcion.tolist() == [
+            "Mediano de Fresas", "Grande de Maracuyá", "Mediano de Fresas", "Mediano de Fresas"
+        ]
+
+    def test_empty_period(self):
+        """An empty period keeps every column with length zero."""
+        tabla = TablaColumnar(COLUMNAS_CLIENTES, [])
+        assert len(tabla) == 0
+        assert len(tabla["total"]) == 0
+        assert list(tabla.filas()) == []
+
+
+class TestSecciones:
+    """Test the aggregations the report sections read."""
+
+    def test_sales_grouping_matches_previous_loops(self, pools):
+        """Grouping by (sucursal, producto, precio) gives the same rows as before, in the same order."""
+        datos = cargar_datos_reporte(DIA)
+        assert datos.ventas_normales == ventas_legacy(FILAS_NORMALES)
+        assert datos.total_normales == 125 * 5 + 200.0
+
+    def test_sales_grouping_random(self, monkeypatch):
+        """The vectorised grouping agrees with the loop on random data."""
+        aleatorio = random.Random(7)
+        filas = [
+            (i, aleatorio.choice(["Fresas", "Oreo", "Fiesta"]), aleatorio.choice(["Mini", "Grande"]),
+             Decimal(aleatorio.choice(["80.00", "95.50", "120.00"])), aleatorio.randint(1, 5),
+             aleatorio.choice(["Progreso", "Comapa", "Jeréz"]), None, aleatorio.choice([None, "Café"]))
+            for i in range(2000)
+        ]
+        monkeypatch.setattr(reportes_datos, "db_pool_normales", ReportePool(filas))
+        monkeypatch.setattr(reportes_datos, "db_pool_clientes", ReportePool([]))
+
+        datos = cargar_datos_reporte(DIA)
+        assert datos.ventas_normales == ventas_legacy(filas)
+
+    def test_client_totals_fall_back_to_price(self, pools):
+        """Orders without a stored total count as precio * cantidad."""
+        datos = cargar_datos_reporte(DIA)
+        assert datos.total_por_cliente.tolist() == [300.0, 250.0]
+        assert datos.total_clientes == 550.0
+
+
+class TestMatrizProduccion:
+    """Test the production matrix."""
+
+    def test_codes_from_constants(self):
+        """Values map to their index in the category list; unknown values get -1."""
+        valores = np.array(["fresas", "Oreo", "Maracuyá", None, "FRESAS"], dtype=object)
+        assert codificar(valores, ["Fresas", "Oreo"]).tolist() == [0, 1, -1, -1, 0]
+        assert codificar(np.array(["progreso"], dtype=object), SUCURSALES, mayusculas=False).tolist() == [-1]
+
+    def test_matches_previous_dict_loops(self):
+        """Every printed cell equals what the old dict-of-dicts produced, including case differences."""
+        aleatorio = random.Random(11)
+        filas = [
+            (i, aleatorio.choice(["Fresas", "FRUTAS", "Oreo", "Tres leches con Arándanos", "Otro"]),
+             aleatorio.choice(["Mini", "mediano", "Grande", "Extra grande", "Media plancha"]), Decimal("10"),
+             aleatorio.randint(1, 4), aleatorio.choice(SUCURSALES + ["Bodega"]), None,
+             aleatorio.choice([None, None, "Café"]))
+            for i in range(3000)
+        ]
+        matriz = MatrizProduccion.desde_tabla(TablaColumnar(COLUMNAS_NORMALES, filas))
+        legacy = produccion_legacy(filas)
+
+        vacio = {s: 0 for s in SUCURSALES}
+        for producto, fila in zip(matriz.productos, matriz.cantidades.tolist()):
+            esperado = legacy.get(MatrizProduccion.etiqueta(producto), vacio)
+            assert fila == [esperado[s] for s in SUCURSALES]
+
+    def test_totals_are_reductions(self):
+        """Row, column and grand totals agree with each other."""
+        matriz = MatrizProduccion.desde_tabla(TablaColumnar(COLUMNAS_NORMALES, FILAS_NORMALES))
+        assert matriz.cantidades.shape == (len(PRODUCTOS_PRODUCCION), len(SUCURSALES))
+        assert matriz.total == matriz.totales_producto.sum() == matriz.totales_sucursal.sum() == 6
+        assert matriz.totales_sucursal[SUCURSALES.index("Progreso")] == 6
+
+    def test_json_layout(self, monkeypatch):
+        """The web admin receives the same matrix the PDF prints, reading only PastelesNormales."""
+        normales, clientes = ReportePool(FILAS_NORMALES), ReportePool(FILAS_CLIENTES)
+        monkeypatch.setattr(reportes_datos, "db_pool_normales", normales)
+        monkeypatch.setattr(reportes_datos, "db_pool_clientes", clientes)
+
+        produccion = obtener_matriz_produccion_db("2024-05-01", sucursal="todas")
+
+        assert clientes.consultas == []
+        assert "sucursal = ?" not in normales.consultas[0][0]
+        assert produccion["sucursales"] == SUCURSALES
+        fresas = next(p for p in produccion["productos"] if p["producto"] == "MEDIANO DE FRESAS")
+        assert fresas["total"] == 6
+        assert fresas["cantidades"][SUCURSALES.index("Progreso")] == 6
+        assert produccion["total"] == 6
+
+    @patch('routers.admin.DatabaseManager')
+    def test_endpoint_restricts_branch(self, mock_db, authenticated_client):
+        """Branch users only see their own column."""
+        mock_db.return_value = MagicMock()
+        mock_db.return_value.obtener_matriz_produccion.return_value = {"total": 0}
+
+        response = authenticated_client.get("/admin/produccion?fecha_inicio=2024-05-01&sucursal=Progreso")
+
+        assert response.status_code == 200
+        assert response.json() == {"produccion": {"total": 0}}
+        mock_db.return_value.obtener_matriz_produccion.assert_called_once_with(
+            fecha_inicio="2024-05-01", fecha_fin=None, sucursal="Jutiapa 1"
+        )
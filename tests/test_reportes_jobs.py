@@ -0,0 +1,269 @@
+"""
+Background Report Job Tests for MiPastel Application
+
+Tests for:
+- Deduplication of identical report requests
+- Disk cache keyed by data version with size-based eviction
+- "Todas" treated as every branch in the data version and cache key
+- Job submission, status and download endpoints
+- Event loop staying responsive while a report renders
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date
+
+import httpx
+import pytest
+
+from api.auth import datos_usuario
+from api.sesiones import COOKIE_SESION, almacen_sesiones
+import api.reportes_jobs as reportes_jobs
+from api.reportes_jobs import GestorReportes, ESTADO_ERROR, ESTADO_LISTO
+
+DIA = date(2024, 5, 1)
+
+
+class RenderFalso:
+    """Writes a fake PDF after an optional delay and counts the calls."""
+
+    def __init__(self, demora=0.0, tamano=1000, falla=False):
+        self.demora = demora
+        self.tamano = tamano
+        self.falla = falla
+        self.llamadas = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, tipo, fecha_inicio, fecha_fin, sucursal, destino):
+        with self._lock:
+            self.llamadas += 1
+        time.sleep(self.demora)
+        if self.falla:
+            raise RuntimeError("ReportLab falló")
+        with open(destino, "wb") as archivo:
+            archivo.write(b"%PDF-1.4 " + tipo.encode() + b"\0" * self.tamano)
+        return destino
+
+
+class PoolVersion:
+    """Answers the data version query over in-memory (id, sucursal) rows."""
+
+    def __init__(self, filas):
+        self.filas = list(filas)
+
+    @contextmanager
+    def get_connection(self):
+        pool = self
+
+        class Cursor:
+            def execute(self, query, params):
+                filas = pool.filas
+                if "sucursal = ?" in query:
+                    filas = [f for f in filas if f[1] == params[-1]]
+                self.resultado = (len(filas), max((f[0] for f in filas), default=None), hash(tuple(filas)))
+
+            def fetchone(self):
+                return self.resultado
+
+        class Conexion:
+            def cursor(self):
+                return Cursor()
+
+        yield Conexion()
+
+
+def crear_gestor(tmp_path, render, version="v1", **kwargs):
+    versiones = {"actual": version}
+    gestor = GestorReportes(
+        directorio=tmp_path,
+        renderizar=render,
+        version_datos=lambda *args: versiones["actual"],
+        executor=ThreadPoolExecutor(max_workers=2),
+        **kwargs
+    )
+    return gestor, versiones
+
+
+class TestGestorReportes:
+    """Test the job manager."""
+
+    def test_identical_requests_are_deduplicated(self, tmp_path):
+        """Concurrent identical requests share one job and one render."""
+        render = RenderFalso(demora=0.1)
+        gestor, _ = crear_gestor(tmp_path, render)
+
+        async def escenario():
+            trabajos = await asyncio.gather(*(gestor.enviar("listas", DIA) for _ in range(5)))
+            await gestor.esperar(trabajos[0], timeout=5)
+            return trabajos
+
+        trabajos = asyncio.run(escenario())
+        assert len({t.id for t in trabajos}) == 1
+        assert render.llamadas == 1
+        assert trabajos[0].estado == ESTADO_LISTO
+
+    def test_cache_hit_for_same_data_version(self, tmp_path):
+        """A finished report is served from disk while the data does not change."""
+        render = RenderFalso()
+        gestor, _ = crear_gestor(tmp_path, render)
+
+        async def escenario():
+            primero = await gestor.enviar("ventas", DIA, sucursal="Progreso")
+            await gestor.esperar(primero, timeout=5)
+            segundo = await gestor.enviar("ventas", DIA, sucursal="Progreso")
+            return primero, segundo
+
+        primero, segundo = asyncio.run(escenario())
+        assert render.llamadas == 1
+        assert segundo.desde_cache is True
+        assert segundo.ruta == primero.ruta
+
+    def test_data_change_renders_again(self, tmp_path):
+        """A new data version produces a new cache entry."""
+        render = RenderFalso()
+        gestor, versiones = crear_gestor(tmp_path, render)
+
+        async def escenario():
+            primero = await gestor.enviar("listas", DIA)
+            await gestor.esperar(primero, timeout=5)
+            versiones["actual"] = "v2"
+            segundo = await gestor.enviar("listas", DIA)
+            await gestor.esperar(segundo, timeout=5)
+            return primero, segundo
+
+        primero, segundo = asyncio.run(escenario())
+        assert render.llamadas == 2
+        assert primero.clave != segundo.clave
+
+    def test_todas_follows_every_branch(self, tmp_path, monkeypatch):
+        """A "todas" report is keyed on all branches: a new order in any of them changes the key."""
+        normales = PoolVersion([(1, "Progreso")])
+        monkeypatch.setattr(reportes_jobs, "db_pool_normales", normales)
+        monkeypatch.setattr(reportes_jobs, "db_pool_clientes", PoolVersion([(1, "Jutiapa 1")]))
+        render = RenderFalso()
+        gestor = GestorReportes(directorio=tmp_path, renderizar=render, executor=ThreadPoolExecutor(max_workers=1))
+
+        async def escenario():
+            primero = await gestor.enviar("listas", DIA, sucursal="todas")
+            await gestor.esperar(primero, timeout=5)
+            vacia = await gestor.enviar("listas", DIA, sucursal="")
+            normales.filas.append((2, "Quesada"))
+            segundo = await gestor.enviar("listas", DIA, sucursal="Todas")
+            await gestor.esperar(segundo, timeout=5)
+            return primero, vacia, segundo
+
+        primero, vacia, segundo = asyncio.run(escenario())
+        assert vacia.clave == primero.clave and vacia.desde_cache
+        assert segundo.clave != primero.clave
+        assert primero.sucursal is None and render.llamadas == 2
+
+    def test_eviction_keeps_recent_reports(self, tmp_path):
+        """When the cache exceeds its size, the least recently used PDFs are removed."""
+        render = RenderFalso(tamano=1000)
+        gestor, _ = crear_gestor(tmp_path, render, max_bytes=2500)
+
+        async def escenario():
+            trabajos = []
+            for dia in range(1, 5):
+                trabajo = await gestor.enviar("listas", date(2024, 5, dia))
+                await gestor.esperar(trabajo, timeout=5)
+                trabajos.append(trabajo)
+                time.sleep(0.02)
+            return trabajos
+
+        trabajos = asyncio.run(escenario())
+        assert [t.terminado_ok for t in trabajos] == [False, False, True, True]
+        assert trabajos[0].a_dict()["estado"] == "expirado"
+        assert sum(p.stat().st_size for p in tmp_path.glob("*.pdf")) <= 2500
+
+    def test_render_failure(self, tmp_path):
+        """A failed render marks the job as error and leaves no partial file."""
+        gestor, _ = crear_gestor(tmp_path, RenderFalso(falla=True))
+
+        async def escenario():
+            trabajo = await gestor.enviar("rango", DIA, date(2024, 5, 31))
+            return await gestor.esperar(trabajo, timeout=5)
+
+        trabajo = asyncio.run(escenario())
+        assert trabajo.estado == ESTADO_ERROR
+        assert "ReportLab" in trabajo.error
+        assert list(tmp_path.iterdir()) == []
+
+    def test_invalid_requests(self, tmp_path):
+        """Unknown types and inverted ranges are rejected before any work."""
+        gestor, _ = crear_gestor(tmp_path, RenderFalso())
+        with pytest.raises(ValueError):
+            asyncio.run(gestor.enviar("inventario", DIA))
+        with pytest.raises(ValueError):
+            asyncio.run(gestor.enviar("rango", DIA, date(2024, 4, 1)))
+
+
+def cookie_de(username, rol, sucursal):
+    datos = {**datos_usuario(username), "rol": rol, "sucursal": sucursal}
+    return f"{COOKIE_SESION}={almacen_sesiones.crear(datos)}".encode("utf-8")
+
+
+class TestReportEndpoints:
+    """Test the HTTP endpoints on a single event loop."""
+
+    def test_submit_poll_download(self, tmp_path, monkeypatch):
+        """A job goes from submitted to downloadable; branch users are pinned to their branch."""
+        import app.main as main
+
+        gestor, _ = crear_gestor(tmp_path, RenderFalso(demora=0.05))
+        monkeypatch.setattr(main, "gestor_reportes", gestor)
+
+        async def escenario():
+            async with httpx.AsyncClient(app=main.app, base_url="http://testserver") as cliente:
+                headers = {"cookie": cookie_de("jutiapa1", "sucursal", "Jutiapa 1")}
+                creado = await cliente.post(
+                    "/reportes/jobs", json={"tipo": "ventas", "fecha_inicio": "2024-05-01", "sucursal": "Progreso"},
+                    headers=headers
+                )
+                job_id = creado.json()["job_id"]
+                pendiente = await cliente.get(f"/reportes/jobs/{job_id}/descargar", headers=headers)
+
+                await gestor.esperar(gestor.obtener(job_id), timeout=5)
+                estado = await cliente.get(f"/reportes/jobs/{job_id}", headers=headers)
+                descarga = await cliente.get(f"/reportes/jobs/{job_id}/descargar", headers=headers)
+                return creado, pendiente, estado, descarga
+
+        creado, pendiente, estado, descarga = asyncio.run(escenario())
+        assert creado.status_code == 202
+        assert creado.json()["sucursal"] == "Jutiapa 1"
+        assert pendiente.status_code == 409
+        assert estado.json()["estado"] == ESTADO_LISTO
+        assert descarga.status_code == 200
+        assert descarga.headers["content-type"] == "application/pdf"
+        assert descarga.content.startswith(b"%PDF")
+
+    def test_jobs_require_authentication(self, client):
+        """Job endpoints need a session."""
+        assert client.post("/reportes/jobs", json={"fecha_inicio": "2024-05-01"}).status_code == 401
+        assert client.get("/reportes/jobs/abc").status_code == 401
+
+    def test_legacy_endpoint_does_not_block_loop(self, tmp_path, monkeypatch):
+        """While a slow report renders, other requests are still answered."""
+        import app.main as main
+
+        gestor, _ = crear_gestor(tmp_path, RenderFalso(demora=0.5))
+        monkeypatch.setattr(main, "gestor_reportes", gestor)
+
+        async def escenario():
+            async with httpx.AsyncClient(app=main.app, base_url="http://testserver") as cliente:
+                reporte = asyncio.create_task(cliente.get("/reportes/pdf?fecha=2024-05-01"))
+                await asyncio.sleep(0.05)
+                inicio = time.perf_counter()
+                salud = await cliente.get("/debug/routes")
+                latencia = time.perf_counter() - inicio
+                return await reporte, salud, latencia
+
+        reporte, salud, latencia = asyncio.run(escenario())
+        assert salud.status_code == 200
+        assert latencia < 0.25
+        assert reporte.status_code == 200
+        assert reporte.content.startswith(b"%PDF")
+        assert "Listas_MiPastel_2024-05-01.pdf" in reporte.headers["content-disposition"]
@@ -0,0 +1,225 @@
+"""
+Desktop Report Worker Tests for MiPastel Application
+
+Tests for:
+- Default report file names and dispatch to the pdf_reportes generators
+- PDFs written under a partial name and renamed only when complete
+- Several reports generated in parallel worker processes into one folder
+- Progress, errors, crashed workers and cancellation
+- GUI thread responsiveness while reports render (benchmark)
+"""
+
+import os
+import queue
+import time
+from datetime import date
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+try:
+    from PySide6.QtCore import QCoreApplication, QElapsedTimer, QTimer
+    from PySide6.QtWidgets import QApplication
+    PYSIDE_AVAILABLE = True
+except ImportError:
+    PYSIDE_AVAILABLE = False
+
+pytestmark = pytest.mark.skipif(not PYSIDE_AVAILABLE, reason="requiere PySide6")
+
+if PYSIDE_AVAILABLE:
+    from admin.reportes_proceso import (
+        AVANCE, ERROR, LISTO, PASOS_POR_REPORTE, TareaReporte, nombre_reporte, proceso_reporte, renderizar_reporte,
+    )
+    from admin.reportes_worker import LoteReportes
+    from tests.reportes_falsos import pdf_con_error, pdf_cpu, pdf_falso, pdf_lento, pdf_que_revienta
+
+SUCURSALES = ["Jutiapa 1", "Progreso", "Quesada", "Jeréz"]
+
+
+@pytest.fixture(scope="module")
+def qapp():
+    return QApplication.instance() or QApplication([])
+
+
+def tareas(carpeta, sucursales=SUCURSALES, tipo="ventas"):
+    return [TareaReporte(tipo, date(2025, 1, 1), date(2025, 1, 31), s,
+                         os.path.join(carpeta, nombre_reporte("Ventas", date(2025, 1, 1), date(2025, 1, 31), s)))
+            for s in sucursales]
+
+
+def ejecutar(lote, segundos=60, al_iniciar=None):
+    """Corre el lote hasta que termine o se cancele; devuelve los avisos de progreso."""
+    avisos, fin = [], []
+    lote.progreso.connect(lambda hechos, total, mensaje: avisos.append((hechos, total, mensaje)))
+    lote.terminado.connect(lambda rutas, errores: fin.append((rutas, errores)))
+    lote.cancelado.connect(lambda: fin.append(None))
+    lote.iniciar()
+    if al_iniciar:
+        al_iniciar()
+    limite = time.monotonic() + segundos
+    while not fin and time.monotonic() < limite:
+        QCoreApplication.processEvents()
+        time.sleep(0.01)
+    assert fin, "el lote no terminó a tiempo"
+    return avisos, fin[0]
+
+
+class TestNombres:
+    """Test default file names and generator dispatch."""
+
+    def test_nombre_reporte(self):
+        """Single day and range names match what the admin used to suggest."""
+        assert nombre_reporte("Ventas", date(2025, 3, 9)) == "Ventas_2025-03-09_TODAS.pdf"
+        assert (nombre_reporte("Listas", date(2025, 3, 1), date(2025, 3, 9), "Progreso")
+                == "Listas_2025-03-01_a_2025-03-09_Progreso.pdf")
+
+    def test_tipo_desconocido(self):
+        """Only sales and production lists can be requested."""
+        with pytest.raises(ValueError):
+            TareaReporte("otro", date(2025, 1, 1), None, None, "x.pdf")
+
+    @pytest.mark.parametrize("tipo,fecha_fin,generador", [
+        ("ventas", None, "generar_pdf_ventas"),
+        ("ventas", date(2025, 1, 5), "generar_pdf_ventas_rango"),
+        ("listas", None, "generar_pdf_listas"),
+        ("listas", date(2025, 1, 5), "generar_pdf_rango_fechas"),
+    ])
+    def test_despacho(self, monkeypatch, tipo, fecha_fin, generador):
+        """The data is read once and handed to the matching generator."""
+        import pdf_reportes
+
+        llamadas = []
+        monkeypatch.setattr(pdf_reportes, "obtener_datos",
+                            lambda datos, inicio, fin, sucursal: ("datos", inicio, fin, sucursal))
+        for nombre in ("generar_pdf_ventas", "generar_pdf_ventas_rango", "generar_pdf_listas",
+                       "generar_pdf_rango_fechas"):
+            monkeypatch.setattr(pdf_reportes, nombre,
+                                lambda *args, _n=nombre, **kwargs: llamadas.append((_n, args, kwargs)))
+
+        avisos = []
+        renderizar_reporte(TareaReporte(tipo, date(2025, 1, 1), fecha_fin, "Progreso", "x.pdf"), avisos.append)
+
+        assert [n for n, _, _ in llamadas] == [generador]
+        assert llamadas[0][2]["datos"] == ("datos", date(2025, 1, 1), fecha_fin or date(2025, 1, 1), "Progreso")
+        assert llamadas[0][1][-1] == "x.pdf"
+        assert len(avisos) == 1
+
+
+class TestProcesoReporte:
+    """Test the child process entry point in-process."""
+
+    def test_renombra_al_terminar(self, tmp_path):
+        """The PDF is written under .parcial and only then gets its final name."""
+        cola = queue.Queue()
+        destino = str(tmp_path / "r.pdf")
+        proceso_reporte(0, TareaReporte("ventas", date(2025, 1, 1), None, "Progreso", destino), cola, pdf_falso)
+
+        mensajes = [cola.get_nowait() for _ in range(cola.qsize())]
+        assert [m[1] for m in mensajes] == [AVANCE, AVANCE, LISTO]
+        assert mensajes[-1][2] == destino
+        assert os.listdir(tmp_path) == ["r.pdf"]
+
+    def test_error_no_deja_archivo(self, tmp_path):
+        """A failing report sends its error and removes the partial file."""
+        cola = queue.Queue()
+        destino = str(tmp_path / "r.pdf")
+
+        def falla(tarea, avisar):
+            pdf_falso(tarea, avisar)
+            raise RuntimeError("ReportLab falló")
+
+        proceso_reporte(2, TareaReporte("listas", date(2025, 1, 1), None, None, destino), cola, falla)
+
+        *_, ultimo = [cola.get_nowait() for _ in range(cola.qsize())]
+        assert ultimo == (2, ERROR, "ReportLab falló")
+        assert os.listdir(tmp_path) == []
+
+
+class TestLoteReportes:
+    """Test parallel generation in worker processes."""
+
+    def test_genera_en_paralelo_en_una_carpeta(self, qapp, tmp_path):
+        """Every branch gets its own PDF in the chosen folder and progress reaches the total."""
+        lote = LoteReportes(tareas(str(tmp_path), SUCURSALES), funcion=pdf_falso, max_procesos=3, intervalo_ms=20)
+        avisos, (rutas, errores) = ejecutar(lote)
+
+        assert errores == []
+        assert sorted(rutas) == sorted(t.destino for t in lote.tareas)
+        assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(t.destino) for t in lote.tareas)
+        assert avisos[-1][:2] == (lote.total_pasos, PASOS_POR_REPORTE * len(SUCURSALES))
+        assert [a[0] for a in avisos] == sorted(a[0] for a in avisos)
+        assert not lote.activo
+
+    def test_errores_por_reporte(self, qapp, tmp_path):
+        """One failing branch does not stop the others."""
+        lote = LoteReportes(tareas(str(tmp_path), SUCURSALES[:3]), funcion=pdf_con_error, intervalo_ms=20)
+        _, (rutas, errores) = ejecutar(lote)
+
+        assert len(rutas) == 2
+        assert [(t.sucursal, m) for t, m in errores] == [("Progreso", "sin conexión")]
+        assert not any(n.endswith(".parcial") for n in os.listdir(tmp_path))
+
+    def test_proceso_que_revienta(self, qapp, tmp_path):
+        """A worker that dies without reporting is counted as an error instead of hanging."""
+        lote = LoteReportes(tareas(str(tmp_path), ["Jerez"]), funcion=pdf_que_revienta, intervalo_ms=20)
+        _, (rutas, errores) = ejecutar(lote)
+
+        assert rutas == []
+        assert "código 3" in errores[0][1]
+
+    def test_cancelar(self, qapp, tmp_path):
+        """Cancelling kills the workers, leaves no partial files and skips pending reports."""
+        lote = LoteReportes(tareas(str(tmp_path), SUCURSALES), funcion=pdf_lento, max_procesos=2, intervalo_ms=20)
+        procesos = []
+
+        def cancelar_al_empezar():
+            limite = time.monotonic() + 30
+            while not any(os.listdir(tmp_path)) and time.monotonic() < limite:
+                time.sleep(0.02)
+            procesos.extend(lote._procesos.values())
+            lote.cancelar()
+
+        _, resultado = ejecutar(lote, al_iniciar=cancelar_al_empezar)
+
+        assert resultado is None
+        assert len(procesos) == 2
+        assert all(not p.is_alive() for p in procesos)
+        assert os.listdir(tmp_path) == []
+        assert not lote.activo
+
+    def test_sin_tareas(self, qapp):
+        with pytest.raises(ValueError):
+            LoteReportes([])
+
+
+class TestBenchmark:
+    """Benchmark GUI responsiveness while reports render."""
+
+    def test_ventana_responde_mientras_se_generan(self, qapp, tmp_path):
+        """A 10 ms GUI timer keeps ticking while four CPU-bound reports run in workers."""
+        lista = tareas(str(tmp_path), SUCURSALES)
+
+        inicio = time.perf_counter()
+        for tarea in tareas(str(tmp_path / "sincrono"), SUCURSALES):
+            os.makedirs(os.path.dirname(tarea.destino), exist_ok=True)
+            pdf_cpu(tarea, lambda mensaje: None)
+        bloqueo_sincrono = time.perf_counter() - inicio
+
+        reloj, huecos = QElapsedTimer(), []
+        latido = QTimer()
+        latido.setInterval(10)
+        latido.timeout.connect(lambda: (huecos.append(reloj.restart())))
+        reloj.start()
+        latido.start()
+
+        inicio = time.perf_counter()
+        lote = LoteReportes(lista, funcion=pdf_cpu, max_procesos=4, intervalo_ms=50)
+        _, (rutas, errores) = ejecutar(lote)
+        total = time.perf_counter() - inicio
+        latido.stop()
+
+        print(f"\nsíncrono: ventana congelada {bloqueo_sincrono * 1000:.0f} ms; "
+              f"procesos: {total * 1000:.0f} ms en total, mayor pausa del hilo de la GUI {max(huecos)} ms")
+        assert len(rutas) == len(SUCURSALES) and errores == []
+        assert max(huecos) < bloqueo_sincrono * 1000 / 2
@@ -6,6 +6,7 @@ Tests for:
 - Branch permission enforcement
 - Normal and client order registration
 - Unauthorized access attempts
+- Diff-only price updates returning the catalog version
 """
 
 import pytest
@@ -14,19 +15,14 @@ from fastapi.testclient import TestClient
 from unittest.mock import Mock, patch, MagicMock
 from datetime import date, timedelta
 
-from api.auth import hash_session
+from api.auth import datos_usuario
+from api.sesiones import COOKIE_SESION, almacen_sesiones
 
 
 @pytest.fixture
 def admin_client(client):
     """Create a client with authenticated session for admin."""
-    username = "admin"
-    session_token = hash_session(username)
-    
-    client.cookies.set("session_token", session_token)
-    client.cookies.set("username", username)
-    client.cookies.set("sucursal", "")
-    client.cookies.set("rol", "admin")
+    client.cookies.set(COOKIE_SESION, almacen_sesiones.crear(datos_usuario("admin")))
     
     return client
 
@@ -247,3 +243,32 @@ class TestDataFiltering:
         call_kwargs = mock_db_instance.obtener_pasteles_normales.call_args[1]
         # Admin should have sucursal=None or empty
         assert call_kwargs.get("sucursal") in [None, ""]
+
+
+class TestAdminPreciosUpdate:
+    """Test the diff-only price update endpoint."""
+
+    @patch('routers.admin.DatabaseManager')
+    def test_returns_count_and_catalog_version(self, mock_db, admin_client):
+        """The response carries how many rows changed and the new catalog version."""
+        mock_db.return_value.actualizar_precios.return_value = {"actualizados": 1, "version": "72-0a1b2c3d"}
+
+        response = admin_client.post("/admin/precios/actualizar", json=[{"id": 1, "precio": 150.0}])
+
+        assert response.status_code == 200
+        assert response.json()["actualizados"] == 1
+        assert response.json()["version"] == "72-0a1b2c3d"
+
+    @patch('routers.admin.DatabaseManager')
+    def test_invalid_price_is_bad_request(self, mock_db, admin_client):
+        """A price the catalog rejects is a 400, not a server error."""
+        mock_db.return_value.actualizar_precios.side_effect = ValueError("El precio 99 no existe")
+
+        response = admin_client.post("/admin/precios/actualizar", json=[{"id": 99, "precio": 150.0}])
+
+        assert response.status_code == 400
+        assert "99" in response.json()["detail"]
+
+    def test_branch_user_cannot_update(self, authenticated_client):
+        response = authenticated_client.post("/admin/precios/actualizar", json=[{"id": 1, "precio": 150.0}])
+        assert response.status_code == 403
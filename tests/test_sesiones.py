@@ -0,0 +1,220 @@
+"""
+Session Store Tests for MiPastel Application
+
+Tests for:
+- Opaque session ids stored server-side with idle and absolute expiry
+- The in-memory Redis stand-in and the JSON path used with a real Redis
+- SesionMiddleware resolving the session once per request
+- Logout and forged cookies
+- Authentication overhead per request against the hashed-cookie scheme (benchmark)
+"""
+
+import hashlib
+import time
+
+import pytest
+from fastapi import FastAPI, Request, status
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+from api import sesiones
+from api.auth import datos_usuario, verificar_sesion
+from api.sesiones import COOKIE_SESION, AlmacenSesiones, ClienteRedisLocal, SesionMiddleware
+from config.settings import settings
+
+
+class RedisFalso:
+    """Minimal Redis double that, like the real client, only keeps bytes."""
+
+    def __init__(self):
+        self.datos = {}
+        self.escrituras = 0
+
+    def get(self, clave):
+        return self.datos.get(clave)
+
+    def set(self, clave, valor, ex=None):
+        assert isinstance(valor, (str, bytes)) and ex >= 1
+        self.escrituras += 1
+        self.datos[clave] = valor.encode() if isinstance(valor, str) else valor
+
+    def delete(self, *claves):
+        return sum(self.datos.pop(c, None) is not None for c in claves)
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1_000_000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(sesiones.time, "time", reloj)
+    monkeypatch.setattr(sesiones.time, "monotonic", reloj)
+    monkeypatch.setattr(settings, "SESSION_IDLE_MINUTES", 30)
+    monkeypatch.setattr(settings, "SESSION_DURATION_HOURS", 8)
+    monkeypatch.setattr(settings, "SESSION_TOUCH_SECONDS", 60)
+    return reloj
+
+
+class TestAlmacen:
+    """Test the session store."""
+
+    def test_create_and_read(self):
+        """A session returns its user's data; unknown ids return None."""
+        almacen = AlmacenSesiones()
+        session_id = almacen.crear(datos_usuario("progreso"))
+
+        assert almacen.obtener(session_id) == datos_usuario("progreso")
+        assert almacen.obtener("desconocido") is None
+        assert almacen.obtener(None) is None
+
+    def test_idle_expiry_and_touch(self, reloj):
+        """Activity keeps the session alive; 30 idle minutes end it."""
+        almacen = AlmacenSesiones()
+        session_id = almacen.crear(datos_usuario("progreso"))
+
+        for _ in range(10):
+            reloj.ahora += 20 * 60
+            assert almacen.obtener(session_id) is not None
+
+        reloj.ahora += 30 * 60
+        assert almacen.obtener(session_id) is None
+
+    def test_absolute_expiry(self, reloj):
+        """Even an active session ends SESSION_DURATION_HOURS after login."""
+        almacen = AlmacenSesiones()
+        session_id = almacen.crear(datos_usuario("progreso"))
+
+        while reloj.ahora < 1_000_000.0 + 8 * 3600 - 600:
+            reloj.ahora += 600
+            assert almacen.obtener(session_id) is not None
+        reloj.ahora += 600
+        assert almacen.obtener(session_id) is None
+
+    def test_touch_is_throttled(self, reloj):
+        """The idle deadline is rewritten at most once per SESSION_TOUCH_SECONDS."""
+        cliente = RedisFalso()
+        almacen = AlmacenSesiones(cliente)
+        session_id = almacen.crear(datos_usuario("admin"))
+
+        for _ in range(100):
+            reloj.ahora += 1
+            assert almacen.obtener(session_id)["rol"] == "admin"
+
+        assert cliente.escrituras == 1 + 1
+
+    def test_redis_values_are_json(self):
+        """With a Redis-like client the session travels as JSON under a prefixed key."""
+        cliente = RedisFalso()
+        almacen = AlmacenSesiones(cliente)
+        session_id = almacen.crear(datos_usuario("admin"))
+
+        assert list(cliente.datos) == [sesiones.PREFIJO_CLAVE + session_id]
+        assert almacen.obtener(session_id)["username"] == "admin"
+        almacen.eliminar(session_id)
+        assert cliente.datos == {}
+
+    def test_local_client_expires_and_purges(self, reloj):
+        """The in-memory stand-in honours EX and sweeps abandoned keys."""
+        cliente = ClienteRedisLocal()
+        cliente.set("a", 1, ex=10)
+        cliente.set("b", 2, ex=1000)
+        reloj.ahora += 61
+        assert cliente.get("a") is None
+        cliente.set("c", 3, ex=10)
+        assert len(cliente) == 2
+
+
+def crear_app():
+    app = FastAPI()
+
+    @app.get("/yo")
+    async def yo(request: Request):
+        # Como los routers: varias verificaciones en la misma petición
+        datos = [verificar_sesion(request) for _ in range(3)]
+        return datos[0] or {}
+
+    app.add_middleware(SesionMiddleware)
+    return app
+
+
+class TestMiddleware:
+    """Test the per-request resolution."""
+
+    def test_resolved_once_per_request(self, monkeypatch):
+        """Several checks in one request cost a single store lookup."""
+        almacen = AlmacenSesiones()
+        session_id = almacen.crear(datos_usuario("comapa"))
+        monkeypatch.setattr(sesiones, "almacen_sesiones", almacen)
+        cliente = TestClient(crear_app())
+        cliente.cookies.set(COOKIE_SESION, session_id)
+
+        with patch.object(almacen, "obtener", wraps=almacen.obtener) as obtener:
+            respuesta = cliente.get("/yo")
+
+        assert respuesta.json()["sucursal"] == "Comapa"
+        assert obtener.call_count == 1
+
+    def test_forged_cookies_grant_nothing(self, client):
+        """Role and branch no longer come from cookies the browser can edit."""
+        client.cookies.set("username", "admin")
+        client.cookies.set("rol", "admin")
+        client.cookies.set(COOKIE_SESION, hashlib.sha256(b"admin").hexdigest())
+
+        response = client.get("/admin/normales")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_logout_ends_session_server_side(self, authenticated_client):
+        """After logout the old session id is useless even if replayed."""
+        session_id = authenticated_client.cookies[COOKIE_SESION]
+
+        authenticated_client.get("/logout", follow_redirects=False)
+
+        assert sesiones.almacen_sesiones.obtener(session_id) is None
+
+
+class TestBenchmark:
+    """Benchmark authentication overhead per request."""
+
+    def test_overhead_per_request(self):
+        """Resolving once and reading request.state beats re-hashing and re-reading cookies per check."""
+        almacen = AlmacenSesiones()
+        session_id = almacen.crear(datos_usuario("jutiapa1"))
+        secreto = settings.SECRET_KEY
+        cookie = (f"session_token={hashlib.sha256(f'jutiapa1{secreto}'.encode()).hexdigest()}; "
+                  f"username=jutiapa1; sucursal=Jutiapa 1; rol=sucursal").encode()
+        verificaciones = 3
+        repeticiones = 20_000
+
+        def legado():
+            request = Request({"type": "http", "headers": [(b"cookie", cookie)]})
+            for _ in range(verificaciones):
+                token = request.cookies.get("session_token")
+                username = request.cookies.get("username")
+                request.cookies.get("sucursal")
+                request.cookies.get("rol")
+                assert token == hashlib.sha256(f"{username}{secreto}".encode()).hexdigest()
+
+        scope_nuevo = {"type": "http", "headers": [(b"cookie", f"{COOKIE_SESION}={session_id}".encode())]}
+
+        def nuevo():
+            scope = dict(scope_nuevo)
+            scope["state"] = {"sesion": almacen.obtener(sesiones.session_id_de(scope))}
+            request = Request(scope)
+            for _ in range(verificaciones):
+                assert verificar_sesion(request) is not None
+
+        tiempos = {}
+        for nombre, funcion in (("cookies + sha256", legado), ("sesión resuelta", nuevo)):
+            inicio = time.perf_counter()
+            for _ in range(repeticiones):
+                funcion()
+            tiempos[nombre] = (time.perf_counter() - inicio) / repeticiones * 1e6
+
+        print("\n" + ", ".join(f"{nombre}: {us:.2f} µs/petición" for nombre, us in tiempos.items()))
+        assert tiempos["sesión resuelta"] < tiempos["cookies + sha256"]
@@ -0,0 +1,116 @@
+"""
+Static Asset Tests for MiPastel Application
+
+Tests for:
+- Content fingerprints in template URLs
+- Immutable caching, strong ETags and 304 revalidation
+- Precompressed gzip variants negotiated from Accept-Encoding
+- Content-hash named uploads
+"""
+
+import gzip
+import hashlib
+
+import pytest
+from fastapi import status
+
+from config.settings import settings
+from utils.static_assets import elegir_codificacion, manifiesto_estaticos, static_url
+
+CARRITO = "js/carrito.js"
+
+
+def hash_de(relativa):
+    return hashlib.sha256((settings.STATIC_DIR / relativa).read_bytes()).hexdigest()[:12]
+
+
+class TestManifiesto:
+    """Test the startup fingerprints."""
+
+    def test_url_carries_content_hash(self):
+        """Known assets get ?v=<hash of their content>; unknown paths are left alone."""
+        assert static_url(CARRITO) == f"/static/{CARRITO}?v={hash_de(CARRITO)}"
+        assert static_url("/uploads/foto.jpg") == "/static/uploads/foto.jpg"
+
+    def test_uploads_not_fingerprinted(self):
+        """The growing uploads folder is not read at startup."""
+        assert not any(ruta.startswith("uploads/") for ruta in manifiesto_estaticos.recursos)
+
+    def test_js_and_css_precompressed(self):
+        """Text assets have a gzip variant that decompresses to the original."""
+        recurso = manifiesto_estaticos.recurso("css/admin-style.css")
+        original = (settings.STATIC_DIR / "css" / "admin-style.css").read_bytes()
+        assert gzip.decompress(recurso.variantes["gzip"]) == original
+
+    def test_index_links_fingerprinted_assets(self, authenticated_client):
+        """The main page references its scripts and stylesheet through static_url."""
+        html = authenticated_client.get("/").text
+        assert f'src="/static/{CARRITO}?v={hash_de(CARRITO)}"' in html
+        assert 'href="/static/css/admin-style.css?v=' in html
+
+
+class TestCabecerasCache:
+    """Test the cache headers of /static."""
+
+    def test_versioned_request_is_immutable(self, client):
+        """The current hash is cacheable for a year without revalidation."""
+        response = client.get(static_url(CARRITO), headers={"Accept-Encoding": "identity"})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+        assert response.headers["etag"] == f'"{hash_de(CARRITO)}"'
+        assert "content-encoding" not in response.headers
+
+    @pytest.mark.parametrize("url", [f"/static/{CARRITO}", f"/static/{CARRITO}?v=viejo"])
+    def test_unversioned_or_stale_revalidates(self, client, url):
+        """Without the current hash the browser must revalidate."""
+        response = client.get(url)
+        assert response.headers["cache-control"] == "no-cache"
+
+    def test_if_none_match_returns_304(self, client):
+        """A matching ETag is answered with an empty 304."""
+        etag = client.get(f"/static/{CARRITO}", headers={"Accept-Encoding": "identity"}).headers["etag"]
+
+        response = client.get(f"/static/{CARRITO}", headers={"If-None-Match": etag, "Accept-Encoding": "identity"})
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    def test_gzip_variant(self, client):
+        """gzip clients get the precompressed body with its own ETag."""
+        original = (settings.STATIC_DIR / CARRITO).read_bytes()
+        response = client.get(static_url(CARRITO), headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.headers["etag"] == f'"{hash_de(CARRITO)}-gzip"'
+        assert int(response.headers["content-length"]) < len(original)
+        assert response.content == original
+
+    def test_hashed_upload_is_immutable(self, client):
+        """Photos named by their content hash never change."""
+        nombre = "a" * 64 + "_thumb.jpg"
+        ruta = settings.UPLOADS_DIR / nombre
+        ruta.write_bytes(b"\xff\xd8foto")
+        try:
+            response = client.get(f"/static/uploads/{nombre}")
+        finally:
+            ruta.unlink()
+        assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+        assert response.headers["etag"] == f'"{"a" * 64}_thumb"'
+
+
+class TestNegociacion:
+    """Test Accept-Encoding negotiation."""
+
+    @pytest.mark.parametrize("cabecera,esperado", [
+        ("gzip, deflate, br", "br"),
+        ("gzip;q=1.0, br;q=0.5", "gzip"),
+        ("br;q=0, gzip", "gzip"),
+        ("*", "br"),
+        ("gzip;q=0", None),
+        ("", None),
+    ])
+    def test_q_values(self, cabecera, esperado):
+        """q-values decide, q=0 excludes and ties prefer brotli."""
+        assert elegir_codificacion(cabecera, ["br", "gzip"]) == esperado
@@ -0,0 +1,239 @@
+"""
+Photo Upload Tests for MiPastel Application
+
+Tests for:
+- Chunked writes with a hard MAX_FILE_SIZE limit
+- Content-hash file names and deduplication
+- Bounded re-encoding and thumbnails
+- Upload endpoints and the thumbnail in the client PDF
+- Refusing oversized multipart requests from their Content-Length
+"""
+
+import asyncio
+import io
+from datetime import date
+
+import pytest
+from fastapi import status
+from PIL import Image
+from starlette.datastructures import UploadFile
+from unittest.mock import MagicMock, patch
+
+import pdf_reportes
+from api.reportes_datos import COLUMNAS_CLIENTES, TablaColumnar
+from config.settings import settings
+from utils.uploads import (
+    ArchivoDemasiadoGrande,
+    ImagenInvalida,
+    guardar_foto,
+    ruta_miniatura,
+    url_miniatura,
+)
+
+
+def imagen_jpeg(ancho=2400, alto=1800, color=(200, 80, 120)):
+    buffer = io.BytesIO()
+    Image.new("RGB", (ancho, alto), color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def subida(contenido, nombre="pastel.jpg", con_tamano=False):
+    return UploadFile(io.BytesIO(contenido), filename=nombre, size=len(contenido) if con_tamano else None)
+
+
+def guardar(contenido, directorio, **kwargs):
+    return asyncio.run(guardar_foto(subida(contenido), directorio, **kwargs))
+
+
+@pytest.fixture
+def uploads(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOADS_DIR", str(tmp_path))
+    return tmp_path
+
+
+class TestGuardarFoto:
+    """Test the streaming photo writer."""
+
+    def test_bounded_photo_and_thumbnail(self, uploads):
+        """Large photos are scaled down and get a thumbnail, both named by content hash."""
+        foto = guardar(imagen_jpeg(), uploads)
+
+        assert foto.nueva is True
+        assert foto.ruta.name == f"{foto.hash}.jpg"
+        assert foto.url == f"/static/uploads/{foto.hash}.jpg"
+        assert foto.url_miniatura == url_miniatura(foto.url)
+        with Image.open(foto.ruta) as imagen:
+            assert max(imagen.size) == settings.UPLOAD_MAX_DIMENSION
+        with Image.open(foto.ruta_miniatura) as miniatura:
+            assert max(miniatura.size) <= settings.UPLOAD_THUMB_DIMENSION
+        assert sorted(p.name for p in uploads.iterdir()) == sorted([foto.ruta.name, foto.ruta_miniatura.name])
+
+    def test_same_content_is_deduplicated(self, uploads):
+        """A second upload of the same bytes reuses the files instead of re-encoding."""
+        contenido = imagen_jpeg(800, 600)
+        primera = guardar(contenido, uploads)
+        segunda = guardar(contenido, uploads)
+
+        assert segunda.ruta == primera.ruta
+        assert segunda.nueva is False
+        assert primera.ruta.exists() and primera.ruta_miniatura.exists()
+
+    def test_limit_stops_reading_and_leaves_nothing(self, uploads):
+        """The limit is enforced while streaming, and the partial file is removed."""
+        contenido = imagen_jpeg(800, 600)
+        archivo = subida(contenido)
+
+        with pytest.raises(ArchivoDemasiadoGrande):
+            asyncio.run(guardar_foto(archivo, uploads, max_bytes=len(contenido) // 2, chunk_size=1024))
+
+        assert archivo.file.tell() < len(contenido)
+        assert list(uploads.iterdir()) == []
+
+    def test_declared_size_rejected_up_front(self, uploads):
+        """A declared size above the limit is rejected before writing anything."""
+        archivo = subida(b"x" * 100, con_tamano=True)
+        with pytest.raises(ArchivoDemasiadoGrande):
+            asyncio.run(guardar_foto(archivo, uploads, max_bytes=10))
+        assert archivo.file.tell() == 0
+
+    @pytest.mark.parametrize("contenido", [b"", b"esto no es una imagen"])
+    def test_invalid_images(self, uploads, contenido):
+        """Empty or undecodable uploads are rejected without leftovers."""
+        with pytest.raises(ImagenInvalida):
+            guardar(contenido, uploads)
+        assert list(uploads.iterdir()) == []
+
+    def test_thumbnail_lookup(self, uploads):
+        """Legacy photos without thumbnail fall back to the photo itself."""
+        foto = guardar(imagen_jpeg(400, 300), uploads)
+        (uploads / "20240101_Fresas.png").write_bytes(b"png")
+
+        assert ruta_miniatura(foto.url) == foto.ruta_miniatura
+        assert ruta_miniatura(str(uploads / "20240101_Fresas.png")) == uploads / "20240101_Fresas.png"
+        assert ruta_miniatura("/static/uploads/borrada.jpg") is None
+        assert url_miniatura("/static/uploads/20240101_Fresas.png") is None
+
+
+class TestUploadEndpoints:
+    """Test the order endpoints that accept photos."""
+
+    @patch('routers.pedidos_api.DatabaseManager')
+    def test_order_stores_hashed_url(self, mock_db, authenticated_client, tmp_path, monkeypatch):
+        """The order keeps the content-hash URL of the photo."""
+        monkeypatch.setattr("routers.pedidos_api.STATIC_UPLOADS", tmp_path)
+        mock_db.return_value = MagicMock()
+        mock_db.return_value.obtener_precio_por_sabor_tamano.return_value = 125.0
+        mock_db.return_value.insertar_pastel_normal.return_value = 10
+
+        response = authenticated_client.post(
+            "/api/pedidos/registrar",
+            data={"tipo": "normal", "sabor": "Fresas", "tamano": "Mediano", "cantidad": "1"},
+            files={"foto": ("pastel.jpg", imagen_jpeg(640, 480), "image/jpeg")},
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        pedido = mock_db.return_value.insertar_pastel_normal.call_args[0][0]
+        assert pedido["foto_path"].startswith("/static/uploads/")
+        assert ruta_miniatura(pedido["foto_path"], tmp_path).name.endswith("_thumb.jpg")
+
+    @patch('routers.pedidos_api.DatabaseManager')
+    def test_oversized_photo_is_413(self, mock_db, authenticated_client, tmp_path, monkeypatch):
+        """Photos above MAX_FILE_SIZE are refused and the order is not inserted."""
+        monkeypatch.setattr("routers.pedidos_api.STATIC_UPLOADS", tmp_path)
+        monkeypatch.setattr(settings, "MAX_FILE_SIZE", 1024)
+        mock_db.return_value = MagicMock()
+
+        response = authenticated_client.post(
+            "/api/pedidos/registrar",
+            data={"tipo": "normal", "sabor": "Fresas", "tamano": "Mediano", "cantidad": "1"},
+            files={"foto": ("pastel.jpg", imagen_jpeg(640, 480), "image/jpeg")},
+        )
+
+        assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        mock_db.return_value.insertar_pastel_normal.assert_not_called()
+        assert list(tmp_path.iterdir()) == []
+
+    @patch('routers.pedidos_api.DatabaseManager')
+    def test_failed_insert_keeps_photo(self, mock_db, authenticated_client, tmp_path, monkeypatch):
+        """A failed insert leaves the photo: a concurrent order with the same content may point at it."""
+        monkeypatch.setattr("routers.pedidos_api.STATIC_UPLOADS", tmp_path)
+        mock_db.return_value = MagicMock()
+        mock_db.return_value.obtener_precio_por_sabor_tamano.return_value = 125.0
+        mock_db.return_value.insertar_pastel_normal.side_effect = Exception("Error de base de datos")
+
+        response = authenticated_client.post(
+            "/api/pedidos/registrar",
+            data={"tipo": "normal", "sabor": "Fresas", "tamano": "Mediano", "cantidad": "1"},
+            files={"foto": ("pastel.jpg", imagen_jpeg(640, 480), "image/jpeg")},
+        )
+
+        assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+        assert len(list(tmp_path.iterdir())) == 2
+
+
+class TestLimiteSubida:
+    """Test the Content-Length guard in front of the upload routes."""
+
+    def llamar(self, cabeceras):
+        from app.middleware import LimiteSubidaMiddleware
+
+        llamadas, enviados = [], []
+
+        async def app(scope, receive, send):
+            llamadas.append(scope["path"])
+
+        async def receive():
+            pytest.fail("se leyó el cuerpo")
+
+        async def send(mensaje):
+            enviados.append(mensaje)
+
+        scope = {"type": "http", "method": "POST", "path": "/api/pedidos/registrar",
+                 "headers": [(k.encode(), v.encode()) for k, v in cabeceras.items()]}
+        asyncio.run(LimiteSubidaMiddleware(app)(scope, receive, send))
+        return llamadas, enviados
+
+    def test_oversized_multipart_refused_without_reading(self, monkeypatch):
+        monkeypatch.setattr(settings, "MAX_FILE_SIZE", 1024)
+        monkeypatch.setattr(settings, "UPLOAD_FORM_OVERHEAD_BYTES", 512)
+
+        llamadas, enviados = self.llamar({"content-type": "multipart/form-data; boundary=x",
+                                          "content-length": str(500 * 1024 * 1024)})
+
+        assert llamadas == []
+        assert enviados[0]["status"] == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+    @pytest.mark.parametrize("cabeceras", [
+        {"content-type": "multipart/form-data; boundary=x", "content-length": "1536"},
+        {"content-type": "multipart/form-data; boundary=x"},
+        {"content-type": "application/json", "content-length": str(500 * 1024 * 1024)},
+    ])
+    def test_other_requests_pass(self, monkeypatch, cabeceras):
+        """Small or unsized multipart bodies (still capped per chunk) and non-uploads reach the app."""
+        monkeypatch.setattr(settings, "MAX_FILE_SIZE", 1024)
+        monkeypatch.setattr(settings, "UPLOAD_FORM_OVERHEAD_BYTES", 512)
+
+        llamadas, _ = self.llamar(cabeceras)
+
+        assert llamadas == ["/api/pedidos/registrar"]
+
+
+class TestFotoEnReporte:
+    """Test the photo column of the client PDF table."""
+
+    def test_thumbnail_drawn_in_table(self, uploads):
+        """Rows with a stored photo show its thumbnail; others keep SI/NO."""
+        foto = guardar(imagen_jpeg(400, 300), uploads)
+        fila = [1, "Fresas", "Mediano", 1, "Progreso", "", "", 150.0, 150.0, None, None, "Rosa", date(2024, 5, 2)]
+        filas = [
+            tuple(fila[:9] + [foto.url] + fila[10:]),
+            tuple(fila[:9] + ["/static/uploads/borrada.jpg"] + fila[10:]),
+            tuple(fila),
+        ]
+
+        tabla = pdf_reportes.generar_tabla_clientes_acumulada(TablaColumnar(COLUMNAS_CLIENTES, filas))
+        columna_foto = [fila[6] for fila in tabla._cellvalues[1:4]]
+
+        assert isinstance(columna_foto[0], pdf_reportes.Image)
+        assert columna_foto[0].filename == str(foto.ruta_miniatura)
+        assert columna_foto[1:] == ["SI", "NO"]
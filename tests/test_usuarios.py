@@ -0,0 +1,149 @@
+"""
+User Store Tests for MiPastel Application
+
+Tests for:
+- Password hashes loaded on first use instead of at import time
+- The versioned hash file, the legacy flat format and generating only missing hashes
+- Read-only user data shared after loading
+- Importing app.main without any bcrypt work (startup benchmark)
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+import bcrypt
+import pytest
+from unittest.mock import patch
+
+from api import usuarios
+from api.usuarios import USUARIOS, AlmacenUsuarios, UsuariosDB, guardar_hashes, leer_hashes
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def rondas_baratas(monkeypatch):
+    """Generated hashes use the cheapest bcrypt cost so the tests stay fast."""
+    monkeypatch.setattr(usuarios, "RONDAS_BCRYPT", 4)
+
+
+def hash_rapido(password):
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=4)).decode()
+
+
+class TestAlmacenUsuarios:
+    """Test lazy loading and the hash file."""
+
+    def test_missing_file_generates_once_and_persists(self, tmp_path, rondas_baratas):
+        """Without a file every hash is generated once and saved in the versioned format."""
+        ruta = tmp_path / "hashes.json"
+        almacen = AlmacenUsuarios(ruta)
+
+        with patch.object(usuarios.bcrypt, "hashpw", wraps=bcrypt.hashpw) as hashpw:
+            admin = almacen.usuarios["admin"]
+            almacen.usuarios["progreso"]
+        contenido = json.loads(ruta.read_text())
+
+        assert hashpw.call_count == len(USUARIOS)
+        assert bcrypt.checkpw(b"admin123", admin["password_hash"].encode())
+        assert contenido["version"] == usuarios.VERSION_ARCHIVO
+        assert set(contenido["hashes"]) == set(USUARIOS)
+
+        with patch.object(usuarios.bcrypt, "hashpw") as hashpw:
+            assert AlmacenUsuarios(ruta).usuarios["admin"]["password_hash"] == admin["password_hash"]
+        hashpw.assert_not_called()
+
+    def test_legacy_flat_file_only_fills_gaps(self, tmp_path, rondas_baratas):
+        """The old {user: hash} file is still read; only users it lacks get a new hash."""
+        ruta = tmp_path / "hashes.json"
+        legado = {u: hash_rapido("x") for u in USUARIOS if u != "carina"}
+        ruta.write_text(json.dumps(legado))
+
+        with patch.object(usuarios.bcrypt, "hashpw", wraps=bcrypt.hashpw) as hashpw:
+            cargados = AlmacenUsuarios(ruta).usuarios
+
+        assert hashpw.call_count == 1
+        assert cargados["jutiapa1"]["password_hash"] == legado["jutiapa1"]
+        assert leer_hashes(str(ruta))["carina"] == cargados["carina"]["password_hash"]
+
+    def test_corrupt_file_is_replaced(self, tmp_path, rondas_baratas):
+        """An unreadable file is regenerated rather than leaving every login broken."""
+        ruta = tmp_path / "hashes.json"
+        ruta.write_text("{no es json")
+
+        assert AlmacenUsuarios(ruta).usuarios["jerez"]["password_hash"].startswith("$2b$04$")
+        assert json.loads(ruta.read_text())["version"] == usuarios.VERSION_ARCHIVO
+
+    def test_loaded_once_and_read_only(self, tmp_path):
+        """Every reader shares a single load, and the result cannot be modified."""
+        ruta = tmp_path / "hashes.json"
+        guardar_hashes(str(ruta), {u: hash_rapido("x") for u in USUARIOS})
+        almacen = AlmacenUsuarios(ruta)
+
+        with patch.object(usuarios, "leer_hashes", wraps=leer_hashes) as leer:
+            primero = almacen.usuarios
+            assert almacen.usuarios is primero
+        assert leer.call_count == 1
+
+        with pytest.raises(TypeError):
+            primero["admin"]["rol"] = "sucursal"
+        with pytest.raises(TypeError):
+            primero["intruso"] = {}
+
+        almacen.recargar()
+        assert not almacen.cargado
+
+    def test_membership_does_not_load(self, tmp_path):
+        """Checking names, iterating or counting users never reads the hash file."""
+        almacen = AlmacenUsuarios(tmp_path / "no-existe.json")
+        vista = UsuariosDB(almacen)
+
+        assert "admin" in vista and "nadie" not in vista
+        assert list(vista) == list(USUARIOS) and len(vista) == len(USUARIOS)
+        assert not almacen.cargado
+        assert not (tmp_path / "no-existe.json").exists()
+
+
+IMPORTAR_APP = """
+import json, sys, time
+import bcrypt
+
+llamadas = []
+hashpw = bcrypt.hashpw
+bcrypt.hashpw = lambda *a, **k: llamadas.append(1) or hashpw(*a, **k)
+
+inicio = time.perf_counter()
+import app.main
+from api.usuarios import almacen_usuarios
+print(json.dumps({"segundos": time.perf_counter() - inicio, "hashpw": len(llamadas),
+                  "cargado": almacen_usuarios.cargado}))
+"""
+
+
+class TestBenchmark:
+    """Benchmark application startup."""
+
+    def test_import_app_does_no_bcrypt(self, tmp_path):
+        """Importing app.main with no hash file computes no hash, unlike the import-time bootstrap."""
+        ruta = tmp_path / "hashes.json"
+        entorno = {**os.environ, "PASSWORD_HASHES_FILE": str(ruta)}
+        entorno["PYTHONPATH"] = os.pathsep.join(filter(None, [RAIZ, entorno.get("PYTHONPATH")]))
+
+        salida = subprocess.run([sys.executable, "-c", IMPORTAR_APP], cwd=RAIZ, env=entorno,
+                                capture_output=True, text=True, timeout=120)
+        assert salida.returncode == 0, salida.stderr
+        resultado = json.loads(salida.stdout.strip().splitlines()[-1])
+
+        # Lo que antes pagaba cada arranque sin archivo: un hash de costo 12 por usuario
+        inicio = time.perf_counter()
+        bcrypt.hashpw(b"x", bcrypt.gensalt(rounds=12))
+        bootstrap = (time.perf_counter() - inicio) * len(USUARIOS)
+
+        print(f"\nimport app.main: {resultado['segundos'] * 1000:.0f} ms; "
+              f"generar los hashes al importar añadía ~{bootstrap * 1000:.0f} ms")
+        assert resultado["hashpw"] == 0
+        assert resultado["cargado"] is False
+        assert not ruta.exists()
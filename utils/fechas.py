@@ -0,0 +1,51 @@
+"""
+Date Range Utilities for MiPastel Application
+
+Builds half-open ``[inicio, fin)`` datetime ranges for filtering the ``fecha``
+column. Comparing the raw column against two parameters keeps the predicate
+sargable, so SQL Server can seek the date indexes instead of evaluating
+``CAST(fecha AS DATE)`` on every row.
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Tuple, Union
+
+FechaEntrada = Union[str, date, datetime, None]
+
+
+def a_fecha(valor: FechaEntrada) -> Optional[date]:
+    """
+    Convert a request value to a date.
+
+    Args:
+        valor: ``YYYY-MM-DD`` string, date or datetime
+
+    Returns:
+        The date, or None if the value is empty
+
+    Raises:
+        ValueError: If the string is not a valid ISO date
+    """
+    if valor is None or valor == "":
+        return None
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return date.fromisoformat(str(valor).strip()[:10])
+
+
+def rango_dias(fecha_inicio: FechaEntrada = None, fecha_fin: FechaEntrada = None) -> Tuple[datetime, datetime]:
+    """
+    Half-open range covering whole days from fecha_inicio to fecha_fin.
+
+    Args:
+        fecha_inicio: First day (defaults to today)
+        fecha_fin: Last day, inclusive (defaults to fecha_inicio)
+
+    Returns:
+        Tuple ``(desde, hasta)`` to use as ``fecha >= desde AND fecha < hasta``
+    """
+    inicio = a_fecha(fecha_inicio) or date.today()
+    fin = a_fecha(fecha_fin) or inicio
+    return datetime.combine(inicio, time.min), datetime.combine(fin + timedelta(days=1), time.min)
@@ -108,13 +108,9 @@ def main():
         env_var_name = f"{username.upper()}_PASSWORD_HASH"
         print(f"{env_var_name}={password_hash}")
         print()
-        print("Or add to USERS_DB in api/auth.py:")
-        print(f'    "{username}": {{')
-        print(f'        "password_hash": "{password_hash}",')
-        print(f'        "nombre": "...",')
-        print(f'        "sucursal": "...",')
-        print(f'        "rol": "..."')
-        print('    }')
+        print("Or add it under \"hashes\" in api/.password_hashes.json")
+        print("(new users also need an entry in USUARIOS in api/usuarios.py):")
+        print(f'    "{username}": "{password_hash}"')
         print("-" * 70)
         print()
 
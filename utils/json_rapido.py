@@ -0,0 +1,123 @@
+"""
+Fast JSON Utilities for MiPastel Application
+
+Serializes pyodbc rows straight to JSON bytes for the order listings,
+skipping the per-row dicts, ``jsonable_encoder`` and the stdlib encoder
+FastAPI would otherwise run.
+
+``CodificadorFilas`` compiles one encoder function per column layout. With
+orjson installed the generated function hands a single list comprehension
+to ``orjson.dumps``; without it, each row is written with an f-string and
+the C string escaper of the ``json`` module. Both produce exactly the
+bytes ``JSONResponse`` produced for the old dicts.
+"""
+
+import json
+from json.encoder import encode_basestring
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Union
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Tipos de columna: valores tal cual, Decimal -> float, o fechas en ISO 8601
+TIPO_ENTERO = "int"
+TIPO_DECIMAL = "float"
+TIPO_TEXTO = "str"
+TIPO_FECHA = "fecha"
+
+Columna = Tuple[str, Union[str, Callable[[Any], Any]], int]
+
+
+def _json_stdlib(valor: Any) -> bytes:
+    return json.dumps(valor, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps(valor: Any) -> bytes:
+    """JSON bytes for plain values (dicts, lists, str, numbers, None)."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(valor)
+    return _json_stdlib(valor)
+
+
+def _expresion_orjson(tipo, indice: int) -> str:
+    valor = f"r[{indice}]"
+    if callable(tipo):
+        return f"f{indice}({valor})"
+    if tipo == TIPO_DECIMAL:
+        return f"(None if {valor} is None else float({valor}))"
+    # orjson escribe enteros, texto, datetime y date igual que isoformat()
+    return valor
+
+
+def _expresion_fstring(tipo, indice: int) -> str:
+    valor = f"r[{indice}]"
+    if callable(tipo):
+        return f"{{generico(f{indice}({valor}))}}"
+    if tipo == TIPO_ENTERO:
+        return f"{{'null' if {valor} is None else int({valor})}}"
+    if tipo == TIPO_DECIMAL:
+        return f"{{'null' if {valor} is None else repr(float({valor}))}}"
+    if tipo == TIPO_FECHA:
+        return f"{{'null' if {valor} is None else texto({valor}.isoformat())}}"
+    return f"{{'null' if {valor} is None else texto({valor})}}"
+
+
+class CodificadorFilas:
+    """
+    JSON encoder for the rows of one query, compiled once per column layout.
+
+    Args:
+        columnas: ``(nombre, tipo, indice)`` per output field, in output
+            order. ``tipo`` is one of the ``TIPO_*`` constants or a function
+            applied to the value first (e.g. to derive a field).
+    """
+
+    def __init__(self, columnas: Sequence[Columna], usar_orjson: Optional[bool] = None):
+        self.columnas = tuple(columnas)
+        self.usar_orjson = ORJSON_AVAILABLE if usar_orjson is None else usar_orjson
+        self.codificar = self._compilar()
+
+    def _compilar(self) -> Callable[[Sequence[Sequence[Any]]], bytes]:
+        entorno: Dict[str, Any] = {"texto": encode_basestring, "generico": lambda v: _json_stdlib(v).decode("utf-8")}
+        for _, tipo, indice in self.columnas:
+            if callable(tipo):
+                entorno[f"f{indice}"] = tipo
+
+        if self.usar_orjson:
+            entorno["dumps"] = orjson.dumps
+            campos = ", ".join(f"{nombre!r}: {_expresion_orjson(tipo, indice)}" for nombre, tipo, indice in self.columnas)
+            fuente = f"def codificar(filas):\n    return dumps([{{{campos}}} for r in filas])\n"
+        else:
+            campos = ",".join(
+                f"{encode_basestring(nombre)}:{_expresion_fstring(tipo, indice)}"
+                for nombre, tipo, indice in self.columnas
+            )
+            fuente = (
+                "def codificar(filas):\n"
+                f"    return ('[' + ','.join([f'''{{{{{campos}}}}}''' for r in filas]) + ']').encode('utf-8')\n"
+            )
+
+        exec(compile(fuente, f"<CodificadorFilas {','.join(c[0] for c in self.columnas)}>", "exec"), entorno)
+        return entorno["codificar"]
+
+
+def respuesta_listado(clave: str, codificador: CodificadorFilas, pagina: Dict[str, Any]) -> Response:
+    """
+    Raw JSON response ``{clave: [rows...], **pagina}`` for a keyset page of rows.
+
+    ``pagina`` is the dict returned by ``fetch_keyset_page`` with its
+    ``items`` still as database rows.
+    """
+    pagina = dict(pagina)
+    filas = codificador.codificar(pagina.pop("items"))
+    cuerpo = b"{" + dumps(clave) + b":" + filas
+    if pagina:
+        cuerpo += b"," + dumps(pagina)[1:]
+    else:
+        cuerpo += b"}"
+    return Response(content=cuerpo, media_type="application/json")
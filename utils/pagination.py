@@ -5,13 +5,19 @@ Provides helper functions and classes for implementing pagination
 in database queries and API responses.
 """
 
+import base64
+import json
+from datetime import datetime, timedelta
 from math import ceil
-from typing import TypeVar, Generic, List, Dict, Any
+from typing import TypeVar, Generic, List, Dict, Any, Awaitable, Callable, Optional, Tuple, Union
 
 from pydantic import BaseModel
 
 T = TypeVar('T')
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
 
 class PaginationParams(BaseModel):
     """Parameters for pagination."""
@@ -33,9 +39,9 @@ class PaginationParams(BaseModel):
         if self.page < 1:
             self.page = 1
         if self.page_size < 1:
-            self.page_size = 50
-        if self.page_size > 100:
-            self.page_size = 100
+            self.page_size = DEFAULT_PAGE_SIZE
+        if self.page_size > MAX_PAGE_SIZE:
+            self.page_size = MAX_PAGE_SIZE
 
 
 class PaginatedResponse(BaseModel, Generic[T]):
@@ -161,6 +167,120 @@ def calculate_offset_limit(page: int, page_size: int) -> tuple[int, int]:
     return params.offset, params.limit
 
 
+
+def clamp_page_size(page_size: Optional[int]) -> int:
+    """Keep a requested page size between 1 and MAX_PAGE_SIZE."""
+    if not page_size or page_size < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(page_size, MAX_PAGE_SIZE)
+
+
+def encode_cursor(fecha: Union[str, datetime], item_id: int) -> str:
+    """
+    Build an opaque cursor pointing after the (fecha, id) key of a row.
+
+    Args:
+        fecha: Row date as datetime or ISO string
+        item_id: Row id
+
+    Returns:
+        str: URL-safe cursor
+    """
+    if isinstance(fecha, datetime):
+        fecha = fecha.isoformat()
+    raw = json.dumps([fecha, int(item_id)], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor was not produced by encode_cursor
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        fecha, item_id = json.loads(raw)
+        return datetime.fromisoformat(fecha), int(item_id)
+    except Exception:
+        raise ValueError("Cursor de paginación inválido")
+
+
+def keyset_filter(after: Tuple[datetime, int], column: str = "fecha") -> Tuple[str, tuple]:
+    """
+    SQL predicate selecting the rows after a key in ``ORDER BY fecha DESC, id DESC``.
+
+    Python datetimes stop at microseconds while DATETIME2 keeps 100 ns, so a
+    row's key may be truncated in the cursor. Rows inside that microsecond
+    are told apart by id; the leading ``fecha < ?`` keeps the predicate
+    a single index seek.
+
+    Returns:
+        tuple: (sql fragment starting with " AND", params)
+    """
+    fecha, item_id = after
+    upper = fecha + timedelta(microseconds=1)
+    return f" AND {column} < ? AND ({column} < ? OR id < ?)", (upper, fecha, item_id)
+
+
+def dict_key(row: Dict[str, Any]) -> Tuple[Any, int]:
+    """(fecha, id) of a listing row returned as a dict."""
+    return row["fecha"], row["id"]
+
+
+def keyset_page(
+    rows: List[Any],
+    page_size: int,
+    key: Callable[[Any], Tuple[Any, int]] = dict_key
+) -> Dict[str, Any]:
+    """
+    Split a ``page_size + 1`` fetch into the page and its continuation cursor.
+
+    Args:
+        rows: Rows ordered by fecha DESC, id DESC (at most page_size + 1)
+        page_size: Number of rows to return
+        key: Returns the (fecha, id) of a row; dict rows by default
+
+    Returns:
+        dict: items, next_cursor and has_next
+    """
+    has_next = len(rows) > page_size
+    items = rows[:page_size]
+    next_cursor = encode_cursor(*key(items[-1])) if has_next else None
+    return {"items": items, "next_cursor": next_cursor, "has_next": has_next}
+
+
+async def fetch_keyset_page(
+    fetch: Callable[..., Awaitable[List[Dict[str, Any]]]],
+    count: Optional[Callable[..., Awaitable[int]]] = None,
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    key: Callable[[Any], Tuple[Any, int]] = dict_key,
+    **filters
+) -> Dict[str, Any]:
+    """
+    Fetch one keyset page from a listing method.
+
+    ``fetch`` receives the filters plus ``limite`` (page size + 1) and
+    ``despues_de`` (decoded cursor); ``count`` is only called when the
+    total is requested. ``key`` reads (fecha, id) from the rows ``fetch``
+    returns.
+
+    Raises:
+        ValueError: If the cursor is invalid
+    """
+    page_size = clamp_page_size(page_size)
+    after = decode_cursor(cursor) if cursor else None
+
+    rows = await fetch(limite=page_size + 1, despues_de=after, **filters)
+    page = keyset_page(rows, page_size, key)
+    page["page_size"] = page_size
+    if include_total and count is not None:
+        page["total"] = await count(**filters)
+    return page
+
 # Example usage in FastAPI endpoint:
 """
 from fastapi import Query
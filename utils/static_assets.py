@@ -0,0 +1,212 @@
+"""
+Static Asset Utilities for MiPastel Application
+
+Fingerprints the files under ``static/`` at startup and serves them with
+cache headers branch tablets on slow links can rely on:
+
+- Templates link assets through ``static_url('js/carrito.js')``, which adds
+  ``?v=<hash>`` of the current content
+- A request carrying the current hash gets ``Cache-Control: immutable`` for a
+  year; anything else is revalidated with a strong ETag and answered with 304
+- JS/CSS are gzip (and brotli, when installed) compressed once at startup
+- Photos named by content hash in ``uploads/`` are immutable as well
+
+The uploads folder is not fingerprinted at startup (it grows at runtime);
+its files are served with a content ETag instead.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+from fastapi.staticfiles import StaticFiles
+from fastapi.templating import Jinja2Templates
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import Scope
+
+from config.settings import settings
+from utils.logger import logger
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+URL_STATIC = "/static"
+CARPETA_UPLOADS = "uploads"
+LARGO_HASH = 12
+EXTENSIONES_COMPRIMIBLES = {".js", ".css", ".svg", ".json", ".txt", ".html"}
+CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+CACHE_REVALIDAR = "no-cache"
+# <sha256>.jpg y <sha256>_thumb.jpg de utils.uploads
+PATRON_UPLOAD_HASH = re.compile(r"^([0-9a-f]{64})(?:_thumb)?\.jpg$")
+
+
+class Recurso:
+    """A fingerprinted static file and its precompressed variants."""
+
+    __slots__ = ("hash", "variantes")
+
+    def __init__(self, hash_contenido: str, variantes: Dict[str, bytes]):
+        self.hash = hash_contenido
+        self.variantes = variantes
+
+
+def _comprimir(contenido: bytes) -> Dict[str, bytes]:
+    variantes = {}
+    if BROTLI_AVAILABLE:
+        variantes["br"] = brotli.compress(contenido, quality=11)
+    variantes["gzip"] = gzip.compress(contenido, compresslevel=9, mtime=0)
+    # Sólo vale la pena si realmente ahorra bytes
+    return {codificacion: datos for codificacion, datos in variantes.items() if len(datos) < len(contenido)}
+
+
+class ManifiestoEstaticos:
+    """Content hashes of the static files, keyed by their path relative to ``static/``."""
+
+    def __init__(self, directorio: Path):
+        self.directorio = Path(directorio)
+        self.recursos: Dict[str, Recurso] = {}
+
+    def cargar(self) -> "ManifiestoEstaticos":
+        recursos = {}
+        for ruta in sorted(self.directorio.rglob("*")):
+            relativa = ruta.relative_to(self.directorio).as_posix()
+            if not ruta.is_file() or relativa.split("/", 1)[0] == CARPETA_UPLOADS:
+                continue
+            contenido = ruta.read_bytes()
+            hash_contenido = hashlib.sha256(contenido).hexdigest()[:LARGO_HASH]
+            variantes = _comprimir(contenido) if ruta.suffix.lower() in EXTENSIONES_COMPRIMIBLES else {}
+            recursos[relativa] = Recurso(hash_contenido, variantes)
+        self.recursos = recursos
+        logger.info(f"Manifiesto de estáticos: {len(recursos)} archivos")
+        return self
+
+    def recurso(self, relativa: str) -> Optional[Recurso]:
+        return self.recursos.get(relativa)
+
+    def url(self, relativa: str) -> str:
+        """URL of ``static/<relativa>`` with its content hash, for use in templates."""
+        relativa = relativa.lstrip("/")
+        recurso = self.recursos.get(relativa)
+        if recurso is None:
+            return f"{URL_STATIC}/{relativa}"
+        return f"{URL_STATIC}/{relativa}?v={recurso.hash}"
+
+
+manifiesto_estaticos = ManifiestoEstaticos(settings.STATIC_DIR).cargar()
+
+
+def static_url(relativa: str) -> str:
+    return manifiesto_estaticos.url(relativa)
+
+
+def configurar_plantillas(templates: Jinja2Templates) -> Jinja2Templates:
+    """Expose ``static_url`` to the templates."""
+    templates.env.globals["static_url"] = static_url
+    return templates
+
+
+def elegir_codificacion(accept_encoding: str, disponibles) -> Optional[str]:
+    """
+    Best of ``disponibles`` for an Accept-Encoding header, honouring q-values.
+
+    Ties go to the order of ``disponibles`` (brotli before gzip).
+    """
+    pesos = {}
+    for parte in accept_encoding.split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        nombre = nombre.strip().lower()
+        if not nombre:
+            continue
+        q = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                q = float(parametros[2:])
+            except ValueError:
+                q = 0.0
+        pesos[nombre] = q
+
+    mejor, mejor_q = None, 0.0
+    for codificacion in disponibles:
+        q = pesos.get(codificacion, pesos.get("*", 0.0))
+        if q > mejor_q:
+            mejor, mejor_q = codificacion, q
+    return mejor
+
+
+def _coincide_etag(if_none_match: str, etag: str) -> bool:
+    etiquetas = [e.strip() for e in if_none_match.split(",")]
+    return "*" in etiquetas or etag in etiquetas
+
+
+class EstaticosConCache(StaticFiles):
+    """StaticFiles with content-hash ETags, immutable caching and precompressed variants."""
+
+    def __init__(self, *args, manifiesto: Optional[ManifiestoEstaticos] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.manifiesto = manifiesto or manifiesto_estaticos
+
+    def _identidad(self, relativa: str, version: Optional[str]) -> Tuple[Optional[Recurso], Optional[str], str]:
+        """(recurso, hash, Cache-Control) for a request path."""
+        recurso = self.manifiesto.recurso(relativa)
+        if recurso is not None:
+            cache = CACHE_INMUTABLE if version == recurso.hash else CACHE_REVALIDAR
+            return recurso, recurso.hash, cache
+
+        carpeta, _, nombre = relativa.rpartition("/")
+        if carpeta == CARPETA_UPLOADS and PATRON_UPLOAD_HASH.match(nombre):
+            return None, os.path.splitext(nombre)[0], CACHE_INMUTABLE
+        return None, None, CACHE_REVALIDAR
+
+    def file_response(
+            self,
+            full_path,
+            stat_result: os.stat_result,
+            scope: Scope,
+            status_code: int = 200
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        relativa = self.get_path(scope).replace(os.sep, "/")
+        version = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("v", [None])[0]
+        recurso, hash_contenido, cache_control = self._identidad(relativa, version)
+
+        codificacion = None
+        headers = {"Cache-Control": cache_control}
+        if recurso is not None and recurso.variantes:
+            codificacion = elegir_codificacion(request_headers.get("accept-encoding", ""), recurso.variantes)
+            headers["Vary"] = "Accept-Encoding"
+        if hash_contenido is not None:
+            # Cada codificación es una representación distinta y lleva su propio ETag
+            headers["ETag"] = f'"{hash_contenido}-{codificacion}"' if codificacion else f'"{hash_contenido}"'
+
+        if codificacion:
+            headers["Content-Encoding"] = codificacion
+            response = Response(
+                recurso.variantes[codificacion],
+                status_code=status_code,
+                media_type=mimetypes.guess_type(relativa)[0] or "text/plain",
+                headers=headers,
+            )
+        else:
+            response = FileResponse(
+                full_path, status_code=status_code, stat_result=stat_result, method=scope["method"],
+                headers=headers
+            )
+
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            if _coincide_etag(if_none_match, response.headers["etag"]):
+                return NotModifiedResponse(response.headers)
+        elif self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,74 @@
+"""
+Streaming Utilities for MiPastel Application
+
+Helpers to send binary files (PDF reports) as chunked responses with an
+exact Content-Length, from open file objects instead of shared paths.
+"""
+
+import os
+from typing import BinaryIO, Iterator, Optional
+from urllib.parse import quote
+
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from config.settings import settings
+
+
+def file_size(file: BinaryIO) -> int:
+    """Bytes left to read from the current position of ``file``."""
+    position = file.tell()
+    end = file.seek(0, os.SEEK_END)
+    file.seek(position)
+    return end - position
+
+
+def iter_file(file: BinaryIO, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Yield ``file`` in chunks and close it at the end.
+
+    Starlette iterates sync iterators in its threadpool, so the reads never
+    block the event loop.
+    """
+    chunk_size = chunk_size or settings.STREAM_CHUNK_BYTES
+    try:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        file.close()
+
+
+def content_disposition(filename: str, disposition: str = "attachment") -> str:
+    """Content-Disposition header value, with RFC 5987 encoding for non-ASCII names."""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition}; filename*=utf-8''{quoted}"
+    return f'{disposition}; filename="{filename}"'
+
+
+def stream_file(
+        file: BinaryIO,
+        filename: str,
+        media_type: str = "application/pdf",
+        chunk_size: Optional[int] = None
+) -> StreamingResponse:
+    """
+    Stream an open binary file as a download.
+
+    The file is read from its current position; Content-Length is computed
+    up front so clients can show progress. The file is closed when the
+    response finishes, even if the client disconnects.
+    """
+    headers = {
+        "Content-Length": str(file_size(file)),
+        "Content-Disposition": content_disposition(filename),
+    }
+    return StreamingResponse(
+        iter_file(file, chunk_size),
+        media_type=media_type,
+        headers=headers,
+        background=BackgroundTask(file.close)
+    )
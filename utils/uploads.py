@@ -0,0 +1,193 @@
+"""
+Photo Upload Utilities for MiPastel Application
+
+Streams cake photos from ``UploadFile`` to disk in chunks, capped at
+MAX_FILE_SIZE, names them by the SHA-256 of their content and re-encodes them off the
+event loop with Pillow:
+
+- ``<hash>.jpg``: the photo, at most UPLOAD_MAX_DIMENSION pixels per side
+- ``<hash>_thumb.jpg``: a thumbnail of at most UPLOAD_THUMB_DIMENSION pixels
+
+Identical photos map to the same files, and two uploads in the same second
+can no longer overwrite each other. Because another order may already point
+at the same file, photos are never deleted when an insert fails; an orphaned
+file is harmless.
+"""
+
+import hashlib
+import os
+import uuid
+from pathlib import Path
+from typing import Optional
+
+import anyio
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from config.settings import settings
+from utils.logger import logger
+
+EXTENSIONES_PERMITIDAS = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp"}
+SUFIJO_MINIATURA = "_thumb"
+URL_UPLOADS = "/static/uploads"
+CALIDAD_JPEG = 85
+
+
+class ArchivoDemasiadoGrande(Exception):
+    """The upload exceeded MAX_FILE_SIZE."""
+
+
+class ImagenInvalida(ValueError):
+    """The upload is not an image Pillow can read."""
+
+
+class FotoGuardada:
+    """Files written for an uploaded photo."""
+
+    __slots__ = ("hash", "ruta", "ruta_miniatura", "nueva")
+
+    def __init__(self, hash_contenido: str, ruta: Path, ruta_miniatura: Path, nueva: bool):
+        self.hash = hash_contenido
+        self.ruta = ruta
+        self.ruta_miniatura = ruta_miniatura
+        self.nueva = nueva
+
+    @property
+    def url(self) -> str:
+        return f"{URL_UPLOADS}/{self.ruta.name}"
+
+    @property
+    def url_miniatura(self) -> str:
+        return f"{URL_UPLOADS}/{self.ruta_miniatura.name}"
+
+
+def extension_permitida(nombre: Optional[str]) -> bool:
+    return bool(nombre) and os.path.splitext(nombre)[1].lower() in EXTENSIONES_PERMITIDAS
+
+
+def _nombre_miniatura(nombre: str) -> str:
+    base, ext = os.path.splitext(nombre)
+    return f"{base}{SUFIJO_MINIATURA}{ext}"
+
+
+def url_miniatura(foto_path: Optional[str]) -> Optional[str]:
+    """
+    Thumbnail URL for a stored ``foto_path``, derived from the naming scheme.
+
+    Returns None for empty values and for legacy photos saved before
+    thumbnails existed, so callers can fall back to the full photo.
+    """
+    if not foto_path or not foto_path.startswith(f"{URL_UPLOADS}/") or not foto_path.endswith(".jpg"):
+        return None
+    return _nombre_miniatura(foto_path)
+
+
+def ruta_miniatura(foto_path: Optional[str], directorio: Optional[Path] = None) -> Optional[Path]:
+    """
+    File on disk to show for ``foto_path``: the thumbnail if present, else the photo itself.
+
+    Accepts both the ``/static/uploads/...`` URLs and the absolute paths older
+    versions stored. Returns None when neither file exists.
+    """
+    if not foto_path:
+        return None
+    directorio = Path(directorio or settings.UPLOADS_DIR)
+    nombre = os.path.basename(foto_path.replace("\\", "/"))
+    for candidato in (directorio / _nombre_miniatura(nombre), directorio / nombre):
+        if candidato.is_file():
+            return candidato
+    return None
+
+
+def _guardar_jpeg(imagen, ruta: Path):
+    temporal = ruta.with_name(f"{ruta.stem}.{uuid.uuid4().hex}.tmp")
+    try:
+        imagen.save(temporal, "JPEG", quality=CALIDAD_JPEG, optimize=True)
+        os.replace(temporal, ruta)
+    finally:
+        temporal.unlink(missing_ok=True)
+
+
+def _reencodar(origen: Path, destino: Path, miniatura: Path, max_dimension: int, max_miniatura: int):
+    """Decode, orient and save the bounded photo and its thumbnail. Runs in a worker thread."""
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(origen) as imagen:
+            # Lets the JPEG decoder scale down while decoding instead of after
+            imagen.draft("RGB", (max_dimension, max_dimension))
+            imagen = ImageOps.exif_transpose(imagen)
+            if imagen.mode != "RGB":
+                imagen = imagen.convert("RGB")
+            imagen.thumbnail((max_dimension, max_dimension))
+            pequena = imagen.copy()
+            pequena.thumbnail((max_miniatura, max_miniatura))
+
+            _guardar_jpeg(imagen, destino)
+            _guardar_jpeg(pequena, miniatura)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ImagenInvalida(f"La imagen no se pudo procesar: {e}")
+
+
+async def guardar_foto(
+        archivo: UploadFile,
+        directorio: Optional[Path] = None,
+        max_bytes: Optional[int] = None,
+        chunk_size: Optional[int] = None
+) -> FotoGuardada:
+    """
+    Stream an uploaded photo to disk and re-encode it.
+
+    Args:
+        archivo: The uploaded file
+        directorio: Destination folder (defaults to UPLOADS_DIR)
+        max_bytes: Largest photo copied to ``directorio`` (defaults to MAX_FILE_SIZE). Starlette
+            has already spooled the request body by now; oversized requests are refused
+            earlier, from their Content-Length, by app.middleware.LimiteSubidaMiddleware
+        chunk_size: Bytes read per chunk (defaults to STREAM_CHUNK_BYTES)
+
+    Raises:
+        ArchivoDemasiadoGrande: If the upload exceeds ``max_bytes``; nothing is kept
+        ImagenInvalida: If the content is not a readable image
+    """
+    directorio = Path(directorio or settings.UPLOADS_DIR)
+    max_bytes = settings.MAX_FILE_SIZE if max_bytes is None else max_bytes
+    chunk_size = chunk_size or settings.STREAM_CHUNK_BYTES
+    limite = ArchivoDemasiadoGrande(f"La imagen supera el máximo de {max_bytes / (1024 * 1024):g} MB")
+    if archivo.size is not None and archivo.size > max_bytes:
+        raise limite
+    directorio.mkdir(parents=True, exist_ok=True)
+
+    temporal = directorio / f".subida-{uuid.uuid4().hex}.part"
+    sha256 = hashlib.sha256()
+    recibidos = 0
+
+    try:
+        async with await anyio.open_file(temporal, "wb") as destino:
+            while True:
+                chunk = await archivo.read(chunk_size)
+                if not chunk:
+                    break
+                recibidos += len(chunk)
+                if recibidos > max_bytes:
+                    raise limite
+                sha256.update(chunk)
+                await destino.write(chunk)
+
+        if recibidos == 0:
+            raise ImagenInvalida("La imagen está vacía")
+
+        hash_contenido = sha256.hexdigest()
+        ruta = directorio / f"{hash_contenido}.jpg"
+        miniatura = directorio / _nombre_miniatura(ruta.name)
+
+        if ruta.exists() and miniatura.exists():
+            return FotoGuardada(hash_contenido, ruta, miniatura, nueva=False)
+
+        await run_in_threadpool(
+            _reencodar, temporal, ruta, miniatura, settings.UPLOAD_MAX_DIMENSION, settings.UPLOAD_THUMB_DIMENSION
+        )
+        logger.info(f"Foto guardada: {ruta.name} ({recibidos} bytes recibidos)")
+        return FotoGuardada(hash_contenido, ruta, miniatura, nueva=True)
+    finally:
+        temporal.unlink(missing_ok=True)